@@ -13,6 +13,7 @@ from agents.tools import (
     get_loyalty_tier_tool,
     get_pending_deliveries_tool,
     suggest_routes_tool,
+    optimize_staff_schedule_tool,
 )
 
 
@@ -67,9 +68,9 @@ def create_customer_service_agent(llm):
 def create_logistics_agent(llm):
     return Agent(
         role="Logistics Coordinator",
-        goal="Optimize delivery routes and ensure orders reach the store on time.",
-        backstory="You plan efficient routes and coordinate with pending orders and drivers.",
-        tools=[get_pending_deliveries_tool, suggest_routes_tool],
+        goal="Optimize delivery routes and ensure orders reach the store on time, with enough staff on the floor.",
+        backstory="You plan efficient routes, coordinate with pending orders and drivers, and plan the staff rota.",
+        tools=[get_pending_deliveries_tool, suggest_routes_tool, optimize_staff_schedule_tool],
         llm=llm,
         verbose=True,
         allow_delegation=False,
@@ -1,7 +1,11 @@
 """Crew definition: agents and tasks for store operations."""
 from crewai import Crew, Process, Task, LLM
 
+from aws.dynamodb import store_scope
 from config import settings
+from core import governor
+from core.metrics import CREW_LATENCY, timed
+from agents.llm import bedrock_runtime_client, install_llm_metrics, register_token_sink, unregister_token_sink
 from agents.agents import (
     create_inventory_manager,
     create_pricing_agent,
@@ -11,17 +15,32 @@ from agents.agents import (
 )
 
 
-def _build_llm() -> LLM:
-    """Single LLM builder used by all agents and the crew."""
-    return LLM(
+def _build_llm(stream: bool = False) -> LLM:
+    """Single LLM builder used by all agents and the crew. stream=True emits token chunks."""
+    if settings.llm_backend == "fake":
+        from agents.fake_llm import build_fake_llm
+        return build_fake_llm(stream=stream)
+    llm = LLM(
         model=f"bedrock/{settings.bedrock_model_id}",
         temperature=0.2,
         aws_region_name=settings.aws_region,
+        stream=stream,
     )
+    # Route Bedrock requests through the shared governor (adaptive concurrency, retries)
+    client = bedrock_runtime_client(settings.bedrock_model_id)
+    if client is not None:
+        llm._client = client
+    return llm
+
+
+def _function_calling_llm(llm):
+    """The Bedrock LLM doubles as function_calling_llm; the fake LLM speaks ReAct text only."""
+    return llm if llm.supports_function_calling() else None
 
 
 def _inventory_task(agent) -> Task:
     return Task(
+        name="inventory_review",
         description=(
             "Check current inventory. List any items that are at or below reorder threshold. "
             "For each low-stock item, create a purchase order (use create_order_tool) with a reasonable quantity. "
@@ -34,6 +53,7 @@ def _inventory_task(agent) -> Task:
 
 def _pricing_task(agent) -> Task:
     return Task(
+        name="pricing_review",
         description=(
             "Review inventory levels. For items that are low stock, suggest whether to raise price or limit discounts. "
             "For items with high stock, suggest a promotion or discount. "
@@ -46,6 +66,7 @@ def _pricing_task(agent) -> Task:
 
 def _maintenance_task(agent) -> Task:
     return Task(
+        name="maintenance_review",
         description=(
             "List all equipment and their health scores. Identify any with health_score below 0.5 or 50%. "
             "Recommend which equipment should get maintenance next and why."
@@ -55,8 +76,23 @@ def _maintenance_task(agent) -> Task:
     )
 
 
+def _targeted_maintenance_task(agent, equipment_ids: list[str], reasons: dict[str, str]) -> Task:
+    details = "; ".join(f"{eid}: {reasons.get(eid) or 'anomalous telemetry'}" for eid in equipment_ids)
+    return Task(
+        name="targeted_maintenance",
+        description=(
+            f"Telemetry flagged these equipment IDs as degrading: {details}. "
+            "Check the current status of each one (use get_equipment_status_tool with the equipment ID). "
+            "Only look at these IDs. For each, say whether maintenance is needed now, soon, or not at all, and why."
+        ),
+        expected_output="One maintenance recommendation per flagged equipment ID.",
+        agent=agent,
+    )
+
+
 def _customer_service_task(agent) -> Task:
     return Task(
+        name="customer_service_guide",
         description=(
             "Prepare a short guide for staff: how to look up a customer by ID, check their loyalty tier, "
             "and what kind of offers to suggest for bronze vs silver vs gold tiers. "
@@ -69,24 +105,28 @@ def _customer_service_task(agent) -> Task:
 
 def _logistics_task(agent) -> Task:
     return Task(
+        name="logistics_plan",
         description=(
             "Check pending deliveries (orders). Suggest an optimal route order for fulfilling them. "
-            "Summarize pending orders and the suggested route."
+            "Summarize pending orders and the suggested route. "
+            "Then plan next week's staff schedule (use optimize_staff_schedule_tool) and list the biggest coverage gaps."
         ),
-        expected_output="A summary of pending deliveries and suggested route.",
+        expected_output="A summary of pending deliveries, the suggested route, and staffing coverage gaps.",
         agent=agent,
     )
 
 
-def build_store_crew() -> Crew:
-    """Build the store operations crew with sequential process."""
+@timed(CREW_LATENCY, operation="build")
+def build_store_crew(stream: bool = False) -> Crew:
+    """Build the store operations crew with sequential process (streaming LLM if stream)."""
+    install_llm_metrics()
     print("=" * 60)
     print("🏗️ Building store crew...")
     print(f"📍 Region: {settings.aws_region}")
     print(f"📍 Model: {settings.bedrock_model_id}")
     print("=" * 60)
 
-    llm = _build_llm()
+    llm = _build_llm(stream=stream)
     print(f"✅ Created LLM: {llm}")
 
     inventory_manager = create_inventory_manager(llm)
@@ -116,12 +156,49 @@ def build_store_crew() -> Crew:
         # ✅ KEY FIX: pass the same LLM as function_calling_llm
         # This forces CrewAI to use native tool/function calling
         # instead of the ReAct text loop that Nova models can't follow
-        function_calling_llm=llm,
+        function_calling_llm=_function_calling_llm(llm),
+        verbose=True,
+    )
+
+
+@timed(CREW_LATENCY, operation="build_maintenance")
+def build_maintenance_crew(equipment_ids: list[str], reasons: dict[str, str] | None = None) -> Crew:
+    """One-agent crew: the Maintenance Coordinator, scoped to the given equipment."""
+    install_llm_metrics()
+    llm = _build_llm()
+    maintenance_agent = create_maintenance_agent(llm)
+    return Crew(
+        agents=[maintenance_agent],
+        tasks=[_targeted_maintenance_task(maintenance_agent, equipment_ids, reasons or {})],
+        process=Process.sequential,
+        function_calling_llm=_function_calling_llm(llm),
         verbose=True,
     )
 
 
-def run_store_operations(**kwargs):
-    """Run the full store operations crew. Pass optional inputs via kwargs."""
-    crew = build_store_crew()
-    return crew.kickoff(inputs=kwargs or {})
\ No newline at end of file
+def run_maintenance_for(equipment_ids: list[str], reasons: dict[str, str] | None = None, priority: str = "batch"):
+    """Run only the maintenance task for specific equipment (e.g. after a telemetry anomaly)."""
+    crew = build_maintenance_crew(equipment_ids, reasons)
+    with governor.priority(priority), CREW_LATENCY.time(operation="kickoff_maintenance"):
+        return crew.kickoff(inputs={"equipment_ids": ",".join(equipment_ids)})
+
+
+def run_store_operations(on_token=None, priority: str = "normal", **kwargs):
+    """
+    Run the full store operations crew. Pass optional inputs via kwargs.
+    on_token(chunk, agent_role, task_name) receives the LLM output as it is generated.
+    priority ("interactive" / "normal" / "batch") orders this run's Bedrock calls
+    against other crews waiting on the governor. kwargs["store_id"] selects the
+    store's tables (aws.dynamodb.store_scope).
+    """
+    stream = on_token is not None and settings.llm_stream_tokens
+    crew = build_store_crew(stream=stream)
+    keys = [id(a.llm) for a in crew.agents] + [str(a.id) for a in crew.agents] if stream else []
+    if stream:
+        register_token_sink(keys, on_token)
+    try:
+        with store_scope(kwargs.get("store_id")), governor.priority(priority):
+            with CREW_LATENCY.time(operation="kickoff"):
+                return crew.kickoff(inputs=kwargs or {})
+    finally:
+        unregister_token_sink(keys)
\ No newline at end of file
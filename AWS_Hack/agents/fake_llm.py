@@ -0,0 +1,122 @@
+"""
+Deterministic stand-in for the Bedrock LLM (LLM_BACKEND=fake): benchmarks, load
+tests and offline demo runs of the crew without Bedrock.
+
+It speaks CrewAI's ReAct text protocol. On each call it counts the observations
+already in the conversation and either emits the agent's next scripted tool call
+(`Action:` / `Action Input:`) or, once the script is done, a final answer quoting
+the observations. The default script calls each of the agent's tools once with no
+input. FAKE_LLM_SCRIPT points to a JSON file of {role: [{"tool": name,
+"input": {...}}, ...]} to replace that per role.
+
+With stream=True the reply is also emitted word by word as stream-chunk events
+(fake_llm_token_ms apart), like a streaming Bedrock call.
+
+Latency per call is fake_llm_latency_ms +- fake_llm_jitter_ms, with jitter drawn from
+a generator seeded by (role, step), so the same run has the same timings.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import random
+import re
+import time
+from typing import Any
+
+from crewai import BaseLLM
+from crewai.llms.base_llm import llm_call_context
+
+from config import settings
+
+
+def _load_script(path: str) -> dict[str, list[dict[str, Any]]]:
+    if not path:
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+class FakeLLM(BaseLLM):
+    """Scripted ReAct LLM; see module docstring."""
+
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    token_ms: float = 0.0
+    script: dict[str, list[dict[str, Any]]] = {}
+    calls: int = 0
+
+    def call(
+        self,
+        messages: Any,
+        tools: list[dict[str, Any]] | None = None,
+        callbacks: list[Any] | None = None,
+        available_functions: dict[str, Any] | None = None,
+        from_task: Any = None,
+        from_agent: Any = None,
+        response_model: Any = None,
+    ) -> str:
+        role = getattr(from_agent, "role", None) or "agent"
+        # One assistant turn per executed tool, ending in its observation (the system
+        # prompt and tool errors also quote "Observation:", so count turns, not matches)
+        turns = [] if isinstance(messages, str) else [
+            str(m.get("content", "")) for m in messages
+            if isinstance(m, dict) and m.get("role") == "assistant" and "\nObservation:" in str(m.get("content", ""))
+        ]
+        observations = len(turns)
+        steps = self.script.get(role)
+        if steps is None:
+            steps = [{"tool": t.name, "input": {}} for t in getattr(from_agent, "tools", None) or []]
+        self._sleep(role, observations)
+        self.calls += 1
+        if observations < len(steps):
+            step = steps[observations]
+            return self._emit(
+                f"Thought: I should use {step['tool']}.\n"
+                f"Action: {step['tool']}\n"
+                f"Action Input: {json.dumps(step.get('input') or {})}",
+                from_task,
+                from_agent,
+            )
+        seen = [t.split("\nObservation:", 1)[1].strip().split("\n", 1)[0][:200] for t in turns]
+        summary = "; ".join(s.strip() for s in seen) or "nothing to report"
+        return self._emit(
+            f"Thought: I now know the final answer\nFinal Answer: {role} summary: {summary}", from_task, from_agent
+        )
+
+    def _emit(self, text: str, from_task: Any, from_agent: Any) -> str:
+        """In streaming mode, emit the answer word by word as stream-chunk events first."""
+        if self.stream:
+            with llm_call_context():
+                for word in re.findall(r"\S+\s*", text):
+                    if self.token_ms:
+                        time.sleep(self.token_ms / 1000)
+                    self._emit_stream_chunk_event(word, from_task=from_task, from_agent=from_agent)
+        return text
+
+    def _sleep(self, role: str, step: int) -> None:
+        if not self.latency_ms and not self.jitter_ms:
+            return
+        seed = int.from_bytes(hashlib.sha1(f"{role}:{step}".encode()).digest()[:8], "big")
+        jitter = random.Random(seed).uniform(-self.jitter_ms, self.jitter_ms)
+        time.sleep(max(0.0, self.latency_ms + jitter) / 1000)
+
+    def supports_function_calling(self) -> bool:
+        return False
+
+    def supports_stop_words(self) -> bool:
+        return False
+
+    def get_context_window_size(self) -> int:
+        return 128000
+
+
+def build_fake_llm(stream: bool = False) -> FakeLLM:
+    return FakeLLM(
+        model="fake",
+        stream=stream,
+        token_ms=settings.fake_llm_token_ms,
+        latency_ms=settings.fake_llm_latency_ms,
+        jitter_ms=settings.fake_llm_jitter_ms,
+        script=_load_script(settings.fake_llm_script),
+    )
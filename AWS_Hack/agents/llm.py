@@ -5,9 +5,271 @@ Uses your AWS CLI credentials or env (AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY,
 from __future__ import annotations
 
 import os
-from typing import Any
+import threading
+import time
+from typing import Any, Callable
+from uuid import UUID
 
 from config import settings
+from core.metrics import LLM_CALLS, LLM_LATENCY, LLM_TOKENS
+
+try:
+    from langchain_core.callbacks import BaseCallbackHandler
+except ImportError:  # get_llm() raises the install hint
+    BaseCallbackHandler = object  # type: ignore[assignment,misc]
+
+
+class BedrockMetricsHandler(BaseCallbackHandler):
+    """LangChain callback recording ChatBedrock latency, outcome and token usage."""
+
+    def __init__(self, model_id: str) -> None:
+        super().__init__()
+        self.model_id = model_id
+        self._started: dict[UUID, float] = {}
+
+    def on_chat_model_start(self, serialized: Any, messages: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_start(self, serialized: Any, prompts: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish(run_id, "ok")
+        usage = (getattr(response, "llm_output", None) or {}).get("usage") or {}
+        for kind in ("prompt_tokens", "completion_tokens"):
+            if usage.get(kind):
+                LLM_TOKENS.labels(self.model_id, kind.split("_")[0]).inc(usage[kind])
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish(run_id, "error")
+
+    def _finish(self, run_id: UUID, status: str) -> None:
+        start = self._started.pop(run_id, None)
+        if start is not None:
+            LLM_LATENCY.labels(self.model_id, "langchain").observe(time.perf_counter() - start)
+        LLM_CALLS.labels(self.model_id, "langchain", status).inc()
+
+
+def _crewai_events():
+    """CrewAI's event module (crewai.events in 1.x, crewai.utilities.events before)."""
+    try:
+        from crewai import events
+        events.LLMCallStartedEvent
+    except (ImportError, AttributeError):
+        from crewai.utilities import events
+    return events
+
+
+_listener_lock = threading.Lock()
+_listener_installed = False
+_llm_started: dict[Any, Any] = {}
+
+
+def _call_key(source: Any, event: Any) -> Any:
+    return getattr(event, "call_id", None) or (id(source), getattr(event, "agent_role", None))
+
+
+def install_llm_metrics() -> None:
+    """
+    Record latency, outcome and token usage of every CrewAI LLM (Bedrock) call,
+    labelled by model and agent. Uses the CrewAI event bus, so it works whether
+    CrewAI routes Bedrock natively or through LiteLLM. Safe to call repeatedly.
+    """
+    global _listener_installed
+    with _listener_lock:
+        if _listener_installed:
+            return
+        _listener_installed = True
+    events = _crewai_events()
+    bus = events.crewai_event_bus
+
+    @bus.on(events.LLMCallStartedEvent)
+    def _on_started(source: Any, event: Any) -> None:
+        _llm_started[_call_key(source, event)] = event.timestamp
+
+    @bus.on(events.LLMCallCompletedEvent)
+    def _on_completed(source: Any, event: Any) -> None:
+        _record(source, event, "ok")
+        usage = getattr(event, "usage", None) or {}
+        model = getattr(event, "model", None) or "unknown"
+        for kind in ("prompt_tokens", "completion_tokens"):
+            if usage.get(kind):
+                LLM_TOKENS.labels(model, kind.split("_")[0]).inc(usage[kind])
+
+    @bus.on(events.LLMCallFailedEvent)
+    def _on_failed(source: Any, event: Any) -> None:
+        _record(source, event, "error")
+
+
+# ---------- Token streaming ----------
+
+# LLM instance id / agent id -> callback(chunk, agent_role, task_name) for one crew run
+_token_sinks: dict[Any, Callable[[str, str | None, str | None], None]] = {}
+_stream_installed = False
+
+
+def install_token_stream() -> None:
+    """
+    Forward streamed LLM chunks to the sink registered for the emitting LLM (or its
+    agent). CrewAI runs stream-chunk handlers synchronously, so chunks keep their order.
+    Safe to call repeatedly.
+    """
+    global _stream_installed
+    with _listener_lock:
+        if _stream_installed:
+            return
+        _stream_installed = True
+    events = _crewai_events()
+
+    @events.crewai_event_bus.on(events.LLMStreamChunkEvent)
+    def _on_chunk(source: Any, event: Any) -> None:
+        # Tool-call argument fragments aren't user-facing text
+        if getattr(event, "tool_call", None):
+            return
+        sink = _token_sinks.get(id(source)) or _token_sinks.get(getattr(event, "agent_id", None))
+        if sink is not None and event.chunk:
+            sink(event.chunk, getattr(event, "agent_role", None), getattr(event, "task_name", None))
+
+
+def register_token_sink(keys: list[Any], sink: Callable[[str, str | None, str | None], None]) -> None:
+    """Route chunks from these LLM instances (id(llm)) / agent ids to `sink`."""
+    install_token_stream()
+    for key in keys:
+        _token_sinks[key] = sink
+
+
+def unregister_token_sink(keys: list[Any]) -> None:
+    for key in keys:
+        _token_sinks.pop(key, None)
+
+
+# ---------- Bedrock call governor ----------
+
+# Error codes that mean "slow down", not "this request is bad"
+_THROTTLE_CODES = frozenset({
+    "ThrottlingException", "TooManyRequestsException", "ServiceUnavailableException", "ModelNotReadyException",
+})
+
+
+def is_throttle(error: BaseException) -> bool:
+    """botocore ClientError with a throttling code (also when wrapped by CrewAI)."""
+    while error is not None:
+        code = (getattr(error, "response", None) or {}).get("Error", {}).get("Code")
+        if code in _THROTTLE_CODES:
+            return True
+        error = error.__cause__
+    return False
+
+
+class GovernedBedrockClient:
+    """
+    bedrock-runtime client whose model calls go through the process-wide governor
+    (core/governor.py). Non-streaming calls may be hedged; streaming calls hold
+    their slot until the stream is read to the end. Everything else passes through.
+    """
+
+    def __init__(self, client: Any, model_id: str) -> None:
+        self._client = client
+        self._model_id = model_id
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._client, name)
+
+    def _call(self, method: str, kwargs: dict[str, Any], stream_key: str | None = None) -> Any:
+        from core.governor import governor
+
+        fn = getattr(self._client, method)
+        wrap = None
+        if stream_key is not None:
+            def wrap(response: Any, done: Callable[[BaseException | None], None]) -> Any:
+                response[stream_key] = _ReleaseAfter(response[stream_key], done)
+                return response
+        return governor().call(
+            kwargs.get("modelId") or self._model_id,
+            lambda: fn(**kwargs),
+            is_throttle=is_throttle,
+            hedge=settings.bedrock_hedge and stream_key is None,
+            wrap_result=wrap,
+        )
+
+    def converse(self, **kwargs: Any) -> Any:
+        return self._call("converse", kwargs)
+
+    def converse_stream(self, **kwargs: Any) -> Any:
+        return self._call("converse_stream", kwargs, "stream")
+
+    def invoke_model(self, **kwargs: Any) -> Any:
+        return self._call("invoke_model", kwargs)
+
+    def invoke_model_with_response_stream(self, **kwargs: Any) -> Any:
+        return self._call("invoke_model_with_response_stream", kwargs, "body")
+
+
+class _ReleaseAfter:
+    """Iterate a response stream; free the governor slot when it ends, fails or is dropped."""
+
+    def __init__(self, events: Any, done: Callable[[BaseException | None], None]) -> None:
+        self._events = events
+        self._done = done
+
+    def __iter__(self):
+        error = None
+        try:
+            yield from self._events
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            self._done(error)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._events, name)
+
+    def __del__(self) -> None:
+        self._done(None)
+
+
+_bedrock_clients: dict[str, GovernedBedrockClient] = {}
+_bedrock_clients_lock = threading.Lock()
+
+
+def bedrock_runtime_client(model_id: str) -> GovernedBedrockClient | None:
+    """
+    Governed bedrock-runtime client, or None when BEDROCK_GOVERNOR is off. One per
+    model, shared by every crew in the process (botocore clients are thread-safe),
+    so concurrent crews reuse one connection pool. botocore's own retries are off:
+    the governor has to see throttles to adapt its limit.
+    """
+    if not settings.bedrock_governor:
+        return None
+    with _bedrock_clients_lock:
+        client = _bedrock_clients.get(model_id)
+        if client is None:
+            import boto3
+            from botocore.config import Config
+
+            session = boto3.Session(profile_name=settings.aws_profile or None, region_name=settings.aws_region)
+            raw = session.client(
+                "bedrock-runtime",
+                config=Config(
+                    read_timeout=300,
+                    retries={"max_attempts": 1},
+                    tcp_keepalive=True,
+                    max_pool_connections=max(10, settings.bedrock_max_concurrency * 2),
+                ),
+            )
+            client = _bedrock_clients[model_id] = GovernedBedrockClient(raw, model_id)
+        return client
+
+
+def _record(source: Any, event: Any, status: str) -> None:
+    model = getattr(event, "model", None) or getattr(source, "model", None) or "unknown"
+    agent = getattr(event, "agent_role", None) or "unknown"
+    started = _llm_started.pop(_call_key(source, event), None)
+    if started is not None:
+        # Event timestamps, not handler time: CrewAI may run handlers on a worker pool
+        LLM_LATENCY.labels(model, agent).observe((event.timestamp - started).total_seconds())
+    LLM_CALLS.labels(model, agent, status).inc()
 
 
 def get_llm():
@@ -37,5 +299,9 @@ def get_llm():
     }
     if profile:
         kwargs["credentials_profile_name"] = profile
+    kwargs["callbacks"] = [BedrockMetricsHandler(model_id)]
+    client = bedrock_runtime_client(model_id)
+    if client is not None:
+        kwargs["client"] = client
 
     return ChatBedrock(**kwargs)
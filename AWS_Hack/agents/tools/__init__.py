@@ -9,6 +9,7 @@ from agents.tools.pricing_tools import get_pricing_suggestion_tool
 from agents.tools.maintenance_tools import get_equipment_status_tool, list_equipment_tool
 from agents.tools.customer_tools import get_customer_info_tool, get_loyalty_tier_tool
 from agents.tools.logistics_tools import get_pending_deliveries_tool, suggest_routes_tool
+from agents.tools.staff_tools import optimize_staff_schedule_tool
 
 __all__ = [
     "get_inventory_tool",
@@ -22,4 +23,5 @@ __all__ = [
     "get_loyalty_tier_tool",
     "get_pending_deliveries_tool",
     "suggest_routes_tool",
+    "optimize_staff_schedule_tool",
 ]
@@ -3,6 +3,7 @@ from crewai.tools import tool
 import json
 
 from aws import dynamodb as db
+from core.metrics import instrument_tool
 
 
 def _parse_input(raw) -> dict:
@@ -36,6 +37,7 @@ TIER_GUIDE = {
 
 
 @tool("Get customer info by ID")
+@instrument_tool
 def get_customer_info_tool(input: str = "") -> str:
     """Get customer profile, loyalty tier, and personalized offer suggestions.
 
@@ -76,6 +78,7 @@ def get_customer_info_tool(input: str = "") -> str:
 
 
 @tool("Get loyalty tier for a customer")
+@instrument_tool
 def get_loyalty_tier_tool(input: str = "") -> str:
     """Get loyalty tier and suggested offers for a customer.
 
@@ -2,8 +2,11 @@
 from crewai.tools import tool
 import json
 import uuid
+from datetime import datetime, timezone
 
+from analytics import demand
 from aws import dynamodb as db
+from core.metrics import instrument_tool
 
 
 def _parse_input(raw) -> dict:
@@ -40,6 +43,7 @@ def _parse_input(raw) -> dict:
 
 
 @tool("Get inventory for a SKU")
+@instrument_tool
 def get_inventory_tool(input: str = "") -> str:
     """Get current stock quantity and details for a product SKU.
     Pass input as JSON: {"sku": "SKU-001"}
@@ -55,10 +59,26 @@ def get_inventory_tool(input: str = "") -> str:
         f"SKU: {item.get('sku')}, Name: {item.get('name')}, "
         f"Quantity: {item.get('quantity')} {item.get('unit', 'units')}, "
         f"Reorder threshold: {item.get('reorder_threshold')}"
+        f"{_forecast_text(sku)}"
+    )
+
+
+def _forecast_text(sku: str) -> str:
+    try:
+        f = demand.get_forecast(sku)
+    except Exception:
+        return ""
+    if not f:
+        return ""
+    cover = f", {f['days_of_cover']} days of cover" if "days_of_cover" in f else ""
+    return (
+        f", Demand forecast: {f['daily_demand']}/day (safety stock {f['safety_stock']}, "
+        f"reorder point {f['reorder_point']}, EOQ {f['eoq']}{cover})"
     )
 
 
 @tool("List items with low stock")
+@instrument_tool
 def list_low_stock_tool(input: str = "") -> str:
     """List all products at or below their reorder threshold. No input required."""
     items = db.list_low_stock()
@@ -73,6 +93,7 @@ def list_low_stock_tool(input: str = "") -> str:
 
 
 @tool("Update inventory quantity")
+@instrument_tool
 def put_inventory_tool(input: str = "") -> str:
     """Update or create an inventory item.
     Pass input as JSON: {"sku": "SKU-001", "name": "Widget A", "quantity": 100, "reorder_threshold": 10}
@@ -92,13 +113,16 @@ def put_inventory_tool(input: str = "") -> str:
 
 
 @tool("Create a purchase order")
+@instrument_tool
 def create_order_tool(input: str = "") -> str:
     """Create purchase orders for low-stock items.
 
     BEHAVIOR:
     - If input is provided as JSON {"sku": "SKU-001", "quantity": 50}, creates one order.
     - If input is empty or missing, automatically fetches ALL low-stock items
-      and creates a purchase order for each one (reorders up to 2x the threshold).
+      and creates a purchase order for each one, sized from the SKU's demand
+      forecast (up to reorder point + economic order quantity). SKUs without
+      enough sales history reorder 2x the threshold.
 
     Use this tool to reorder low-stock items. You do not need to pass arguments —
     calling it with no input will handle everything automatically.
@@ -110,7 +134,10 @@ def create_order_tool(input: str = "") -> str:
     # If specific sku+quantity provided, create single order
     if sku and quantity is not None:
         order_id = f"PO-{sku}-{uuid.uuid4().hex[:8]}"
-        db.put_order(order_id=order_id, sku=sku, quantity=int(quantity), status="pending")
+        db.put_order(
+            order_id=order_id, sku=sku, quantity=int(quantity), status="pending",
+            created_at=_now(), **_supplier_location(db.get_inventory(sku)),
+        )
         return f"Created order {order_id} for SKU {sku}, quantity {quantity}."
 
     # Otherwise auto-fetch low stock and create orders for all of them
@@ -118,16 +145,49 @@ def create_order_tool(input: str = "") -> str:
     if not items:
         return "No low-stock items found. No orders created."
 
-    results = []
+    forecasts = _forecasts([i.get("sku") for i in items])
+    results, skipped = [], []
     for item in items:
         item_sku = item.get("sku")
         threshold = item.get("reorder_threshold", 10)
-        # Order enough to restock to 2x the threshold
-        reorder_qty = threshold * 2
+        reorder_qty = demand.order_quantity(forecasts.get(item_sku), item.get("quantity", 0))
+        if reorder_qty is None:
+            # Not enough history for a forecast: restock to 2x the threshold
+            reorder_qty, basis = threshold * 2, "fixed rule"
+        else:
+            basis = f"forecast {forecasts[item_sku]['daily_demand']}/day"
+        if reorder_qty <= 0:
+            skipped.append(item_sku)
+            continue
         order_id = f"PO-{item_sku}-{uuid.uuid4().hex[:8]}"
-        db.put_order(order_id=order_id, sku=item_sku, quantity=reorder_qty, status="pending")
+        db.put_order(
+            order_id=order_id, sku=item_sku, quantity=reorder_qty, status="pending",
+            created_at=_now(), **_supplier_location(item),
+        )
         results.append(
-            f"  - {order_id}: {item_sku} ({item.get('name')}), qty={reorder_qty}"
+            f"  - {order_id}: {item_sku} ({item.get('name')}), qty={reorder_qty} ({basis})"
         )
 
-    return "Created purchase orders for all low-stock items:\n" + "\n".join(results)
\ No newline at end of file
+    out = "Created purchase orders for all low-stock items:\n" + "\n".join(results)
+    if skipped:
+        out += f"\nNot reordered (stock covers forecast demand): {', '.join(skipped)}"
+    return out
+
+
+def _forecasts(skus: list) -> dict:
+    try:
+        return demand.get_forecasts(s for s in skus if s)
+    except Exception as e:
+        print(f"Demand forecasts unavailable: {e}")
+        return {}
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _supplier_location(item: dict | None) -> dict:
+    """Supplier coordinates from the inventory item, copied onto the order for route planning."""
+    if not item:
+        return {}
+    return {k: item[k] for k in ("supplier_lat", "supplier_lon") if item.get(k) is not None}
@@ -1,10 +1,13 @@
 """Logistics tools for the Logistics Agent."""
 from crewai.tools import tool
 
+from analytics import routing
 from aws import dynamodb as db
+from core.metrics import instrument_tool
 
 
 @tool("Get pending deliveries (orders)")
+@instrument_tool
 def get_pending_deliveries_tool(input: str = "") -> str:
     """List all pending purchase orders that need delivery.
     No input required. Call with no arguments to get full pending deliveries list.
@@ -20,18 +23,11 @@ def get_pending_deliveries_tool(input: str = "") -> str:
 
 
 @tool("Suggest delivery route summary")
+@instrument_tool
 def suggest_routes_tool(input: str = "") -> str:
-    """Suggest an optimized delivery route for all pending orders.
-    No input required. Automatically fetches pending orders and suggests route sequence.
+    """Plan optimized delivery routes for all pending orders: stop sequence per
+    vehicle, distance, load and duration, within vehicle capacity and pickup windows.
+    No input required. Automatically fetches pending orders and plans the routes.
     """
-    orders = db.get_orders(status="pending")
-    if not orders:
-        return "No pending deliveries; no route needed."
-    order_ids = [o.get("order_id") for o in orders]
-    route = " -> ".join(order_ids[:5])
-    suffix = " -> ..." if len(order_ids) > 5 else ""
-    return (
-        f"Suggested delivery route ({len(order_ids)} stops):\n"
-        f"Sequence: {route}{suffix}\n"
-        f"Tip: Group by SKU supplier location to minimize travel distance."
-    )
\ No newline at end of file
+    plan = routing.plan_pending_routes()
+    return routing.describe(plan)
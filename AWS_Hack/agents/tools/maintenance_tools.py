@@ -2,7 +2,11 @@
 from crewai.tools import tool
 import json
 
+from analytics import maintenance_forecast
 from aws import dynamodb as db
+from aws import health_history
+from config import settings
+from core.metrics import instrument_tool
 
 
 def _parse_input(raw) -> dict:
@@ -28,22 +32,29 @@ def _parse_input(raw) -> dict:
 
 
 @tool("List all equipment")
+@instrument_tool
 def list_equipment_tool(input: str = "") -> str:
-    """List all store equipment with health scores and maintenance dates.
+    """List all store equipment with health scores, maintenance dates and the
+    forecast time until each needs maintenance (most urgent first).
     No input required. Call with no arguments to get full equipment list.
     """
     items = db.list_equipment()
     if not items:
         return "No equipment registered."
+    forecasts = _forecasts()
+    rank = {eid: f.get("rank", 0) for eid, f in forecasts.items()}
+    items.sort(key=lambda e: rank.get(e.get("equipment_id"), len(rank) + 1))
     lines = [
         f"- {e.get('equipment_id')}: health={e.get('health_score', 'N/A')}, "
-        f"last_maintenance={e.get('last_maintenance', 'N/A')}"
+        f"last_maintenance={e.get('last_maintenance', 'N/A')}, "
+        f"forecast: {maintenance_forecast.describe(forecasts.get(e.get('equipment_id')))}"
         for e in items
     ]
     return "Equipment:\n" + "\n".join(lines)
 
 
 @tool("Get equipment status by ID")
+@instrument_tool
 def get_equipment_status_tool(input: str = "") -> str:
     """Get health score and last maintenance date for equipment.
 
@@ -82,8 +93,38 @@ def _status_for_equipment(equipment_id: str) -> str:
         return f"No equipment found: {equipment_id}"
     health = item.get("health_score", 0)
     last = item.get("last_maintenance", "unknown")
-    status = "⚠️ Schedule maintenance soon." if health < 0.5 else "✅ Status OK."
+    # Same rule as the maintenance forecast and schedule
+    due = float(health) <= settings.maintenance_health_threshold
+    status = "⚠️ Schedule maintenance soon." if due else "✅ Status OK."
     return (
         f"Equipment {equipment_id}: health_score={health}, "
-        f"last_maintenance={last}. {status}"
+        f"last_maintenance={last}.{_trend_text(equipment_id)}{_forecast_text(equipment_id)} {status}"
+    )
+
+
+def _forecasts() -> dict:
+    try:
+        return maintenance_forecast.forecast_index()
+    except Exception as e:
+        print(f"Maintenance forecast unavailable: {e}")
+        return {}
+
+
+def _forecast_text(equipment_id: str) -> str:
+    """' Forecast: reaches threshold in ~12 days (...).' or '' when there is no forecast."""
+    f = _forecasts().get(equipment_id)
+    return f" Forecast: {maintenance_forecast.describe(f)}." if f else ""
+
+
+def _trend_text(equipment_id: str) -> str:
+    """' 7-day trend: declining (-0.021/day over 412 readings).' or '' without history."""
+    try:
+        t = health_history.trend(equipment_id)
+    except Exception:
+        return ""
+    if not t or "slope_per_day" not in t:
+        return ""
+    return (
+        f" {t['window_days']:g}-day trend: {t['trend']} "
+        f"({t['slope_per_day']:+.3f}/day over {t['readings']} readings)."
     )
\ No newline at end of file
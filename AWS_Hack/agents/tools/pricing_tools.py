@@ -3,6 +3,7 @@ from crewai.tools import tool
 import json
 
 from aws import dynamodb as db
+from core.metrics import instrument_tool
 
 
 def _parse_input(raw) -> dict:
@@ -28,6 +29,7 @@ def _parse_input(raw) -> dict:
 
 
 @tool("Get pricing suggestion for a SKU")
+@instrument_tool
 def get_pricing_suggestion_tool(input: str = "") -> str:
     """Get pricing suggestions based on inventory levels for all low-stock items or a specific SKU.
 
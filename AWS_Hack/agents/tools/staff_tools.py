@@ -0,0 +1,16 @@
+"""Staff scheduling tools for the Logistics Agent."""
+from crewai.tools import tool
+
+from analytics import staffing
+from core.metrics import instrument_tool
+
+
+@tool("Optimize staff schedule")
+@instrument_tool
+def optimize_staff_schedule_tool(input: str = "") -> str:
+    """Plan next week's shifts from staff availability and forecast demand, and
+    report hours scheduled vs required and the remaining coverage gaps.
+    No input required. Does not publish the schedule.
+    """
+    plan = staffing.optimize_schedule()
+    return staffing.describe(plan)
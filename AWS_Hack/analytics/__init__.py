@@ -0,0 +1 @@
+"""Vectorized planning engines: maintenance forecasting, routing, demand, staffing."""
@@ -0,0 +1,482 @@
+"""
+Demand forecasting: per-SKU daily demand, safety stock and economic reorder quantities.
+
+History: DemandHistory keeps a (SKUs x demand_history_days) matrix of units sold
+per day. It is fed from inventory level readings (IoT level_update/sale telemetry
+via DemandRecorder: every drop in level is demand, rises are restocks) or, where
+there is no telemetry, from purchase order history (backfill_from_orders). It is
+saved to demand_history_path and remembers which SKUs changed since the last
+refresh. Several processes may record into one file (ingestion, the API's
+inventory log, refresh jobs): save() takes a file lock and, if another process
+saved meanwhile, reloads the file and adds this process's unsaved demand to it.
+
+Forecast (forecast_arrays, vectorized across SKUs):
+  daily demand     exponentially weighted mean of the daily series (newest day weight
+                   demand_ewma_alpha), and the matching weighted std
+  safety stock     z(service level) * std * sqrt(lead time)
+  reorder point    daily * lead time + safety stock
+  EOQ              sqrt(2 * annual demand * order cost / yearly holding cost per unit)
+
+refresh() recomputes only SKUs that changed (everything once a day, as quiet days
+count too) and writes them to demand_forecast_table. Tools and GET
+/inventory/analytics read that table; nothing is computed per request.
+"""
+from __future__ import annotations
+
+import math
+import os
+import threading
+import time
+from decimal import Decimal
+from statistics import NormalDist
+from typing import Any, Iterable, Iterator
+
+import numpy as np
+
+from config import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: single process only
+    fcntl = None
+
+DAY = 86400
+
+
+def _day(ts: float) -> int:
+    return int(ts // DAY)
+
+
+# ---------- History ----------
+
+
+class DemandHistory:
+    """Daily demand per SKU over a rolling window of `days` days ending today."""
+
+    def __init__(self, path: str | None = None, days: int | None = None) -> None:
+        self.path = path
+        self.days = days or settings.demand_history_days
+        self.skus: list[str] = []
+        self.index: dict[str, int] = {}
+        self.last_day = _day(time.time())
+        self.demand = np.zeros((0, self.days), dtype=np.float32)
+        self.first_day = np.zeros(0, dtype=np.int64)
+        self.last_level = np.full(0, np.nan)
+        self.dirty = np.zeros(0, dtype=bool)
+        self.refreshed_day = -1
+        # Last inventory event applied (aws/inventory_log.DemandView), so replays don't double count
+        self.seq = 0
+        self._lock = threading.Lock()
+        # Changes since the file was last read or written, merged into it by save():
+        # sku -> {day: units}, SKUs with new level readings, SKUs rebuilt by clear()
+        self._unsaved: dict[str, dict[int, float]] = {}
+        self._unsaved_levels: set[str] = set()
+        self._cleared: set[str] = set()
+        self._stamp: tuple[int, int, int] | None = None
+        if path and os.path.exists(path):
+            self._load(path)
+            self._stamp = self._file_stamp()
+
+    def _file_stamp(self) -> tuple[int, int, int] | None:
+        # save() replaces the file, so the inode changes even within one mtime tick
+        try:
+            st = os.stat(self.path)
+        except (OSError, TypeError):
+            return None
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    def _load(self, path: str) -> None:
+        with np.load(path, allow_pickle=False) as f:
+            self.skus = [str(s) for s in f["skus"]]
+            self.demand = f["demand"].astype(np.float32)
+            self.first_day = f["first_day"]
+            self.last_level = f["last_level"]
+            self.dirty = f["dirty"]
+            self.last_day = int(f["last_day"])
+            self.refreshed_day = int(f["refreshed_day"])
+            self.seq = int(f["seq"]) if "seq" in f else 0
+        self.index = {s: i for i, s in enumerate(self.skus)}
+        if self.demand.shape[1] != self.days:
+            keep = min(self.days, self.demand.shape[1])
+            resized = np.zeros((len(self.skus), self.days), dtype=np.float32)
+            resized[:, self.days - keep:] = self.demand[:, -keep:]
+            self.demand = resized
+
+    def save(self) -> None:
+        """Write to path, first merging in what other processes saved since our last sync."""
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp.npz"
+        with self._lock, open(self.path + ".lock", "w") as lock:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            stamp = self._file_stamp()
+            if stamp is not None and stamp != self._stamp:
+                self._merge_from_file()
+            n = len(self.skus)
+            np.savez(
+                tmp,
+                skus=np.array(self.skus, dtype=str),
+                demand=self.demand[:n],
+                first_day=self.first_day[:n],
+                last_level=self.last_level[:n],
+                dirty=self.dirty[:n],
+                last_day=self.last_day,
+                refreshed_day=self.refreshed_day,
+                seq=self.seq,
+            )
+            os.replace(tmp, self.path)
+            self._stamp = self._file_stamp()
+            self._unsaved.clear()
+            self._unsaved_levels.clear()
+            self._cleared.clear()
+
+    def sync(self) -> None:
+        """Pick up demand other processes recorded (saving ours with it)."""
+        if self._unsaved or self._unsaved_levels or self._cleared or self._file_stamp() != self._stamp:
+            self.save()
+
+    def _merge_from_file(self) -> None:
+        """Replace our state with the file's plus our unsaved changes (lock held)."""
+        ours = self.skus, self.index, self.demand, self.first_day, self.last_level, self.dirty
+        our_day, our_refreshed, our_seq = self.last_day, self.refreshed_day, self.seq
+        unsaved, self._unsaved = self._unsaved, {}
+        self._load(self.path)
+        self._roll(max(self.last_day, our_day))
+        skus, index, demand, first_day, last_level, dirty = ours
+        shift = self.last_day - our_day
+        for sku in self._cleared:
+            i, j = self._row(sku, self.last_day), index[sku]
+            self.demand[i] = 0
+            if shift < self.days:
+                self.demand[i, : self.days - shift] = demand[j, shift:]
+            self.first_day[i], self.last_level[i], self.dirty[i] = first_day[j], last_level[j], True
+        for sku, days in unsaved.items():
+            if sku in self._cleared:
+                continue
+            i = self._row(sku, min(days))
+            for day, qty in days.items():
+                self._add(i, qty, day)
+        for sku in self._unsaved_levels:
+            self.last_level[self._row(sku, self.last_day)] = last_level[index[sku]]
+        for j in np.flatnonzero(dirty[: len(skus)]):
+            self.dirty[self._row(skus[j], self.last_day)] = True
+        self.refreshed_day = max(self.refreshed_day, our_refreshed)
+        self.seq = max(self.seq, our_seq)
+
+    def _row(self, sku: str, day: int) -> int:
+        i = self.index.get(sku)
+        if i is not None:
+            return i
+        i = len(self.skus)
+        if i == len(self.demand):
+            grow = max(64, i)
+            self.demand = np.vstack((self.demand, np.zeros((grow, self.days), dtype=np.float32)))
+            self.first_day = np.concatenate((self.first_day, np.zeros(grow, dtype=np.int64)))
+            self.last_level = np.concatenate((self.last_level, np.full(grow, np.nan)))
+            self.dirty = np.concatenate((self.dirty, np.zeros(grow, dtype=bool)))
+        self.skus.append(sku)
+        self.index[sku] = i
+        self.first_day[i] = day
+        self.dirty[i] = True
+        return i
+
+    def _roll(self, day: int) -> None:
+        """Advance the window so its last column is `day`."""
+        shift = day - self.last_day
+        if shift <= 0:
+            return
+        if shift >= self.days:
+            self.demand[:] = 0
+        else:
+            self.demand[:, :-shift] = self.demand[:, shift:]
+            self.demand[:, -shift:] = 0
+        self.last_day = day
+
+    def _add(self, i: int, qty: float, day: int) -> None:
+        col = self.days - 1 - (self.last_day - day)
+        if col >= 0:
+            self.demand[i, col] += qty
+            self.dirty[i] = True
+            days = self._unsaved.setdefault(self.skus[i], {})
+            days[day] = days.get(day, 0.0) + qty
+        if day < self.first_day[i]:
+            self.first_day[i] = day
+
+    def record_levels(self, levels: dict[str, float], ts: float | None = None) -> int:
+        """Inventory level readings; returns SKUs whose level dropped (demand recorded)."""
+        day = _day(time.time() if ts is None else ts)
+        changed = 0
+        with self._lock:
+            self._roll(day)
+            for sku, level in levels.items():
+                i = self._row(sku, day)
+                prev = self.last_level[i]
+                level = float(level)
+                if not math.isnan(prev) and level < prev:
+                    self._add(i, prev - level, day)
+                    changed += 1
+                self.last_level[i] = level
+                self._unsaved_levels.add(sku)
+        return changed
+
+    def record_demand(self, sku: str, qty: float, ts: float | None = None) -> None:
+        """Units consumed on the day of ts (e.g. from order history)."""
+        day = _day(time.time() if ts is None else ts)
+        with self._lock:
+            self._roll(max(day, self.last_day))
+            self._add(self._row(sku, day), float(qty), day)
+
+    def has_levels(self, sku: str) -> bool:
+        """True once level telemetry has been seen for the SKU."""
+        i = self.index.get(sku)
+        return i is not None and not math.isnan(self.last_level[i])
+
+    def clear(self, sku: str) -> None:
+        i = self.index.get(sku)
+        if i is not None:
+            with self._lock:
+                self.demand[i] = 0
+                self.first_day[i] = self.last_day
+                self.dirty[i] = True
+                self._unsaved.pop(sku, None)
+                self._cleared.add(sku)
+
+    def snapshot(self, only_dirty: bool = False, today: int | None = None) -> tuple[list[str], np.ndarray, np.ndarray]:
+        """
+        (skus, demand matrix ending today, days observed per SKU) for the forecast.
+        The returned SKUs are no longer dirty; call mark_dirty() if forecasting fails.
+        """
+        today = _day(time.time()) if today is None else today
+        with self._lock:
+            self._roll(today)
+            n = len(self.skus)
+            rows = np.flatnonzero(self.dirty[:n]) if only_dirty else np.arange(n)
+            self.dirty[rows] = False
+            observed = np.clip(today - self.first_day[rows] + 1, 0, self.days)
+            return [self.skus[i] for i in rows], self.demand[rows].copy(), observed
+
+    def mark_dirty(self, skus: Iterable[str]) -> None:
+        with self._lock:
+            for sku in skus:
+                self.dirty[self.index[sku]] = True
+
+
+_history: DemandHistory | None = None
+_history_lock = threading.Lock()
+
+
+def get_history() -> DemandHistory:
+    global _history
+    with _history_lock:
+        if _history is None:
+            _history = DemandHistory(settings.demand_history_path)
+        return _history
+
+
+# ---------- Forecast ----------
+
+
+def forecast_arrays(
+    demand: np.ndarray,
+    observed: np.ndarray,
+    lead_time: np.ndarray,
+    unit_cost: np.ndarray,
+    alpha: float | None = None,
+    service_level: float | None = None,
+) -> dict[str, np.ndarray]:
+    """
+    Vectorized forecast for all rows of `demand` (SKUs x days, last column = today;
+    only the last `observed` days of each row count).
+    """
+    alpha = settings.demand_ewma_alpha if alpha is None else alpha
+    service_level = settings.demand_service_level if service_level is None else service_level
+    n, days = demand.shape
+    age = np.arange(days - 1, -1, -1, dtype=np.float64)  # 0 = today
+    w = (1 - alpha) ** age
+    w = np.where(age[None, :] < observed[:, None], w[None, :], 0.0)
+    sw = w.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(sw > 0, (w * demand).sum(axis=1) / sw, 0.0)
+        var = np.where(sw > 0, (w * (demand - mean[:, None]) ** 2).sum(axis=1) / sw, 0.0)
+    std = np.sqrt(var)
+    z = NormalDist().inv_cdf(service_level)
+    safety = z * std * np.sqrt(lead_time)
+    reorder_point = mean * lead_time + safety
+    holding = np.maximum(settings.demand_holding_rate * unit_cost, 1e-9)
+    eoq = np.sqrt(2 * mean * 365 * settings.demand_order_cost / holding)
+    return {
+        "daily_demand": mean,
+        "demand_std": std,
+        "safety_stock": safety,
+        "reorder_point": reorder_point,
+        "eoq": eoq,
+    }
+
+
+def _num(value: Any, default: float) -> float:
+    try:
+        v = float(value)
+    except (TypeError, ValueError):
+        return default
+    return v if v > 0 else default
+
+
+def _dec(value: float, places: int = 3) -> Decimal:
+    return Decimal(str(round(float(value), places)))
+
+
+def refresh(full: bool = False, history: DemandHistory | None = None) -> dict[str, Any]:
+    """
+    Re-forecast SKUs whose history changed (all SKUs when full, or on the first
+    refresh of a day) and write them to the forecast table.
+    """
+    from aws import dynamodb as db
+
+    history = history or get_history()
+    t0 = time.perf_counter()
+    # Include what other processes (e.g. ingest_telemetry --demand) recorded
+    history.sync()
+    today = _day(time.time())
+    full = full or history.refreshed_day < today
+    skus, demand, observed = history.snapshot(only_dirty=not full, today=today)
+    if not skus:
+        return {"skus": 0, "full": full, "elapsed_ms": round((time.perf_counter() - t0) * 1000, 1)}
+    try:
+        items, _ = db.batch_get_inventory(skus)
+        by_sku = {i["sku"]: i for i in items}
+        lead = np.array([_num(by_sku.get(s, {}).get("lead_time_days"), settings.demand_lead_time_days) for s in skus])
+        cost = np.array([_num(by_sku.get(s, {}).get("unit_cost"), settings.demand_default_unit_cost) for s in skus])
+        f = forecast_arrays(demand.astype(np.float64), observed, lead, cost)
+        computed_at = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        rows = []
+        for k, sku in enumerate(skus):
+            on_hand = by_sku.get(sku, {}).get("quantity")
+            daily = float(f["daily_demand"][k])
+            row = {
+                "sku": sku,
+                "daily_demand": _dec(daily),
+                "demand_std": _dec(f["demand_std"][k]),
+                "safety_stock": _dec(f["safety_stock"][k], 1),
+                "reorder_point": _dec(f["reorder_point"][k], 1),
+                "eoq": _dec(f["eoq"][k], 1),
+                "lead_time_days": _dec(lead[k], 2),
+                "history_days": int(observed[k]),
+                "computed_at": computed_at,
+            }
+            if on_hand is not None and daily > 0:
+                row["days_of_cover"] = _dec(float(on_hand) / daily, 1)
+            rows.append(row)
+        db.batch_write(settings.demand_forecast_table, rows)
+    except Exception:
+        history.mark_dirty(skus)
+        raise
+    if full:
+        history.refreshed_day = today
+    history.save()
+    return {"skus": len(skus), "full": full, "elapsed_ms": round((time.perf_counter() - t0) * 1000, 1)}
+
+
+# ---------- Reading the forecast table ----------
+
+
+def get_forecast(sku: str) -> dict[str, Any] | None:
+    from aws import dynamodb as db
+
+    items, _ = db.batch_get(settings.demand_forecast_table, "sku", [sku])
+    return items[0] if items else None
+
+
+def get_forecasts(skus: Iterable[str]) -> dict[str, dict[str, Any]]:
+    from aws import dynamodb as db
+
+    items, _ = db.batch_get(settings.demand_forecast_table, "sku", skus)
+    return {i["sku"]: i for i in items}
+
+
+def iter_forecasts(page_size: int | None = None) -> Iterator[dict[str, Any]]:
+    from aws import dynamodb as db
+
+    return db.iter_scan(settings.demand_forecast_table, page_size)
+
+
+def list_forecasts_page(limit: int, cursor: str | None = None) -> tuple[list[dict[str, Any]], str | None]:
+    from aws import dynamodb as db
+
+    return db.scan_page(settings.demand_forecast_table, limit, cursor)
+
+
+def order_quantity(forecast: dict[str, Any] | None, on_hand: float) -> int | None:
+    """
+    Units to order now: up to reorder point + EOQ. None when there is not enough
+    history yet (callers fall back to their fixed rule).
+    """
+    if not forecast or int(forecast.get("history_days", 0)) < settings.demand_min_history_days:
+        return None
+    target = float(forecast["reorder_point"]) + float(forecast["eoq"])
+    return max(0, math.ceil(target - float(on_hand)))
+
+
+# ---------- Feeding the history ----------
+
+
+class DemandRecorder:
+    """
+    TelemetryIngestor listener: window inventory levels -> demand history, with a
+    refresh of the changed SKUs at most every demand_refresh_seconds.
+    """
+
+    def __init__(self, history: DemandHistory | None = None, refresh_seconds: float | None = None) -> None:
+        self.history = history or get_history()
+        self.refresh_seconds = settings.demand_refresh_seconds if refresh_seconds is None else refresh_seconds
+        self._last_refresh = time.monotonic()
+
+    def __call__(self, window: Any) -> None:
+        # With the inventory event log on, level drops reach the history through
+        # its DemandView instead; recording them here too would double count
+        if window.inventory and not settings.inventory_event_log:
+            self.history.record_levels({sku: agg[0] for sku, agg in window.inventory.items()}, window.end)
+        if time.monotonic() - self._last_refresh >= self.refresh_seconds:
+            self.flush()
+
+    def flush(self) -> dict[str, Any]:
+        self._last_refresh = time.monotonic()
+        try:
+            return refresh(history=self.history)
+        except Exception as e:
+            print(f"Demand forecast refresh failed: {e}")
+            self.history.save()
+            return {}
+
+    def close(self) -> None:
+        self.flush()
+
+
+def backfill_from_orders(history: DemandHistory | None = None, orders: list[dict[str, Any]] | None = None) -> int:
+    """
+    Use purchase orders (with created_at) as the demand signal for SKUs that have no
+    level telemetry. Those SKUs are rebuilt from scratch, so re-running is safe.
+    Returns orders recorded.
+    """
+    from datetime import datetime
+
+    from aws import dynamodb as db
+
+    history = history or get_history()
+    orders = db.get_orders() if orders is None else orders
+    by_sku: dict[str, list[tuple[float, float]]] = {}
+    for o in orders:
+        sku, created = o.get("sku"), o.get("created_at")
+        if not sku or not created or history.has_levels(sku):
+            continue
+        try:
+            ts = datetime.fromisoformat(str(created).replace("Z", "+00:00")).timestamp()
+        except ValueError:
+            continue
+        by_sku.setdefault(sku, []).append((ts, _num(o.get("quantity"), 0.0)))
+    for sku, events in by_sku.items():
+        history.clear(sku)
+        for ts, qty in events:
+            history.record_demand(sku, qty, ts)
+    return sum(len(e) for e in by_sku.values())
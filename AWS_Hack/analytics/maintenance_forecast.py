@@ -0,0 +1,285 @@
+"""
+Predictive maintenance: time until each device's health reaches the maintenance threshold.
+
+Every device's recent health history (aws/health_history, bucketed to
+forecast_bucket_hours means over forecast_window_days) becomes one row of a
+(devices x points) matrix, read from the history store's fleet bucket aggregates. fit_fleet() fits all rows at once with a Huber-weighted
+linear regression (iteratively reweighted least squares, so a few bad readings
+don't swing the slope). The time to threshold then follows from the fitted health
+now and the slope, with a pessimistic/optimistic range from the slope's standard
+error.
+
+forecast_arrays() is the pure-NumPy core. compute_forecasts() scores 100k devices
+end to end (equipment scan, fleet matrix, fit, ranked rows) in about 1.6 s on one
+core; benchmarks/bench_forecast.py measures both. get_forecasts() builds the matrix from the store, caches the result for
+forecast_ttl_seconds and backs the maintenance tools and the /equipment endpoints.
+"""
+from __future__ import annotations
+
+import math
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+import numpy as np
+
+from config import settings
+from core.singleflight import group
+
+DAY = 86400.0
+# Two-sided ~90% interval on the slope for the time-to-threshold range
+_Z = 1.645
+_HUBER_K = 1.345
+
+
+def fit_fleet(x: np.ndarray, y: np.ndarray, mask: np.ndarray, iterations: int = 3) -> dict[str, np.ndarray]:
+    """
+    Row-wise robust line fit y ~ a + b*x over the points where mask is True.
+    x is in days relative to now (<= 0), so `a` is the fitted health now; when every
+    row shares the same x (a broadcast row, as from the fleet matrix) the weighted
+    sums are matrix-vector products.
+    Returns a, b (per day), se_b (standard error of b) and n (points used).
+    """
+    valid = mask.astype(np.float32)
+    y = np.where(mask, y, 0).astype(np.float32)
+    if x.ndim == 2 and x.strides[0] == 0:
+        xv = np.asarray(x[0], dtype=np.float32)
+        xv2 = xv * xv
+        xb = xv[None, :]
+
+        def sums(w: np.ndarray) -> tuple[np.ndarray, ...]:
+            wy = w * y
+            return w.sum(axis=1), w @ xv, wy.sum(axis=1), w @ xv2, wy @ xv
+    else:
+        xb = np.where(mask, x, 0).astype(np.float32)
+
+        def sums(w: np.ndarray) -> tuple[np.ndarray, ...]:
+            wx = w * xb
+            return w.sum(axis=1), wx.sum(axis=1), (w * y).sum(axis=1), (wx * xb).sum(axis=1), (wx * y).sum(axis=1)
+
+    w = valid
+    n = valid.sum(axis=1)
+    # Reused buffers: the residual pass dominates for large fleets
+    r = np.empty_like(y)
+    absr = np.empty_like(y)
+    weights = np.empty_like(y)
+    for it in range(iterations + 1):
+        sw, sx, sy, sxx, sxy = sums(w)
+        den = sw * sxx - sx * sx
+        ok = den > 1e-9
+        with np.errstate(divide="ignore", invalid="ignore"):
+            b = np.where(ok, (sw * sxy - sx * sy) / den, 0.0).astype(np.float32)
+            a = np.where(sw > 0, (sy - b * sx) / np.maximum(sw, 1e-9), np.nan).astype(np.float32)
+        with np.errstate(invalid="ignore"):
+            np.multiply(b[:, None], xb, out=r)
+            np.subtract(y, r, out=r)
+            np.subtract(r, a[:, None], out=r)
+            np.multiply(r, valid, out=r)
+        if it == iterations:
+            break
+        # Robust scale from the mean absolute residual (x1.2533 = sigma for Gaussian noise)
+        np.abs(r, out=absr)
+        scale = absr.sum(axis=1) / np.maximum(n, 1) * 1.2533
+        # Huber weights min(1, k*scale/|r|), zero off the mask
+        np.maximum(absr, 1e-12, out=absr)
+        w = np.divide(np.maximum(_HUBER_K * scale, 1e-6)[:, None], absr, out=weights)
+        np.minimum(w, valid, out=w)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sigma2 = (w * r * r).sum(axis=1) / np.maximum(sw - 2, 1e-9)
+        se_b = np.where(ok & (n > 2), np.sqrt(sigma2 * sw / den), np.inf)
+    return {"a": a, "b": b, "se_b": se_b, "n": n}
+
+
+def time_to_threshold(a: np.ndarray, b: np.ndarray, threshold: float, horizon: float) -> np.ndarray:
+    """Days until a + b*t hits threshold; 0 if already below, inf if not reached within horizon."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = np.where(b < 0, (threshold - a) / b, np.inf)
+    t = np.where(a <= threshold, 0.0, t)
+    return np.where((t > horizon) | np.isnan(t), np.inf, t)
+
+
+def forecast_arrays(
+    x: np.ndarray,
+    y: np.ndarray,
+    mask: np.ndarray,
+    threshold: float | None = None,
+    horizon: float | None = None,
+) -> dict[str, np.ndarray]:
+    """Vectorized fleet forecast: fitted health now, slope, time to threshold (+ range), confidence."""
+    threshold = settings.maintenance_health_threshold if threshold is None else threshold
+    horizon = settings.forecast_horizon_days if horizon is None else horizon
+    fit = fit_fleet(x, y, mask)
+    a, b, se = fit["a"], fit["b"], fit["se_b"]
+    se_finite = np.where(np.isfinite(se), se, 0.0)
+    ttf = time_to_threshold(a, b, threshold, horizon)
+    # Pessimistic = steeper decline; optimistic = shallower (may never reach)
+    ttf_low = time_to_threshold(a, np.where(np.isfinite(se), b - _Z * se_finite, b), threshold, horizon)
+    ttf_high = time_to_threshold(a, np.where(np.isfinite(se), b + _Z * se_finite, np.inf), threshold, horizon)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t_stat = np.where(se > 0, -b / se, 0.0)
+    confidence = np.full(len(a), "low", dtype=object)
+    confidence[t_stat >= 1.5] = "medium"
+    confidence[t_stat >= 3] = "high"
+    confidence[a <= threshold] = "high"
+    return {"health_now": a, "slope_per_day": b, "ttf_days": ttf, "ttf_days_low": ttf_low, "ttf_days_high": ttf_high, "confidence": confidence, "points": fit["n"]}
+
+
+# ---------- Fleet matrix from the history store ----------
+
+
+def _fleet_matrix(equipment_ids: list[str], now: float) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    from aws import health_history
+
+    bucket, _ = health_history.forecast_buckets()
+    starts, y, mask = health_history.fleet_matrix(equipment_ids, now)
+    # Bucket midpoints, in days before now
+    x = np.broadcast_to(((starts + bucket / 2 - now) / DAY).astype(np.float32), y.shape)
+    return x, y, mask
+
+
+_ROW_KEYS = ("equipment_id", "health_now", "slope_per_day", "ttf_days", "ttf_days_low", "ttf_days_high",
+             "confidence", "due_by", "points", "rank")
+
+
+def _nullable(values: np.ndarray, decimals: int) -> list[float | None]:
+    """Rounded floats with NaN/inf as None (JSON-friendly)."""
+    out = np.round(values.astype(np.float64), decimals).astype(object)
+    out[~np.isfinite(values)] = None
+    return out.tolist()
+
+
+def _rows(equipment: list[dict[str, Any]], result: dict[str, np.ndarray], now: float) -> list[dict[str, Any]]:
+    """
+    One row per device, ranked: soonest pessimistic time-to-threshold first, then lowest
+    health; devices with no forecastable decline last. Built column-wise in NumPy.
+    """
+    threshold = settings.maintenance_health_threshold
+    points = result["points"].astype(np.int64)
+    a = result["health_now"].astype(np.float64)
+    stored = np.array([float(e["health_score"]) if e.get("health_score") is not None else np.nan
+                       for e in equipment], dtype=np.float64)
+    # No usable history: only the stored score is known, no trend
+    usable = (points >= 2) & np.isfinite(a)
+    below = ~usable & (stored <= threshold)
+    none_or_zero = np.where(below, 0.0, np.nan)
+
+    health = np.where(usable, np.round(a, 4), stored)
+    slope = np.where(usable, result["slope_per_day"], np.nan)
+    ttf = {k: np.where(usable, np.round(result[k].astype(np.float64), 2), none_or_zero)
+           for k in ("ttf_days", "ttf_days_low", "ttf_days_high")}
+    confidence = np.where(usable, result["confidence"], np.where(below, "high", "none"))
+
+    low = ttf["ttf_days_low"]
+    due_day = np.floor(now / DAY + np.where(np.isfinite(low), low, 0)).astype(np.int64)
+    epoch = datetime(1970, 1, 1, tzinfo=timezone.utc).date().toordinal()
+    dates = {d: datetime.fromordinal(epoch + d).date().isoformat() for d in np.unique(due_day[np.isfinite(low)]).tolist()}
+
+    order = np.lexsort((np.where(np.isfinite(health), health, np.inf), np.where(np.isfinite(low), low, np.inf)))
+    due_by = np.array([dates.get(d) for d in due_day.tolist()], dtype=object)
+    due_by[~np.isfinite(low)] = None
+    ids = np.array([e["equipment_id"] for e in equipment], dtype=object)
+    columns = [
+        ids[order].tolist(),
+        _nullable(health[order], 4),
+        _nullable(slope[order], 5),
+        *(_nullable(ttf[k][order], 2) for k in ("ttf_days", "ttf_days_low", "ttf_days_high")),
+        np.asarray(confidence, dtype=object)[order].tolist(),
+        due_by[order].tolist(),
+        points[order].tolist(),
+        range(1, len(order) + 1),
+    ]
+    return [dict(zip(_ROW_KEYS, values)) for values in zip(*columns)]
+
+
+def compute_forecasts(equipment: list[dict[str, Any]] | None = None, now: float | None = None) -> list[dict[str, Any]]:
+    """
+    Forecast every device, ranked: soonest pessimistic time-to-threshold first,
+    then lowest health. Devices with no forecastable decline come last.
+    """
+    from aws import dynamodb as db
+
+    now = time.time() if now is None else now
+    equipment = list(db.iter_equipment(settings.scan_page_size)) if equipment is None else equipment
+    if not equipment:
+        return []
+    x, y, mask = _fleet_matrix([e["equipment_id"] for e in equipment], now)
+    return _rows(equipment, forecast_arrays(x, y, mask), now)
+
+
+# One cache per equipment table, so fleet runs (aws.dynamodb.store_scope) don't share forecasts
+_caches: dict[str, dict[str, Any]] = {}
+_cache_lock = threading.Lock()
+
+
+def _cache() -> dict[str, Any]:
+    from aws import dynamodb as db
+
+    table = db.physical_table(settings.equipment_table)
+    with _cache_lock:
+        return _caches.setdefault(table, {"table": table, "at": 0.0, "rows": [], "by_id": {}})
+
+
+def get_forecasts(max_age: float | None = None) -> list[dict[str, Any]]:
+    """Cached ranked schedule; concurrent refreshes share one computation."""
+    max_age = settings.forecast_ttl_seconds if max_age is None else max_age
+    cache = _cache()
+    if time.time() - cache["at"] > max_age:
+        group("analytics.maintenance_forecast").do(cache["table"], _refresh, cache)
+    return cache["rows"]
+
+
+def _refresh(cache: dict[str, Any]) -> None:
+    rows = compute_forecasts()
+    with _cache_lock:
+        cache.update(at=time.time(), rows=rows, by_id={r["equipment_id"]: r for r in rows})
+
+
+def forecast_index(max_age: float | None = None) -> dict[str, dict[str, Any]]:
+    """Cached forecasts keyed by equipment_id."""
+    get_forecasts(max_age)
+    return _cache()["by_id"]
+
+
+def forecast_for(equipment_id: str) -> dict[str, Any] | None:
+    return forecast_index().get(equipment_id)
+
+
+def forecasts_for(equipment: list[dict[str, Any]]) -> dict[str, dict[str, Any]]:
+    """
+    Forecasts for these devices only: from the fleet cache while it is fresh,
+    otherwise fitted for just these (no fleet rank), without refreshing the cache.
+    """
+    cache = _cache()
+    if cache["at"] and time.time() - cache["at"] <= settings.forecast_ttl_seconds:
+        by_id = cache["by_id"]
+        return {e["equipment_id"]: by_id[e["equipment_id"]] for e in equipment if e["equipment_id"] in by_id}
+    rows = compute_forecasts(equipment)
+    for r in rows:
+        r.pop("rank", None)
+    return {r["equipment_id"]: r for r in rows}
+
+
+def schedule(top: int | None = None, max_age: float | None = None) -> dict[str, Any]:
+    """Ranked maintenance schedule (the first `top` devices) with when it was computed."""
+    rows = get_forecasts(max_age)
+    at = _cache()["at"]
+    generated = datetime.fromtimestamp(at, timezone.utc).isoformat() if at else None
+    return {"generated_at": generated, "total": len(rows), "items": rows[:top] if top else rows}
+
+
+def describe(f: dict[str, Any] | None) -> str:
+    """One-line summary for the agent tools."""
+    if not f or f.get("health_now") is None:
+        return "no forecast (no health data)"
+    if f["ttf_days"] == 0:
+        return "at or below maintenance threshold now"
+    if f["ttf_days_low"] is None:
+        return "no decline toward the threshold forecast"
+    if f["ttf_days"] is None:
+        return f"may reach threshold in {f['ttf_days_low']:g}+ days ({f['confidence']} confidence)"
+    return (
+        f"reaches threshold in ~{f['ttf_days']:g} days "
+        f"(range {f['ttf_days_low']:g}-{f['ttf_days_high'] if f['ttf_days_high'] is not None else 'never'}, "
+        f"{f['confidence']} confidence, schedule by {f['due_by']})"
+    )
@@ -0,0 +1,401 @@
+"""
+Delivery route planning for pending orders (capacitated vehicle routing with time windows).
+
+Vehicles leave the store (store_lat/store_lon), collect orders at their supplier
+locations and return. An order is routable when it carries supplier_lat and
+supplier_lon; optional attributes:
+  window_start / window_end  pickup window, minutes after dispatch
+  service_minutes            time on site (default route_service_minutes)
+Its `quantity` is the load it takes up on the vehicle.
+
+Plan:
+1. Distance matrix: vectorized great-circle distances x route_detour_factor, cached
+   by the coordinate set so repeated plans over the same stops skip it.
+2. Construction: nearest neighbour per vehicle. The next stop is the feasible one
+   (capacity, window, back by the end of the shift) whose service can start soonest.
+3. Improvement: 2-opt (segment reversal) and Or-opt (move a run of 1-3 stops,
+   either direction) within each route. Every candidate position is scored in one
+   NumPy expression and only improving moves are checked for time-window
+   feasibility. This repeats until nothing improves or the time budget runs out.
+"""
+from __future__ import annotations
+
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable
+
+import numpy as np
+
+from config import settings
+from core.singleflight import group
+
+EARTH_RADIUS_KM = 6371.0
+# Improvements smaller than this (km) are float noise, not progress
+_EPS = 1e-4
+_MATRIX_CACHE_SIZE = 4
+# Improving candidates tried per position before moving on (time-window checks)
+_MAX_TRIES = 8
+
+
+# ---------- Distance matrix ----------
+
+
+def haversine_matrix(lat: np.ndarray, lon: np.ndarray, block: int = 1024) -> np.ndarray:
+    """Pairwise great-circle distances in km (float32), computed in row blocks."""
+    lat = np.radians(np.asarray(lat, dtype=np.float64))
+    lon = np.radians(np.asarray(lon, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    n = len(lat)
+    out = np.empty((n, n), dtype=np.float32)
+    for s in range(0, n, block):
+        e = min(n, s + block)
+        a = (
+            np.sin((lat[s:e, None] - lat[None, :]) / 2) ** 2
+            + cos_lat[s:e, None] * cos_lat[None, :] * np.sin((lon[s:e, None] - lon[None, :]) / 2) ** 2
+        )
+        out[s:e] = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+    return out
+
+
+_matrix_cache: OrderedDict[str, np.ndarray] = OrderedDict()
+_matrix_lock = threading.Lock()
+
+
+def distance_matrix(coords: np.ndarray) -> np.ndarray:
+    """Road-distance estimate (km) between (lat, lon) rows; cached by coordinate set."""
+    coords = np.ascontiguousarray(coords, dtype=np.float64)
+    key = hashlib.sha1(coords.tobytes() + str(settings.route_detour_factor).encode()).hexdigest()
+    with _matrix_lock:
+        hit = _matrix_cache.get(key)
+        if hit is not None:
+            _matrix_cache.move_to_end(key)
+            return hit
+    matrix = haversine_matrix(coords[:, 0], coords[:, 1])
+    matrix *= settings.route_detour_factor
+    with _matrix_lock:
+        _matrix_cache[key] = matrix
+        # Keyed by the coordinates, so stores never share a matrix; keep one per
+        # store in flight during fleet runs
+        while len(_matrix_cache) > max(_MATRIX_CACHE_SIZE, settings.fleet_concurrency):
+            _matrix_cache.popitem(last=False)
+    return matrix
+
+
+# ---------- Solver ----------
+
+
+def solve(
+    dist: np.ndarray,
+    demand: np.ndarray,
+    window_start: np.ndarray,
+    window_end: np.ndarray,
+    service: np.ndarray,
+    capacity: float,
+    vehicles: int = 0,
+    speed_kmh: float = 40.0,
+    shift_minutes: float = math.inf,
+    time_budget: float = 3.0,
+) -> dict[str, Any]:
+    """
+    Route stops 1..n from depot 0. All arrays are indexed like dist (index 0 is the
+    depot; its entries are ignored). Returns routes (lists of stop indices, depot
+    excluded), unassigned {index: reason}, construction and final distance.
+    """
+    deadline = time.perf_counter() + time_budget
+    minutes_per_km = 60.0 / speed_kmh
+    n = len(dist)
+    travel_from_depot = dist[0].astype(np.float64) * minutes_per_km
+    travel_to_depot = dist[:, 0].astype(np.float64) * minutes_per_km
+    has_windows = bool(np.isfinite(window_end[1:]).any() or (window_start[1:] > 0).any())
+
+    unassigned: dict[int, str] = {}
+    open_ = np.ones(n, dtype=bool)
+    open_[0] = False
+    first_start = np.maximum(travel_from_depot, window_start)
+    checks = (
+        (demand > capacity, "exceeds vehicle capacity"),
+        (travel_from_depot > window_end, "time window unreachable"),
+        (first_start + service + travel_to_depot > shift_minutes, "cannot be served within the shift"),
+    )
+    for bad, reason in checks:
+        for i in np.flatnonzero(bad & open_):
+            unassigned[int(i)] = reason
+        open_ &= ~bad
+
+    # Construction
+    routes: list[list[int]] = []
+    while open_.any() and (vehicles <= 0 or len(routes) < vehicles):
+        cur, t, load, route = 0, 0.0, 0.0, [0]
+        while True:
+            arrive = t + dist[cur].astype(np.float64) * minutes_per_km
+            start = np.maximum(arrive, window_start)
+            ok = (
+                open_
+                & (load + demand <= capacity)
+                & (arrive <= window_end)
+                & (start + service + travel_to_depot <= shift_minutes)
+            )
+            if not ok.any():
+                break
+            nxt = int(np.where(ok, start - t, np.inf).argmin())
+            route.append(nxt)
+            open_[nxt] = False
+            load += demand[nxt]
+            t = start[nxt] + service[nxt]
+            cur = nxt
+        route.append(0)
+        routes.append(route)
+    for i in np.flatnonzero(open_):
+        unassigned[int(i)] = "no vehicle available"
+
+    construction_km = sum(_route_length(dist, r) for r in routes)
+
+    # Improvement
+    feasible = None
+    if has_windows:
+        feasible = _window_checker(dist, window_start, window_end, service, minutes_per_km, shift_minutes)
+    arrays = [np.asarray(r) for r in routes]
+    active = set(range(len(arrays)))
+    while active and time.perf_counter() < deadline:
+        for k in sorted(active):
+            r, moved_2opt = _two_opt(dist, arrays[k], feasible, deadline)
+            r, moved_or = _or_opt(dist, r, feasible, deadline)
+            arrays[k] = r
+            if not (moved_2opt or moved_or):
+                active.discard(k)
+            if time.perf_counter() >= deadline:
+                break
+    routes = [r.tolist() for r in arrays]
+    return {
+        "routes": [r[1:-1] for r in routes],
+        "unassigned": unassigned,
+        "construction_km": construction_km,
+        "total_km": sum(_route_length(dist, r) for r in routes),
+        "converged": not active,
+    }
+
+
+def _route_length(dist: np.ndarray, route) -> float:
+    r = np.asarray(route)
+    return float(dist[r[:-1], r[1:]].astype(np.float64).sum())
+
+
+def _window_checker(
+    dist: np.ndarray,
+    window_start: np.ndarray,
+    window_end: np.ndarray,
+    service: np.ndarray,
+    minutes_per_km: float,
+    shift_minutes: float,
+) -> Callable[[np.ndarray], bool]:
+    ws, we, sv = window_start.tolist(), window_end.tolist(), service.tolist()
+
+    def feasible(route: np.ndarray) -> bool:
+        r = route.tolist()
+        legs = (dist[route[:-1], route[1:]] * minutes_per_km).tolist()
+        t = 0.0
+        for stop, leg in zip(r[1:-1], legs):
+            t += leg
+            if t > we[stop]:
+                return False
+            t = max(t, ws[stop]) + sv[stop]
+        return t + legs[-1] <= shift_minutes
+
+    return feasible
+
+
+def _two_opt(dist, r: np.ndarray, feasible, deadline: float) -> tuple[np.ndarray, bool]:
+    """One sweep of 2-opt: for each edge, the best improving reversal that stays feasible."""
+    moved = False
+    edges = dist[r[:-1], r[1:]]
+    m = len(r) - 1
+    i = 0
+    while i < m - 2:
+        if i % 64 == 0 and time.perf_counter() >= deadline:
+            break
+        a, b = r[i], r[i + 1]
+        # Reverse r[i+1..j]: edges (a,b) and (r[j],r[j+1]) become (a,r[j]) and (b,r[j+1])
+        delta = dist[a, r[i + 2:m]] + dist[b, r[i + 3:m + 1]] - edges[i] - edges[i + 2:m]
+        for k in _improving(delta):
+            j = i + 2 + k
+            cand = np.concatenate((r[:i + 1], r[i + 1:j + 1][::-1], r[j + 1:]))
+            if feasible is None or feasible(cand):
+                r = cand
+                edges = dist[r[:-1], r[1:]]
+                moved = True
+                break
+        i += 1
+    return r, moved
+
+
+def _or_opt(dist, r: np.ndarray, feasible, deadline: float) -> tuple[np.ndarray, bool]:
+    """One sweep of Or-opt: move each run of 1-3 stops to its best position (either direction)."""
+    moved = False
+    for length in (1, 2, 3):
+        i = 1
+        while i + length < len(r):
+            if i % 64 == 0 and time.perf_counter() >= deadline:
+                return r, moved
+            seg = r[i:i + length]
+            first, last = seg[0], seg[-1]
+            prev, nxt = r[i - 1], r[i + length]
+            gain = dist[prev, first] + dist[last, nxt] - dist[prev, nxt]
+            rest = np.concatenate((r[:i], r[i + length:]))
+            u, v = rest[:-1], rest[1:]
+            base = dist[u, v]
+            fwd = dist[u, first] + dist[last, v] - base - gain
+            rev = dist[u, last] + dist[first, v] - base - gain if length > 1 else None
+            applied = False
+            for reverse, delta in ((False, fwd), (True, rev)):
+                if delta is None:
+                    continue
+                for k in _improving(delta):
+                    piece = seg[::-1] if reverse else seg
+                    cand = np.concatenate((rest[:k + 1], piece, rest[k + 1:]))
+                    if feasible is None or feasible(cand):
+                        r = cand
+                        moved = applied = True
+                        break
+                if applied:
+                    break
+            if not applied:
+                i += 1
+    return r, moved
+
+
+def _improving(delta: np.ndarray) -> list[int]:
+    """Indices of the best improving candidates, best first."""
+    idx = np.flatnonzero(delta < -_EPS)
+    if len(idx) > _MAX_TRIES:
+        idx = idx[np.argpartition(delta[idx], _MAX_TRIES)[:_MAX_TRIES]]
+    return idx[np.argsort(delta[idx])].tolist()
+
+
+# ---------- Orders -> plan ----------
+
+
+def _num(value: Any, default: float) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def plan_routes(
+    orders: list[dict[str, Any]] | None = None,
+    depot: tuple[float, float] | None = None,
+    vehicles: int | None = None,
+    capacity: float | None = None,
+    time_budget: float | None = None,
+) -> dict[str, Any]:
+    """
+    Plan routes for orders (default: all pending orders). Returns per-vehicle stop
+    sequences with distance, load and duration, the total distance and the orders
+    that could not be routed (with the reason).
+    """
+    if orders is None:
+        from aws import dynamodb as db
+        orders = db.get_orders(status="pending")
+    depot = depot or (settings.store_lat, settings.store_lon)
+    vehicles = settings.route_vehicles if vehicles is None else vehicles
+    capacity = settings.route_vehicle_capacity if capacity is None else capacity
+    time_budget = settings.route_time_budget_seconds if time_budget is None else time_budget
+    t0 = time.perf_counter()
+
+    stops, unassigned = [], []
+    for o in orders:
+        lat, lon = _num(o.get("supplier_lat"), math.nan), _num(o.get("supplier_lon"), math.nan)
+        if math.isnan(lat) or math.isnan(lon):
+            unassigned.append({"order_id": o.get("order_id"), "reason": "no supplier coordinates"})
+        else:
+            stops.append((o, lat, lon))
+
+    plan: dict[str, Any] = {"depot": {"lat": depot[0], "lon": depot[1]}, "routes": [], "total_distance_km": 0.0}
+    if stops:
+        coords = np.array([depot] + [(lat, lon) for _, lat, lon in stops])
+        dist = distance_matrix(coords)
+        pad = lambda values: np.array([0.0] + values)  # noqa: E731
+        result = solve(
+            dist,
+            demand=pad([_num(o.get("quantity"), 0.0) for o, _, _ in stops]),
+            window_start=pad([_num(o.get("window_start"), 0.0) for o, _, _ in stops]),
+            window_end=pad([_num(o.get("window_end"), math.inf) for o, _, _ in stops]),
+            service=pad([_num(o.get("service_minutes"), settings.route_service_minutes) for o, _, _ in stops]),
+            capacity=capacity,
+            vehicles=vehicles,
+            speed_kmh=settings.route_speed_kmh,
+            shift_minutes=settings.route_shift_minutes,
+            time_budget=max(0.0, time_budget - (time.perf_counter() - t0)),
+        )
+        for n, route in enumerate(result["routes"], 1):
+            full = [0] + route + [0]
+            km = _route_length(dist, full)
+            load = sum(_num(stops[i - 1][0].get("quantity"), 0.0) for i in route)
+            plan["routes"].append({
+                "vehicle": n,
+                "stops": [stops[i - 1][0].get("order_id") for i in route],
+                "distance_km": round(km, 2),
+                "load": load,
+                "capacity": capacity,
+                "duration_minutes": round(_duration(stops, route, dist), 1),
+            })
+        for i, reason in sorted(result["unassigned"].items()):
+            unassigned.append({"order_id": stops[i - 1][0].get("order_id"), "reason": reason})
+        plan["total_distance_km"] = round(result["total_km"], 2)
+        plan["construction_distance_km"] = round(result["construction_km"], 2)
+        plan["converged"] = result["converged"]
+    plan["stops"] = len(stops)
+    plan["vehicles_used"] = len(plan["routes"])
+    plan["unassigned"] = unassigned
+    plan["elapsed_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+    return plan
+
+
+def _duration(stops: list, route: list[int], dist: np.ndarray) -> float:
+    minutes_per_km = 60.0 / settings.route_speed_kmh
+    t, cur = 0.0, 0
+    for i in route:
+        o = stops[i - 1][0]
+        t = max(t + float(dist[cur, i]) * minutes_per_km, _num(o.get("window_start"), 0.0))
+        t += _num(o.get("service_minutes"), settings.route_service_minutes)
+        cur = i
+    return t + float(dist[cur, 0]) * minutes_per_km
+
+
+def plan_pending_routes(**kwargs: Any) -> dict[str, Any]:
+    """
+    plan_routes() over pending orders; identical concurrent requests for the same
+    store (orders table, see aws.dynamodb.store_scope) share one plan.
+    """
+    from aws import dynamodb as db
+
+    key = repr((db.physical_table(settings.orders_table), sorted(kwargs.items())))
+    return group("analytics.routing").do(key, lambda: plan_routes(**kwargs))
+
+
+def describe(plan: dict[str, Any], max_routes: int = 10, max_stops: int = 8) -> str:
+    """Text summary for the Logistics agent."""
+    if not plan["routes"] and not plan["unassigned"]:
+        return "No pending deliveries; no route needed."
+    lines = [
+        f"Planned {plan['stops']} stops on {plan['vehicles_used']} vehicle(s), "
+        f"total {plan['total_distance_km']:g} km"
+        + (f" (nearest-neighbour start: {plan['construction_distance_km']:g} km)." if plan["routes"] else ".")
+    ]
+    for r in plan["routes"][:max_routes]:
+        seq = " -> ".join(r["stops"][:max_stops]) + (" -> ..." if len(r["stops"]) > max_stops else "")
+        lines.append(
+            f"- Vehicle {r['vehicle']}: {len(r['stops'])} stops, {r['distance_km']:g} km, "
+            f"load {r['load']:g}/{r['capacity']:g}, ~{r['duration_minutes']:g} min: Store -> {seq} -> Store"
+        )
+    if len(plan["routes"]) > max_routes:
+        lines.append(f"- ... {len(plan['routes']) - max_routes} more vehicle(s)")
+    if plan["unassigned"]:
+        reasons: dict[str, int] = {}
+        for u in plan["unassigned"]:
+            reasons[u["reason"]] = reasons.get(u["reason"], 0) + 1
+        lines.append("Not routed: " + ", ".join(f"{n} ({reason})" for reason, n in reasons.items()))
+    return "\n".join(lines)
@@ -0,0 +1,435 @@
+"""
+Weekly staff scheduling: assign shifts to cover a 15-minute demand curve.
+
+Inputs
+- Availability: rows in the staff schedules table with kind="availability":
+  staff_id, schedule_day (mon..sun or an ISO date), start/end ("HH:MM"), and an
+  optional max_hours_week. Rows without a kind are treated as availability too.
+- Demand: required headcount per slot (7 x 96). demand_curve() derives it from
+  forecast units per day (the demand forecast table) or, without forecasts, from
+  order volume. When orders have enough created_at samples, their weekday/time
+  pattern shapes the curve; otherwise a default two-peak day is used. Either way it
+  is converted with staff_units_per_hour and floored at staff_min_on_duty while
+  the store is open.
+
+Solver (a shift is one contiguous block per staff member per day; starts every
+30 minutes, lengths in whole hours between the shift limits)
+1. Greedy: take the shift with the best gain, where gain = understaffed slots
+   covered minus a penalty for overstaffed ones. Prefix sums score every
+   (day, start, length) at once. The shift goes to the eligible staff member
+   (available for the whole block, free that day, hours left) with the most
+   hours left.
+2. Local search: for each assigned shift, remove it and score every alternative
+   for the same person on every free day, including dropping the shift. Keep the
+   best. Repeat greedy and local search until nothing improves or the time budget
+   runs out.
+
+The result lists assignments, coverage totals and the remaining coverage gaps.
+"""
+from __future__ import annotations
+
+import time
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Any
+
+import numpy as np
+
+from config import settings
+
+DAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+SLOTS = 96  # 15-minute slots per day
+_START_STEP = 2  # shifts start on the half hour
+_UNDER_WEIGHT = 1.0
+_OVER_WEIGHT = 0.3
+
+
+def _slot(hhmm: str) -> int:
+    h, _, m = str(hhmm).partition(":")
+    return min(SLOTS, max(0, int(h) * 4 + int(m or 0) // 15))
+
+
+def _hhmm(slot: int) -> str:
+    return f"{slot // 4:02d}:{slot % 4 * 15:02d}"
+
+
+def _day_index(value: Any) -> int | None:
+    text = str(value or "").strip().lower()
+    if text[:3] in DAYS:
+        return DAYS.index(text[:3])
+    try:
+        return date.fromisoformat(text[:10]).weekday()
+    except ValueError:
+        return None
+
+
+# ---------- Demand curve ----------
+
+
+def _default_profile() -> np.ndarray:
+    """Relative load per slot for one day: base level plus lunch and evening peaks."""
+    t = np.arange(SLOTS) / 4.0
+    return 1.0 + 0.8 * np.exp(-((t - 12.5) / 1.2) ** 2) + 1.0 * np.exp(-((t - 17.5) / 1.5) ** 2)
+
+
+def demand_curve(
+    units_per_day: float | None = None,
+    orders: list[dict[str, Any]] | None = None,
+) -> tuple[np.ndarray, dict[str, Any]]:
+    """Required headcount (7 x 96) and a note on where the numbers came from."""
+    open_slot, close_slot = _slot(settings.staff_open_time), _slot(settings.staff_close_time)
+    is_open = np.zeros(SLOTS, dtype=bool)
+    is_open[open_slot:close_slot] = True
+    source = {}
+
+    if orders is None:
+        from aws import dynamodb as db
+        orders = db.get_orders()
+    stamps, dates = [], []
+    for o in orders:
+        try:
+            ts = datetime.fromisoformat(str(o["created_at"]).replace("Z", "+00:00"))
+        except (KeyError, ValueError):
+            continue
+        stamps.append((ts.weekday(), ts.hour * 4 + ts.minute // 15, float(o.get("quantity", 1) or 1)))
+        dates.append(ts.date().toordinal())
+
+    if units_per_day is None:
+        units_per_day = _forecast_units_per_day()
+        source["volume"] = "demand forecast"
+        if units_per_day is None and stamps:
+            # Calendar days the history spans (days without orders count as quiet days)
+            days = max(dates) - min(dates) + 1
+            units_per_day = sum(q for _, _, q in stamps) / days
+            source["volume"] = "order volume"
+        if units_per_day is None:
+            units_per_day = settings.staff_default_units_per_day
+            source["volume"] = "default"
+    else:
+        source["volume"] = "given"
+
+    if len(stamps) >= settings.staff_min_order_samples:
+        counts = np.zeros((7, SLOTS))
+        for d, s, q in stamps:
+            counts[d, s] += q
+        # Smooth over +-1 hour so sparse history doesn't produce spiky staffing
+        kernel = np.ones(9) / 9
+        profile = np.array([np.convolve(row, kernel, mode="same") for row in counts]) + 1e-9
+        source["shape"] = "order history"
+    else:
+        weekday_factor = np.array([1.0, 1.0, 1.0, 1.0, 1.15, 1.3, 1.2])
+        profile = weekday_factor[:, None] * _default_profile()[None, :]
+        source["shape"] = "default"
+    profile = np.where(is_open[None, :], profile, 0.0)
+    # Average day carries units_per_day; busier days get proportionally more
+    share = profile / profile.sum() * 7
+    units_per_slot = units_per_day * share
+    required = np.ceil(units_per_slot / (settings.staff_units_per_hour / 4)).astype(np.int32)
+    required = np.where(is_open[None, :], np.maximum(required, settings.staff_min_on_duty), 0)
+    source["units_per_day"] = round(float(units_per_day), 1)
+    return required, source
+
+
+def _forecast_units_per_day() -> float | None:
+    try:
+        from analytics.demand import iter_forecasts
+
+        total = sum(float(f.get("daily_demand", 0)) for f in iter_forecasts(settings.scan_page_size))
+    except Exception:
+        return None
+    return total or None
+
+
+# ---------- Staff ----------
+
+
+def load_staff(rows: list[dict[str, Any]] | None = None) -> tuple[list[str], np.ndarray, np.ndarray, int]:
+    """
+    (staff ids, availability bool[staff, 7, 96], max slots per week, rows skipped) from
+    schedule rows. Rows with an unknown day, a time that isn't HH:MM or a non-numeric
+    max_hours_week are skipped.
+    """
+    if rows is None:
+        from aws import dynamodb as db
+        rows = db.list_staff_schedules()
+    windows: dict[str, list[tuple[int, int, int]]] = {}
+    max_hours: dict[str, float] = {}
+    skipped = 0
+    for r in rows:
+        if r.get("kind", "availability") != "availability" or not r.get("staff_id"):
+            continue
+        d = _day_index(r.get("schedule_day"))
+        try:
+            if d is None:
+                raise ValueError(r.get("schedule_day"))
+            window = (d, _slot(r.get("start", "00:00")), _slot(r.get("end", "24:00")))
+            hours = None if r.get("max_hours_week") is None else float(r["max_hours_week"])
+        except (TypeError, ValueError):
+            skipped += 1
+            continue
+        sid = str(r["staff_id"])
+        windows.setdefault(sid, []).append(window)
+        if hours is not None:
+            max_hours[sid] = hours
+    staff = sorted(windows)
+    avail = np.zeros((len(staff), 7, SLOTS), dtype=bool)
+    for k, sid in enumerate(staff):
+        for d, a, b in windows[sid]:
+            avail[k, d, a:b] = True
+    budget = np.array([int(max_hours.get(s, settings.staff_max_hours_week) * 4) for s in staff], dtype=np.int64)
+    return staff, avail, budget, skipped
+
+
+# ---------- Solver ----------
+
+
+class _Problem:
+    def __init__(self, need: np.ndarray, avail: np.ndarray, budget: np.ndarray) -> None:
+        self.need = need.astype(np.int32)
+        self.have = np.zeros_like(self.need)
+        self.starts = np.arange(0, SLOTS, _START_STEP)
+        self.lengths = np.arange(settings.staff_shift_min_hours, settings.staff_shift_max_hours + 1) * 4
+        self.ends = self.starts[:, None] + self.lengths[None, :]  # (S, L)
+        self.valid = self.ends <= SLOTS
+        self.ends_c = np.minimum(self.ends, SLOTS)
+        # availability prefix sums: a block [s, e) is available iff P[e] - P[s] == e - s
+        self.avail_p = np.concatenate(
+            (np.zeros(avail.shape[:2] + (1,), dtype=np.int32), np.cumsum(avail, axis=2, dtype=np.int32)), axis=2
+        )
+        self.hours_left = budget.copy()
+        self.used_day = np.zeros(avail.shape[:2], dtype=bool)
+        # staff index -> {day: (start, length)}
+        self.shifts: dict[int, dict[int, tuple[int, int]]] = {}
+
+    def block_cost(self, marginal: np.ndarray) -> np.ndarray:
+        """Sum of a (days, 96) per-slot marginal over every (start, length): (days, S, L)."""
+        p = np.concatenate((np.zeros((marginal.shape[0], 1)), np.cumsum(marginal, axis=1)), axis=1)
+        cost = p[:, self.ends_c] - p[:, self.starts][:, :, None]
+        return np.where(self.valid[None], cost, np.inf)
+
+    def marginal(self, have: np.ndarray) -> np.ndarray:
+        """Cost change of one more person in each slot."""
+        return np.where(have < self.need, -_UNDER_WEIGHT, _OVER_WEIGHT)
+
+    def available(self, k: int | np.ndarray, day: int | np.ndarray, start: int, length: int) -> np.ndarray:
+        return self.avail_p[k, day, start + length] - self.avail_p[k, day, start] == length
+
+    def assign(self, k: int, day: int, start: int, length: int) -> None:
+        self.have[day, start:start + length] += 1
+        self.hours_left[k] -= length
+        self.used_day[k, day] = True
+        self.shifts.setdefault(k, {})[day] = (start, length)
+
+    def unassign(self, k: int, day: int) -> tuple[int, int]:
+        start, length = self.shifts[k].pop(day)
+        self.have[day, start:start + length] -= 1
+        self.hours_left[k] += length
+        self.used_day[k, day] = False
+        return start, length
+
+    def cost(self) -> float:
+        diff = self.have - self.need
+        return float(_UNDER_WEIGHT * np.maximum(-diff, 0).sum() + _OVER_WEIGHT * np.maximum(diff, 0).sum())
+
+    # ----- greedy -----
+
+    def greedy(self, deadline: float) -> int:
+        added = 0
+        blocked = np.zeros((7,) + self.ends.shape, dtype=bool)
+        score = -self.block_cost(self.marginal(self.have))
+        while time.perf_counter() < deadline:
+            masked = np.where(blocked, -np.inf, score)
+            flat = int(masked.argmax())
+            if not masked.flat[flat] > 1e-9:
+                break
+            day, si, li = np.unravel_index(flat, masked.shape)
+            start, length = int(self.starts[si]), int(self.lengths[li])
+            eligible = np.flatnonzero(
+                ~self.used_day[:, day]
+                & (self.hours_left >= length)
+                & self.available(slice(None), day, start, length)
+            )
+            if not len(eligible):
+                blocked[day, si, li] = True
+                continue
+            k = int(eligible[self.hours_left[eligible].argmax()])
+            self.assign(k, int(day), start, length)
+            score[day] = -self.block_cost(self.marginal(self.have[day:day + 1]))[0]
+            added += 1
+        return added
+
+    # ----- local search -----
+
+    def improve(self, deadline: float) -> int:
+        moves = 0
+        for k in list(self.shifts):
+            for day in list(self.shifts[k]):
+                if time.perf_counter() >= deadline:
+                    return moves
+                start, length = self.unassign(k, day)
+                cost = self.block_cost(self.marginal(self.have))
+                ok = (
+                    ~self.used_day[k][:, None, None]
+                    & self.valid[None]
+                    & (self.lengths[None, None, :] <= self.hours_left[k])
+                    & (self.avail_p[k][:, self.ends_c] - self.avail_p[k][:, self.starts][:, :, None] == self.lengths[None, None, :])
+                )
+                cost = np.where(ok, cost, np.inf)
+                si = int(np.searchsorted(self.starts, start))
+                li = int(np.searchsorted(self.lengths, length))
+                current = cost[day, si, li]
+                flat = int(cost.argmin())
+                best = cost.flat[flat]
+                if best < min(current, 0.0) - 1e-9:
+                    d2, s2, l2 = np.unravel_index(flat, cost.shape)
+                    self.assign(k, int(d2), int(self.starts[s2]), int(self.lengths[l2]))
+                    moves += 1
+                elif current > 1e-9:
+                    moves += 1  # dropping it is better than keeping it
+                else:
+                    self.assign(k, day, start, length)
+            if not self.shifts.get(k):
+                self.shifts.pop(k, None)
+        return moves
+
+
+def solve(
+    need: np.ndarray,
+    avail: np.ndarray,
+    budget: np.ndarray,
+    time_budget: float | None = None,
+) -> _Problem:
+    time_budget = settings.staff_time_budget_seconds if time_budget is None else time_budget
+    deadline = time.perf_counter() + time_budget
+    problem = _Problem(need, avail, budget)
+    while time.perf_counter() < deadline:
+        added = problem.greedy(deadline)
+        moved = problem.improve(deadline)
+        if not added and not moved:
+            break
+    return problem
+
+
+# ---------- Plan ----------
+
+
+def coverage_gaps(need: np.ndarray, have: np.ndarray) -> list[dict[str, Any]]:
+    """Contiguous understaffed periods per day."""
+    gaps = []
+    short = np.maximum(need - have, 0)
+    for d in range(7):
+        row = short[d]
+        t = 0
+        while t < SLOTS:
+            if row[t] == 0:
+                t += 1
+                continue
+            s = t
+            while t < SLOTS and row[t] > 0:
+                t += 1
+            gaps.append({
+                "day": DAYS[d],
+                "start": _hhmm(s),
+                "end": _hhmm(t),
+                "short_by": int(row[s:t].max()),
+                "staff_hours_short": float(row[s:t].sum()) / 4,
+            })
+    return gaps
+
+
+def optimize_schedule(
+    rows: list[dict[str, Any]] | None = None,
+    required: np.ndarray | None = None,
+    units_per_day: float | None = None,
+    time_budget: float | None = None,
+) -> dict[str, Any]:
+    """Build the week's shift plan from schedule rows and the demand curve."""
+    t0 = time.perf_counter()
+    staff, avail, budget, skipped = load_staff(rows)
+    source: dict[str, Any] = {"volume": "given", "shape": "given"}
+    if required is None:
+        required, source = demand_curve(units_per_day)
+    required = np.asarray(required, dtype=np.int32).reshape(7, SLOTS)
+    problem = solve(required, avail, budget, time_budget)
+    assignments = [
+        {
+            "staff_id": staff[k],
+            "day": DAYS[d],
+            "start": _hhmm(s),
+            "end": _hhmm(s + length),
+            "hours": length / 4,
+        }
+        for k, days in problem.shifts.items()
+        for d, (s, length) in days.items()
+    ]
+    assignments.sort(key=lambda a: (DAYS.index(a["day"]), a["start"], a["staff_id"]))
+    need_hours = float(required.sum()) / 4
+    covered = float(np.minimum(problem.have, required).sum()) / 4
+    return {
+        "staff": len(staff),
+        "availability_rows_skipped": skipped,
+        "staff_scheduled": len({a["staff_id"] for a in assignments}),
+        "demand_source": source,
+        "required_staff_hours": need_hours,
+        "scheduled_staff_hours": float(problem.have.sum()) / 4,
+        "covered_staff_hours": covered,
+        "coverage_pct": round(100 * covered / need_hours, 1) if need_hours else 100.0,
+        "overstaffed_staff_hours": float(np.maximum(problem.have - required, 0).sum()) / 4,
+        "assignments": assignments,
+        "gaps": coverage_gaps(required, problem.have),
+        "elapsed_ms": round((time.perf_counter() - t0) * 1000, 1),
+    }
+
+
+def publish_schedule(plan: dict[str, Any], week_start: str | None = None) -> int:
+    """Write the plan's shifts to the staff schedules table (kind="shift"); returns rows written."""
+    from aws import dynamodb as db
+
+    if week_start is None:
+        today = datetime.now(timezone.utc).date()
+        week_start = (today + timedelta(days=7 - today.weekday())).isoformat()
+    monday = date.fromisoformat(week_start)
+    rows = []
+    for a in plan["assignments"]:
+        day = (monday + timedelta(days=DAYS.index(a["day"]))).isoformat()
+        rows.append({
+            "schedule_id": f"shift#{day}#{a['staff_id']}",
+            "kind": "shift",
+            "staff_id": a["staff_id"],
+            "schedule_day": day,
+            "start": a["start"],
+            "end": a["end"],
+            "hours": Decimal(str(a["hours"])),
+        })
+    db.batch_write(settings.staff_schedules_table, rows)
+    return len(rows)
+
+
+def describe(plan: dict[str, Any], max_gaps: int = 10) -> str:
+    """Text summary for the agents."""
+    if not plan["staff"]:
+        return "No staff availability found in the staff schedules table."
+    lines = [
+        f"Weekly schedule: {len(plan['assignments'])} shifts for {plan['staff_scheduled']}/{plan['staff']} staff, "
+        f"{plan['scheduled_staff_hours']:g} staff-hours scheduled vs {plan['required_staff_hours']:g} required "
+        f"({plan['coverage_pct']:g}% covered, {plan['overstaffed_staff_hours']:g} h overstaffed). "
+        f"Demand from {plan['demand_source'].get('volume')} ({plan['demand_source'].get('shape')} shape)."
+    ]
+    if plan.get("availability_rows_skipped"):
+        lines.append(
+            f"Skipped {plan['availability_rows_skipped']} availability rows with an unreadable day, "
+            "time or max_hours_week."
+        )
+    gaps = sorted(plan["gaps"], key=lambda g: -g["staff_hours_short"])
+    if not gaps:
+        lines.append("No coverage gaps.")
+    else:
+        lines.append(f"Coverage gaps ({len(gaps)}, largest first):")
+        for g in gaps[:max_gaps]:
+            lines.append(
+                f"- {g['day']} {g['start']}-{g['end']}: short by up to {g['short_by']} "
+                f"({g['staff_hours_short']:g} staff-hours)"
+            )
+        if len(gaps) > max_gaps:
+            lines.append(f"- ... {len(gaps) - max_gaps} more")
+    return "\n".join(lines)
@@ -7,23 +7,31 @@ import sys
 import io
 import json
 import asyncio
+import itertools
 import threading
 import time
+
+_IMPORT_STARTED = time.perf_counter()
+
 import re
+import zlib
 from pathlib import Path
 from datetime import datetime, timezone
 
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException, Query
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 os.environ['CREWAI_TELEMETRY_OPT_OUT'] = 'true'
 os.environ['CREWAI_DISABLE_TELEMETRY'] = 'true'
 load_dotenv()
 
+from config import settings
+from core.metrics import STARTUP_LATENCY, MetricsMiddleware
+
 STATIC_DIR = Path(__file__).resolve().parent / "static"
 
 app = FastAPI(
@@ -41,6 +49,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Latency / status / byte metrics per route, exported at GET /metrics
+app.add_middleware(MetricsMiddleware)
+
 # Serve static assets (CSS, JS) -- keep backward compatibility
 app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
 
@@ -50,6 +61,49 @@ app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
 class TriggerInput(BaseModel):
     store_id: str = "store-001"
     trigger: str = "api"
+    # Workflow starts: a retry with the same key (while the run is still going) returns
+    # the same execution instead of starting another; omit it to always start a new run
+    idempotency_key: str | None = None
+
+
+class BatchTriggerInput(BaseModel):
+    runs: list[TriggerInput]
+    # Default key for runs without their own: resending the batch with the same key
+    # starts nothing new while those runs are going; omit it to start every run afresh
+    idempotency_key: str | None = None
+
+
+class BatchGetInput(BaseModel):
+    keys: list[str]
+
+
+class MaintenanceRunInput(BaseModel):
+    equipment_ids: list[str]
+
+
+class InventoryAdjustInput(BaseModel):
+    sku: str
+    # Negative for sales/shrinkage, positive for receipts
+    delta: int
+    reason: str = ""
+
+
+class StaffScheduleInput(BaseModel):
+    # Required headcount per 15-minute slot, 7 days x 96 (Monday first); default
+    # is derived from forecast demand / order volume
+    required: list[list[int]] | None = None
+    units_per_day: float | None = None
+    time_budget: float | None = Field(default=None, ge=0, le=30)
+    # Write the shifts to the staff schedules table for the week starting week_start
+    apply: bool = False
+    week_start: str | None = None
+
+
+class FleetRunInput(BaseModel):
+    store_ids: list[str] = Field(min_length=1)
+    # Stores in flight; default settings.fleet_concurrency
+    concurrency: int | None = Field(default=None, ge=1, le=256)
+    trigger: str = "fleet"
 
 
 class CrewRunResult(BaseModel):
@@ -114,6 +168,77 @@ class QueueWriter(io.TextIOBase):
             self._buf = ""
 
 
+# ---------- Paginated and streamed list responses ----------
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+NDJSON_CHUNK_BYTES = 64 * 1024
+
+
+def _accepts(header: str, token: str) -> bool:
+    """True if a comma-separated Accept-style header lists `token` with q > 0."""
+    for part in header.split(","):
+        fields = [f.strip() for f in part.split(";")]
+        if fields[0].lower() != token:
+            continue
+        for field in fields[1:]:
+            if field.lower().startswith("q="):
+                try:
+                    return float(field[2:]) > 0
+                except ValueError:
+                    return False
+        return True
+    return False
+
+
+def _ndjson_chunks(items):
+    """Encode items as NDJSON, yielding ~64KB chunks so memory stays flat."""
+    from aws.dynamodb import _json_default
+    buf: list[str] = []
+    size = 0
+    for item in items:
+        line = json.dumps(item, default=_json_default, separators=(",", ":")) + "\n"
+        buf.append(line)
+        size += len(line)
+        if size >= NDJSON_CHUNK_BYTES:
+            yield "".join(buf).encode()
+            buf, size = [], 0
+    if buf:
+        yield "".join(buf).encode()
+
+
+def _gzip_chunks(chunks):
+    """Gzip a chunk stream, sync-flushing each chunk so clients see data early."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+def _list_response(request: Request, iter_items, fetch_page, limit: int | None, cursor: str | None):
+    """
+    Shared handler for large list endpoints.
+    - Accept: application/x-ndjson streams every item straight off the paginated scan
+      (gzip-compressed when the client sends Accept-Encoding: gzip).
+    - limit/cursor return one page plus `next_cursor` (opaque DynamoDB ExclusiveStartKey).
+    - Neither returns the full list, as before.
+    """
+    if _accepts(request.headers.get("accept", ""), NDJSON_MEDIA_TYPE):
+        chunks = _ndjson_chunks(iter_items())
+        headers = {"Cache-Control": "no-cache", "Vary": "Accept, Accept-Encoding"}
+        if _accepts(request.headers.get("accept-encoding", ""), "gzip"):
+            chunks = _gzip_chunks(chunks)
+            headers["Content-Encoding"] = "gzip"
+        return StreamingResponse(chunks, media_type=NDJSON_MEDIA_TYPE, headers=headers)
+
+    if limit is None and cursor is None:
+        return {"items": list(iter_items()), "next_cursor": None}
+    try:
+        items, next_cursor = fetch_page(limit or settings.scan_page_size, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": items, "next_cursor": next_cursor}
+
+
 # ---------- Static frontend (backward compat) ----------
 
 @app.get("/")
@@ -127,20 +252,73 @@ def index():
 
 # ---------- Health ----------
 
+@app.on_event("startup")
+def startup():
+    """Record time to ready; with CREW_BACKEND=process, start warming crew workers."""
+    if settings.crew_backend == "process":
+        from core.crew_workers import pool
+        pool().start()
+    ready = time.perf_counter() - _IMPORT_STARTED
+    STARTUP_LATENCY.labels("api_ready").observe(ready)
+    print(f"API ready in {ready:.2f}s (crew backend: {settings.crew_backend})")
+
+
+@app.on_event("shutdown")
+def shutdown():
+    if settings.crew_backend == "process":
+        from core.crew_workers import pool
+        pool().shutdown()
+
+
 @app.get("/health")
 def health():
     return {"status": "ok"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus text-format metrics (API, crew, tools, AWS and Bedrock calls)."""
+    from core.metrics import render
+    return PlainTextResponse(render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.get("/stats/bedrock")
+def bedrock_stats():
+    """Bedrock governor per model: concurrency limit, in flight, queue by priority, throttles, hedges."""
+    from core.governor import stats
+    return stats()
+
+
+@app.get("/stats/crew-workers")
+def crew_worker_stats():
+    """Warm crew worker pool (CREW_BACKEND=process): workers by state, warm-up time, runs, restarts."""
+    if settings.crew_backend != "process":
+        return {"backend": settings.crew_backend}
+    from core.crew_workers import pool
+    return {"backend": "process", **pool().stats()}
+
+
+@app.get("/stats/singleflight")
+def singleflight_stats():
+    """Per-function counters for coalesced DynamoDB reads (calls, executed, coalesced)."""
+    from core.singleflight import stats
+    return stats()
+
+
 # ---------- Original crew run (non-streaming) ----------
 
+# Triggers of unattended runs: their Bedrock calls queue behind interactive ones
+SCHEDULED_TRIGGERS = {"schedule", "scheduled", "eventbridge", "cron"}
+
+
 @app.post("/run-crew", response_model=CrewRunResult)
 def run_crew(body: TriggerInput | None = None):
     """Run the full CrewAI crew (blocking). For streaming logs, use GET /stream-crew."""
-    from agents.crew import run_store_operations
-    inputs = (body or TriggerInput()).model_dump()
+    from core.crew_workers import execute
+    inputs = (body or TriggerInput()).model_dump(exclude={"idempotency_key"})
+    priority = "batch" if inputs["trigger"] in SCHEDULED_TRIGGERS else "normal"
     try:
-        result = run_store_operations(**inputs)
+        result = execute("store", {"priority": priority, **inputs})
         return CrewRunResult(
             success=True,
             message="Crew run completed",
@@ -150,25 +328,59 @@ def run_crew(body: TriggerInput | None = None):
         return CrewRunResult(success=False, message=str(e), output=None)
 
 
+@app.post("/run-maintenance", response_model=CrewRunResult)
+def run_maintenance(body: MaintenanceRunInput):
+    """Run only the Maintenance Coordinator, for specific equipment (blocking)."""
+    from core.crew_workers import execute
+    if not body.equipment_ids:
+        raise HTTPException(status_code=400, detail="equipment_ids is empty")
+    try:
+        result = execute("maintenance", {"equipment_ids": list(dict.fromkeys(body.equipment_ids)), "priority": "normal"})
+        return CrewRunResult(
+            success=True,
+            message="Maintenance run completed",
+            output=str(result) if result else None,
+        )
+    except Exception as e:
+        return CrewRunResult(success=False, message=str(e), output=None)
+
+
 # ---------- SSE streaming crew run ----------
 
 @app.get("/stream-crew")
 async def stream_crew(store_id: str = "store-001", trigger: str = "api"):
     """
-    Server-Sent Events endpoint that streams agent logs in real-time.
+    Server-Sent Events endpoint that streams agent logs in real-time, plus the LLM
+    output token by token (`type: "token"`, tagged with agent and task).
     Connect via EventSource from the frontend.
     """
     queue: asyncio.Queue = asyncio.Queue()
     loop = asyncio.get_event_loop()
 
+    def on_token(chunk: str, agent: str | None, task: str | None):
+        """LLM output as it is generated; goes out as `token` events."""
+        loop.call_soon_threadsafe(queue.put_nowait, {
+            "type": "token",
+            "agent": agent if agent in AGENT_ROLES else "System",
+            "task": task,
+            "chunk": chunk,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+        })
+
     def run_crew_in_thread():
-        """Run crew in a background thread, capturing stdout."""
+        """Run crew in a background thread, capturing stdout (or the worker's, streamed back)."""
         original_stdout = sys.stdout
         writer = QueueWriter(queue, loop)
-        sys.stdout = writer
+        if settings.crew_backend != "process":
+            sys.stdout = writer
         try:
-            from agents.crew import run_store_operations
-            result = run_store_operations(store_id=store_id, trigger=trigger)
+            from core.crew_workers import execute
+            result = execute(
+                "store",
+                {"priority": "interactive", "store_id": store_id, "trigger": trigger},
+                on_log=writer.write,
+                on_token=on_token,
+            )
             writer.flush()
             # Send the final result
             asyncio.run_coroutine_threadsafe(
@@ -198,7 +410,9 @@ async def stream_crew(store_id: str = "store-001", trigger: str = "api"):
                 yield f"data: {json.dumps({'type': 'heartbeat', 'timestamp': datetime.now(timezone.utc).isoformat()})}\n\n"
                 continue
 
-            if line == "__DONE__":
+            if isinstance(line, dict):
+                yield f"data: {json.dumps(line)}\n\n"
+            elif line == "__DONE__":
                 yield f"event: done\ndata: {json.dumps({'type': 'done', 'timestamp': datetime.now(timezone.utc).isoformat()})}\n\n"
                 break
             elif line.startswith("__CREW_RESULT__:"):
@@ -229,28 +443,192 @@ def low_stock():
 
 
 @app.get("/inventory/all")
-def all_inventory():
-    """List all inventory items."""
-    from aws.dynamodb import list_inventory
-    return {"items": list_inventory()}
+def all_inventory(
+    request: Request,
+    limit: int | None = Query(default=None, ge=1, le=settings.max_page_limit),
+    cursor: str | None = Query(default=None),
+):
+    """List inventory items: everything, one page (limit/cursor), or an NDJSON stream."""
+    from aws.dynamodb import iter_inventory, list_inventory_page
+    return _list_response(
+        request,
+        lambda: iter_inventory(settings.scan_page_size),
+        list_inventory_page,
+        limit,
+        cursor,
+    )
+
+
+@app.post("/inventory/adjust")
+def adjust_inventory(body: InventoryAdjustInput):
+    """Add delta to a SKU's quantity (recorded as a movement event when the event log is on)."""
+    from aws.dynamodb import adjust_inventory as adjust
+    item = adjust(body.sku, body.delta, body.reason)
+    if item is None:
+        raise HTTPException(status_code=404, detail=f"No inventory found for SKU: {body.sku}")
+    return item
+
+
+@app.post("/inventory/import", status_code=202)
+async def inventory_import(
+    request: Request,
+    format: str | None = Query(default=None, pattern="^(csv|ndjson)$"),
+    wait: bool = False,
+):
+    """
+    Bulk-import inventory rows from the raw request body: CSV with a header line or
+    NDJSON (format= or Content-Type). The body is streamed into the importer without
+    buffering; progress is at GET /jobs/{job_id}. wait=true answers after the import.
+    """
+    import queue
+    from aws.inventory_import import detect_format, import_inventory
+    from core import jobs
+    fmt = format or detect_format(request.headers.get("content-type"))
+    job = jobs.create("inventory_import", format=fmt)
+    body: queue.Queue = queue.Queue(maxsize=settings.import_queue_chunks * settings.import_workers)
+    thread = jobs.start(job, import_inventory, iter(body.get, None), fmt, job)
+    try:
+        async for chunk in request.stream():
+            if chunk:
+                await asyncio.to_thread(body.put, chunk)
+    finally:
+        await asyncio.to_thread(body.put, None)
+    if wait:
+        await asyncio.to_thread(thread.join)
+    return job.snapshot()
+
+
+@app.get("/inventory/events")
+def inventory_events(
+    after_seq: int = Query(default=0, ge=0),
+    limit: int = Query(default=100, ge=1, le=settings.max_page_limit),
+):
+    """Inventory movement events after a sequence number (audit / change feed)."""
+    if not settings.inventory_event_log:
+        raise HTTPException(status_code=404, detail="Inventory event log is not enabled")
+    from aws.inventory_log import get_ledger
+    ledger = get_ledger()
+    events = list(itertools.islice(ledger.log.read(after_seq), limit))
+    return {"events": events, "next_after_seq": events[-1]["seq"] if events else after_seq, "ledger": ledger.stats()}
+
+
+@app.get("/inventory/analytics")
+def inventory_analytics(
+    request: Request,
+    sku: str | None = Query(default=None),
+    limit: int | None = Query(default=None, ge=1, le=settings.max_page_limit),
+    cursor: str | None = Query(default=None),
+):
+    """
+    Per-SKU demand forecast, safety stock, reorder point and EOQ from the precomputed
+    forecast table: one SKU, everything, one page, or an NDJSON stream.
+    """
+    from analytics import demand
+    if sku:
+        forecast = demand.get_forecast(sku)
+        if not forecast:
+            raise HTTPException(status_code=404, detail=f"No demand forecast for {sku}")
+        return forecast
+    return _list_response(
+        request,
+        lambda: demand.iter_forecasts(settings.scan_page_size),
+        demand.list_forecasts_page,
+        limit,
+        cursor,
+    )
+
+
+@app.post("/inventory/analytics/refresh")
+def refresh_inventory_analytics(full: bool = False):
+    """Re-forecast SKUs whose demand history changed (or all with full=true)."""
+    from analytics import demand
+    return demand.refresh(full=full)
+
+
+# ---------- Dashboard ----------
+
+@app.get("/dashboard/summary")
+def dashboard_summary(top_n: int | None = Query(default=None, ge=0, le=100)):
+    """
+    One-request dashboard overview (stock classes, unhealthy equipment, pending order
+    totals, most urgent items) served from an incrementally maintained in-process view.
+    """
+    from aws.dashboard_view import VIEW
+    return VIEW.summary(top_n=top_n)
 
 
 # ---------- Equipment endpoints ----------
 
 @app.get("/equipment/all")
-def all_equipment():
-    """List all equipment with health scores."""
-    from aws.dynamodb import list_equipment
-    return {"items": list_equipment()}
+def all_equipment(
+    request: Request,
+    limit: int | None = Query(default=None, ge=1, le=settings.max_page_limit),
+    cursor: str | None = Query(default=None),
+    forecast: bool = Query(default=False),
+):
+    """
+    List equipment with health scores: everything, one page, or an NDJSON stream.
+    forecast=true adds each item's maintenance `forecast`: for a page, fitted for that
+    page's devices only (or taken from a fresh fleet forecast); for a full listing or
+    stream, from the cached fleet forecast.
+    """
+    from aws.dynamodb import iter_equipment, list_equipment_page
+    iter_items = lambda: iter_equipment(settings.scan_page_size)  # noqa: E731
+    fetch_page = list_equipment_page
+    if forecast:
+        from analytics import maintenance_forecast as mf
+
+        def iter_items():
+            by_id = mf.forecast_index()
+            return ({**i, "forecast": by_id.get(i.get("equipment_id"))} for i in iter_equipment(settings.scan_page_size))
+
+        def fetch_page(limit, cursor):
+            items, next_cursor = list_equipment_page(limit, cursor)
+            by_id = mf.forecasts_for(items)
+            return [{**i, "forecast": by_id.get(i.get("equipment_id"))} for i in items], next_cursor
+
+    return _list_response(request, iter_items, fetch_page, limit, cursor)
+
+
+@app.get("/equipment/maintenance-schedule")
+def maintenance_schedule(top: int = Query(default=20, ge=1, le=settings.max_page_limit), refresh: bool = False):
+    """Equipment ranked by forecast time to the maintenance threshold (soonest first)."""
+    from analytics import maintenance_forecast as mf
+    return mf.schedule(top, max_age=0 if refresh else None)
+
+
+@app.get("/equipment/{equipment_id}/history")
+def equipment_history(equipment_id: str, days: float = 7, max_points: int = 500):
+    """Health readings for the last N days (downsampled to ~max_points) plus the trend."""
+    from aws import health_history
+    if days <= 0 or max_points < 1:
+        raise HTTPException(status_code=400, detail="days and max_points must be positive")
+    now = time.time()
+    return {
+        "equipment_id": equipment_id,
+        "trend": health_history.trend(equipment_id, window_days=min(days, 7)),
+        **health_history.history(equipment_id, now - days * 86400, now + 1, max_points=max_points),
+    }
 
 
 # ---------- Order endpoints ----------
 
 @app.get("/orders/all")
-def all_orders(status: str | None = Query(default=None)):
-    """List all orders, optionally filter by status."""
-    from aws.dynamodb import get_orders
-    return {"items": get_orders(status=status)}
+def all_orders(
+    request: Request,
+    status: str | None = Query(default=None),
+    limit: int | None = Query(default=None, ge=1, le=settings.max_page_limit),
+    cursor: str | None = Query(default=None),
+):
+    """List orders, optionally filter by status: everything, one page, or an NDJSON stream."""
+    from aws.dynamodb import iter_orders, get_orders_page
+    return _list_response(
+        request,
+        lambda: iter_orders(status=status, page_size=settings.scan_page_size),
+        lambda page_limit, page_cursor: get_orders_page(page_limit, page_cursor, status=status),
+        limit,
+        cursor,
+    )
 
 
 @app.get("/orders/pending")
@@ -260,6 +638,112 @@ def pending_orders():
     return {"items": get_orders(status="pending")}
 
 
+# ---------- Logistics ----------
+
+@app.get("/logistics/routes")
+def logistics_routes(
+    vehicles: int | None = Query(default=None, ge=0),
+    capacity: float | None = Query(default=None, gt=0),
+    time_budget: float | None = Query(default=None, ge=0, le=60),
+):
+    """Delivery routes for pending orders: per-vehicle stop sequence, distance, load."""
+    from analytics.routing import plan_pending_routes
+    return plan_pending_routes(vehicles=vehicles, capacity=capacity, time_budget=time_budget)
+
+
+# ---------- Jobs ----------
+
+@app.get("/jobs")
+def list_jobs(kind: str | None = None):
+    """Recent background jobs (imports, fleet runs), newest first."""
+    from core.jobs import list_jobs as jobs
+    return {"items": jobs(kind)}
+
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    """Status, progress and result of a background job."""
+    from core.jobs import get
+    job = get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"No job found: {job_id}")
+    return job.snapshot()
+
+
+# ---------- Fleet ----------
+
+@app.post("/fleet/run", status_code=202)
+async def fleet_run(body: FleetRunInput, wait: bool = False):
+    """
+    Run the store crew for each store in store_ids, up to concurrency at a time, as a
+    background job; progress and the per-store report are at GET /jobs/{job_id}.
+    wait=true answers after the last store.
+    """
+    from core import jobs
+    from core.fleet import run_fleet
+    if len(body.store_ids) > settings.fleet_max_stores:
+        raise HTTPException(status_code=422, detail=f"At most {settings.fleet_max_stores} stores per run")
+    job = jobs.create("fleet_run", stores=len(body.store_ids), concurrency=body.concurrency, trigger=body.trigger)
+    thread = jobs.start(job, run_fleet, body.store_ids, job, concurrency=body.concurrency, trigger=body.trigger)
+    if wait:
+        await asyncio.to_thread(thread.join)
+    return job.snapshot()
+
+
+# ---------- Staff ----------
+
+@app.post("/staff/schedule/optimize")
+def staff_schedule_optimize(body: StaffScheduleInput | None = None):
+    """Plan the week's shifts from staff availability: assignments, coverage and gaps."""
+    from analytics.staffing import SLOTS, optimize_schedule, publish_schedule
+    body = body or StaffScheduleInput()
+    if body.required is not None and (len(body.required) != 7 or any(len(d) != SLOTS for d in body.required)):
+        raise HTTPException(status_code=422, detail=f"required must be 7 rows of {SLOTS} slots")
+    plan = optimize_schedule(
+        required=body.required, units_per_day=body.units_per_day, time_budget=body.time_budget
+    )
+    if body.apply:
+        try:
+            plan["published"] = publish_schedule(plan, body.week_start)
+        except ValueError:
+            raise HTTPException(status_code=422, detail="week_start must be an ISO date")
+    return plan
+
+
+# ---------- Batch lookups ----------
+
+def _batch_lookup(body: BatchGetInput, fetch):
+    """Shared handler for POST /{entity}/batch: dedupe, chunked BatchGetItem, missing list."""
+    if len(body.keys) > settings.batch_get_max_keys:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {settings.batch_get_max_keys} keys per request",
+        )
+    items, missing = fetch(body.keys)
+    return {"items": items, "missing": missing}
+
+
+@app.post("/inventory/batch")
+def batch_inventory(body: BatchGetInput):
+    """Get many inventory items by SKU in one request."""
+    from aws.dynamodb import batch_get_inventory
+    return _batch_lookup(body, batch_get_inventory)
+
+
+@app.post("/equipment/batch")
+def batch_equipment(body: BatchGetInput):
+    """Get many equipment records by ID in one request."""
+    from aws.dynamodb import batch_get_equipment
+    return _batch_lookup(body, batch_get_equipment)
+
+
+@app.post("/customers/batch")
+def batch_customers(body: BatchGetInput):
+    """Get many customer profiles by ID in one request."""
+    from aws.dynamodb import batch_get_customers
+    return _batch_lookup(body, batch_get_customers)
+
+
 # ---------- Customer endpoints ----------
 
 @app.get("/customers/{customer_id}")
@@ -274,18 +758,49 @@ def get_customer(customer_id: str):
 
 # ---------- Workflow endpoints ----------
 
+def _workflow_key(trigger: str, key: str | None) -> str | None:
+    """The caller's idempotency key; scheduled triggers default to their time window."""
+    if key or trigger not in SCHEDULED_TRIGGERS:
+        return key
+    return f"{trigger}-{int(time.time()) // max(1, settings.workflow_schedule_window_seconds)}"
+
+
 @app.post("/workflow/start")
 def start_workflow(body: TriggerInput | None = None):
     """Start the Store Operations Step Functions workflow."""
-    from aws.step_functions import start_workflow as sf_start
-    inputs = (body or TriggerInput()).model_dump()
-    arn = sf_start(inputs)
-    if not arn:
+    from aws.step_functions import start_workflows
+    body = body or TriggerInput()
+    inputs = body.model_dump(exclude={"idempotency_key"})
+    result = start_workflows([inputs], keys=[_workflow_key(body.trigger, body.idempotency_key)])[0]
+    if result["error"] and result["error"].startswith("ExecutionAlreadyExists"):
+        raise HTTPException(status_code=409, detail=f"Workflow for this idempotency key already ran: {result['error']}")
+    if not result["execution_arn"]:
         raise HTTPException(
             status_code=503,
             detail="Could not start workflow. Is the state machine deployed?",
         )
-    return {"execution_arn": arn, "input": inputs}
+    return {"execution_arn": result["execution_arn"], "started": result["started"], "input": inputs}
+
+
+@app.post("/workflow/start-batch")
+def start_workflow_batch(body: BatchTriggerInput):
+    """Start the workflow for many stores at once; per-store ARN or error."""
+    from aws.step_functions import start_workflows
+    if len(body.runs) > settings.workflow_batch_max:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {settings.workflow_batch_max} runs per request",
+        )
+    results = start_workflows(
+        [r.model_dump(exclude={"idempotency_key"}) for r in body.runs],
+        keys=[_workflow_key(r.trigger, r.idempotency_key or body.idempotency_key) for r in body.runs],
+    )
+    return {
+        "started": sum(1 for r in results if r["started"]),
+        "existing": sum(1 for r in results if r["execution_arn"] and not r["started"]),
+        "failed": sum(1 for r in results if r["error"]),
+        "results": results,
+    }
 
 
 @app.get("/workflow/status")
@@ -295,6 +810,50 @@ def workflow_status(execution_arn: str):
     return get_workflow_status(execution_arn)
 
 
+@app.get("/workflow/{execution_arn}/events")
+async def workflow_events(execution_arn: str):
+    """
+    Server-Sent Events stream of status changes and new history events for one execution.
+    All clients share a single poll loop against Step Functions; the stream ends with
+    `event: done` once the execution reaches a terminal status. 404 for an execution
+    that doesn't exist.
+    """
+    from aws.step_functions import get_workflow_status
+    from aws.workflow_events import MISSING_STATUS, WATCHER
+    status = await asyncio.to_thread(get_workflow_status, execution_arn)
+    if status.get("status") == MISSING_STATUS:
+        raise HTTPException(status_code=404, detail=status.get("error") or "Execution not found")
+    queue = WATCHER.subscribe(execution_arn)
+
+    async def event_generator():
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=30.0)
+                except asyncio.TimeoutError:
+                    yield f"data: {json.dumps({'type': 'heartbeat', 'timestamp': datetime.now(timezone.utc).isoformat()})}\n\n"
+                    continue
+                if event is None:
+                    yield f"event: done\ndata: {json.dumps({'type': 'done', 'timestamp': datetime.now(timezone.utc).isoformat()})}\n\n"
+                    break
+                yield f"data: {json.dumps(event, default=str)}\n\n"
+        finally:
+            WATCHER.unsubscribe(execution_arn, queue)
+
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
+STARTUP_LATENCY.labels("api_import").observe(time.perf_counter() - _IMPORT_STARTED)
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,216 @@
+"""
+In-process materialized view behind GET /dashboard/summary.
+
+The write functions in aws/dynamodb.py push every inventory, order and equipment
+write into the view, so the summary is kept up to date incrementally. A full scan
+reconciles it on first use and then every `dashboard_reconcile_seconds`, in the
+background, to pick up writes made by other processes.
+"""
+from __future__ import annotations
+
+import heapq
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any
+
+from config import settings
+from core.singleflight import group
+
+STOCK_CLASSES = ("low", "normal", "high")
+
+
+def stock_class(quantity: float, threshold: float) -> str:
+    """Same thresholds the pricing tool uses: low <= threshold < normal <= 3x < high."""
+    if quantity <= threshold:
+        return "low"
+    if quantity > threshold * 3:
+        return "high"
+    return "normal"
+
+
+def _num(value: Any, default: float = 0) -> float:
+    try:
+        f = float(value)
+    except (TypeError, ValueError):
+        return default
+    return int(f) if f.is_integer() else f
+
+
+class _State:
+    """Per-key rows plus the aggregates derived from them."""
+
+    def __init__(self) -> None:
+        self.inventory: dict[str, tuple[float, float, str]] = {}
+        self.equipment: dict[str, float] = {}
+        self.orders: dict[str, tuple[str, float]] = {}
+        self.stock_counts = dict.fromkeys(STOCK_CLASSES, 0)
+        self.low_skus: set[str] = set()
+        self.unhealthy = 0
+        self.pending_count = 0
+        self.pending_quantity = 0.0
+
+    def set_inventory(self, sku: str, quantity: float, threshold: float, name: str) -> None:
+        old = self.inventory.get(sku)
+        if old is not None:
+            self.stock_counts[stock_class(old[0], old[1])] -= 1
+        cls = stock_class(quantity, threshold)
+        self.stock_counts[cls] += 1
+        self.inventory[sku] = (quantity, threshold, name)
+        if cls == "low":
+            self.low_skus.add(sku)
+        else:
+            self.low_skus.discard(sku)
+
+    def set_equipment(self, equipment_id: str, health: float, threshold: float) -> None:
+        old = self.equipment.get(equipment_id)
+        if old is not None and old < threshold:
+            self.unhealthy -= 1
+        if health < threshold:
+            self.unhealthy += 1
+        self.equipment[equipment_id] = health
+
+    def set_order(self, order_id: str, status: str, quantity: float) -> None:
+        old = self.orders.get(order_id)
+        if old is not None and old[0] == "pending":
+            self.pending_count -= 1
+            self.pending_quantity -= old[1]
+        if status == "pending":
+            self.pending_count += 1
+            self.pending_quantity += quantity
+        self.orders[order_id] = (status, quantity)
+
+
+class DashboardView:
+    """Incrementally maintained dashboard aggregates with periodic scan reconciliation."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._state = _State()
+        self._reconciled_at: float | None = None
+        self._reconcile_thread: threading.Thread | None = None
+        # Writes seen while a reconcile scan is running; replayed over the scan result
+        self._pending_writes: list[tuple[str, tuple]] | None = None
+
+    # ----- incremental updates (called by aws/dynamodb.py write functions) -----
+
+    def apply(self, kind: str, *args: Any) -> None:
+        with self._lock:
+            if self._pending_writes is not None:
+                self._pending_writes.append((kind, args))
+            self._apply(self._state, kind, args)
+
+    def _apply(self, state: _State, kind: str, args: tuple) -> None:
+        if kind == "inventory":
+            sku, quantity, threshold, name = args
+            state.set_inventory(sku, _num(quantity), _num(threshold), name)
+        elif kind == "equipment":
+            equipment_id, health = args
+            state.set_equipment(equipment_id, _num(health), settings.maintenance_health_threshold)
+        elif kind == "order":
+            order_id, status, quantity = args
+            state.set_order(order_id, status, _num(quantity))
+
+    def on_inventory(self, item: dict[str, Any]) -> None:
+        self.apply(
+            "inventory",
+            item["sku"],
+            item.get("quantity", 0),
+            item.get("reorder_threshold", 0),
+            item.get("name", item["sku"]),
+        )
+
+    def on_equipment(self, equipment_id: str, health_score: float) -> None:
+        self.apply("equipment", equipment_id, health_score)
+
+    def on_order(self, order_id: str, status: str, quantity: float) -> None:
+        self.apply("order", order_id, status, quantity)
+
+    # ----- reconciliation -----
+
+    def reconcile(self) -> None:
+        """Rebuild from full scans, then replay any writes that raced with the scan."""
+        from aws import dynamodb as db
+
+        with self._lock:
+            self._pending_writes = []
+        try:
+            fresh = _State()
+            for i in db.iter_inventory(settings.scan_page_size):
+                self._apply(fresh, "inventory", (
+                    i["sku"], i.get("quantity", 0), i.get("reorder_threshold", 0), i.get("name", i["sku"]),
+                ))
+            for e in db.iter_equipment(settings.scan_page_size):
+                if "health_score" in e:
+                    self._apply(fresh, "equipment", (e["equipment_id"], e["health_score"]))
+            for o in db.iter_orders(page_size=settings.scan_page_size):
+                self._apply(fresh, "order", (o["order_id"], o.get("order_status", ""), o.get("quantity", 0)))
+        except Exception:
+            with self._lock:
+                self._pending_writes = None
+            raise
+        with self._lock:
+            for kind, args in self._pending_writes:
+                self._apply(fresh, kind, args)
+            self._pending_writes = None
+            self._state = fresh
+            self._reconciled_at = time.time()
+
+    def _reconcile_in_background(self) -> None:
+        def run() -> None:
+            try:
+                self.reconcile()
+            except Exception as e:
+                print(f"Dashboard view reconcile failed: {e}")
+
+        with self._lock:
+            if self._reconcile_thread and self._reconcile_thread.is_alive():
+                return
+            self._reconcile_thread = threading.Thread(target=run, daemon=True)
+            self._reconcile_thread.start()
+
+    def ensure_fresh(self) -> None:
+        """Blocking reconcile on first use; stale views refresh in the background."""
+        if self._reconciled_at is None:
+            # Concurrent first readers share one scan
+            group("aws.dashboard_view.reconcile").do("initial", self.reconcile)
+        elif time.time() - self._reconciled_at > settings.dashboard_reconcile_seconds:
+            self._reconcile_in_background()
+
+    # ----- read -----
+
+    def summary(self, top_n: int | None = None) -> dict[str, Any]:
+        self.ensure_fresh()
+        top_n = settings.dashboard_top_n if top_n is None else top_n
+        with self._lock:
+            state = self._state
+            low = [(sku, *state.inventory[sku]) for sku in state.low_skus]
+            # Most urgent = lowest stock relative to its reorder threshold
+            urgent = heapq.nsmallest(
+                top_n,
+                low,
+                key=lambda r: (r[1] / r[2] if r[2] else r[1], r[1]),
+            )
+            return {
+                "stock_classes": dict(state.stock_counts),
+                "inventory_total": len(state.inventory),
+                "equipment": {
+                    "total": len(state.equipment),
+                    "below_threshold": state.unhealthy,
+                    "threshold": settings.maintenance_health_threshold,
+                },
+                "pending_orders": {
+                    "count": state.pending_count,
+                    "quantity": state.pending_quantity,
+                },
+                "urgent_items": [
+                    {"sku": sku, "name": name, "quantity": q, "reorder_threshold": t}
+                    for sku, q, t, name in urgent
+                ],
+                "reconciled_at": datetime.fromtimestamp(self._reconciled_at, timezone.utc).isoformat()
+                if self._reconciled_at
+                else None,
+            }
+
+
+VIEW = DashboardView()
@@ -1,28 +1,288 @@
 """DynamoDB tables and access for store operations."""
 from __future__ import annotations
 
+import base64
+import json
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
 from decimal import Decimal
-from typing import Any
+from typing import Any, Iterable, Iterator
 
 import boto3
 from botocore.exceptions import ClientError
 
+from aws import inventory_log
+from aws.dashboard_view import VIEW as dashboard_view
 from config import settings
+from core.metrics import observe_aws
+from core.singleflight import singleflight
+
+
+_local = threading.local()
+
+
+def _thread_cache() -> dict[str, Any]:
+    """
+    Per-thread boto3 session plus its client/resource. Sessions and resources are not
+    thread-safe, so each thread builds its own once and reuses it across calls.
+    """
+    key = (settings.aws_region, settings.aws_profile)
+    cache = getattr(_local, "cache", None)
+    if cache is None or cache["key"] != key:
+        kwargs = {"region_name": settings.aws_region}
+        if settings.aws_profile:
+            kwargs["profile_name"] = settings.aws_profile
+        cache = _local.cache = {"key": key, "session": boto3.session.Session(**kwargs)}
+    return cache
 
 
 def _client():
-    kwargs = {"region_name": settings.aws_region}
-    if settings.aws_profile:
-        kwargs["profile_name"] = settings.aws_profile
-    return boto3.client("dynamodb", **kwargs)
+    cache = _thread_cache()
+    if "client" not in cache:
+        cache["client"] = cache["session"].client("dynamodb")
+    return cache["client"]
 
 
 def _resource():
-    kwargs = {"region_name": settings.aws_region}
-    if settings.aws_profile:
-        kwargs["profile_name"] = settings.aws_profile
-    return boto3.resource("dynamodb", **kwargs)
+    if settings.storage_backend == "memory":
+        from aws.local_dynamodb import LOCAL
+        return LOCAL
+    cache = _thread_cache()
+    if "resource" not in cache:
+        cache["resource"] = cache["session"].resource("dynamodb")
+    return cache["resource"]
+
+
+# ---------- Per-store routing ----------
+
+# Store whose tables this context uses; None = the configured tables
+_store: ContextVar[str | None] = ContextVar("dynamodb_store", default=None)
+
+
+@contextmanager
+def store_scope(store_id: str | None) -> Iterator[None]:
+    """
+    Route the block's table access to store_id's tables (settings.store_table_template).
+    The configured store (settings.store_id), None, or the default "{table}" template
+    keep the configured tables. The inventory event log and the dashboard view track
+    the configured store only; other stores read and write their tables directly.
+    """
+    routed = store_id not in (None, settings.store_id) and settings.store_table_template != "{table}"
+    token = _store.set(store_id if routed else None)
+    try:
+        yield
+    finally:
+        _store.reset(token)
+
+
+def physical_table(name: str) -> str:
+    """Table to use for a configured table name in the current store scope."""
+    store = _store.get()
+    if store is None:
+        return name
+    return settings.store_table_template.format(store_id=store, table=name)
+
+
+def current_store() -> str | None:
+    """Store routed by store_scope, or None for the configured store."""
+    return _store.get()
+
+
+def _default_store() -> bool:
+    return _store.get() is None
+
+
+def _event_log() -> bool:
+    return settings.inventory_event_log and _store.get() is None
+
+
+# ---------- Paginated scans ----------
+
+
+def _json_default(value: Any) -> Any:
+    """JSON encoder for DynamoDB values (numbers come back as Decimal)."""
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def encode_cursor(last_key: dict[str, Any] | None) -> str | None:
+    """Encode a DynamoDB LastEvaluatedKey as an opaque URL-safe cursor."""
+    if not last_key:
+        return None
+    raw = json.dumps(last_key, default=_json_default, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str | None) -> dict[str, Any] | None:
+    """Decode a cursor from encode_cursor back into an ExclusiveStartKey."""
+    if not cursor:
+        return None
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        key = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, json.JSONDecodeError):
+        raise ValueError("Invalid cursor") from None
+    if not isinstance(key, dict):
+        raise ValueError("Invalid cursor")
+    return key
+
+
+_key_names: dict[str, frozenset[str]] = {}
+
+
+def _check_start_key(table: Any, key: dict[str, Any]) -> None:
+    """Reject a cursor that is not a key of this table (DynamoDB would 400 it as a 500)."""
+    names = _key_names.get(table.name)
+    if names is None:
+        # key_schema is one DescribeTable per table name
+        names = _key_names[table.name] = frozenset(k["AttributeName"] for k in table.key_schema)
+    if set(key) != names or not all(isinstance(v, (str, int)) and not isinstance(v, bool) for v in key.values()):
+        raise ValueError("Invalid cursor")
+
+
+def scan_page(
+    table_name: str,
+    limit: int,
+    cursor: str | None = None,
+    **scan_kw: Any,
+) -> tuple[list[dict[str, Any]], str | None]:
+    """
+    Return one page of a scan and the cursor for the next page (None when done).
+    With a FilterExpression a page may hold fewer than `limit` items.
+    """
+    table = _resource().Table(physical_table(table_name))
+    kw = dict(scan_kw, Limit=limit)
+    start_key = decode_cursor(cursor)
+    if start_key:
+        _check_start_key(table, start_key)
+        kw["ExclusiveStartKey"] = start_key
+    try:
+        with observe_aws("dynamodb", "Scan", table_name):
+            r = table.scan(**kw)
+    except ClientError as e:
+        # Right attribute names, wrong value types
+        if start_key and e.response["Error"]["Code"] == "ValidationException":
+            raise ValueError("Invalid cursor") from None
+        raise
+    return list(r.get("Items", [])), encode_cursor(r.get("LastEvaluatedKey"))
+
+
+def iter_scan(
+    table_name: str,
+    page_size: int | None = None,
+    **scan_kw: Any,
+) -> Iterator[dict[str, Any]]:
+    """Yield every item of a table, one scan page at a time."""
+    table = _resource().Table(physical_table(table_name))
+    kw = dict(scan_kw)
+    if page_size:
+        kw["Limit"] = page_size
+    while True:
+        with observe_aws("dynamodb", "Scan", table_name):
+            r = table.scan(**kw)
+        yield from r.get("Items", [])
+        last_key = r.get("LastEvaluatedKey")
+        if not last_key:
+            return
+        kw["ExclusiveStartKey"] = last_key
+
+
+# ---------- Batch get ----------
+
+
+_batch_pool: ThreadPoolExecutor | None = None
+_batch_pool_lock = threading.Lock()
+
+
+def _batch_executor() -> ThreadPoolExecutor:
+    """Shared pool for BatchGetItem chunks; its threads keep their boto3 resources warm."""
+    global _batch_pool
+    with _batch_pool_lock:
+        if _batch_pool is None:
+            _batch_pool = ThreadPoolExecutor(
+                max_workers=settings.batch_get_concurrency,
+                thread_name_prefix="ddb-batch-get",
+            )
+        return _batch_pool
+
+
+def _batch_get_chunk(table_name: str, key_name: str, keys: list[str], physical: str) -> list[dict[str, Any]]:
+    """BatchGetItem for up to 100 keys, retrying UnprocessedKeys with exponential backoff."""
+    resource = _resource()
+    request: dict[str, Any] = {physical: {"Keys": [{key_name: k} for k in keys]}}
+    items: list[dict[str, Any]] = []
+    for attempt in range(settings.batch_get_max_retries + 1):
+        if attempt:
+            time.sleep(min(0.05 * 2 ** (attempt - 1), 2.0))
+        with observe_aws("dynamodb", "BatchGetItem", table_name):
+            r = resource.batch_get_item(RequestItems=request)
+        items.extend(r.get("Responses", {}).get(physical, []))
+        request = r.get("UnprocessedKeys") or {}
+        if not request:
+            return items
+    raise RuntimeError(
+        f"BatchGetItem on {physical}: {len(request[physical]['Keys'])} keys still unprocessed"
+    )
+
+
+def batch_get(
+    table_name: str,
+    key_name: str,
+    keys: Iterable[str],
+) -> tuple[list[dict[str, Any]], list[str]]:
+    """
+    Fetch many items by hash key. Keys are deduplicated (first-seen order kept), split
+    into batch_get_chunk_size chunks and resolved concurrently on a shared pool.
+    Returns (items in request order, keys that do not exist).
+    """
+    unique = list(dict.fromkeys(k for k in keys if k))
+    if not unique:
+        return [], []
+    size = max(1, min(settings.batch_get_chunk_size, 100))
+    chunks = [unique[i:i + size] for i in range(0, len(unique), size)]
+    pool = _batch_executor()
+    # Resolved here: the pool threads don't see this context's store scope
+    physical = physical_table(table_name)
+    futures = [pool.submit(_batch_get_chunk, table_name, key_name, c, physical) for c in chunks]
+    found: dict[str, dict[str, Any]] = {}
+    for f in futures:
+        for item in f.result():
+            found[item[key_name]] = item
+    items = [found[k] for k in unique if k in found]
+    missing = [k for k in unique if k not in found]
+    return items, missing
+
+
+def batch_write(table_name: str, items: list[dict[str, Any]]) -> None:
+    """
+    Put many items with BatchWriteItem, 25 per request, retrying UnprocessedItems
+    with exponential backoff. Items must already be DynamoDB-safe (Decimal, not float).
+    """
+    resource = _resource()
+    physical = physical_table(table_name)
+    for start in range(0, len(items), 25):
+        request: dict[str, Any] = {
+            physical: [{"PutRequest": {"Item": item}} for item in items[start:start + 25]]
+        }
+        for attempt in range(settings.batch_get_max_retries + 1):
+            if attempt:
+                time.sleep(min(0.05 * 2 ** (attempt - 1), 2.0))
+            with observe_aws("dynamodb", "BatchWriteItem", table_name):
+                r = resource.batch_write_item(RequestItems=request)
+            request = r.get("UnprocessedItems") or {}
+            if not request:
+                break
+        else:
+            raise RuntimeError(
+                f"BatchWriteItem on {physical}: {len(request[physical])} items still unprocessed"
+            )
 
 
 # ---------- Inventory ----------
@@ -30,9 +290,10 @@ def _resource():
 
 def get_inventory(sku: str) -> dict[str, Any] | None:
     """Get one inventory item by SKU."""
-    table = _resource().Table(settings.inventory_table)
+    table = _resource().Table(physical_table(settings.inventory_table))
     try:
-        r = table.get_item(Key={"sku": sku})
+        with observe_aws("dynamodb", "GetItem", settings.inventory_table):
+            r = table.get_item(Key={"sku": sku})
         return r.get("Item")
     except ClientError:
         return None
@@ -47,7 +308,6 @@ def put_inventory(
     **kwargs: Any,
 ) -> None:
     """Put or update an inventory item."""
-    table = _resource().Table(settings.inventory_table)
     item = {
         "sku": sku,
         "name": name,
@@ -56,17 +316,121 @@ def put_inventory(
         "reorder_threshold": reorder_threshold,
         **kwargs,
     }
-    table.put_item(Item=item)
+    if _event_log():
+        inventory_log.get_ledger().append([inventory_log.upsert_event(item)])
+        return
+    table = _resource().Table(physical_table(settings.inventory_table))
+    with observe_aws("dynamodb", "PutItem", settings.inventory_table):
+        table.put_item(Item=item)
+    if _default_store():
+        dashboard_view.on_inventory(item)
 
 
 def list_inventory() -> list[dict[str, Any]]:
     """Scan inventory table (use sparingly; for small datasets)."""
-    table = _resource().Table(settings.inventory_table)
-    return list(table.scan().get("Items", []))
+    return _list_inventory(_store.get())
+
+
+# `store` only keys the coalescing: the leader runs in its caller's store scope
+@singleflight
+def _list_inventory(store: str | None) -> list[dict[str, Any]]:
+    return list(iter_inventory())
+
+
+def iter_inventory(page_size: int | None = None) -> Iterator[dict[str, Any]]:
+    """Stream all inventory items page by page."""
+    return iter_scan(settings.inventory_table, page_size)
+
+
+def batch_get_inventory(skus: Iterable[str]) -> tuple[list[dict[str, Any]], list[str]]:
+    """Get many inventory items by SKU; returns (items, missing SKUs)."""
+    return batch_get(settings.inventory_table, "sku", skus)
+
+
+def batch_put_inventory(items: list[dict[str, Any]]) -> None:
+    """Put many full inventory items at once (BatchWriteItem)."""
+    if _event_log():
+        inventory_log.get_ledger().append([inventory_log.upsert_event(i) for i in items])
+        return
+    write_inventory_rows(items)
+
+
+def write_inventory_rows(items: list[dict[str, Any]], deletes: Iterable[str] = ()) -> None:
+    """Write inventory rows as-is (no event log): batched puts, then deletes."""
+    if items:
+        batch_write(settings.inventory_table, items)
+        if _default_store():
+            for item in items:
+                dashboard_view.on_inventory(item)
+    table = _resource().Table(physical_table(settings.inventory_table))
+    for sku in deletes:
+        with observe_aws("dynamodb", "DeleteItem", settings.inventory_table):
+            table.delete_item(Key={"sku": sku})
+
+
+def apply_inventory_levels(levels: dict[str, Any], **attrs: Any) -> list[str]:
+    """
+    Set quantity (plus optional extra attributes) on many existing items: one batched
+    read, one batched write. Unknown SKUs are skipped and returned. Read-modify-write:
+    a concurrent put_inventory on the same SKU between the two calls is overwritten.
+    """
+    if _event_log():
+        return inventory_log.get_ledger().set_levels(levels, **attrs)
+    items, missing = batch_get_inventory(levels)
+    for item in items:
+        item["quantity"] = levels[item["sku"]]
+        item.update(attrs)
+    if items:
+        batch_put_inventory(items)
+    return missing
+
+
+def list_inventory_page(
+    limit: int, cursor: str | None = None
+) -> tuple[list[dict[str, Any]], str | None]:
+    """One page of inventory items plus the next cursor."""
+    return scan_page(settings.inventory_table, limit, cursor)
+
+
+def adjust_inventory(sku: str, delta: int | float, reason: str = "") -> dict[str, Any] | None:
+    """
+    Add delta to a SKU's quantity (negative for sales). Returns the updated item,
+    None for an unknown SKU.
+    """
+    if _event_log():
+        return inventory_log.get_ledger().adjust(sku, delta, reason)
+    table = _resource().Table(physical_table(settings.inventory_table))
+    try:
+        with observe_aws("dynamodb", "UpdateItem", settings.inventory_table):
+            r = table.update_item(
+                Key={"sku": sku},
+                UpdateExpression="ADD quantity :d",
+                ConditionExpression="attribute_exists(sku)",
+                ExpressionAttributeValues={":d": Decimal(str(delta))},
+                ReturnValues="ALL_NEW",
+            )
+    except ClientError as e:
+        if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+            return None
+        raise
+    item = r["Attributes"]
+    if _default_store():
+        dashboard_view.on_inventory(item)
+    return item
 
 
 def list_low_stock() -> list[dict[str, Any]]:
-    """Return items where quantity <= reorder_threshold. Requires GSI or scan."""
+    """
+    Return items where quantity <= reorder_threshold. From the event log's low-stock
+    view when it is on, otherwise a scan.
+    """
+    return _list_low_stock(_store.get())
+
+
+@singleflight
+def _list_low_stock(store: str | None) -> list[dict[str, Any]]:
+    if _event_log():
+        return inventory_log.get_ledger().low_stock_items()
     items = list_inventory()
     return [
         i
@@ -78,15 +442,36 @@ def list_low_stock() -> list[dict[str, Any]]:
 # ---------- Orders ----------
 
 
-def get_orders(status: str | None = None) -> list[dict[str, Any]]:
-    """List orders; optionally filter by status."""
-    table = _resource().Table(settings.orders_table)
+def _order_filter(status: str | None) -> dict[str, Any]:
     scan_kw: dict[str, Any] = {}
     if status:
         scan_kw["FilterExpression"] = "order_status = :s"
         scan_kw["ExpressionAttributeValues"] = {":s": status}
-    items = table.scan(**scan_kw).get("Items", [])
-    return items
+    return scan_kw
+
+
+def get_orders(status: str | None = None) -> list[dict[str, Any]]:
+    """List orders; optionally filter by status."""
+    return _get_orders(_store.get(), status)
+
+
+@singleflight
+def _get_orders(store: str | None, status: str | None) -> list[dict[str, Any]]:
+    return list(iter_orders(status=status))
+
+
+def iter_orders(
+    status: str | None = None, page_size: int | None = None
+) -> Iterator[dict[str, Any]]:
+    """Stream orders page by page; optionally filter by status."""
+    return iter_scan(settings.orders_table, page_size, **_order_filter(status))
+
+
+def get_orders_page(
+    limit: int, cursor: str | None = None, status: str | None = None
+) -> tuple[list[dict[str, Any]], str | None]:
+    """One page of orders plus the next cursor; optionally filter by status."""
+    return scan_page(settings.orders_table, limit, cursor, **_order_filter(status))
 
 
 def put_order(
@@ -97,22 +482,26 @@ def put_order(
     **kwargs: Any,
 ) -> None:
     """Create or update a purchase order."""
-    table = _resource().Table(settings.orders_table)
-    table.put_item(
-        Item={
-            "order_id": order_id,
-            "sku": sku,
-            "quantity": quantity,
-            "order_status": status,
-            **kwargs,
-        }
-    )
+    table = _resource().Table(physical_table(settings.orders_table))
+    with observe_aws("dynamodb", "PutItem", settings.orders_table):
+        table.put_item(
+            Item={
+                "order_id": order_id,
+                "sku": sku,
+                "quantity": quantity,
+                "order_status": status,
+                **kwargs,
+            }
+        )
+    if _default_store():
+        dashboard_view.on_order(order_id, status, quantity)
 
 
 def get_order(order_id: str) -> dict[str, Any] | None:
     """Get a single order by order_id."""
-    table = _resource().Table(settings.orders_table)
-    r = table.get_item(Key={"order_id": order_id})
+    table = _resource().Table(physical_table(settings.orders_table))
+    with observe_aws("dynamodb", "GetItem", settings.orders_table):
+        r = table.get_item(Key={"order_id": order_id})
     return r.get("Item")
 
 
@@ -121,15 +510,37 @@ def get_order(order_id: str) -> dict[str, Any] | None:
 
 def get_equipment(equipment_id: str) -> dict[str, Any] | None:
     """Get equipment record."""
-    table = _resource().Table(settings.equipment_table)
-    r = table.get_item(Key={"equipment_id": equipment_id})
+    table = _resource().Table(physical_table(settings.equipment_table))
+    with observe_aws("dynamodb", "GetItem", settings.equipment_table):
+        r = table.get_item(Key={"equipment_id": equipment_id})
     return r.get("Item")
 
 
 def list_equipment() -> list[dict[str, Any]]:
     """List all equipment."""
-    table = _resource().Table(settings.equipment_table)
-    return list(table.scan().get("Items", []))
+    return _list_equipment(_store.get())
+
+
+@singleflight
+def _list_equipment(store: str | None) -> list[dict[str, Any]]:
+    return list(iter_equipment())
+
+
+def iter_equipment(page_size: int | None = None) -> Iterator[dict[str, Any]]:
+    """Stream all equipment page by page."""
+    return iter_scan(settings.equipment_table, page_size)
+
+
+def batch_get_equipment(equipment_ids: Iterable[str]) -> tuple[list[dict[str, Any]], list[str]]:
+    """Get many equipment records by ID; returns (items, missing IDs)."""
+    return batch_get(settings.equipment_table, "equipment_id", equipment_ids)
+
+
+def list_equipment_page(
+    limit: int, cursor: str | None = None
+) -> tuple[list[dict[str, Any]], str | None]:
+    """One page of equipment plus the next cursor."""
+    return scan_page(settings.equipment_table, limit, cursor)
 
 
 def update_equipment_health(
@@ -139,7 +550,7 @@ def update_equipment_health(
     **kwargs: Any,
 ) -> None:
     """Update equipment health (from IoT or maintenance agent)."""
-    table = _resource().Table(settings.equipment_table)
+    table = _resource().Table(physical_table(settings.equipment_table))
     key = {"equipment_id": equipment_id}
     upd = "set health_score = :h"
     # DynamoDB requires Decimal for numeric types (not float)
@@ -154,11 +565,21 @@ def update_equipment_health(
         key_name = f":{k}"
         upd += f", {k} = {key_name}"
         vals[key_name] = v
-    table.update_item(
-        Key=key,
-        UpdateExpression=upd,
-        ExpressionAttributeValues=vals,
-    )
+    with observe_aws("dynamodb", "UpdateItem", settings.equipment_table):
+        table.update_item(
+            Key=key,
+            UpdateExpression=upd,
+            ExpressionAttributeValues=vals,
+        )
+    if _default_store():
+        dashboard_view.on_equipment(equipment_id, health_score)
+    try:
+        from aws import health_history
+
+        health_history.append(equipment_id, float(health_score))
+    except Exception as e:
+        # History is best-effort: the current health_score is already stored
+        print(f"Health history append failed for {equipment_id}: {e}")
 
 
 # ---------- Customers (for Customer Service agent) ----------
@@ -166,14 +587,20 @@ def update_equipment_health(
 
 def get_customer(customer_id: str) -> dict[str, Any] | None:
     """Get customer by ID."""
-    table = _resource().Table(settings.customers_table)
-    r = table.get_item(Key={"customer_id": customer_id})
+    table = _resource().Table(physical_table(settings.customers_table))
+    with observe_aws("dynamodb", "GetItem", settings.customers_table):
+        r = table.get_item(Key={"customer_id": customer_id})
     return r.get("Item")
 
 
+def batch_get_customers(customer_ids: Iterable[str]) -> tuple[list[dict[str, Any]], list[str]]:
+    """Get many customers by ID; returns (items, missing IDs)."""
+    return batch_get(settings.customers_table, "customer_id", customer_ids)
+
+
 def get_customers_table():
     """Return customers table resource for agent tools that need it."""
-    return _resource().Table(settings.customers_table)
+    return _resource().Table(physical_table(settings.customers_table))
 
 
 # ---------- Staff schedules ----------
@@ -181,14 +608,13 @@ def get_customers_table():
 
 def get_staff_schedules_table():
     """Return staff schedules table for scheduling agent logic."""
-    return _resource().Table(settings.staff_schedules_table)
+    return _resource().Table(physical_table(settings.staff_schedules_table))
 
 
 def list_staff_schedules(day: str | None = None) -> list[dict[str, Any]]:
-    """List staff schedule entries; optional filter by day."""
-    table = _resource().Table(settings.staff_schedules_table)
+    """List staff schedule entries (all scan pages); optional filter by day."""
     kw: dict[str, Any] = {}
     if day:
         kw["FilterExpression"] = "schedule_day = :d"
         kw["ExpressionAttributeValues"] = {":d": day}
-    return list(table.scan(**kw).get("Items", []))
+    return list(iter_scan(settings.staff_schedules_table, settings.scan_page_size, **kw))
@@ -0,0 +1,604 @@
+"""
+Equipment health history: compact per-device time series of health_score readings.
+
+A reading packs into one uint32: seconds since the start of its UTC day in the high
+17 bits, and health quantized to 15 bits (resolution ~3e-5) in the low bits. That is
+4 bytes per reading, and readings sort by time within a day. Readings are grouped
+into one block per (equipment_id, day):
+- "file" backend: one append-only file per device under health_history_dir, a
+  sequence of blocks [header: magic, day, count, capacity][capacity x uint32]. The
+  file is read through mmap and parsed with NumPy, so there is no per-reading Python
+  work. One writer process per directory. Other stores (aws.dynamodb.store_scope)
+  get a subdirectory, stores/<store_id>.
+- "dynamodb" backend: one item per (equipment_id, day) in equipment_history_table
+  holding the packed bytes, appended with an optimistic read-modify-write. Other
+  stores use their own copy of the table (settings.store_table_template).
+
+append() and query() return NumPy arrays. downsample() buckets long ranges into
+mean/min/max/count, and trend() fits the recent slope that the maintenance tools report.
+
+The file backend also keeps fleet-level bucket aggregates (FleetBuckets): per-device
+sum and count of readings per forecast_bucket_hours bucket, in ring buffers covering
+the forecast window, in mmap'd arrays under <dir>/fleet updated by append().
+fleet_matrix() reads the whole fleet's bucket means from them in a few NumPy gathers
+instead of one history read per device (the maintenance forecast's input).
+"""
+from __future__ import annotations
+
+import functools
+import json
+import math
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+import numpy as np
+
+from config import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: single process only
+    fcntl = None
+
+DAY = 86400
+_HEALTH_BITS = 15
+_Q = (1 << _HEALTH_BITS) - 1
+_HEADER = struct.Struct("<4sIII")  # magic, day (days since epoch), count, capacity
+_MAGIC = b"HH1\0"
+_BLOCK_CAPACITY = 1024
+
+
+def pack(ts: np.ndarray, health: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Epoch seconds + health -> (day per reading, packed uint32 per reading)."""
+    ts = np.asarray(ts, dtype=np.int64)
+    q = np.rint(np.clip(np.asarray(health, dtype=np.float64), 0.0, 1.0) * _Q).astype(np.uint32)
+    days = ts // DAY
+    packed = ((ts - days * DAY).astype(np.uint32) << _HEALTH_BITS) | q
+    return days, packed
+
+
+def unpack(days: Any, packed: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Packed readings (+ their day, scalar or per reading) -> (epoch seconds int64, health float32)."""
+    ts = (packed >> _HEALTH_BITS).astype(np.int64) + np.asarray(days, dtype=np.int64) * DAY
+    health = (packed & _Q).astype(np.float32) / _Q
+    return ts, health
+
+
+def _split_by_day(days: np.ndarray, packed: np.ndarray) -> list[tuple[int, np.ndarray]]:
+    if len(days) and days[0] == days[-1] and (days == days[0]).all():
+        return [(int(days[0]), packed)]
+    out = []
+    for day in np.unique(days):
+        out.append((int(day), packed[days == day]))
+    return out
+
+
+@functools.lru_cache(maxsize=1 << 18)
+def _safe_name(equipment_id: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", equipment_id)
+
+
+def forecast_buckets() -> tuple[int, int]:
+    """(bucket seconds, buckets per window) of the maintenance forecast settings."""
+    bucket = max(1, int(settings.forecast_bucket_hours * 3600))
+    return bucket, max(2, int(math.ceil(settings.forecast_window_days * DAY / bucket)))
+
+
+# ---------- Fleet bucket aggregates ----------
+
+
+class FleetBuckets:
+    """
+    Per-device ring buffers of bucket aggregates: row = device (rows are appended to
+    devices.txt), slot = bucket number % slots. A slot holds the bucket number it
+    currently aggregates (0 = empty), the sum of readings and their count. Arrays are
+    np.memmap files, so other processes see the writer's updates; they remap when
+    devices.txt grows.
+    """
+
+    def __init__(self, directory: str, bucket_seconds: int, slots: int) -> None:
+        # One directory per configuration, so a settings change never truncates
+        # arrays another process still has mapped
+        self.directory = os.path.join(directory, f"{bucket_seconds}x{slots}")
+        self.bucket_seconds = bucket_seconds
+        self.slots = slots
+        self.rows: dict[str, int] = {}
+        self.capacity = 0
+        self._ids_size = -1
+        self._arrays: dict[str, np.ndarray] = {}
+        self._lock_file: Any = None
+
+    _DTYPES = {"bucket": np.int32, "sum": np.float64, "count": np.uint32}
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.directory, f"{name}.bin")
+
+    def exists(self) -> bool:
+        """True once a build completed (meta.json is written last)."""
+        return os.path.exists(os.path.join(self.directory, "meta.json"))
+
+    def create(self) -> None:
+        """Start empty, discarding a build that never completed."""
+        os.makedirs(self.directory, exist_ok=True)
+        for name in (*self._DTYPES, "devices"):
+            path = self._file(name) if name != "devices" else os.path.join(self.directory, "devices.txt")
+            open(path, "wb").close()
+        self.rows, self.capacity, self._ids_size, self._arrays = {}, 0, -1, {}
+
+    def created(self) -> None:
+        tmp = os.path.join(self.directory, f"meta.{os.getpid()}.tmp")
+        with open(tmp, "w") as f:
+            json.dump({"bucket_seconds": self.bucket_seconds, "slots": self.slots}, f)
+        os.replace(tmp, os.path.join(self.directory, "meta.json"))
+
+    @contextmanager
+    def locked(self) -> Iterator[None]:
+        """Cross-process lock for building and updating the aggregates."""
+        if self._lock_file is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._lock_file = open(os.path.join(self.directory, "lock"), "w")
+        if fcntl:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def refresh(self) -> None:
+        """Pick up devices (and grown arrays) added since we last looked."""
+        ids_path = os.path.join(self.directory, "devices.txt")
+        try:
+            size = os.path.getsize(ids_path)
+        except OSError:
+            return
+        if size == self._ids_size:
+            return
+        with open(ids_path, encoding="utf-8") as f:
+            names = f.read().split("\n")[:-1]
+        self.rows = {name: row for row, name in enumerate(names)}
+        self._ids_size = size
+        capacity = os.path.getsize(self._file("count")) // (4 * self.slots)
+        if capacity != self.capacity or not self._arrays:
+            self._map(capacity)
+
+    def _map(self, capacity: int) -> None:
+        self.capacity = capacity
+        if not capacity:
+            self._arrays = {}
+            return
+        # Plain ndarray views of the maps (cheaper to index than np.memmap)
+        self._arrays = {
+            name: np.asarray(np.memmap(self._file(name), dtype=dtype, mode="r+", shape=(capacity, self.slots)))
+            for name, dtype in self._DTYPES.items()
+        }
+
+    def _row(self, name: str) -> int:
+        row = self.rows.get(name)
+        if row is not None:
+            return row
+        # Rows another process added first
+        self.refresh()
+        row = self.rows.get(name)
+        if row is not None:
+            return row
+        row = len(self.rows)
+        if row >= self.capacity:
+            capacity = max(1024, 2 * self.capacity)
+            for array_name, dtype in self._DTYPES.items():
+                # Zero-filled growth: bucket 0 marks an empty slot
+                with open(self._file(array_name), "r+b") as f:
+                    f.truncate(capacity * self.slots * np.dtype(dtype).itemsize)
+            self._map(capacity)
+        ids_path = os.path.join(self.directory, "devices.txt")
+        with open(ids_path, "a", encoding="utf-8") as f:
+            f.write(name + "\n")
+        self._ids_size = os.path.getsize(ids_path)
+        self.rows[name] = row
+        return row
+
+    def add(self, name: str, ts: np.ndarray, health: np.ndarray) -> None:
+        """Fold readings of one device into its buckets (locked() held)."""
+        buckets = np.asarray(ts, dtype=np.int64) // self.bucket_seconds
+        if len(buckets) == 1:
+            groups = [(int(buckets[0]), float(health[0]), 1)]
+        else:
+            uniq, inverse = np.unique(buckets, return_inverse=True)
+            sums = np.bincount(inverse, weights=np.asarray(health, dtype=np.float64))
+            groups = zip(uniq.tolist(), sums.tolist(), np.bincount(inverse).tolist())
+        row = self._row(name)
+        b, total, n = self._arrays["bucket"][row], self._arrays["sum"][row], self._arrays["count"][row]
+        for bucket, s, c in groups:
+            slot = bucket % self.slots
+            if b[slot] == bucket:
+                total[slot] += s
+                n[slot] += c
+            elif b[slot] < bucket:
+                # A newer bucket takes over the slot (the old one has left the window)
+                b[slot], total[slot], n[slot] = bucket, s, c
+
+    def means(self, names: list[str], first_bucket: int, points: int) -> tuple[np.ndarray, np.ndarray]:
+        """(mean health, has-data mask) per device x bucket first_bucket .. +points-1."""
+        self.refresh()
+        rows = np.array([self.rows.get(name, -1) for name in names], dtype=np.int64)
+        mean = np.zeros((len(names), points), dtype=np.float32)
+        mask = np.zeros(mean.shape, dtype=bool)
+        known = np.flatnonzero(rows >= 0)
+        if not len(known) or not self._arrays:
+            return mean, mask
+        wanted = first_bucket + np.arange(points, dtype=np.int64)
+        slots = wanted % self.slots
+        r = rows[known]
+        # Whole-row gathers (contiguous copies), then the window's slots
+        count = self._arrays["count"][r][:, slots]
+        hit = (self._arrays["bucket"][r][:, slots] == wanted) & (count > 0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            m = self._arrays["sum"][r][:, slots] / count
+        mean[known] = np.where(hit, m, 0)
+        mask[known] = hit
+        return mean, mask
+
+
+# ---------- File backend ----------
+
+
+class FileHealthStore:
+    def __init__(self, directory: str | None = None) -> None:
+        self.directory = directory or settings.health_history_dir
+        os.makedirs(self.directory, exist_ok=True)
+        self._lock = threading.Lock()
+        # path -> [file size, [[offset, day, count, capacity], ...]]
+        self._index: dict[str, list] = {}
+        self._fleet: FleetBuckets | None = None
+
+    def _path(self, equipment_id: str) -> str:
+        return os.path.join(self.directory, _safe_name(equipment_id) + ".hh")
+
+    def fleet(self) -> FleetBuckets:
+        """
+        Bucket aggregates for the current forecast settings, built from the device
+        files the first time (or after a settings change). Call with _lock held.
+        """
+        bucket, points = forecast_buckets()
+        # Slack so the oldest bucket of the window isn't overwritten mid-bucket
+        slots = points + 2
+        fleet = self._fleet
+        if fleet is not None and (fleet.bucket_seconds, fleet.slots) == (bucket, slots):
+            return fleet
+        fleet = FleetBuckets(os.path.join(self.directory, "fleet"), bucket, slots)
+        if not fleet.exists():
+            with fleet.locked():
+                if not fleet.exists():
+                    self._rebuild(fleet)
+        fleet.refresh()
+        self._fleet = fleet
+        return fleet
+
+    def _rebuild(self, fleet: FleetBuckets) -> None:
+        """Aggregate the window of every device file (fleet lock held)."""
+        fleet.create()
+        now = time.time()
+        first_day = int((now - fleet.slots * fleet.bucket_seconds) // DAY)
+        for entry in sorted(os.scandir(self.directory), key=lambda e: e.name):
+            if not entry.name.endswith(".hh"):
+                continue
+            name = entry.name[:-3]
+            blocks = [b for b in self._blocks(entry.path) if b[1] >= first_day and b[2]]
+            if not blocks:
+                continue
+            with open(entry.path, "rb") as f:
+                parts = []
+                for offset, day, count, _ in blocks:
+                    f.seek(offset + _HEADER.size)
+                    parts.append(unpack(day, np.frombuffer(f.read(count * 4), dtype="<u4")))
+            fleet.add(name, np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts]))
+        fleet.created()
+
+    def _blocks(self, path: str) -> list[list[int]]:
+        """
+        Block index for a file. Only the last block changes in place (appends fill its
+        preallocated slots and rewrite its header), so that header is re-read on every
+        call and only bytes past it are parsed when the file grew; readings another
+        process appended are always seen.
+        """
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return []
+        cached = self._index.get(path)
+        if cached is not None and cached[1] and cached[0] <= size:
+            blocks = cached[1][:-1]
+            offset = cached[1][-1][0]
+        else:
+            blocks, offset = [], 0
+        with open(path, "rb") as f:
+            while offset + _HEADER.size <= size:
+                f.seek(offset)
+                magic, day, count, capacity = _HEADER.unpack(f.read(_HEADER.size))
+                if magic != _MAGIC:
+                    raise ValueError(f"Corrupt health history file {path} at offset {offset}")
+                blocks.append([offset, day, count, capacity])
+                offset += _HEADER.size + capacity * 4
+        self._index[path] = [size, blocks]
+        return blocks
+
+    def append(self, equipment_id: str, ts: Any, health: Any) -> None:
+        path = self._path(equipment_id)
+        with self._lock:
+            # Built (from the files) before this append, so it isn't counted twice
+            fleet = self.fleet()
+            with fleet.locked():
+                self._append(path, fleet, equipment_id, ts, health)
+
+    def _append(self, path: str, fleet: FleetBuckets, equipment_id: str, ts: Any, health: Any) -> None:
+        days, packed = pack(ts, health)
+        blocks = self._blocks(path)
+        with open(path, "ab" if not blocks else "r+b") as f:
+            for day, day_packed in _split_by_day(days, packed):
+                self._append_day(f, path, blocks, day, day_packed)
+            f.flush()
+            self._index[path] = [os.fstat(f.fileno()).st_size, blocks]
+        # Same quantization as the stored readings
+        fleet.add(_safe_name(equipment_id), *unpack(days, packed))
+
+    def _append_day(self, f: Any, path: str, blocks: list[list[int]], day: int, packed: np.ndarray) -> None:
+        i = 0
+        last = blocks[-1] if blocks else None
+        if last is not None and last[1] == day and last[2] < last[3]:
+            n = min(len(packed), last[3] - last[2])
+            f.seek(last[0] + _HEADER.size + last[2] * 4)
+            f.write(packed[:n].astype("<u4").tobytes())
+            last[2] += n
+            f.seek(last[0])
+            f.write(_HEADER.pack(_MAGIC, day, last[2], last[3]))
+            i = n
+        if i < len(packed):
+            rest = packed[i:]
+            capacity = max(_BLOCK_CAPACITY, len(rest))
+            f.seek(0, os.SEEK_END)
+            offset = f.tell()
+            data = np.zeros(capacity, dtype="<u4")
+            data[: len(rest)] = rest
+            f.write(_HEADER.pack(_MAGIC, day, len(rest), capacity))
+            f.write(data.tobytes())
+            blocks.append([offset, day, len(rest), capacity])
+
+    def read_days(self, equipment_id: str, first_day: int, last_day: int) -> list[tuple[Any, np.ndarray]]:
+        """[(days per reading, packed readings)] for blocks in [first_day, last_day]."""
+        path = self._path(equipment_id)
+        with self._lock:
+            blocks = [b[:] for b in self._blocks(path) if first_day <= b[1] <= last_day and b[2]]
+        if not blocks:
+            return []
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            views = [
+                np.frombuffer(mm, dtype="<u4", count=count, offset=offset + _HEADER.size)
+                for offset, _, count, _ in blocks
+            ]
+            # One copy out of the map, so the result outlives it
+            packed = np.concatenate(views)
+            del views
+        days = np.repeat(np.array([b[1] for b in blocks], dtype=np.int64), [b[2] for b in blocks])
+        return [(days, packed)]
+
+
+# ---------- DynamoDB backend ----------
+
+
+class DynamoHealthStore:
+    """Items keyed (equipment_id, day) with attribute r = packed readings, n = count."""
+
+    def __init__(self, table_name: str | None = None) -> None:
+        self.table_name = table_name or settings.equipment_history_table
+
+    def _table(self):
+        from aws.dynamodb import _resource
+
+        return _resource().Table(self.table_name)
+
+    def append(self, equipment_id: str, ts: Any, health: Any) -> None:
+        from botocore.exceptions import ClientError
+        from core.metrics import observe_aws
+
+        table = self._table()
+        for day, packed in _split_by_day(*pack(ts, health)):
+            for _ in range(settings.batch_get_max_retries + 1):
+                with observe_aws("dynamodb", "GetItem", self.table_name):
+                    item = table.get_item(Key={"equipment_id": equipment_id, "day": day}).get("Item")
+                old = bytes(item["r"]) if item else b""
+                n = int(item["n"]) if item else 0
+                try:
+                    with observe_aws("dynamodb", "PutItem", self.table_name):
+                        table.put_item(
+                            Item={"equipment_id": equipment_id, "day": day, "r": old + packed.astype("<u4").tobytes(), "n": n + len(packed)},
+                            ConditionExpression="attribute_not_exists(n) OR n = :n",
+                            ExpressionAttributeValues={":n": n},
+                        )
+                    break
+                except ClientError as e:
+                    if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                        raise
+            else:
+                raise RuntimeError(f"Health history append for {equipment_id} kept conflicting")
+
+    def read_days(self, equipment_id: str, first_day: int, last_day: int) -> list[tuple[Any, np.ndarray]]:
+        from boto3.dynamodb.conditions import Key
+        from core.metrics import observe_aws
+
+        table = self._table()
+        kw: dict[str, Any] = {
+            "KeyConditionExpression": Key("equipment_id").eq(equipment_id) & Key("day").between(first_day, last_day)
+        }
+        out = []
+        while True:
+            with observe_aws("dynamodb", "Query", self.table_name):
+                r = table.query(**kw)
+            for item in r.get("Items", []):
+                out.append((int(item["day"]), np.frombuffer(bytes(item["r"]), dtype="<u4")))
+            if not r.get("LastEvaluatedKey"):
+                return out
+            kw["ExclusiveStartKey"] = r["LastEvaluatedKey"]
+
+
+# Store per table / directory, so fleet runs read each store's own readings
+_stores: dict[str, FileHealthStore | DynamoHealthStore] = {}
+_store_lock = threading.Lock()
+
+
+def get_store() -> FileHealthStore | DynamoHealthStore:
+    """The history store for the current store scope (aws.dynamodb.store_scope)."""
+    from aws.dynamodb import current_store, physical_table
+
+    if settings.health_history_backend == "dynamodb":
+        location = physical_table(settings.equipment_history_table)
+    else:
+        store_id = current_store()
+        location = settings.health_history_dir
+        if store_id is not None:
+            location = os.path.join(location, "stores", re.sub(r"[^A-Za-z0-9_.-]", "_", store_id))
+    store = _stores.get(location)
+    if store is None:
+        with _store_lock:
+            store = _stores.get(location)
+            if store is None:
+                if settings.health_history_backend == "dynamodb":
+                    store = DynamoHealthStore(location)
+                else:
+                    store = FileHealthStore(location)
+                _stores[location] = store
+    return store
+
+
+# ---------- API ----------
+
+
+def append(equipment_id: str, health: Any, ts: Any = None) -> None:
+    """Record one reading (scalars) or many (arrays). ts defaults to now."""
+    if ts is None:
+        ts = time.time()
+    ts = np.atleast_1d(np.asarray(ts, dtype=np.float64))
+    health = np.atleast_1d(np.asarray(health, dtype=np.float64))
+    get_store().append(equipment_id, ts, np.broadcast_to(health, ts.shape))
+
+
+def query(equipment_id: str, start: float, end: float | None = None) -> tuple[np.ndarray, np.ndarray]:
+    """Readings with start <= ts < end, time-ordered: (epoch seconds int64, health float32)."""
+    return _query(get_store(), equipment_id, start, end)
+
+
+def _query(store: FileHealthStore | DynamoHealthStore, equipment_id: str, start: float, end: float | None) -> tuple[np.ndarray, np.ndarray]:
+    end = time.time() + 1 if end is None else end
+    parts = store.read_days(equipment_id, int(start // DAY), int((end - 1) // DAY))
+    if not parts:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    if len(parts) == 1:
+        ts, health = unpack(*parts[0])
+    else:
+        ts, health = unpack(
+            np.repeat([day for day, _ in parts], [len(p) for _, p in parts]),
+            np.concatenate([p for _, p in parts]),
+        )
+    keep = (ts >= start) & (ts < end)
+    ts, health = ts[keep], health[keep]
+    if len(ts) > 1 and (np.diff(ts) < 0).any():
+        order = np.argsort(ts, kind="stable")
+        ts, health = ts[order], health[order]
+    return ts, health
+
+
+def fleet_matrix(equipment_ids: list[str], now: float | None = None) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Bucket means over the forecast window for many devices: (bucket starts, epoch
+    seconds [points], mean health [devices x points], has-data mask). The file backend
+    reads its fleet aggregates; otherwise histories are read concurrently.
+    """
+    now = time.time() if now is None else now
+    bucket, points = forecast_buckets()
+    first = int(now // bucket) - points + 1
+    starts = (first + np.arange(points, dtype=np.int64)) * bucket
+    store = get_store()
+    if isinstance(store, FileHealthStore):
+        with store._lock:
+            fleet = store.fleet()
+        mean, mask = fleet.means([_safe_name(e) for e in equipment_ids], first, points)
+        return starts, mean, mask
+
+    mean = np.zeros((len(equipment_ids), points), dtype=np.float32)
+    mask = np.zeros(mean.shape, dtype=bool)
+
+    def read(row: int) -> None:
+        ts, health = _query(store, equipment_ids[row], float(starts[0]), now + 1)
+        if not len(ts):
+            return
+        ds = downsample(ts, health, bucket)
+        cols = (ds["ts"] // bucket).astype(np.int64) - first
+        keep = (cols >= 0) & (cols < points)
+        mean[row, cols[keep]] = ds["mean"][keep]
+        mask[row, cols[keep]] = True
+
+    with ThreadPoolExecutor(max_workers=max(1, settings.batch_get_concurrency)) as pool:
+        list(pool.map(read, range(len(equipment_ids))))
+    return starts, mean, mask
+
+
+def downsample(ts: np.ndarray, health: np.ndarray, bucket_seconds: float) -> dict[str, np.ndarray]:
+    """Time-ordered readings -> per-bucket start, mean, min, max and count (empty buckets omitted)."""
+    if not len(ts):
+        empty = np.empty(0)
+        return {"ts": empty, "mean": empty, "min": empty, "max": empty, "count": empty}
+    bucket = (ts // bucket_seconds).astype(np.int64)
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    counts = np.diff(np.r_[starts, len(ts)])
+    sums = np.add.reduceat(health.astype(np.float64), starts)
+    return {
+        "ts": bucket[starts] * bucket_seconds,
+        "mean": sums / counts,
+        "min": np.minimum.reduceat(health, starts),
+        "max": np.maximum.reduceat(health, starts),
+        "count": counts,
+    }
+
+
+def history(equipment_id: str, start: float, end: float | None = None, max_points: int = 500) -> dict[str, list]:
+    """JSON-friendly range query; long ranges are downsampled to about max_points buckets."""
+    end = time.time() + 1 if end is None else end
+    ts, health = query(equipment_id, start, end)
+    if len(ts) <= max_points:
+        return {"ts": ts.tolist(), "health": np.round(health, 4).tolist(), "bucket_seconds": None}
+    bucket = max(1, int(np.ceil((end - start) / max_points)))
+    ds = downsample(ts, health, bucket)
+    return {
+        "ts": ds["ts"].tolist(),
+        "health": np.round(ds["mean"], 4).tolist(),
+        "min": np.round(ds["min"], 4).tolist(),
+        "max": np.round(ds["max"], 4).tolist(),
+        "bucket_seconds": bucket,
+    }
+
+
+def trend(equipment_id: str, window_days: float = 7.0, stable_per_day: float = 0.005) -> dict[str, Any] | None:
+    """
+    Least-squares slope of health over the last window_days, in health units per day.
+    Hourly means are fitted, so a burst of readings doesn't dominate. None without data.
+    """
+    now = time.time()
+    ts, health = query(equipment_id, now - window_days * DAY, now + 1)
+    if not len(ts):
+        return None
+    out: dict[str, Any] = {"readings": int(len(ts)), "latest": round(float(health[-1]), 4), "window_days": window_days}
+    ds = downsample(ts, health, 3600)
+    if len(ds["ts"]) < 2:
+        out.update(slope_per_day=0.0, trend="insufficient data")
+        return out
+    x = (ds["ts"] - ds["ts"][0]) / DAY
+    slope = float(np.polyfit(x, ds["mean"], 1)[0])
+    out["slope_per_day"] = round(slope, 5)
+    out["trend"] = "stable" if abs(slope) < stable_per_day else ("declining" if slope < 0 else "improving")
+    return out
@@ -0,0 +1,235 @@
+"""
+Streaming bulk import of inventory rows (CSV with a header line, or NDJSON).
+
+The input is consumed as an iterable of byte chunks (an HTTP request body or a
+file read in pieces). It is decoded incrementally, parsed row by row, validated,
+and converted to DynamoDB types. Each SKU is routed by hash to one of N writer
+threads. Every writer has a small bounded queue and writes its rows in chunks
+through batch_put_inventory, which uses BatchWriteItem with retry of unprocessed
+items, or the inventory event log when that is on.
+
+- Memory stays flat: at most N x (queue depth + 1) chunks are held, whatever the
+  file size.
+- A slow table slows the reader down instead of buffering the upload.
+- Routing by SKU keeps each SKU's rows in file order, so the last row wins.
+- Rows replace whole items, like put_inventory.
+- Required: sku and quantity (an integer >= 0).
+- Defaults: name = sku, unit = "units", reorder_threshold = 10.
+- Known numeric columns are converted (see _INT_FIELDS / _DECIMAL_FIELDS). Other
+  CSV columns stay strings; NDJSON values keep their JSON types (floats parsed as
+  Decimal).
+- Invalid rows are counted and the first few errors are kept on the job; they
+  don't stop the import.
+"""
+from __future__ import annotations
+
+import codecs
+import csv
+import json
+import queue
+import threading
+import time
+import zlib
+from decimal import Decimal, InvalidOperation
+from typing import Any, Iterable, Iterator
+
+from config import settings
+from core.jobs import Job
+
+_INT_FIELDS = ("quantity", "reorder_threshold", "lead_time_days")
+_DECIMAL_FIELDS = ("unit_price", "unit_cost", "supplier_lat", "supplier_lon")
+_MAX_ERRORS = 20
+
+
+def detect_format(content_type: str | None, filename: str | None = None) -> str:
+    """'csv' or 'ndjson' from a Content-Type header or file name (default csv)."""
+    text = f"{content_type or ''} {filename or ''}".lower()
+    if "ndjson" in text or "json" in text or text.rstrip().endswith(".jsonl"):
+        return "ndjson"
+    return "csv"
+
+
+def _lines(chunks: Iterable[bytes], counter: list[int]) -> Iterator[str]:
+    """Decode UTF-8 byte chunks into lines (newline kept, so csv sees quoted newlines)."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buf = ""
+    for chunk in chunks:
+        if not chunk:
+            continue
+        counter[0] += len(chunk)
+        buf += decoder.decode(chunk)
+        start = 0
+        while True:
+            end = buf.find("\n", start)
+            if end < 0:
+                break
+            yield buf[start:end + 1]
+            start = end + 1
+        buf = buf[start:]
+    buf += decoder.decode(b"", final=True)
+    if buf:
+        yield buf
+
+
+def _rows(lines: Iterator[str], fmt: str) -> Iterator[tuple[int, dict[str, Any] | None, str | None]]:
+    """(row number, raw row or None, parse error or None)."""
+    if fmt == "csv":
+        reader = csv.DictReader(lines)
+        for row in reader:
+            # DictReader puts overflow cells under None
+            if None in row:
+                yield reader.line_num, None, "more cells than header columns"
+                continue
+            yield reader.line_num, {k.strip(): v for k, v in row.items() if k and v not in (None, "")}, None
+        return
+    for n, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line, parse_float=Decimal)
+        except ValueError as e:
+            yield n, None, f"invalid JSON: {e}"
+            continue
+        if not isinstance(row, dict):
+            yield n, None, "expected a JSON object"
+            continue
+        yield n, row, None
+
+
+def convert_row(raw: dict[str, Any]) -> dict[str, Any]:
+    """Validate one raw row and convert it to an inventory item; raises ValueError."""
+    item = dict(raw)
+    sku = str(item.get("sku") or "").strip()
+    if not sku:
+        raise ValueError("missing sku")
+    item["sku"] = sku
+    if item.get("quantity") is None:
+        raise ValueError("missing quantity")
+    for field in _INT_FIELDS:
+        if item.get(field) is None:
+            continue
+        try:
+            value = Decimal(str(item[field]).strip())
+        except InvalidOperation:
+            raise ValueError(f"{field} is not a number: {item[field]!r}")
+        if not value.is_finite() or value != value.to_integral_value():
+            raise ValueError(f"{field} must be an integer: {item[field]!r}")
+        item[field] = int(value)
+    if item["quantity"] < 0:
+        raise ValueError("quantity must be >= 0")
+    for field in _DECIMAL_FIELDS:
+        if item.get(field) is None:
+            continue
+        try:
+            value = Decimal(str(item[field]).strip())
+        except InvalidOperation:
+            raise ValueError(f"{field} is not a number: {item[field]!r}")
+        if not value.is_finite():
+            raise ValueError(f"{field} must be finite")
+        item[field] = value
+    item.setdefault("name", sku)
+    item.setdefault("unit", "units")
+    item.setdefault("reorder_threshold", 10)
+    return item
+
+
+class InventoryImporter:
+    """One import run; progress goes to `job` (see core/jobs.py)."""
+
+    def __init__(
+        self,
+        fmt: str,
+        job: Job,
+        workers: int | None = None,
+        chunk_rows: int | None = None,
+    ) -> None:
+        if fmt not in ("csv", "ndjson"):
+            raise ValueError(f"Unsupported import format: {fmt!r}")
+        self.fmt = fmt
+        self.job = job
+        self.workers = workers or settings.import_workers
+        self.chunk_rows = chunk_rows or settings.import_chunk_rows
+        self._queues = [queue.Queue(maxsize=settings.import_queue_chunks) for _ in range(self.workers)]
+        self._failed: BaseException | None = None
+        self._errors: list[dict[str, Any]] = []
+        job.update(rows_read=0, rows_written=0, rows_rejected=0, bytes_read=0, errors=[])
+
+    def _writer(self, q: "queue.Queue[list[dict[str, Any]] | None]") -> None:
+        from aws import dynamodb as db
+
+        while True:
+            chunk = q.get()
+            if chunk is None:
+                return
+            if self._failed:
+                continue  # keep draining so the reader never blocks on a full queue
+            try:
+                # Within one BatchWriteItem a key may appear once; last row wins
+                items = list({i["sku"]: i for i in chunk}.values())
+                db.batch_put_inventory(items)
+                self.job.incr(rows_written=len(chunk))
+            except Exception as e:
+                self._failed = e
+
+    def _reject(self, line: int, error: str) -> None:
+        self.job.incr(rows_rejected=1)
+        if len(self._errors) < _MAX_ERRORS:
+            self._errors.append({"line": line, "error": error})
+            self.job.update(errors=list(self._errors))
+
+    def run(self, chunks: Iterable[bytes]) -> dict[str, Any]:
+        """Parse, validate and write everything in `chunks`; returns the final counts."""
+        threads = [threading.Thread(target=self._writer, args=(q,), daemon=True) for q in self._queues]
+        for t in threads:
+            t.start()
+        buffers: list[list[dict[str, Any]]] = [[] for _ in self._queues]
+        counter = [0]
+        read = 0
+        t0 = time.perf_counter()
+        chunks = iter(chunks)
+        try:
+            for line, raw, error in _rows(_lines(chunks, counter), self.fmt):
+                if self._failed:
+                    break
+                read += 1
+                if error is None:
+                    try:
+                        item = convert_row(raw)
+                    except ValueError as e:
+                        error = str(e)
+                if error is not None:
+                    self._reject(line, error)
+                    continue
+                p = zlib.crc32(item["sku"].encode()) % len(buffers)
+                buffers[p].append(item)
+                if len(buffers[p]) >= self.chunk_rows:
+                    self._queues[p].put(buffers[p])
+                    buffers[p] = []
+                if read % self.chunk_rows == 0:
+                    elapsed = time.perf_counter() - t0
+                    self.job.update(rows_read=read, bytes_read=counter[0], rows_per_second=round(read / elapsed))
+            for p, buf in enumerate(buffers):
+                if buf:
+                    self._queues[p].put(buf)
+        finally:
+            for q in self._queues:
+                q.put(None)
+            for t in threads:
+                t.join()
+            # Drain an abandoned upload so a producer blocked on it can finish
+            for _ in chunks:
+                pass
+        elapsed = time.perf_counter() - t0
+        self.job.update(
+            rows_read=read,
+            bytes_read=counter[0],
+            rows_per_second=round(read / elapsed) if elapsed else 0,
+        )
+        if self._failed:
+            raise RuntimeError(f"Inventory import stopped after a write failed: {self._failed}")
+        progress = self.job.snapshot()["progress"]
+        return {k: progress[k] for k in ("rows_read", "rows_written", "rows_rejected", "bytes_read")}
+
+
+def import_inventory(chunks: Iterable[bytes], fmt: str, job: Job, **kw: Any) -> dict[str, Any]:
+    return InventoryImporter(fmt, job, **kw).run(chunks)
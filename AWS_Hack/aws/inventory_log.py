@@ -0,0 +1,597 @@
+"""
+Event-sourced inventory: an append-only movement log plus materialized views.
+
+Every inventory change is an event with a log-assigned sequence number:
+  upsert  {"sku", "item": {...}}           full item (put_inventory, imports)
+  set     {"sku", "quantity", "attrs"}     level reading (telemetry)
+  adjust  {"sku", "delta", "reason"}       sale (-), receipt (+), correction
+  delete  {"sku"}
+Each event also carries "seq" and "ts".
+
+Logs:
+- FileEventLog: NDJSON segment files under inventory_log_dir, named by their first
+  sequence number. Appends take an flock, so processes on one host can share it.
+- DynamoEventLog: the store-inventory-events table (stream = store_id, seq). Sequence
+  ranges come from an atomic counter item.
+
+InventoryLedger applies events in sequence order to its materializers:
+- ItemsView: current items. Changed SKUs are written to the inventory table.
+- LowStockView: the set of SKUs at or below their reorder threshold.
+- DemandView: quantity drops from set/adjust events, fed to the demand history.
+
+Views are updated per event, so cost is O(changes). Recovery loads the last
+snapshot and replays only the log tail after it. Events appended by other
+processes are picked up by catch_up(); the writer already materialized them into
+the table, so this process only updates its in-memory views, and writes table rows
+only for SKUs its own appends touched.
+
+A gap (a sequence number reserved by another writer but not written yet) holds
+catch_up back for inventory_log_gap_grace_seconds, then is skipped. Skipped numbers
+are looked for again until inventory_log_gap_retry_seconds; an event that turns up
+late is applied if nothing newer supersedes it (an adjust after the SKU's last
+upsert/set, or any event newer than everything applied to the SKU), and SKUs this
+process wrote in the meantime are written again.
+
+Enable with inventory_event_log=true: put_inventory, apply_inventory_levels,
+batch_put_inventory and adjust_inventory in aws/dynamodb.py then go through here.
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from decimal import Decimal
+from typing import Any, Iterable, Iterator
+
+from config import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: single process only
+    fcntl = None
+
+
+def _json_default(value: Any) -> Any:
+    from aws.dynamodb import _json_default as encode
+
+    return encode(value)
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, default=_json_default, separators=(",", ":"))
+
+
+def dynamo_safe(value: Any) -> Any:
+    """floats -> Decimal, recursively (log and snapshot JSON decodes numbers as float)."""
+    if isinstance(value, float):
+        return Decimal(str(value))
+    if isinstance(value, dict):
+        return {k: dynamo_safe(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [dynamo_safe(v) for v in value]
+    return value
+
+
+# ---------- Events ----------
+
+
+def upsert_event(item: dict[str, Any]) -> dict[str, Any]:
+    return {"op": "upsert", "sku": item["sku"], "item": item}
+
+
+def set_event(sku: str, quantity: Any, **attrs: Any) -> dict[str, Any]:
+    return {"op": "set", "sku": sku, "quantity": quantity, "attrs": attrs}
+
+
+def adjust_event(sku: str, delta: Any, reason: str = "") -> dict[str, Any]:
+    return {"op": "adjust", "sku": sku, "delta": delta, "reason": reason}
+
+
+def delete_event(sku: str) -> dict[str, Any]:
+    return {"op": "delete", "sku": sku}
+
+
+# ---------- Logs ----------
+
+
+class FileEventLog:
+    """NDJSON segments <dir>/<first seq, 20 digits>.log, rolled every segment_events."""
+
+    def __init__(self, directory: str | None = None, segment_events: int | None = None) -> None:
+        self.dir = directory or settings.inventory_log_dir
+        self.segment_events = segment_events or settings.inventory_log_segment_events
+        os.makedirs(self.dir, exist_ok=True)
+        self._lock = threading.Lock()
+        # Known end of the log: last seq, its segment and the byte offset after it
+        self.last_seq = 0
+        self._segment: str | None = None
+        self._segment_count = 0
+        self._end = 0
+        self._cursor: tuple[int, str, int] | None = None
+        self._scan_to_end()
+
+    def _segments(self) -> list[str]:
+        return sorted(f for f in os.listdir(self.dir) if f.endswith(".log"))
+
+    def _scan_to_end(self) -> None:
+        """Catch up with segments/lines appended since we last looked (other processes)."""
+        segments = self._segments()
+        if not segments:
+            return
+        if self._segment not in segments:
+            self._segment, self._end, self._segment_count = segments[-1], 0, 0
+        start = segments.index(self._segment)
+        for name in segments[start:]:
+            if name != self._segment:
+                self._segment, self._end, self._segment_count = name, 0, 0
+            with open(os.path.join(self.dir, name), "rb") as f:
+                f.seek(self._end)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # partial write in progress
+                    self._end += len(line)
+                    self._segment_count += 1
+                    self.last_seq = json.loads(line)["seq"]
+
+    def append(self, events: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """Assign sequence numbers and append; returns the stamped events."""
+        with self._lock, open(os.path.join(self.dir, ".lock"), "w") as lock:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            self._scan_to_end()
+            now = time.time()
+            out = []
+            i = 0
+            while i < len(events):
+                if self._segment is None or self._segment_count >= self.segment_events:
+                    self._segment, self._end, self._segment_count = f"{self.last_seq + 1:020d}.log", 0, 0
+                take = events[i:i + self.segment_events - self._segment_count]
+                stamped = [{**e, "seq": self.last_seq + k + 1, "ts": e.get("ts", now)} for k, e in enumerate(take)]
+                data = "".join(_dumps(e) + "\n" for e in stamped).encode()
+                with open(os.path.join(self.dir, self._segment), "ab") as f:
+                    f.write(data)
+                    f.flush()
+                    os.fsync(f.fileno())
+                self._end += len(data)
+                self._segment_count += len(stamped)
+                self.last_seq = stamped[-1]["seq"]
+                out.extend(stamped)
+                i += len(take)
+            return out
+
+    def read(self, after_seq: int = 0) -> Iterator[dict[str, Any]]:
+        """Events with seq > after_seq, in order."""
+        if self._cursor and self._cursor[0] == after_seq:
+            _, name, offset = self._cursor
+            segments = [s for s in self._segments() if s >= name]
+        else:
+            segments = self._segments()
+            first = 0
+            for k, name in enumerate(segments):
+                if int(name[:-4]) <= after_seq + 1:
+                    first = k
+            segments, offset = segments[first:], 0
+        for name in segments:
+            with open(os.path.join(self.dir, name), "rb") as f:
+                f.seek(offset)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    offset += len(line)
+                    event = json.loads(line)
+                    if event["seq"] > after_seq:
+                        self._cursor = (event["seq"], name, offset)
+                        yield event
+            offset = 0
+
+
+class DynamoEventLog:
+    """Items (stream=store_id, seq) with the event JSON in `e`; seq ranges from a counter item."""
+
+    def __init__(self, table_name: str | None = None, stream: str | None = None) -> None:
+        self.table_name = table_name or settings.inventory_events_table
+        self.stream = stream or settings.store_id
+
+    def _table(self):
+        from aws.dynamodb import _resource
+
+        return _resource().Table(self.table_name)
+
+    def _reserve(self, n: int) -> int:
+        """Reserve n sequence numbers; returns the first."""
+        from core.metrics import observe_aws
+
+        with observe_aws("dynamodb", "UpdateItem", self.table_name):
+            r = self._table().update_item(
+                Key={"stream": f"{self.stream}#counter", "seq": 0},
+                UpdateExpression="ADD last_seq :n",
+                ExpressionAttributeValues={":n": n},
+                ReturnValues="UPDATED_NEW",
+            )
+        return int(r["Attributes"]["last_seq"]) - n + 1
+
+    def append(self, events: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        from aws.dynamodb import batch_write
+
+        first = self._reserve(len(events))
+        now = time.time()
+        stamped = [{**e, "seq": first + k, "ts": e.get("ts", now)} for k, e in enumerate(events)]
+        batch_write(self.table_name, [
+            {"stream": self.stream, "seq": e["seq"], "e": _dumps(e)} for e in stamped
+        ])
+        return stamped
+
+    def read(self, after_seq: int = 0) -> Iterator[dict[str, Any]]:
+        from boto3.dynamodb.conditions import Key
+        from core.metrics import observe_aws
+
+        table = self._table()
+        kw: dict[str, Any] = {
+            "KeyConditionExpression": Key("stream").eq(self.stream) & Key("seq").gt(after_seq),
+        }
+        while True:
+            with observe_aws("dynamodb", "Query", self.table_name):
+                r = table.query(**kw)
+            for item in r.get("Items", []):
+                yield json.loads(item["e"])
+            if not r.get("LastEvaluatedKey"):
+                return
+            kw["ExclusiveStartKey"] = r["LastEvaluatedKey"]
+
+
+# ---------- Materializers ----------
+
+
+def _is_low(item: dict[str, Any]) -> bool:
+    return float(item.get("quantity", 0)) <= float(item.get("reorder_threshold", 0))
+
+
+class ItemsView:
+    """Current item per SKU; remembers which SKUs changed since the last flush."""
+
+    def __init__(self) -> None:
+        self.items: dict[str, dict[str, Any]] = {}
+        self.changed: set[str] = set()
+
+    def apply(self, event: dict[str, Any]) -> tuple[dict[str, Any] | None, dict[str, Any] | None]:
+        """Apply one event; returns (item before, item after)."""
+        sku = event["sku"]
+        before = self.items.get(sku)
+        op = event["op"]
+        if op == "upsert":
+            after = dict(event["item"])
+        elif op == "delete":
+            after = None
+        elif before is None:
+            return None, None  # level/adjust for an unknown SKU
+        elif op == "set":
+            after = {**before, **event.get("attrs", {}), "quantity": event["quantity"]}
+        elif op == "adjust":
+            after = {**before, "quantity": _add(before.get("quantity", 0), event["delta"])}
+        else:
+            return before, before
+        if after is None:
+            self.items.pop(sku, None)
+        else:
+            after["seq"] = event["seq"]
+            self.items[sku] = after
+        self.changed.add(sku)
+        return before, after
+
+    def flush(self) -> tuple[list[dict[str, Any]], list[str]]:
+        """Changed items to write and SKUs to delete; clears the change set."""
+        puts = [self.items[s] for s in self.changed if s in self.items]
+        deletes = [s for s in self.changed if s not in self.items]
+        self.changed.clear()
+        return puts, deletes
+
+
+def _add(quantity: Any, delta: Any) -> Any:
+    total = float(quantity) + float(delta)
+    return int(total) if total.is_integer() else total
+
+
+class LowStockView:
+    """SKUs at or below their reorder threshold."""
+
+    def __init__(self) -> None:
+        self.skus: set[str] = set()
+
+    def apply(self, event: dict[str, Any], before: dict[str, Any] | None, after: dict[str, Any] | None) -> None:
+        if after is not None and _is_low(after):
+            self.skus.add(event["sku"])
+        else:
+            self.skus.discard(event["sku"])
+
+    def load(self, items: dict[str, dict[str, Any]]) -> None:
+        self.skus = {s for s, i in items.items() if _is_low(i)}
+
+
+class DemandView:
+    """Quantity drops from level readings and adjustments -> analytics.demand history."""
+
+    def __init__(self, history: Any = None) -> None:
+        self._history = history
+
+    @property
+    def history(self):
+        if self._history is None:
+            from analytics.demand import get_history
+
+            self._history = get_history()
+        return self._history
+
+    def apply(self, event: dict[str, Any], before: dict[str, Any] | None, after: dict[str, Any] | None) -> None:
+        if event["op"] not in ("set", "adjust") or before is None or after is None:
+            return
+        history = self.history
+        if event["seq"] <= history.seq:
+            return  # already recorded before a restart
+        drop = float(before.get("quantity", 0)) - float(after.get("quantity", 0))
+        if drop > 0:
+            history.record_demand(event["sku"], drop, event["ts"])
+        history.seq = event["seq"]
+
+    def checkpoint(self) -> None:
+        if self._history is not None:
+            self._history.save()
+
+
+# ---------- Ledger ----------
+
+
+class InventoryLedger:
+    def __init__(self, log: FileEventLog | DynamoEventLog, views: Iterable[Any] | None = None, snapshot_path: str | None = None) -> None:
+        self.log = log
+        self.items = ItemsView()
+        self.low_stock = LowStockView()
+        self.views = [self.low_stock, *(views or ())]
+        self.snapshot_path = snapshot_path
+        self.seq = 0
+        self._since_snapshot = 0
+        # Missing seq -> when first noticed (a reserved sequence not written yet)
+        self._gaps: dict[int, float] = {}
+        # Skipped seq -> when skipped; re-read until inventory_log_gap_retry_seconds
+        self._skipped: dict[int, float] = {}
+        # SKU -> seq of its last upsert/set/delete (late adjusts before it are stale)
+        self._base_seq: dict[str, int] = {}
+        # SKU -> last seq this process wrote to the table; SKUs to write again
+        self._written: dict[str, int] = {}
+        self._repair: set[str] = set()
+        self._lock = threading.RLock()
+        self.counts = {"appended": 0, "applied": 0, "replayed": 0, "snapshots": 0, "gaps_skipped": 0,
+                       "late_applied": 0, "late_superseded": 0, "gaps_lost": 0}
+
+    # ----- recovery -----
+
+    def recover(self) -> dict[str, Any]:
+        """Load the last snapshot, then replay the log tail after it."""
+        t0 = time.perf_counter()
+        with self._lock:
+            if self.snapshot_path and os.path.exists(self.snapshot_path):
+                with open(self.snapshot_path, encoding="utf-8") as f:
+                    snap = json.load(f)
+                self.items.items = snap["items"]
+                self.seq = snap["seq"]
+                self._skipped = dict.fromkeys(snap.get("skipped", []), time.monotonic())
+                self.low_stock.load(self.items.items)
+            replayed = self.catch_up(write=False)
+            self.counts["replayed"] += replayed
+        return {"seq": self.seq, "items": len(self.items.items), "replayed": replayed,
+                "elapsed_ms": round((time.perf_counter() - t0) * 1000, 1)}
+
+    def snapshot(self) -> None:
+        if not self.snapshot_path:
+            return
+        with self._lock:
+            data = _dumps({"seq": self.seq, "items": self.items.items, "skipped": sorted(self._skipped)})
+            self._since_snapshot = 0
+        os.makedirs(os.path.dirname(self.snapshot_path) or ".", exist_ok=True)
+        tmp = f"{self.snapshot_path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp, self.snapshot_path)
+        for view in self.views:
+            if hasattr(view, "checkpoint"):
+                view.checkpoint()
+        self.counts["snapshots"] += 1
+
+    # ----- applying -----
+
+    def _apply(self, event: dict[str, Any]) -> None:
+        before, after = self.items.apply(event)
+        for view in self.views:
+            view.apply(event, before, after)
+        if event["op"] != "adjust":
+            self._base_seq[event["sku"]] = event["seq"]
+        self.seq = event["seq"]
+        self._since_snapshot += 1
+        self.counts["applied"] += 1
+
+    def _apply_late(self) -> int:
+        """Apply skipped events that have since been written (see module docstring)."""
+        now = time.monotonic()
+        for seq, skipped_at in list(self._skipped.items()):
+            if now - skipped_at > settings.inventory_log_gap_retry_seconds:
+                del self._skipped[seq]
+                self.counts["gaps_lost"] += 1
+        if not self._skipped:
+            return 0
+        late = []
+        for event in self.log.read(min(self._skipped) - 1):
+            if event["seq"] in self._skipped:
+                late.append(event)
+            if event["seq"] >= self.seq:
+                break
+        for event in late:
+            del self._skipped[event["seq"]]
+            sku = event["sku"]
+            current = self.items.items.get(sku)
+            newest = int(current.get("seq", 0)) if current else self._base_seq.get(sku, 0)
+            if event["seq"] < (self._base_seq.get(sku, 0) if event["op"] == "adjust" else newest):
+                self.counts["late_superseded"] += 1
+                continue
+            before, after = self.items.apply(event)
+            if after is not None and before is not None:
+                after["seq"] = max(event["seq"], int(before.get("seq", 0)))
+            for view in self.views:
+                view.apply(event, before, after)
+            if event["op"] != "adjust":
+                self._base_seq[sku] = max(event["seq"], self._base_seq.get(sku, 0))
+            if self._written.get(sku, 0) > event["seq"]:
+                self._repair.add(sku)
+            self.counts["late_applied"] += 1
+        return len(late)
+
+    def catch_up(self, write: bool = False, wait_for_gaps: float = 0.0, own: set[str] | None = None) -> int:
+        """
+        Apply log events after self.seq in order. A gap (sequence reserved but not yet
+        written) stops the pass until it is older than inventory_log_gap_grace_seconds;
+        then it is skipped. write=True also writes the changed items among `own` (SKUs
+        of this process's appends; all when None) to the inventory table.
+        """
+        with self._lock:
+            applied = 0
+            deadline = time.monotonic() + wait_for_gaps
+            while True:
+                stalled = False
+                for event in self.log.read(self.seq):
+                    expected = self.seq + 1
+                    if event["seq"] != expected:
+                        seen = self._gaps.setdefault(expected, time.monotonic())
+                        if time.monotonic() - seen < settings.inventory_log_gap_grace_seconds:
+                            stalled = True
+                            break
+                        self._gaps.pop(expected, None)
+                        self.counts["gaps_skipped"] += event["seq"] - expected
+                        for seq in range(expected, event["seq"]):
+                            self._skipped[seq] = time.monotonic()
+                    self._apply(event)
+                    applied += 1
+                if not stalled or time.monotonic() >= deadline:
+                    break
+                time.sleep(0.05)
+            if self._skipped:
+                applied += self._apply_late()
+            self._flush(write, own)
+            if self._since_snapshot >= settings.inventory_snapshot_every:
+                self.snapshot()
+            return applied
+
+    def _flush(self, write: bool, own: set[str] | None = None) -> None:
+        puts, deletes = self.items.flush()
+        if not write:
+            puts, deletes = [], []
+        elif own is not None:
+            # Other writers' events are already in the table, written by them
+            puts = [i for i in puts if i["sku"] in own]
+            deletes = [s for s in deletes if s in own]
+        if self._repair:
+            written = {i["sku"] for i in puts} | set(deletes)
+            puts += [self.items.items[s] for s in self._repair if s in self.items.items and s not in written]
+            deletes += [s for s in self._repair if s not in self.items.items and s not in written]
+            self._repair.clear()
+        if puts or deletes:
+            from aws import dynamodb as db
+
+            db.write_inventory_rows([dynamo_safe(i) for i in puts], deletes)
+            for i in puts:
+                self._written[i["sku"]] = int(i.get("seq", 0))
+            for s in deletes:
+                self._written[s] = self.seq
+
+    def append(self, events: list[dict[str, Any]]) -> list[int]:
+        """Log events, then materialize everything up to them (in log order). Returns their seqs."""
+        if not events:
+            return []
+        with self._lock:
+            stamped = self.log.append(events)
+            self.counts["appended"] += len(stamped)
+            self.catch_up(write=True, wait_for_gaps=settings.inventory_log_gap_grace_seconds,
+                          own={e["sku"] for e in stamped})
+        return [e["seq"] for e in stamped]
+
+    # ----- reads -----
+
+    def get(self, sku: str) -> dict[str, Any] | None:
+        return self.items.items.get(sku)
+
+    def low_stock_items(self) -> list[dict[str, Any]]:
+        with self._lock:
+            self.catch_up()
+            return [self.items.items[s] for s in sorted(self.low_stock.skus)]
+
+    def set_levels(self, levels: dict[str, Any], **attrs: Any) -> list[str]:
+        """Level readings for known SKUs; returns the unknown ones (skipped)."""
+        with self._lock:
+            self.catch_up()
+            missing = [s for s in levels if s not in self.items.items]
+            events = [set_event(s, q, **attrs) for s, q in levels.items() if s in self.items.items]
+            self.append(events)
+        return missing
+
+    def adjust(self, sku: str, delta: Any, reason: str = "") -> dict[str, Any] | None:
+        """Add delta to a known SKU's quantity; returns a copy of the item, None if unknown."""
+        with self._lock:
+            self.catch_up()
+            if sku not in self.items.items:
+                return None
+            self.append([adjust_event(sku, delta, reason)])
+            return dict(self.items.items[sku])
+
+    def seed(self, items: Iterable[dict[str, Any]], batch: int = 1000) -> int:
+        """Log one upsert per item into an empty log; returns the number logged."""
+        with self._lock:
+            self.catch_up()
+            if self.seq:
+                raise RuntimeError(f"Inventory log already has events (seq {self.seq})")
+            events = [upsert_event(dict(i)) for i in items]
+            for start in range(0, len(events), batch):
+                self.append(events[start:start + batch])
+        return len(events)
+
+    def rebuild_table(self) -> dict[str, Any]:
+        """Rewrite the inventory table from the views (after recovery, or to repair drift)."""
+        from aws import dynamodb as db
+
+        with self._lock:
+            self.catch_up()
+            items = [dynamo_safe(i) for i in self.items.items.values()]
+            keep = set(self.items.items)
+        stale = [i["sku"] for i in db.iter_scan(settings.inventory_table) if i["sku"] not in keep]
+        db.write_inventory_rows(items, stale)
+        return {"written": len(items), "deleted": len(stale)}
+
+    def stats(self) -> dict[str, Any]:
+        return {**self.counts, "seq": self.seq, "items": len(self.items.items), "low_stock": len(self.low_stock.skus)}
+
+
+def bootstrap_from_table(ledger: InventoryLedger) -> int:
+    """Seed an empty log with one upsert per item currently in the inventory table."""
+    from aws import dynamodb as db
+
+    return ledger.seed(db.iter_scan(settings.inventory_table, settings.scan_page_size))
+
+
+_ledger: InventoryLedger | None = None
+_ledger_lock = threading.Lock()
+
+
+def get_ledger() -> InventoryLedger:
+    """Process-wide ledger, recovered from snapshot + tail on first use."""
+    global _ledger
+    with _ledger_lock:
+        if _ledger is None:
+            if settings.inventory_log_backend == "dynamodb":
+                log: FileEventLog | DynamoEventLog = DynamoEventLog()
+            else:
+                log = FileEventLog()
+            ledger = InventoryLedger(
+                log,
+                views=[DemandView()],
+                snapshot_path=os.path.join(settings.inventory_log_dir, "snapshot.json"),
+            )
+            ledger.recover()
+            _ledger = ledger
+        return _ledger
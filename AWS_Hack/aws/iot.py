@@ -1,19 +1,62 @@
-"""AWS IoT Core publish for equipment telemetry and inventory events."""
+"""
+AWS IoT Core publish for equipment telemetry and inventory events.
+
+publish_iot_event() sends one message synchronously. The convenience publishers
+(publish_inventory_event, publish_equipment_telemetry) enqueue onto a shared
+IoTPublisher instead: a bounded queue drained by sender threads over one persistent
+iot-data client, with retry/backoff and optional per-topic batching. When batching is
+on, a batch is published as a JSON array of the individual payloads.
+"""
 from __future__ import annotations
 
+import atexit
 import json
-from typing import Any
+import queue
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Callable
 
 import boto3
 
 from config import settings
+from core.metrics import BYTES, IOT_MESSAGES, IOT_PUBLISH_LATENCY, IOT_QUEUE_DEPTH, observe_aws
+
+_client_lock = threading.Lock()
+_client_cache: dict[tuple, Any] = {}
 
 
 def _client():
-    kwargs = {"region_name": settings.aws_region}
-    if settings.aws_profile:
-        kwargs["profile_name"] = settings.aws_profile
-    return boto3.client("iot-data", **kwargs)
+    """Shared iot-data client (boto3 clients are thread-safe); keeps its TLS connections warm."""
+    key = (settings.aws_region, settings.aws_profile)
+    with _client_lock:
+        client = _client_cache.get(key)
+        if client is None:
+            kwargs = {"region_name": settings.aws_region}
+            if settings.aws_profile:
+                kwargs["profile_name"] = settings.aws_profile
+            client = _client_cache[key] = boto3.session.Session(**kwargs).client("iot-data")
+        return client
+
+
+# IOT_BACKEND=memory: published messages land here instead of IoT Core
+LOCAL_MESSAGES: deque = deque(maxlen=10000)
+LOCAL_COUNTS = {"messages": 0, "bytes": 0}
+_local_lock = threading.Lock()
+
+
+def _send(topic: str, body: str) -> None:
+    """Default transport: one qos=1 Publish. Raises on failure."""
+    if settings.iot_backend == "memory":
+        with _local_lock:
+            LOCAL_MESSAGES.append((topic, body))
+            LOCAL_COUNTS["messages"] += 1
+            LOCAL_COUNTS["bytes"] += len(body)
+        return
+    with observe_aws("iot-data", "Publish"):
+        _client().publish(topic=topic, qos=1, payload=body)
+    BYTES.labels("iot-data", "Publish").inc(len(body))
 
 
 def publish_iot_event(
@@ -25,22 +68,216 @@ def publish_iot_event(
     Requires IoT thing with publish permission on that topic.
     """
     try:
-        _client().publish(
-            topic=topic,
-            qos=1,
-            payload=json.dumps(payload),
-        )
+        _send(topic, json.dumps(payload))
         return True
     except Exception:
         return False
 
 
+# ---------- Asynchronous publisher ----------
+
+_STOP = object()
+
+
+class IoTPublisher:
+    """
+    Non-blocking publisher: publish() enqueues and returns immediately; sender threads
+    publish with retry and exponential backoff. `send(topic, body)` is the transport
+    (defaults to IoT Core), so load tests can point it at a local stand-in.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[str, str], None] | None = None,
+        workers: int | None = None,
+        queue_size: int | None = None,
+        batch_size: int | None = None,
+        linger_ms: int | None = None,
+        max_retries: int | None = None,
+        latency: Any = None,
+    ) -> None:
+        self._send = send or _send
+        # Histogram child for enqueue -> ack latency (a load test passes its own)
+        self._latency = latency if latency is not None else IOT_PUBLISH_LATENCY.labels()
+        self.workers = workers or settings.iot_publish_workers
+        self.batch_size = max(1, batch_size or settings.iot_batch_size)
+        self.linger = (settings.iot_batch_linger_ms if linger_ms is None else linger_ms) / 1000
+        self.max_retries = settings.iot_publish_max_retries if max_retries is None else max_retries
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size or settings.iot_queue_size)
+        self._lock = threading.Lock()
+        self._closed = False
+        # Set when close() gives up on draining: sender threads stop after their batch
+        self._stopping = threading.Event()
+        self.counts = {"queued": 0, "sent": 0, "failed": 0, "dropped": 0}
+        self._threads = [
+            threading.Thread(target=self._run, name=f"iot-publisher-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for t in self._threads:
+            t.start()
+
+    def publish(self, topic: str, payload: dict[str, Any], enqueued_at: float | None = None) -> bool:
+        """
+        Enqueue one message. Returns False (and counts a drop) if the queue is full or
+        closed. enqueued_at (perf_counter) overrides the latency start, e.g. with the
+        intended send time of an open-loop load generator.
+        """
+        if self._closed:
+            return self._count("dropped")
+        try:
+            self._queue.put_nowait((topic, payload, enqueued_at or time.perf_counter()))
+        except queue.Full:
+            return self._count("dropped")
+        IOT_QUEUE_DEPTH.labels().inc()
+        self._count("queued")
+        return True
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Wait until everything enqueued so far was sent or given up on."""
+        if timeout is None:
+            self._queue.join()
+            return True
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.005)
+        return True
+
+    def close(self, timeout: float | None = None) -> None:
+        """
+        Stop accepting messages, drain the queue and stop the sender threads. Messages
+        still queued after `timeout` are dropped; close never blocks on a full queue.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        if not self.flush(timeout):
+            self._stopping.set()
+        for _ in self._threads:
+            try:
+                self._queue.put_nowait(_STOP)
+            except queue.Full:
+                break  # senders are busy and will see _stopping
+        for t in self._threads:
+            t.join(timeout)
+        dropped = 0
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                dropped += 1
+        if dropped:
+            IOT_QUEUE_DEPTH.labels().dec(dropped)
+            self._count("dropped", dropped)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            out: dict[str, Any] = dict(self.counts)
+        out["queue_depth"] = self._queue.qsize()
+        latency = self._latency
+        out["latency_p50_ms"] = round(latency.quantile(0.5) * 1000, 3)
+        out["latency_p99_ms"] = round(latency.quantile(0.99) * 1000, 3)
+        return out
+
+    def _count(self, status: str, n: int = 1) -> bool:
+        with self._lock:
+            self.counts[status] += n
+        IOT_MESSAGES.labels(status).inc(n)
+        return False
+
+    # ----- sender threads -----
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            first = self._queue.get()
+            if first is _STOP:
+                self._queue.task_done()
+                return
+            if self.batch_size == 1:
+                batches, stop = [[first]], False
+            else:
+                batches, stop = self._gather(first)
+            for batch in batches:
+                self._deliver(batch)
+                IOT_QUEUE_DEPTH.labels().dec(len(batch))
+                for _ in batch:
+                    self._queue.task_done()
+            if stop:
+                self._queue.task_done()
+                return
+
+    def _gather(self, first: tuple) -> tuple[list[list[tuple]], bool]:
+        """
+        Collect messages into per-topic batches until one topic reaches batch_size or
+        linger elapses. Returns (batches, whether a stop marker was taken).
+        """
+        by_topic: dict[str, list[tuple]] = {first[0]: [first]}
+        deadline = time.perf_counter() + self.linger
+        stop = False
+        while len(by_topic[first[0]]) < self.batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                stop = True
+                break
+            bucket = by_topic.setdefault(item[0], [])
+            bucket.append(item)
+            if len(bucket) >= self.batch_size:
+                break
+        return list(by_topic.values()), stop
+
+    def _deliver(self, batch: list[tuple]) -> None:
+        topic = batch[0][0]
+        payloads = [p for _, p, _ in batch]
+        body = json.dumps(payloads[0] if len(payloads) == 1 else payloads)
+        for attempt in range(self.max_retries + 1):
+            if attempt and self._stopping.is_set():
+                self._count("failed", len(batch))
+                return
+            if attempt:
+                time.sleep(random.uniform(0, min(0.05 * 2 ** attempt, 2.0)))
+            try:
+                self._send(topic, body)
+            except Exception as e:
+                if attempt == self.max_retries:
+                    print(f"IoT publish to {topic} failed after {attempt + 1} attempts: {e}")
+                    self._count("failed", len(batch))
+                continue
+            now = time.perf_counter()
+            latency = self._latency
+            for _, _, enqueued in batch:
+                latency.observe(now - enqueued)
+            self._count("sent", len(batch))
+            return
+
+
+_publisher: IoTPublisher | None = None
+_publisher_lock = threading.Lock()
+
+
+def get_publisher() -> IoTPublisher:
+    """Process-wide publisher, drained on interpreter exit."""
+    global _publisher
+    if _publisher is None:
+        with _publisher_lock:
+            if _publisher is None:
+                _publisher = IoTPublisher()
+                atexit.register(_publisher.close, 5.0)
+    return _publisher
+
+
 def publish_inventory_event(sku: str, quantity: int, event: str = "level_update") -> bool:
-    """Convenience: publish inventory level to store/{store_id}/inventory."""
+    """Convenience: enqueue inventory level for store/{store_id}/inventory. False if dropped."""
     topic = f"store/{settings.store_id}/inventory"
-    return publish_iot_event(
+    return get_publisher().publish(
         topic,
-        {"sku": sku, "quantity": quantity, "event": event},
+        {"sku": sku, "quantity": quantity, "event": event, "ts": time.time()},
     )
 
 
@@ -49,9 +286,9 @@ def publish_equipment_telemetry(
     health_score: float,
     metrics: dict[str, Any] | None = None,
 ) -> bool:
-    """Convenience: publish equipment telemetry to store/{store_id}/equipment."""
+    """Convenience: enqueue equipment telemetry for store/{store_id}/equipment. False if dropped."""
     topic = f"store/{settings.store_id}/equipment"
-    payload = {"equipment_id": equipment_id, "health_score": health_score}
+    payload = {"equipment_id": equipment_id, "health_score": health_score, "ts": time.time()}
     if metrics:
         payload["metrics"] = metrics
-    return publish_iot_event(topic, payload)
+    return get_publisher().publish(topic, payload)
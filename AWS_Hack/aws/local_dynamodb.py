@@ -0,0 +1,253 @@
+"""
+In-memory stand-in for the DynamoDB resource API, used when STORAGE_BACKEND=memory.
+
+Covers the subset aws/dynamodb.py and the scripts use: Table.get_item / put_item /
+update_item (optionally conditioned on attribute_exists(key)) / delete_item / scan
+(Limit, ExclusiveStartKey, simple FilterExpression strings) / batch_writer, and
+resource-level batch_get_item / batch_write_item.
+Tables are created on first use; hash key names come from the configured table names.
+Each table is guarded by its own lock, so one instance is shared by all threads.
+"""
+from __future__ import annotations
+
+import re
+import threading
+from typing import Any
+
+from config import settings
+
+
+def _key_names() -> dict[str, str]:
+    return {
+        settings.inventory_table: "sku",
+        settings.orders_table: "order_id",
+        settings.equipment_table: "equipment_id",
+        settings.customers_table: "customer_id",
+        settings.staff_schedules_table: "schedule_id",
+        settings.demand_forecast_table: "sku",
+    }
+
+
+def _key_name(name: str) -> str:
+    """Hash key for a table; per-store tables (settings.store_table_template) match their base name."""
+    names = _key_names()
+    if name in names:
+        return names[name]
+    for base in sorted(names, key=len, reverse=True):
+        if base in name:
+            return names[base]
+    return "id"
+
+
+# `attr op :value` terms joined by AND, which is all the repo's scans use
+_TERM = re.compile(r"^\s*([A-Za-z_#][\w.]*)\s*(=|<>|<=|>=|<|>)\s*(:\w+)\s*$")
+_OPS = {
+    "=": lambda a, b: a == b,
+    "<>": lambda a, b: a != b,
+    "<": lambda a, b: a is not None and a < b,
+    "<=": lambda a, b: a is not None and a <= b,
+    ">": lambda a, b: a is not None and a > b,
+    ">=": lambda a, b: a is not None and a >= b,
+}
+
+
+def _compile_filter(expr: str, values: dict[str, Any], names: dict[str, str]):
+    terms = []
+    for part in re.split(r"\s+AND\s+", expr, flags=re.IGNORECASE):
+        m = _TERM.match(part)
+        if not m:
+            raise NotImplementedError(f"Local DynamoDB cannot evaluate FilterExpression: {expr!r}")
+        attr, op, placeholder = m.groups()
+        terms.append((names.get(attr, attr), _OPS[op], values[placeholder]))
+    return lambda item: all(op(item.get(attr), v) for attr, op, v in terms)
+
+
+def _condition_failed(operation: str):
+    from botocore.exceptions import ClientError
+
+    return ClientError(
+        {"Error": {"Code": "ConditionalCheckFailedException", "Message": "The conditional request failed"}},
+        operation,
+    )
+
+
+class LocalTable:
+    def __init__(self, name: str, key_name: str) -> None:
+        self.name = name
+        self.key_name = key_name
+        self._rows: dict[Any, dict[str, Any]] = {}
+        # Insertion order for scans; deleted slots become None so cursors stay valid
+        self._order: list[Any] = []
+        self._pos: dict[Any, int] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, key: dict[str, Any]) -> Any:
+        return key[self.key_name]
+
+    def _store(self, item: dict[str, Any]) -> None:
+        k = item[self.key_name]
+        if k not in self._rows:
+            self._pos[k] = len(self._order)
+            self._order.append(k)
+        self._rows[k] = item
+
+    def get_item(self, Key: dict[str, Any], **kw: Any) -> dict[str, Any]:
+        with self._lock:
+            item = self._rows.get(self._key(Key))
+        return {"Item": dict(item)} if item is not None else {}
+
+    def put_item(self, Item: dict[str, Any], **kw: Any) -> dict[str, Any]:
+        with self._lock:
+            self._store(dict(Item))
+        return {}
+
+    def delete_item(self, Key: dict[str, Any], **kw: Any) -> dict[str, Any]:
+        k = self._key(Key)
+        with self._lock:
+            # _pos keeps the slot so a cursor pointing at a deleted key still resumes in place
+            if self._rows.pop(k, None) is not None:
+                self._order[self._pos[k]] = None
+        return {}
+
+    def update_item(
+        self,
+        Key: dict[str, Any],
+        UpdateExpression: str,
+        ExpressionAttributeValues: dict[str, Any] | None = None,
+        ExpressionAttributeNames: dict[str, str] | None = None,
+        ConditionExpression: str | None = None,
+        **kw: Any,
+    ) -> dict[str, Any]:
+        """Supports `set a = :a, b = :b` and `add n :v` clauses, and attribute_exists(key)."""
+        values = ExpressionAttributeValues or {}
+        names = ExpressionAttributeNames or {}
+        k = self._key(Key)
+        with self._lock:
+            if ConditionExpression:
+                if ConditionExpression.replace(" ", "") != f"attribute_exists({self.key_name})":
+                    raise NotImplementedError(f"Local DynamoDB cannot evaluate ConditionExpression: {ConditionExpression!r}")
+                if k not in self._rows:
+                    raise _condition_failed("UpdateItem")
+            item = dict(self._rows.get(k) or Key)
+            for action, body in re.findall(r"(?i)\b(set|add)\s+(.*?)(?=\s+\b(?:set|add)\b\s|$)", UpdateExpression):
+                for clause in body.split(","):
+                    if action.lower() == "set":
+                        attr, _, placeholder = clause.partition("=")
+                        item[names.get(attr.strip(), attr.strip())] = values[placeholder.strip()]
+                    else:
+                        attr, placeholder = clause.split()
+                        attr = names.get(attr, attr)
+                        item[attr] = item.get(attr, 0) + values[placeholder]
+            self._store(item)
+        return {"Attributes": dict(item)}
+
+    def scan(
+        self,
+        Limit: int | None = None,
+        ExclusiveStartKey: dict[str, Any] | None = None,
+        FilterExpression: str | None = None,
+        ExpressionAttributeValues: dict[str, Any] | None = None,
+        ExpressionAttributeNames: dict[str, str] | None = None,
+        **kw: Any,
+    ) -> dict[str, Any]:
+        """Like DynamoDB, Limit caps items evaluated (before the filter), not items returned."""
+        match = (
+            _compile_filter(FilterExpression, ExpressionAttributeValues or {}, ExpressionAttributeNames or {})
+            if FilterExpression
+            else None
+        )
+        with self._lock:
+            start = 0
+            if ExclusiveStartKey:
+                start = self._pos.get(self._key(ExclusiveStartKey), -1) + 1
+            items: list[dict[str, Any]] = []
+            evaluated = 0
+            last = None
+            i = start
+            while i < len(self._order) and (Limit is None or evaluated < Limit):
+                k = self._order[i]
+                i += 1
+                if k is None:
+                    continue
+                evaluated += 1
+                last = k
+                row = self._rows[k]
+                if match is None or match(row):
+                    items.append(dict(row))
+            # As in DynamoDB, a page cut short by Limit carries a key even if nothing follows
+            more = i < len(self._order)
+        r: dict[str, Any] = {"Items": items, "Count": len(items), "ScannedCount": evaluated}
+        if more and last is not None:
+            r["LastEvaluatedKey"] = {self.key_name: last}
+        return r
+
+    @property
+    def key_schema(self) -> list[dict[str, str]]:
+        return [{"AttributeName": self.key_name, "KeyType": "HASH"}]
+
+    def batch_writer(self, **kw: Any) -> "_BatchWriter":
+        return _BatchWriter(self)
+
+    @property
+    def item_count(self) -> int:
+        return len(self._rows)
+
+
+class _BatchWriter:
+    def __init__(self, table: LocalTable) -> None:
+        self._table = table
+
+    def __enter__(self) -> "_BatchWriter":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        pass
+
+    def put_item(self, Item: dict[str, Any]) -> None:
+        self._table.put_item(Item=Item)
+
+    def delete_item(self, Key: dict[str, Any]) -> None:
+        self._table.delete_item(Key=Key)
+
+
+class LocalDynamoDB:
+    """Resource-shaped entry point: Table(name), batch_get_item, batch_write_item."""
+
+    def __init__(self) -> None:
+        self._tables: dict[str, LocalTable] = {}
+        self._lock = threading.Lock()
+
+    def Table(self, name: str) -> LocalTable:
+        table = self._tables.get(name)
+        if table is None:
+            with self._lock:
+                table = self._tables.get(name)
+                if table is None:
+                    table = self._tables[name] = LocalTable(name, _key_name(name))
+        return table
+
+    def batch_get_item(self, RequestItems: dict[str, Any], **kw: Any) -> dict[str, Any]:
+        responses = {}
+        for name, req in RequestItems.items():
+            table = self.Table(name)
+            responses[name] = [
+                r["Item"] for r in (table.get_item(Key=k) for k in req["Keys"]) if "Item" in r
+            ]
+        return {"Responses": responses, "UnprocessedKeys": {}}
+
+    def batch_write_item(self, RequestItems: dict[str, Any], **kw: Any) -> dict[str, Any]:
+        for name, requests in RequestItems.items():
+            table = self.Table(name)
+            for req in requests:
+                if "PutRequest" in req:
+                    table.put_item(Item=req["PutRequest"]["Item"])
+                elif "DeleteRequest" in req:
+                    table.delete_item(Key=req["DeleteRequest"]["Key"])
+        return {"UnprocessedItems": {}}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._tables.clear()
+
+
+LOCAL = LocalDynamoDB()
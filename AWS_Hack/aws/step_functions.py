@@ -1,60 +1,257 @@
 """Step Functions client to start and query workflows."""
 from __future__ import annotations
 
+import hashlib
 import json
+import random
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 from typing import Any
 
 import boto3
+from botocore.exceptions import ClientError
 
 from config import settings
+from core.metrics import observe_aws
+
+
+_client_lock = threading.Lock()
+_client_cache: dict[tuple, Any] = {}
 
 
 def _client():
-    kwargs = {"region_name": settings.aws_region}
-    if settings.aws_profile:
-        kwargs["profile_name"] = settings.aws_profile
-    return boto3.client("stepfunctions", **kwargs)
+    """Shared Step Functions client (boto3 clients are thread-safe)."""
+    key = (settings.aws_region, settings.aws_profile)
+    with _client_lock:
+        client = _client_cache.get(key)
+        if client is None:
+            kwargs = {"region_name": settings.aws_region}
+            if settings.aws_profile:
+                kwargs["profile_name"] = settings.aws_profile
+            client = _client_cache[key] = boto3.session.Session(**kwargs).client("stepfunctions")
+        return client
 
 
-def _get_state_machine_arn() -> str | None:
-    """Resolve state machine ARN by name."""
-    client = _client()
-    paginator = client.get_paginator("list_state_machines")
-    for page in paginator.paginate():
-        for sm in page.get("stateMachines", []):
-            if sm.get("name") == settings.state_machine_name:
-                return sm.get("stateMachineArn")
+# Resolved state machine ARNs by name; dropped when StartExecution says the ARN is stale
+_arn_cache: dict[str, str] = {}
+_arn_lock = threading.Lock()
+_STALE_ARN_ERRORS = {"StateMachineDoesNotExist", "StateMachineDeleting", "InvalidArn"}
+
+
+def _get_state_machine_arn(refresh: bool = False) -> str | None:
+    """Resolve state machine ARN by name (cached; list_state_machines pages the whole account)."""
+    name = settings.state_machine_name
+    arn = None if refresh else _arn_cache.get(name)
+    if arn:
+        return arn
+    with _arn_lock:
+        arn = None if refresh else _arn_cache.get(name)
+        if arn:
+            return arn
+        client = _client()
+        paginator = client.get_paginator("list_state_machines")
+        with observe_aws("stepfunctions", "ListStateMachines"):
+            for page in paginator.paginate():
+                for sm in page.get("stateMachines", []):
+                    if sm.get("name") == name:
+                        _arn_cache[name] = sm["stateMachineArn"]
+                        return _arn_cache[name]
     return None
 
 
+def invalidate_state_machine_arn() -> None:
+    """Forget the cached ARN so the next start resolves it again."""
+    with _arn_lock:
+        _arn_cache.pop(settings.state_machine_name, None)
+
+
+# ---------- Starting executions ----------
+
+_NAME_UNSAFE = re.compile(r"[^A-Za-z0-9_-]+")
+_THROTTLE_ERRORS = {"ThrottlingException", "TooManyRequestsException", "RequestLimitExceeded"}
+
+
+def execution_name(
+    input_payload: dict[str, Any],
+    name_prefix: str = "StoreOps",
+    idempotency_key: str | None = None,
+) -> str:
+    """
+    Content-addressed execution name: prefix, trigger and a SHA-256 digest of the
+    canonical input plus idempotency_key. The same input and key map to the same name,
+    so a retried start can't launch a second run; start_workflow(s) use a fresh key
+    when none is given, so every other start is a new execution.
+    """
+    canonical = json.dumps(input_payload, sort_keys=True, separators=(",", ":"), default=str)
+    if idempotency_key:
+        canonical += "|" + idempotency_key
+    digest = hashlib.sha256(canonical.encode()).hexdigest()[:24]
+    trigger = _NAME_UNSAFE.sub("_", str(input_payload.get("trigger", "manual")))[:32]
+    # Execution names: 1-80 chars of [A-Za-z0-9_-]
+    return f"{_NAME_UNSAFE.sub('_', name_prefix)[:20]}-{trigger}-{digest}"
+
+
+# Allowed difference between our clock and Step Functions' when telling a new
+# execution from an already running one returned for a retried name
+_START_CLOCK_SKEW = timedelta(seconds=2)
+
+
+def _start_execution(input_payload: dict[str, Any], name: str) -> tuple[str, bool]:
+    """
+    Start one named execution; returns (execution ARN, started). Raises ClientError
+    (throttling included) so callers can decide whether to retry. A retry while the
+    execution is still running returns its ARN (StartExecution is idempotent for a
+    running execution with the same input); once it has closed, the name is taken for
+    90 days and the start fails with ExecutionAlreadyExists rather than reporting the
+    old run as this one. The response doesn't say whether it started a new execution,
+    so `started` is False when its startDate is before this call (less _START_CLOCK_SKEW).
+    """
+    if settings.workflow_backend == "local":
+        from workflows.local import get_engine
+
+        return get_engine().start(input_payload, name)
+    client = _client()
+    for refresh in (False, True):
+        arn = _get_state_machine_arn(refresh=refresh)
+        if not arn:
+            raise LookupError(f"State machine {settings.state_machine_name} not found")
+        try:
+            called = datetime.now(timezone.utc)
+            with observe_aws("stepfunctions", "StartExecution"):
+                r = client.start_execution(stateMachineArn=arn, name=name, input=json.dumps(input_payload))
+            start_date = r.get("startDate")
+            started = start_date is None or start_date >= called - _START_CLOCK_SKEW
+            return r["executionArn"], started
+        except ClientError as e:
+            if e.response["Error"]["Code"] not in _STALE_ARN_ERRORS or refresh:
+                raise
+            # State machine was recreated or removed: re-resolve once and retry
+            invalidate_state_machine_arn()
+    raise LookupError(f"State machine {settings.state_machine_name} not found")
+
+
 def start_workflow(
     input_payload: dict[str, Any],
     name_prefix: str = "StoreOps",
+    idempotency_key: str | None = None,
 ) -> str | None:
     """
     Start the StoreOperationsWorkflow with the given input.
-    Returns execution ARN if successful, else None.
+    Returns execution ARN if successful, else None. Without an idempotency_key every
+    call is a new execution; with one, a retry of a running start returns its ARN.
     """
-    arn = _get_state_machine_arn()
-    if not arn:
-        return None
-    client = _client()
+    key = idempotency_key or uuid.uuid4().hex
     try:
-        r = client.start_execution(
-            stateMachineArn=arn,
-            name=f"{name_prefix}-{input_payload.get('trigger', 'manual')}-{hash(json.dumps(input_payload, sort_keys=True)) % 10**8}",
-            input=json.dumps(input_payload),
-        )
-        return r.get("executionArn")
+        arn, _ = _start_execution(input_payload, execution_name(input_payload, name_prefix, key))
+        return arn
     except Exception:
         return None
 
 
+class _AdaptiveLimit:
+    """
+    AIMD concurrency window for StartExecution: halves on a throttle, grows by about
+    one slot per window of successes, never below 1 or above the configured maximum.
+    """
+
+    def __init__(self, maximum: int) -> None:
+        self.maximum = max(1, maximum)
+        self.limit = float(self.maximum)
+        self.in_flight = 0
+        self._cond = threading.Condition()
+
+    def acquire(self) -> None:
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+
+    def release(self, throttled: bool) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            if throttled:
+                self.limit = max(1.0, self.limit / 2)
+            else:
+                self.limit = min(float(self.maximum), self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+
+def _start_with_backoff(limit: _AdaptiveLimit, payload: dict[str, Any], name: str) -> tuple[str, bool]:
+    """One execution under the shared window; throttles back off with full jitter."""
+    for attempt in range(settings.workflow_start_max_retries + 1):
+        if attempt:
+            time.sleep(random.uniform(0, min(0.1 * 2 ** attempt, 5.0)))
+        limit.acquire()
+        throttled = False
+        try:
+            return _start_execution(payload, name)
+        except ClientError as e:
+            throttled = e.response["Error"]["Code"] in _THROTTLE_ERRORS
+            if not throttled or attempt == settings.workflow_start_max_retries:
+                raise
+        finally:
+            limit.release(throttled)
+    raise RuntimeError("unreachable")
+
+
+def start_workflows(
+    payloads: list[dict[str, Any]],
+    name_prefix: str = "StoreOps",
+    idempotency_key: str | None = None,
+    keys: list[str | None] | None = None,
+) -> list[dict[str, Any]]:
+    """
+    Start one execution per payload (e.g. one per store) concurrently, at most
+    workflow_start_concurrency at a time with adaptive throttling backoff.
+    Returns one result per payload, in order:
+    {"input", "execution_name", "execution_arn", "started", "error"}.
+    keys gives a per-payload idempotency key (falling back to idempotency_key); without
+    either, the batch gets a fresh key, so duplicate payloads in it share one
+    StartExecution call but a repeated request starts new executions.
+    """
+    default = idempotency_key or uuid.uuid4().hex
+    keys = keys or [None] * len(payloads)
+    names = [execution_name(p, name_prefix, k or default) for p, k in zip(payloads, keys)]
+    limit = _AdaptiveLimit(settings.workflow_start_concurrency)
+    unique = dict(zip(names, payloads))
+    with ThreadPoolExecutor(max_workers=min(limit.maximum, max(1, len(unique)))) as pool:
+        futures = {name: pool.submit(_start_with_backoff, limit, p, name) for name, p in unique.items()}
+    results = []
+    seen: set[str] = set()
+    for name, payload in zip(names, payloads):
+        out: dict[str, Any] = {"input": payload, "execution_name": name, "execution_arn": None, "started": False, "error": None}
+        try:
+            out["execution_arn"], started = futures[name].result()
+            out["started"] = started and name not in seen
+            seen.add(name)
+        except ClientError as e:
+            out["error"] = f"{e.response['Error']['Code']}: {e.response['Error'].get('Message', '')}"
+        except Exception as e:
+            out["error"] = str(e)
+        results.append(out)
+    return results
+
+
+_MISSING_EXECUTION_CODES = {"ExecutionDoesNotExist", "InvalidArn"}
+
+
 def get_workflow_status(execution_arn: str) -> dict[str, Any]:
-    """Get status and output of an execution."""
+    """
+    Get status and output of an execution. Status is NOT_FOUND for an execution that
+    doesn't exist (or a malformed ARN), UNKNOWN when it could not be read right now.
+    """
+    if settings.workflow_backend == "local":
+        from workflows.local import get_engine
+
+        return get_engine().describe(execution_arn)
     client = _client()
     try:
-        r = client.describe_execution(executionArn=execution_arn)
+        with observe_aws("stepfunctions", "DescribeExecution"):
+            r = client.describe_execution(executionArn=execution_arn)
         out = {
             "status": r.get("status"),
             "startDate": str(r.get("startDate")),
@@ -67,5 +264,41 @@ def get_workflow_status(execution_arn: str) -> dict[str, Any]:
             except json.JSONDecodeError:
                 out["output"] = r["output"]
         return out
+    except ClientError as e:
+        code = e.response["Error"]["Code"]
+        # No such execution: final, unlike throttling or network errors (UNKNOWN, retried)
+        status = "NOT_FOUND" if code in _MISSING_EXECUTION_CODES else "UNKNOWN"
+        return {"status": status, "error": f"{code}: {e.response['Error'].get('Message', '')}"}
     except Exception as e:
         return {"status": "UNKNOWN", "error": str(e)}
+
+
+def get_execution_history(execution_arn: str, after_event_id: int = 0) -> list[dict[str, Any]]:
+    """
+    History events newer than after_event_id, oldest first. Reads newest-first and
+    stops at the first event already seen, so repeated polls only fetch the tail.
+    """
+    if settings.workflow_backend == "local":
+        from workflows.local import get_engine
+
+        return get_engine().history(execution_arn, after_event_id)
+    client = _client()
+    newest_first: list[dict[str, Any]] = []
+    kw: dict[str, Any] = {"executionArn": execution_arn, "reverseOrder": True, "maxResults": 100}
+    while True:
+        with observe_aws("stepfunctions", "GetExecutionHistory"):
+            r = client.get_execution_history(**kw)
+        for ev in r.get("events", []):
+            if ev["id"] <= after_event_id:
+                return newest_first[::-1]
+            newest_first.append(
+                {
+                    "id": ev["id"],
+                    "event_type": ev.get("type"),
+                    "timestamp": str(ev.get("timestamp")),
+                    "previous_event_id": ev.get("previousEventId"),
+                }
+            )
+        if not r.get("nextToken"):
+            return newest_first[::-1]
+        kw["nextToken"] = r["nextToken"]
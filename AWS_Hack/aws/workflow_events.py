@@ -0,0 +1,144 @@
+"""
+Shared Step Functions execution watcher behind GET /workflow/{execution_arn}/events.
+
+One asyncio task polls every execution that has at least one SSE subscriber, instead
+of each client polling /workflow/status. Each execution is polled on its own adaptive
+interval: reset to the minimum when something changed, stretched by a backoff factor
+while nothing does. Status changes and new history events are fanned out to all of
+that execution's subscriber queues; a None marks the end of the stream. An execution
+that doesn't exist ends its stream after the NOT_FOUND status; only transient read
+errors (UNKNOWN) keep it polling.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from typing import Any
+
+from config import settings
+
+TERMINAL_STATUSES = {"SUCCEEDED", "FAILED", "TIMED_OUT", "ABORTED"}
+# get_workflow_status for a missing execution or malformed ARN: nothing more will come
+MISSING_STATUS = "NOT_FOUND"
+# History events replayed to clients that subscribe after the execution started
+HISTORY_REPLAY = 200
+
+
+class _Watch:
+    __slots__ = ("subscribers", "status", "last_event_id", "history", "interval", "due")
+
+    def __init__(self) -> None:
+        self.subscribers: set[asyncio.Queue] = set()
+        self.status: dict[str, Any] | None = None
+        self.last_event_id = 0
+        self.history: deque[dict[str, Any]] = deque(maxlen=HISTORY_REPLAY)
+        self.interval = settings.workflow_poll_min_seconds
+        self.due = 0.0
+
+
+class ExecutionWatcher:
+    def __init__(self) -> None:
+        self._watches: dict[str, _Watch] = {}
+        self._task: asyncio.Task | None = None
+        self._wake: asyncio.Event | None = None
+
+    def subscribe(self, execution_arn: str) -> asyncio.Queue:
+        """Queue receiving {"type": "status" | "history", ...} events, then None."""
+        queue: asyncio.Queue = asyncio.Queue()
+        watch = self._watches.get(execution_arn)
+        if watch is None:
+            watch = self._watches[execution_arn] = _Watch()
+        else:
+            for ev in watch.history:
+                queue.put_nowait(ev)
+            if watch.status is not None:
+                queue.put_nowait(watch.status)
+        watch.subscribers.add(queue)
+        watch.due = 0.0
+        self._ensure_running()
+        return queue
+
+    def unsubscribe(self, execution_arn: str, queue: asyncio.Queue) -> None:
+        watch = self._watches.get(execution_arn)
+        if watch is None:
+            return
+        watch.subscribers.discard(queue)
+        if not watch.subscribers:
+            del self._watches[execution_arn]
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "executions": len(self._watches),
+            "subscribers": sum(len(w.subscribers) for w in self._watches.values()),
+        }
+
+    def _ensure_running(self) -> None:
+        if self._wake is None:
+            self._wake = asyncio.Event()
+        self._wake.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self) -> None:
+        sem = asyncio.Semaphore(settings.workflow_poll_concurrency)
+        while self._watches:
+            now = time.monotonic()
+            due = [(arn, w) for arn, w in self._watches.items() if w.due <= now]
+            if due:
+                await asyncio.gather(*(self._poll(arn, w, sem) for arn, w in due))
+            if not self._watches:
+                break
+            next_due = min(w.due for w in self._watches.values())
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=max(0.0, next_due - time.monotonic()))
+            except asyncio.TimeoutError:
+                pass
+        self._task = None
+
+    async def _poll(self, arn: str, watch: _Watch, sem: asyncio.Semaphore) -> None:
+        from aws.step_functions import get_execution_history, get_workflow_status
+
+        async with sem:
+            status = await asyncio.to_thread(get_workflow_status, arn)
+            try:
+                events = await asyncio.to_thread(get_execution_history, arn, watch.last_event_id)
+            except Exception:
+                events = []
+
+        changed = False
+        for ev in events:
+            msg = {"type": "history", **ev}
+            watch.history.append(msg)
+            watch.last_event_id = ev["id"]
+            self._publish(watch, msg)
+            changed = True
+        status_msg = {"type": "status", **status}
+        if status_msg != watch.status:
+            watch.status = status_msg
+            self._publish(watch, status_msg)
+            changed = True
+
+        if status.get("status") in TERMINAL_STATUSES or status.get("status") == MISSING_STATUS:
+            for q in watch.subscribers:
+                q.put_nowait(None)
+            if self._watches.get(arn) is watch:
+                del self._watches[arn]
+            return
+        if changed:
+            watch.interval = settings.workflow_poll_min_seconds
+        else:
+            watch.interval = min(
+                watch.interval * settings.workflow_poll_backoff,
+                settings.workflow_poll_max_seconds,
+            )
+        watch.due = time.monotonic() + watch.interval
+
+    @staticmethod
+    def _publish(watch: _Watch, msg: dict[str, Any]) -> None:
+        for q in watch.subscribers:
+            q.put_nowait(msg)
+
+
+WATCHER = ExecutionWatcher()
@@ -0,0 +1,56 @@
+"""
+Throughput of the local ASL engine on store_workflow.asl.json with the in-memory
+storage backend: executions per second, split by whether the Choice takes the
+reorder branch.
+
+Usage: python benchmarks/bench_asl.py [--n 5000] [--items 50]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ["STORAGE_BACKEND"] = "memory"
+os.environ["WORKFLOW_BACKEND"] = "local"
+
+from aws import dynamodb as db  # noqa: E402
+from aws.local_dynamodb import LOCAL  # noqa: E402
+from aws.step_functions import get_workflow_status, start_workflow  # noqa: E402
+
+
+def _seed(items: int, low: int) -> None:
+    LOCAL.reset()
+    for i in range(items):
+        db.put_inventory(f"SKU-{i:04d}", f"Item {i}", 5 if i < low else 50, reorder_threshold=10)
+
+
+def _run(n: int, label: str) -> None:
+    start = time.perf_counter()
+    failed = 0
+    for i in range(n):
+        arn = start_workflow({"store_id": "store-001", "trigger": "bench", "run": f"{label}-{i}"})
+        if get_workflow_status(arn)["status"] != "SUCCEEDED":
+            failed += 1
+    elapsed = time.perf_counter() - start
+    print(f"{label:<12} {n / elapsed:>10.0f} exec/s  ({elapsed * 1e6 / n:.1f} us/exec, {failed} failed)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the local Step Functions engine")
+    parser.add_argument("--n", type=int, default=5000, help="Executions per case")
+    parser.add_argument("--items", type=int, default=50, help="Inventory rows to seed")
+    args = parser.parse_args()
+
+    _seed(args.items, low=0)
+    _run(args.n, "no-reorder")
+    # Reorder branch writes orders on every run; a handful of low items keeps it realistic
+    _seed(args.items, low=3)
+    _run(args.n, "reorder")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Bedrock governor: N crews sharing a simulated model with a hard concurrency quota
+(calls above it are throttled at once) and a heavy latency tail. Compares raw calls
+with botocore-style retries against the governor (AIMD limit, backoff, priority,
+optional hedging): throughput, throttles and per-priority latency.
+
+Usage: python benchmarks/bench_governor.py [--crews 24] [--calls 40] [--quota 8] [--hedge]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from botocore.exceptions import ClientError  # noqa: E402
+
+from agents.llm import is_throttle  # noqa: E402
+from core.governor import Governor  # noqa: E402
+
+
+class SimulatedBedrock:
+    """converse() with a concurrency quota; latency lognormal, 5% of calls 8x slower."""
+
+    def __init__(self, quota: int, median_ms: float, seed: int = 7) -> None:
+        self.quota = quota
+        self.median = median_ms / 1000
+        self.active = 0
+        self.throttles = 0
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+
+    def converse(self, **kwargs):
+        with self._lock:
+            if self.active >= self.quota:
+                self.throttles += 1
+                raise ClientError({"Error": {"Code": "ThrottlingException", "Message": "Too many requests"}}, "Converse")
+            self.active += 1
+            latency = self.median * self._rng.lognormvariate(0, 0.3) * (8 if self._rng.random() < 0.05 else 1)
+        try:
+            time.sleep(latency)
+            return {"output": {"message": {"content": [{"text": "ok"}]}}}
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+def raw_call(client: SimulatedBedrock, retries: int = 3):
+    """What an unshared client does: a few quick retries, no coordination."""
+    for attempt in range(retries + 1):
+        try:
+            return client.converse(modelId="sim")
+        except ClientError as e:
+            if not is_throttle(e) or attempt == retries:
+                raise
+            time.sleep(random.uniform(0, 0.05 * 2 ** attempt))
+
+
+def run(mode: str, args) -> None:
+    client = SimulatedBedrock(args.quota, args.median_ms)
+    gov = Governor(initial=2, max_limit=64, backoff_base=0.05, backoff_cap=1.0, hedge_min_seconds=0.0)
+    latencies: dict[str, list[float]] = {"interactive": [], "batch": []}
+    failed = [0]
+
+    def crew(i: int) -> None:
+        prio = "interactive" if i % 4 == 0 else "batch"
+        for _ in range(args.calls):
+            t0 = time.perf_counter()
+            try:
+                if mode == "raw":
+                    raw_call(client)
+                else:
+                    gov.call("sim", lambda: client.converse(modelId="sim"), is_throttle=is_throttle,
+                             hedge=mode == "hedged", priority=prio)
+            except ClientError:
+                failed[0] += 1
+                continue
+            latencies[prio].append(time.perf_counter() - t0)
+
+    threads = [threading.Thread(target=crew, args=(i,)) for i in range(args.crews)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    done = sum(len(v) for v in latencies.values())
+
+    def pct(values: list[float], q: float) -> float:
+        values = sorted(values)
+        return values[min(len(values) - 1, int(q * len(values)))] * 1000 if values else 0.0
+
+    extra = ""
+    if mode != "raw":
+        s = gov.stats()["sim"]
+        extra = f"  limit {s['limit']:>5}  retries {s['retries']:>4}  hedges {s['hedges']}/{s['hedge_wins']} won"
+    print(f"{mode:>8}: {done / elapsed:7.1f} calls/s  failed {failed[0]:>4}  throttled {client.throttles:>5}  "
+          f"interactive p50/p99 {pct(latencies['interactive'], .5):6.0f}/{pct(latencies['interactive'], .99):6.0f} ms  "
+          f"batch p50/p99 {pct(latencies['batch'], .5):6.0f}/{pct(latencies['batch'], .99):6.0f} ms{extra}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Bedrock call governor")
+    parser.add_argument("--crews", type=int, default=24)
+    parser.add_argument("--calls", type=int, default=40, help="Sequential LLM calls per crew")
+    parser.add_argument("--quota", type=int, default=8, help="Simulated concurrent-request quota")
+    parser.add_argument("--median-ms", type=float, default=50.0)
+    parser.add_argument("--hedge", action="store_true", help="Also run with hedging on")
+    args = parser.parse_args()
+
+    print(f"{args.crews} crews x {args.calls} calls, quota {args.quota}, median {args.median_ms:g} ms")
+    for mode in ("raw", "governed") + (("hedged",) if args.hedge else ()):
+        run(mode, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Health history store: bytes per reading, append throughput and the time to scan a
+year of one device's readings (file backend, in a temporary directory).
+
+Usage: python benchmarks/bench_health_history.py [--per-day 1440] [--days 365]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+from aws import health_history as hh  # noqa: E402
+from config import settings  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the equipment health history store")
+    parser.add_argument("--per-day", type=int, default=1440, help="Readings per device per day")
+    parser.add_argument("--days", type=int, default=365)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as d:
+        settings.health_history_dir = d
+        end = time.time()
+        start = end - args.days * hh.DAY
+        n = args.per_day * args.days
+        ts = np.linspace(start, end - 1, n)
+        health = np.clip(1.0 - np.linspace(0, 0.6, n) + np.random.default_rng(1).normal(0, 0.01, n), 0, 1)
+
+        t0 = time.perf_counter()
+        for day in range(args.days):
+            sl = slice(day * args.per_day, (day + 1) * args.per_day)
+            hh.append("EQ-BENCH", health[sl], ts[sl])
+        bulk = time.perf_counter() - t0
+        size = os.path.getsize(hh.get_store()._path("EQ-BENCH"))
+        print(f"{n} readings, {size / n:.2f} bytes/reading, bulk append {n / bulk:,.0f} readings/s")
+
+        t0 = time.perf_counter()
+        for i in range(2000):
+            hh.append("EQ-SINGLE", 0.9, end + i)
+        print(f"single appends: {(time.perf_counter() - t0) / 2000 * 1e6:.1f} us each")
+
+        for label, fn in (
+            ("year scan", lambda: hh.query("EQ-BENCH", start, end)),
+            ("year downsampled", lambda: hh.history("EQ-BENCH", start, end, max_points=500)),
+            ("7-day trend", lambda: hh.trend("EQ-BENCH")),
+        ):
+            fn()
+            runs = 20
+            t0 = time.perf_counter()
+            for _ in range(runs):
+                out = fn()
+            print(f"{label:<18} {(time.perf_counter() - t0) / runs * 1000:7.2f} ms")
+        print("trend:", out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Single-core throughput of the telemetry pipeline (decode, validate, aggregate,
+window hand-off) against the in-memory storage backend. Target: >= 10k messages/s.
+
+Usage: python benchmarks/bench_ingest.py [--n 200000] [--devices 500] [--skus 2000] [--batch 1]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ["STORAGE_BACKEND"] = "memory"
+
+from aws import dynamodb as db  # noqa: E402
+from telemetry.ingest import TelemetryIngestor  # noqa: E402
+
+
+def _messages(n: int, devices: int, skus: int, batch: int) -> list[tuple[str, bytes]]:
+    rng = random.Random(7)
+    now = time.time()
+    out = []
+    for i in range(0, n, batch):
+        if i % 2:
+            payloads = [
+                {"equipment_id": f"EQ-{rng.randrange(devices):04d}", "health_score": round(rng.uniform(0.2, 1.0), 3),
+                 "metrics": {"temp": rng.randint(18, 28)}, "ts": now}
+                for _ in range(batch)
+            ]
+            topic = "store/store-001/equipment"
+        else:
+            payloads = [
+                {"sku": f"SKU-{rng.randrange(skus):05d}", "quantity": rng.randint(0, 200), "event": "level_update", "ts": now}
+                for _ in range(batch)
+            ]
+            topic = "store/store-001/inventory"
+        out.append((topic, json.dumps(payloads[0] if batch == 1 else payloads).encode()))
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark telemetry ingestion")
+    parser.add_argument("--n", type=int, default=200_000, help="Readings")
+    parser.add_argument("--devices", type=int, default=500)
+    parser.add_argument("--skus", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=1, help="Readings per message (publisher batching)")
+    parser.add_argument("--window", type=float, default=1.0)
+    args = parser.parse_args()
+
+    db.batch_put_inventory([
+        {"sku": f"SKU-{i:05d}", "name": f"Item {i}", "quantity": 100, "unit": "units", "reorder_threshold": 10}
+        for i in range(args.skus)
+    ])
+    messages = _messages(args.n, args.devices, args.skus, args.batch)
+    ingestor = TelemetryIngestor(window_seconds=args.window)
+
+    start = time.perf_counter()
+    stats = ingestor.run(iter(messages))
+    elapsed = time.perf_counter() - start
+    ingestor.close()
+    print(f"{stats['readings']} readings in {len(messages)} messages: {elapsed:.2f}s, "
+          f"{stats['readings'] / elapsed:,.0f} readings/s, {len(messages) / elapsed:,.0f} messages/s")
+    print(stats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Micro-benchmark for core.metrics: cost of one observation on the hot path.
+Target: a few microseconds or less per observation.
+
+Usage: python benchmarks/bench_metrics.py [--n 200000]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.metrics import Registry, observe_aws
+
+
+def _per_call_ns(fn, n: int) -> float:
+    start = time.perf_counter_ns()
+    fn(n)
+    return (time.perf_counter_ns() - start) / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark metrics instrumentation overhead")
+    parser.add_argument("--n", type=int, default=200_000, help="Observations per case")
+    args = parser.parse_args()
+
+    reg = Registry()
+    counter = reg.counter("bench_total", "bench", ("tool",))
+    hist = reg.histogram("bench_seconds", "bench", ("tool",))
+    child_c = counter.labels("t")
+    child_h = hist.labels("t")
+
+    def baseline(n):
+        for _ in range(n):
+            pass
+
+    def counter_child(n):
+        for _ in range(n):
+            child_c.inc()
+
+    def counter_labels(n):
+        for _ in range(n):
+            counter.labels("t").inc()
+
+    def histogram_child(n):
+        for i in range(n):
+            child_h.observe(i * 1e-7)
+
+    def histogram_timer(n):
+        for _ in range(n):
+            with child_h.time():
+                pass
+
+    def aws_observe(n):
+        for _ in range(n):
+            with observe_aws("dynamodb", "GetItem", "bench"):
+                pass
+
+    base = _per_call_ns(baseline, args.n)
+    cases = [counter_child, counter_labels, histogram_child, histogram_timer, aws_observe]
+    print(f"{'case':<20}{'ns/op':>10}")
+    for case in cases:
+        ns = _per_call_ns(case, args.n) - base
+        print(f"{case.__name__:<20}{ns:>10.0f}")
+    print(f"render(): {len(reg.render())} bytes, p99={child_h.quantile(0.99) * 1e6:.1f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Route planner: time to plan N random supplier stops around the store, with and
+without pickup windows. Target: thousands of stops within the time budget.
+
+Usage: python benchmarks/bench_routes.py [--stops 3000] [--budget 3]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+from analytics.routing import plan_routes  # noqa: E402
+from config import settings  # noqa: E402
+
+
+def orders(n: int, windows: bool, seed: int = 7) -> list[dict]:
+    rng = np.random.default_rng(seed)
+    lat = settings.store_lat + rng.normal(0, 0.3, n)
+    lon = settings.store_lon + rng.normal(0, 0.4, n)
+    out = []
+    for i in range(n):
+        o = {"order_id": f"PO-{i:05d}", "quantity": int(rng.integers(5, 60)),
+             "supplier_lat": float(lat[i]), "supplier_lon": float(lon[i])}
+        if windows:
+            start = float(rng.uniform(0, settings.route_shift_minutes - 180))
+            o["window_start"], o["window_end"] = start, start + 120
+        out.append(o)
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the route planner")
+    parser.add_argument("--stops", type=int, default=3000)
+    parser.add_argument("--budget", type=float, default=3.0, help="Time budget (seconds)")
+    args = parser.parse_args()
+
+    for windows in (False, True):
+        batch = orders(args.stops, windows)
+        t0 = time.perf_counter()
+        plan = plan_routes(batch, time_budget=args.budget)
+        elapsed = time.perf_counter() - t0
+        gain = 1 - plan["total_distance_km"] / plan["construction_distance_km"]
+        print(f"{args.stops:,} stops, windows={windows}: {elapsed:.2f}s, {plan['vehicles_used']} vehicles, "
+              f"{plan['total_distance_km']:,.0f} km ({gain:.1%} below nearest neighbour), "
+              f"converged={plan['converged']}, unassigned={len(plan['unassigned'])}")
+
+
+if __name__ == "__main__":
+    main()
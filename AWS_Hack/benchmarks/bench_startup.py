@@ -0,0 +1,95 @@
+"""
+Startup cost: cold imports of the API and run_crew.py, and latency of the first and
+second /run-crew with CREW_BACKEND=thread vs process (after the workers are warm).
+Each measurement runs in a fresh interpreter; fake LLM and in-memory AWS stand-ins.
+
+Usage: python benchmarks/bench_startup.py [--repeat 3] [--workers 2]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENV = {
+    "STORAGE_BACKEND": "memory",
+    "LLM_BACKEND": "fake",
+    "WORKFLOW_BACKEND": "local",
+    "IOT_BACKEND": "memory",
+    "CREWAI_TELEMETRY_OPT_OUT": "true",
+}
+
+IMPORT_SNIPPET = """
+import json, time
+t0 = time.perf_counter()
+import {module}
+print("RESULT " + json.dumps({{"seconds": time.perf_counter() - t0}}))
+"""
+
+RUN_SNIPPET = """
+import json, time
+t0 = time.perf_counter()
+from fastapi.testclient import TestClient
+import api_server
+out = {"import": time.perf_counter() - t0}
+
+def main():
+    with TestClient(api_server.app) as client:
+        if api_server.settings.crew_backend == "process":
+            from core.crew_workers import pool
+            t = time.perf_counter()
+            pool().wait_ready()
+            out["workers_ready"] = time.perf_counter() - t
+        for name in ("first_run", "second_run"):
+            t = time.perf_counter()
+            assert client.post("/run-crew", json={}).json()["success"]
+            out[name] = time.perf_counter() - t
+    print("RESULT " + json.dumps(out))
+
+if __name__ == "__main__":
+    main()
+"""
+
+
+def measure(snippet: str, env: dict[str, str]) -> dict[str, float]:
+    proc = subprocess.run(
+        [sys.executable, "-c", snippet],
+        cwd=ROOT,
+        env={**os.environ, **ENV, **env, "PYTHONPATH": ROOT},
+        capture_output=True,
+        text=True,
+        timeout=600,
+    )
+    for line in proc.stdout.splitlines():
+        if line.startswith("RESULT "):
+            return json.loads(line[len("RESULT "):])
+    raise RuntimeError(f"Measurement failed:\n{proc.stderr[-2000:]}")
+
+
+def report(label: str, runs: list[dict[str, float]]) -> None:
+    keys = list(runs[0])
+    parts = [f"{k} {statistics.median(r[k] for r in runs):.2f}s" for k in keys]
+    print(f"  {label:<22} " + "  ".join(parts))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cold start and first crew run")
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh interpreters per measurement (median shown)")
+    parser.add_argument("--workers", type=int, default=2, help="CREW_WORKERS for the process backend")
+    args = parser.parse_args()
+
+    print(f"Median of {args.repeat} fresh interpreters:")
+    for label, module in (("import api_server", "api_server"), ("import run_crew", "run_crew")):
+        report(label, [measure(IMPORT_SNIPPET.format(module=module), {}) for _ in range(args.repeat)])
+    for backend in ("thread", "process"):
+        env = {"CREW_BACKEND": backend, "CREW_WORKERS": str(args.workers)}
+        report(f"CREW_BACKEND={backend}", [measure(RUN_SNIPPET, env) for _ in range(args.repeat)])
+
+
+if __name__ == "__main__":
+    main()
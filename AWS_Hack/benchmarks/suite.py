@@ -0,0 +1,354 @@
+"""
+End-to-end benchmark suite on local stand-ins, no AWS or Bedrock needed:
+- DynamoDB: STORAGE_BACKEND=memory (aws/local_dynamodb.py), seeded with the
+  synthetic catalog (scripts/synthetic_data.py).
+- Step Functions: WORKFLOW_BACKEND=local. IoT data: IOT_BACKEND=memory.
+- Bedrock: LLM_BACKEND=fake (agents/fake_llm.py), which makes scripted tool
+  calls with configurable latency.
+
+Parts
+- tools: each agent tool at every catalog size (time per call).
+- api: load test per endpoint, concurrent requests in process (httpx ASGI
+  transport): latency percentiles, requests/s, errors. Includes concurrent
+  /stream-crew runs.
+- crew: full run_store_operations() runs, at the smallest size.
+
+Results go to a JSON file (default benchmarks/results/<git commit>.json).
+--compare BASELINE.json prints the change per case and flags regressions beyond
+--threshold; add --fail-on-regression to use it as a gate.
+
+Usage:
+  python benchmarks/suite.py [--sizes 1000,100000,1000000] [--parts tools,api,crew]
+      [--llm-latency-ms 50] [--requests 200] [--concurrency 16] [--streams 4]
+      [--crew-runs 3] [--out results.json] [--compare baseline.json]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+_DATA = tempfile.mkdtemp(prefix="store-bench-")
+os.environ.update(
+    STORAGE_BACKEND="memory",
+    WORKFLOW_BACKEND="local",
+    IOT_BACKEND="memory",
+    LLM_BACKEND="fake",
+    HEALTH_HISTORY_DIR=os.path.join(_DATA, "health_history"),
+    DEMAND_HISTORY_PATH=os.path.join(_DATA, "demand_history.npz"),
+    INVENTORY_LOG_DIR=os.path.join(_DATA, "inventory_log"),
+    CREWAI_DISABLE_TELEMETRY="true",
+    OTEL_SDK_DISABLED="true",
+)
+
+from config import settings  # noqa: E402
+
+
+def _stats(samples: list[float]) -> dict[str, Any]:
+    """Latency summary in milliseconds from samples in seconds."""
+    ms = sorted(s * 1000 for s in samples)
+
+    def pct(p: float) -> float:
+        return round(ms[min(len(ms) - 1, int(p * len(ms)))], 3)
+
+    return {
+        "n": len(ms),
+        "mean_ms": round(statistics.fmean(ms), 3),
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+        "max_ms": round(ms[-1], 3),
+    }
+
+
+def _timeit(fn: Callable[[], Any], min_reps: int = 3, max_reps: int = 50, budget: float = 2.0) -> dict[str, Any]:
+    samples: list[float] = []
+    start = time.perf_counter()
+    while len(samples) < max_reps:
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+        spent = time.perf_counter() - start
+        if spent >= budget and len(samples) >= min_reps or spent >= 10 * budget:
+            break
+    return _stats(samples)
+
+
+# ---------- Data ----------
+
+
+def seed(size: int) -> None:
+    """Reset the in-memory tables and write a catalog of `size` SKUs (plus orders, devices, ...)."""
+    from aws.local_dynamodb import LOCAL
+    from scripts.synthetic_data import seed_synthetic
+
+    LOCAL.reset()
+    with contextlib.redirect_stdout(io.StringIO()):
+        seed_synthetic(
+            skus=size,
+            orders=max(100, size // 10),
+            equipment=min(max(10, size // 100), 10000),
+            customers=size,
+            staff=min(max(20, size // 1000), 300),
+            seed=42,
+            workers=8,
+        )
+
+
+# ---------- Tools ----------
+
+
+def tool_cases() -> list[tuple[str, Any, str]]:
+    """(name, tool, input) per agent tool."""
+    from agents import tools as t
+
+    return [
+        ("get_inventory", t.get_inventory_tool, '{"sku": "SKU-0000001"}'),
+        ("list_low_stock", t.list_low_stock_tool, ""),
+        ("pricing_suggestion_sku", t.get_pricing_suggestion_tool, '{"sku": "SKU-0000001"}'),
+        ("pricing_suggestion_all", t.get_pricing_suggestion_tool, ""),
+        ("list_equipment", t.list_equipment_tool, ""),
+        ("equipment_status", t.get_equipment_status_tool, '{"equipment_id": "EQ-000001"}'),
+        ("customer_info", t.get_customer_info_tool, '{"customer_id": "CUST-00000001"}'),
+        ("loyalty_tier", t.get_loyalty_tier_tool, '{"customer_id": "CUST-00000001"}'),
+        ("pending_deliveries", t.get_pending_deliveries_tool, ""),
+        ("suggest_routes", t.suggest_routes_tool, ""),
+        ("optimize_staff_schedule", t.optimize_staff_schedule_tool, ""),
+        # Writers last: create_order adds pending orders the routing cases would pick up
+        ("put_inventory", t.put_inventory_tool, '{"sku": "SKU-BENCH", "name": "Bench", "quantity": 5}'),
+        ("create_order", t.create_order_tool, ""),
+    ]
+
+
+def bench_tools(size: int, budget: float) -> list[dict[str, Any]]:
+    results = []
+    for name, tool, inp in tool_cases():
+        stats = _timeit(lambda: tool.func(inp), budget=budget)
+        print(f"  tool {name:<26} {size:>9,}  p50 {stats['p50_ms']:>10.2f} ms")
+        results.append({"part": "tools", "name": name, "size": size, **stats})
+    return results
+
+
+# ---------- API ----------
+
+
+def api_cases() -> list[dict[str, Any]]:
+    """(name, method, path, body, requests scale); heavy endpoints get fewer requests."""
+    keys = [f"SKU-{i:07d}" for i in range(100)]
+    return [
+        {"name": "health", "method": "GET", "path": "/health"},
+        {"name": "inventory_low_stock", "method": "GET", "path": "/inventory/low-stock", "scale": 0.1},
+        {"name": "inventory_page", "method": "GET", "path": "/inventory/all?limit=500"},
+        {"name": "inventory_batch", "method": "POST", "path": "/inventory/batch", "json": {"keys": keys}},
+        {"name": "inventory_adjust", "method": "POST", "path": "/inventory/adjust",
+         "json": {"sku": "SKU-0000002", "delta": -1, "reason": "bench"}},
+        {"name": "inventory_analytics", "method": "GET", "path": "/inventory/analytics?limit=100"},
+        {"name": "dashboard_summary", "method": "GET", "path": "/dashboard/summary"},
+        {"name": "equipment_page", "method": "GET", "path": "/equipment/all?limit=500", "scale": 0.2},
+        {"name": "maintenance_schedule", "method": "GET", "path": "/equipment/maintenance-schedule?top=20"},
+        {"name": "equipment_batch", "method": "POST", "path": "/equipment/batch",
+         "json": {"keys": [f"EQ-{i:06d}" for i in range(10)]}},
+        {"name": "orders_page", "method": "GET", "path": "/orders/all?limit=500"},
+        {"name": "orders_pending", "method": "GET", "path": "/orders/pending", "scale": 0.1},
+        {"name": "customer_get", "method": "GET", "path": "/customers/CUST-00000001"},
+        {"name": "customers_batch", "method": "POST", "path": "/customers/batch",
+         "json": {"keys": [f"CUST-{i:08d}" for i in range(100)]}},
+        {"name": "logistics_routes", "method": "GET", "path": "/logistics/routes?time_budget=0.2", "scale": 0.05},
+        {"name": "staff_optimize", "method": "POST", "path": "/staff/schedule/optimize",
+         "json": {"time_budget": 0.2}, "scale": 0.05},
+        {"name": "workflow_start", "method": "POST", "path": "/workflow/start", "scale": 0.2},
+        {"name": "jobs", "method": "GET", "path": "/jobs"},
+        {"name": "metrics", "method": "GET", "path": "/metrics", "scale": 0.2},
+    ]
+
+
+async def _load(client, case: dict[str, Any], requests: int, concurrency: int) -> dict[str, Any]:
+    latencies: list[float] = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def worker() -> None:
+        nonlocal errors
+        for _ in remaining:
+            t0 = time.perf_counter()
+            try:
+                r = await client.request(case["method"], case["path"], json=case.get("json"))
+                ok = r.status_code < 400
+            except Exception:
+                ok = False
+            latencies.append(time.perf_counter() - t0)
+            errors += not ok
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, requests))))
+    elapsed = time.perf_counter() - t0
+    return {**_stats(latencies), "errors": errors, "requests_per_second": round(len(latencies) / elapsed, 1)}
+
+
+async def _streams(client, streams: int) -> dict[str, Any]:
+    """Concurrent /stream-crew runs to completion: time to `done` and events per stream."""
+
+    async def one() -> tuple[float, int, bool]:
+        t0 = time.perf_counter()
+        r = await client.get("/stream-crew", timeout=600)
+        events = r.text.count("\n\n")
+        return time.perf_counter() - t0, events, r.status_code == 200 and "event: done" in r.text
+
+    t0 = time.perf_counter()
+    runs = await asyncio.gather(*(one() for _ in range(streams)))
+    elapsed = time.perf_counter() - t0
+    return {
+        **_stats([r[0] for r in runs]),
+        "errors": sum(1 for r in runs if not r[2]),
+        "events_per_stream": round(statistics.fmean(r[1] for r in runs), 1),
+        "wall_seconds": round(elapsed, 3),
+    }
+
+
+def bench_api(size: int, requests: int, concurrency: int, streams: int) -> list[dict[str, Any]]:
+    import httpx
+
+    import api_server
+
+    async def run() -> list[dict[str, Any]]:
+        results = []
+        transport = httpx.ASGITransport(app=api_server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            for case in api_cases():
+                n = max(concurrency, int(requests * case.get("scale", 1.0)))
+                stats = await _load(client, case, n, concurrency)
+                print(f"  api  {case['name']:<26} {size:>9,}  p50 {stats['p50_ms']:>10.2f} ms  "
+                      f"{stats['requests_per_second']:>9,.1f} req/s  errors {stats['errors']}")
+                results.append({"part": "api", "name": case["name"], "size": size, "concurrency": concurrency, **stats})
+            if streams:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    stats = await _streams(client, streams)
+                print(f"  api  {'stream_crew x' + str(streams):<26} {size:>9,}  p50 {stats['p50_ms']:>10.2f} ms  "
+                      f"errors {stats['errors']}")
+                results.append({"part": "api", "name": "stream_crew", "size": size, "concurrency": streams, **stats})
+        return results
+
+    return asyncio.run(run())
+
+
+# ---------- Crew ----------
+
+
+def bench_crew(size: int, runs: int) -> list[dict[str, Any]]:
+    from agents.crew import run_store_operations
+
+    samples = []
+    for _ in range(runs):
+        with contextlib.redirect_stdout(io.StringIO()):
+            t0 = time.perf_counter()
+            run_store_operations()
+            samples.append(time.perf_counter() - t0)
+    stats = _stats(samples)
+    print(f"  crew run_store_operations       {size:>9,}  p50 {stats['p50_ms']:>10.2f} ms")
+    return [{"part": "crew", "name": "run_store_operations", "size": size,
+             "llm_latency_ms": settings.fake_llm_latency_ms, **stats}]
+
+
+# ---------- Results ----------
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(current: list[dict[str, Any]], baseline_path: str, threshold: float) -> int:
+    """Print p50 change per case vs a baseline file; returns the number of regressions."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(r["part"], r["name"], r["size"]): r for r in json.load(f)["results"]}
+    regressions = 0
+    print(f"\nCompared with {baseline_path} (p50, regression > {threshold:.0%}):")
+    for r in current:
+        old = baseline.get((r["part"], r["name"], r["size"]))
+        if not old or not old.get("p50_ms"):
+            continue
+        change = r["p50_ms"] / old["p50_ms"] - 1
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(f"  {r['part']:<5} {r['name']:<26} {r['size']:>9,}  {old['p50_ms']:>10.2f} -> {r['p50_ms']:>10.2f} ms "
+              f"({change:+.1%}){flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end benchmarks on local stand-ins")
+    parser.add_argument("--sizes", default="1000,100000,1000000", help="Catalog sizes (SKUs)")
+    parser.add_argument("--parts", default="tools,api,crew")
+    parser.add_argument("--budget", type=float, default=2.0, help="Seconds per tool case")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per API case")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--streams", type=int, default=4, help="Concurrent /stream-crew runs (0 = skip)")
+    parser.add_argument("--crew-runs", type=int, default=3)
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="Fake LLM latency per call")
+    parser.add_argument("--out", default=None, help="Default: benchmarks/results/<git commit>.json")
+    parser.add_argument("--compare", default=None, help="Baseline results file")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Regression threshold (0.2 = 20%%)")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    settings.fake_llm_latency_ms = args.llm_latency_ms
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    parts = set(args.parts.split(","))
+    commit = _git_commit()
+    results: list[dict[str, Any]] = []
+    for size in sizes:
+        t0 = time.perf_counter()
+        seed(size)
+        print(f"Seeded {size:,} SKUs in {time.perf_counter() - t0:.1f}s")
+        if "tools" in parts:
+            results += bench_tools(size, args.budget)
+        if "api" in parts:
+            results += bench_api(size, args.requests, args.concurrency, args.streams)
+        # Crew runs are dominated by the tools at large sizes (timed above); one size is enough
+        if "crew" in parts and size == min(sizes):
+            results += bench_crew(size, args.crew_runs)
+
+    out = args.out or os.path.join(ROOT, "benchmarks", "results", f"{commit}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump({
+            "meta": {
+                "commit": commit,
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+                "args": vars(args),
+            },
+            "results": results,
+        }, f, indent=2)
+    print(f"\nWrote {len(results)} results to {out}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold)
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
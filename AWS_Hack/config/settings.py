@@ -20,16 +20,221 @@ class Settings(BaseSettings):
     
     # AWS Bedrock
     bedrock_model_id: str = "amazon.nova-pro-v1:0"
+    # "bedrock" or "fake" (agents/fake_llm.py: scripted, deterministic, no network;
+    # benchmarks and offline runs). Fake latency per call, +- jitter, optional script.
+    llm_backend: str = "bedrock"
+    fake_llm_latency_ms: float = 0.0
+    fake_llm_jitter_ms: float = 0.0
+    fake_llm_script: str = ""
+    # Fake LLM in streaming mode: delay between emitted word chunks
+    fake_llm_token_ms: float = 0.0
+    # /stream-crew: run the LLM in streaming mode and forward chunks as `token` events
+    llm_stream_tokens: bool = True
+    # Bedrock call governor (core/governor.py), shared by every crew in the process:
+    # per-model AIMD concurrency limit (start, floor, ceiling, cut ratio on throttling),
+    # throttle retries with full-jitter exponential backoff (base doubling up to cap),
+    # max wait for a slot (0 = no limit), and optional hedging of non-streaming calls
+    # still running after the hedge quantile of recent latencies (at least min seconds)
+    bedrock_governor: bool = True
+    bedrock_initial_concurrency: int = 4
+    bedrock_min_concurrency: int = 1
+    bedrock_max_concurrency: int = 32
+    bedrock_backoff_ratio: float = 0.5
+    bedrock_max_retries: int = 6
+    bedrock_backoff_base_seconds: float = 0.5
+    bedrock_backoff_cap_seconds: float = 20.0
+    bedrock_queue_timeout_seconds: float = 0.0
+    bedrock_hedge: bool = False
+    bedrock_hedge_quantile: float = 0.95
+    bedrock_hedge_min_seconds: float = 2.0
+
+    # Crew execution: "thread" (in the API process; agents imported on the first run)
+    # or "process" (core/crew_workers.py: worker processes started with the server,
+    # each with agents imported and a crew built; runs go over a pipe and logs/tokens
+    # stream back). Workers are recycled after max runs, and replaced when a ping goes
+    # unanswered for the health timeout, startup exceeds the start timeout, or a run
+    # exceeds the run timeout (0 = none). Workers admit Bedrock calls through the
+    # server's governor (one limit for all); with STORAGE_BACKEND=memory each has
+    # its own tables.
+    crew_backend: str = "thread"
+    crew_workers: int = 2
+    crew_worker_max_runs: int = 50
+    crew_worker_health_interval_seconds: float = 5.0
+    crew_worker_health_timeout_seconds: float = 30.0
+    crew_worker_start_timeout_seconds: float = 120.0
+    # Max wait for a free worker when all are busy (0 = wait as long as it takes)
+    crew_queue_timeout_seconds: float = 0.0
+    crew_run_timeout_seconds: float = 0.0
+
+    # "dynamodb" (AWS) or "memory" (in-process stand-in: local runs, load tests)
+    storage_backend: str = "dynamodb"
 
     # Table names (prefix with store_id if you want multi-tenant)
+    # Tables of other stores (fleet runs, aws.dynamodb.store_scope): "{table}" shares
+    # the tables below; e.g. "{store_id}-{table}" gives each store its own set
+    store_table_template: str = "{table}"
     inventory_table: str = "store-inventory"
     orders_table: str = "store-orders"
     equipment_table: str = "store-equipment"
     customers_table: str = "store-customers"
     staff_schedules_table: str = "store-staff-schedules"
+    # Equipment health history (aws/health_history.py): "file" (local, one file per
+    # device under health_history_dir) or "dynamodb" (one item per device per day)
+    health_history_backend: str = "file"
+    health_history_dir: str = "data/health_history"
+    equipment_history_table: str = "store-equipment-history"
+    # Precomputed per-SKU demand forecasts (analytics/demand.py); the daily demand
+    # history they are computed from is kept in a local file
+    demand_forecast_table: str = "store-demand-forecast"
+    demand_history_path: str = "data/demand_history.npz"
+    # Event-sourced inventory (aws/inventory_log.py): when on, inventory writes append
+    # movement events and the inventory table / low-stock set are materialized from
+    # them. Log backend "file" (NDJSON segments + snapshot under inventory_log_dir)
+    # or "dynamodb" (inventory_events_table). Snapshot every N applied events; a
+    # missing sequence number is waited for this long before it is skipped, and a
+    # skipped one is still looked for (and applied if it turns up) for the retry time.
+    inventory_event_log: bool = False
+    inventory_log_backend: str = "file"
+    inventory_log_dir: str = "data/inventory_log"
+    inventory_events_table: str = "store-inventory-events"
+    inventory_log_segment_events: int = 100000
+    inventory_snapshot_every: int = 10000
+    inventory_log_gap_grace_seconds: float = 5.0
+    inventory_log_gap_retry_seconds: float = 300.0
+
+    # Bulk inventory import (aws/inventory_import.py): parallel writers (SKUs are
+    # hashed to one writer so per-SKU order holds), rows per batch write, and
+    # queued chunks per writer before the reader waits (bounds memory)
+    import_workers: int = 8
+    import_chunk_rows: int = 500
+    import_queue_chunks: int = 2
+    # Background jobs kept in memory for GET /jobs/{job_id} (core/jobs.py)
+    jobs_keep: int = 100
+    # Fleet runs (core/fleet.py): store crews in flight at once (with
+    # CREW_BACKEND=process also bounded by crew_workers), max stores per run
+    fleet_concurrency: int = 8
+    fleet_max_stores: int = 1000
+
+    # List endpoints: default page size for streamed scans, max `limit=` per page
+    scan_page_size: int = 500
+    max_page_limit: int = 1000
+
+    # Batch get endpoints: keys per BatchGetItem (max 100), parallel chunks, request cap
+    batch_get_chunk_size: int = 100
+    batch_get_concurrency: int = 8
+    batch_get_max_keys: int = 1000
+    batch_get_max_retries: int = 5
+
+    # Dashboard summary view: full-scan reconcile interval, urgent items returned
+    dashboard_reconcile_seconds: int = 300
+    dashboard_top_n: int = 10
+
+    # Maintenance: equipment below this health score needs attention
+    maintenance_health_threshold: float = 0.5
+
+    # IoT data plane: "iot" (AWS IoT Core) or "memory" (aws/iot.py keeps the last
+    # messages in process; load tests and offline runs)
+    iot_backend: str = "iot"
+    # IoT publisher: sender threads, queue bound (publish() returns False when full),
+    # messages per topic per publish (1 = no batching) and how long a batch may wait
+    iot_publish_workers: int = 4
+    iot_queue_size: int = 10000
+    iot_batch_size: int = 1
+    iot_batch_linger_ms: int = 20
+    iot_publish_max_retries: int = 3
+
+    # Telemetry ingestion (telemetry/): tumbling window length and MQTT source
+    telemetry_window_seconds: float = 5.0
+    telemetry_mqtt_host: str = "localhost"
+    telemetry_mqtt_port: int = 1883
+
+    # Maintenance forecast (analytics/maintenance_forecast.py): history window fitted,
+    # bucket size of the fitted points, cache lifetime, and how far ahead a
+    # time-to-threshold is still reported
+    forecast_window_days: float = 14.0
+    forecast_bucket_hours: float = 4.0
+    forecast_ttl_seconds: int = 300
+    forecast_horizon_days: float = 365.0
+
+    # Delivery routing (analytics/routing.py): the store is the depot vehicles leave
+    # from and return to; orders carry supplier_lat/supplier_lon. Road distance is
+    # great-circle x detour factor. Vehicle count 0 = as many as needed.
+    store_lat: float = 47.6062
+    store_lon: float = -122.3321
+    route_vehicles: int = 0
+    route_vehicle_capacity: int = 1000
+    route_speed_kmh: float = 40.0
+    route_shift_minutes: float = 600.0
+    route_service_minutes: float = 10.0
+    route_detour_factor: float = 1.3
+    route_time_budget_seconds: float = 3.0
+
+    # Demand forecasting (analytics/demand.py): days of daily demand kept, EWMA weight
+    # of the newest day, history needed before a forecast replaces the fixed reorder
+    # rule, target service level, and the EOQ cost model (order cost per purchase
+    # order, holding cost as a yearly fraction of unit cost). Item attributes
+    # lead_time_days / unit_cost override the defaults per SKU. Dirty SKUs are
+    # re-forecast at most every demand_refresh_seconds while ingesting.
+    demand_history_days: int = 90
+    demand_ewma_alpha: float = 0.1
+    demand_min_history_days: int = 7
+    demand_service_level: float = 0.95
+    demand_lead_time_days: float = 3.0
+    demand_order_cost: float = 25.0
+    demand_holding_rate: float = 0.25
+    demand_default_unit_cost: float = 10.0
+    demand_refresh_seconds: float = 300.0
+
+    # Staff scheduling (analytics/staffing.py): opening hours, allowed shift lengths,
+    # weekly hour cap when availability rows don't set max_hours_week, staff always
+    # on the floor while open, and units handled per staff-hour (turns forecast
+    # demand into headcount). Orders shape the intraday curve once there are enough
+    # timestamped samples; without forecasts or orders the default volume is used.
+    staff_open_time: str = "08:00"
+    staff_close_time: str = "22:00"
+    staff_shift_min_hours: int = 4
+    staff_shift_max_hours: int = 8
+    staff_max_hours_week: float = 40.0
+    staff_min_on_duty: int = 2
+    staff_units_per_hour: float = 60.0
+    staff_default_units_per_day: float = 2000.0
+    staff_min_order_samples: int = 200
+    staff_time_budget_seconds: float = 1.0
+
+    # Equipment anomaly detection (telemetry/anomaly.py): EWMA smoothing, z-scores to
+    # enter/leave the anomalous state, samples before z-scores count, consecutive
+    # anomalous samples needed to fire, and the absolute health band above the
+    # maintenance threshold that must be regained to clear
+    anomaly_ewma_alpha: float = 0.3
+    anomaly_z_enter: float = 3.0
+    anomaly_z_exit: float = 1.0
+    anomaly_warmup: int = 5
+    anomaly_enter_count: int = 2
+    anomaly_clear_margin: float = 0.05
+    # Targeted maintenance runs: gather anomalies for debounce seconds into one run,
+    # skip equipment handled within cooldown, cap runs per hour
+    maintenance_debounce_seconds: float = 30.0
+    maintenance_cooldown_seconds: float = 1800.0
+    maintenance_max_runs_per_hour: int = 6
 
     # Step Functions
     state_machine_name: str = "StoreOperationsWorkflow"
+    # Shared execution poller for /workflow/{execution_arn}/events (adaptive interval)
+    workflow_poll_min_seconds: float = 1.0
+    workflow_poll_max_seconds: float = 15.0
+    workflow_poll_backoff: float = 1.5
+    workflow_poll_concurrency: int = 10
+    # "stepfunctions" (AWS) or "local" (in-process ASL interpreter, workflows/local.py)
+    workflow_backend: str = "stepfunctions"
+    local_workflow_definition: str = "store_workflow.asl.json"
+    # Batch starts (POST /workflow/start-batch): max concurrent StartExecution calls,
+    # retries per execution on throttling, max executions per request
+    workflow_start_concurrency: int = 16
+    workflow_start_max_retries: int = 6
+    workflow_batch_max: int = 500
+    # Starts from scheduled triggers (cron, eventbridge) without an idempotency key are
+    # deduplicated within this window, so a retried tick doesn't launch a second run
+    workflow_schedule_window_seconds: int = 3600
 
     @property
     def llm_api_key(self) -> str:
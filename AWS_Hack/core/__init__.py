@@ -0,0 +1 @@
+"""Cross-cutting runtime helpers (metrics, request coalescing, ...)."""
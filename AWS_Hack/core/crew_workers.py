@@ -0,0 +1,596 @@
+"""
+Crew execution on warm worker processes (CREW_BACKEND=process).
+
+Importing crewai / langchain / boto3 and building the first crew takes seconds, and
+crew runs in threads hold the GIL against the API event loop. Here a fixed pool of
+long-lived processes is started with the server. Each one imports agents.crew and
+builds a crew once, then reports ready. Runs go to an idle worker over a pipe; the
+worker streams its stdout lines and LLM token chunks back while the run is in
+progress, then the result.
+
+- One run per worker at a time; callers wait for an idle worker (up to
+  crew_queue_timeout_seconds, if set).
+- Bedrock admission stays process-wide: a worker's governor forwards every acquire /
+  release to the parent's (core.governor.RemoteLimiter), so all workers share one
+  adaptive limit per model. Slots held by a worker that dies are released.
+- Workers are recycled (stopped and replaced) after crew_worker_max_runs runs.
+- A health thread pings every worker. The worker answers from its main thread while
+  the run executes on another, so a busy worker still answers. A worker that misses
+  pings for crew_worker_health_timeout_seconds, or exceeds crew_run_timeout_seconds
+  on a run, is killed and replaced; its run fails.
+- Worker start ("spawn") is used everywhere, so nothing forked inherits the API's
+  threads or sockets.
+
+This module must not import agents.* at top level: the API process stays light.
+Metrics recorded inside workers (LLM, tools, AWS) stay in the workers; governor
+state (GET /stats/bedrock, llm_governor_*) is the parent's.
+"""
+from __future__ import annotations
+
+import io
+import itertools
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+from typing import Any, Callable
+
+from config import settings
+from core.governor import governor
+from core.metrics import REGISTRY, STARTUP_LATENCY
+
+# kind -> function in agents.crew
+RUNNERS = {"store": "run_store_operations", "maintenance": "run_maintenance_for"}
+
+
+# ---------- Worker process ----------
+
+
+class _PipeWriter(io.TextIOBase):
+    """Worker stdout: complete lines go to the parent as ("log", run_id, line)."""
+
+    def __init__(self, send: Callable[[tuple], None]) -> None:
+        self._send = send
+        self._buf = ""
+        self.run_id: str | None = None
+
+    def write(self, s: str) -> int:
+        if not s:
+            return 0
+        if self.run_id is None:
+            return sys.__stdout__.write(s)
+        self._buf += s
+        if "\n" in self._buf:
+            lines, self._buf = self._buf.rsplit("\n", 1)
+            self._send(("log", self.run_id, lines + "\n"))
+        return len(s)
+
+    def flush(self) -> None:
+        if self.run_id is not None and self._buf:
+            self._send(("log", self.run_id, self._buf + "\n"))
+            self._buf = ""
+
+
+class _GovernorClient:
+    """Worker side of the governor proxy: requests over the pipe, answers via resolve()."""
+
+    def __init__(self, send: Callable[[tuple], None]) -> None:
+        self._send = send
+        self._ids = itertools.count(1)
+        self._pending: dict[int, list] = {}
+        self._lock = threading.Lock()
+
+    def request(self, method: str, args: tuple) -> Any:
+        req_id = next(self._ids)
+        slot = [threading.Event(), True, None]
+        with self._lock:
+            self._pending[req_id] = slot
+        self._send(("gov", req_id, method, args))
+        slot[0].wait()
+        if not slot[1]:
+            raise TimeoutError(slot[2]) if method == "acquire" else RuntimeError(slot[2])
+        return slot[2]
+
+    def notify(self, method: str, args: tuple) -> None:
+        self._send(("gov_note", method, args))
+
+    def resolve(self, req_id: int, ok: bool, value: Any) -> None:
+        with self._lock:
+            slot = self._pending.pop(req_id, None)
+        if slot is not None:
+            slot[1], slot[2] = ok, value
+            slot[0].set()
+
+
+def _worker_main(conn: Any) -> None:
+    """Entry point of a worker process: warm up, then serve runs until told to stop."""
+    t0 = time.perf_counter()
+    os.environ.setdefault("CREWAI_TELEMETRY_OPT_OUT", "true")
+    os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
+    send_lock = threading.Lock()
+
+    def send(msg: tuple) -> None:
+        with send_lock:
+            conn.send(msg)
+
+    gov_client = _GovernorClient(send)
+    governor().use_remote(gov_client.request, gov_client.notify)
+    try:
+        from agents import crew
+
+        # Build (not run) a crew: constructs the LLM, Bedrock client and agents once
+        sys.stdout = io.StringIO()
+        try:
+            crew.build_store_crew()
+        finally:
+            sys.stdout = sys.__stdout__
+    except Exception as e:
+        send(("failed", f"{type(e).__name__}: {e}"))
+        return
+    writer = _PipeWriter(send)
+    sys.stdout = writer
+    send(("ready", os.getpid(), time.perf_counter() - t0))
+
+    state = {"runs": 0, "busy": False}
+
+    def execute(run_id: str, kind: str, kwargs: dict[str, Any], stream: bool) -> None:
+        writer.run_id = run_id
+        try:
+            fn = getattr(crew, RUNNERS[kind])
+            if stream:
+                kwargs["on_token"] = lambda chunk, agent, task: send(("token", run_id, chunk, agent, task))
+            result = fn(**kwargs)
+            writer.flush()
+            send(("result", run_id, True, str(result) if result else ""))
+        except Exception as e:
+            writer.flush()
+            send(("result", run_id, False, str(e)))
+        finally:
+            writer.run_id = None
+            state["runs"] += 1
+            state["busy"] = False
+
+    while True:
+        try:
+            msg = conn.recv()
+        except (EOFError, OSError):
+            return
+        if msg[0] == "gov_reply":
+            gov_client.resolve(*msg[1:])
+        elif msg[0] == "ping":
+            send(("pong", state["runs"], state["busy"]))
+        elif msg[0] == "stop":
+            return
+        elif msg[0] == "run":
+            _, run_id, kind, kwargs, stream = msg
+            state["busy"] = True
+            threading.Thread(target=execute, args=(run_id, kind, kwargs, stream), daemon=True).start()
+
+
+# ---------- Parent side ----------
+
+
+class _Run:
+    __slots__ = ("run_id", "on_log", "on_token", "done", "ok", "output")
+
+    def __init__(self, run_id: str, on_log: Callable | None, on_token: Callable | None) -> None:
+        self.run_id = run_id
+        self.on_log = on_log
+        self.on_token = on_token
+        self.done = threading.Event()
+        self.ok = False
+        self.output = ""
+
+
+class _Worker:
+    def __init__(self, worker_id: int, proc: Any, conn: Any) -> None:
+        self.worker_id = worker_id
+        self.proc = proc
+        self.conn = conn
+        self.send_lock = threading.Lock()
+        self.started = time.monotonic()
+        self.ready = False
+        self.pid: int | None = None
+        self.warm_seconds: float | None = None
+        self.runs = 0
+        self.last_pong = time.monotonic()
+        self.run: _Run | None = None
+        self.run_started = 0.0
+        self.retiring = False
+        # Governor slots admitted for this worker, released if it dies holding them
+        self.gov_lock = threading.Lock()
+        self.gov_held: list[tuple[str, float]] = []
+        self.gone = False
+
+    def send(self, msg: tuple) -> None:
+        with self.send_lock:
+            self.conn.send(msg)
+
+    def info(self) -> dict[str, Any]:
+        state = "busy" if self.run else "idle" if self.ready else "starting"
+        return {
+            "worker_id": self.worker_id,
+            "pid": self.pid,
+            "state": state,
+            "runs": self.runs,
+            "warm_seconds": round(self.warm_seconds, 3) if self.warm_seconds is not None else None,
+            "age_seconds": round(time.monotonic() - self.started, 1),
+        }
+
+
+class WorkerPool:
+    """Fixed-size pool of warm crew worker processes; see module docstring."""
+
+    def __init__(
+        self,
+        size: int | None = None,
+        max_runs: int | None = None,
+        health_interval: float | None = None,
+        health_timeout: float | None = None,
+        start_timeout: float | None = None,
+        run_timeout: float | None = None,
+    ) -> None:
+        self.size = max(1, size or settings.crew_workers)
+        self.max_runs = max_runs or settings.crew_worker_max_runs
+        self.health_interval = health_interval or settings.crew_worker_health_interval_seconds
+        self.health_timeout = health_timeout or settings.crew_worker_health_timeout_seconds
+        self.start_timeout = start_timeout or settings.crew_worker_start_timeout_seconds
+        self.queue_timeout = settings.crew_queue_timeout_seconds or None
+        self.run_timeout = run_timeout if run_timeout is not None else settings.crew_run_timeout_seconds
+        self._ctx = multiprocessing.get_context("spawn")
+        self._ids = itertools.count(1)
+        self._run_ids = itertools.count(1)
+        self._workers: dict[int, _Worker] = {}
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._started = False
+        self.counts = {"runs": 0, "failed_runs": 0, "recycled": 0, "crashed": 0, "unhealthy": 0, "start_failures": 0}
+
+    # ----- lifecycle -----
+
+    def start(self, wait: bool = False) -> "WorkerPool":
+        """Spawn the workers (warm-up continues in the background unless wait)."""
+        with self._lock:
+            if self._started:
+                return self
+            self._started = True
+        for _ in range(self.size):
+            self._spawn()
+        threading.Thread(target=self._health_loop, name="crew-workers-health", daemon=True).start()
+        if wait:
+            self.wait_ready()
+        return self
+
+    def wait_ready(self, timeout: float | None = None) -> bool:
+        deadline = time.monotonic() + (timeout or self.start_timeout)
+        while time.monotonic() < deadline:
+            with self._lock:
+                if self._workers and all(w.ready for w in self._workers.values()):
+                    return True
+            time.sleep(0.05)
+        return False
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        with self._lock:
+            self._closed = True
+            workers = list(self._workers.values())
+        for w in workers:
+            self._stop(w, timeout)
+
+    def _spawn(self) -> None:
+        parent, child = self._ctx.Pipe()
+        proc = self._ctx.Process(target=_worker_main, args=(child,), name="crew-worker", daemon=True)
+        proc.start()
+        child.close()
+        w = _Worker(next(self._ids), proc, parent)
+        with self._lock:
+            self._workers[w.worker_id] = w
+        threading.Thread(target=self._reader, args=(w,), name=f"crew-worker-{w.worker_id}", daemon=True).start()
+
+    def _stop(self, w: _Worker, timeout: float = 5.0) -> None:
+        w.retiring = True
+        try:
+            w.send(("stop",))
+        except (OSError, ValueError):
+            pass
+        w.proc.join(timeout)
+        if w.proc.is_alive():
+            w.proc.kill()
+            w.proc.join(timeout)
+
+    def _kill(self, w: _Worker, reason: str) -> None:
+        """Kill a worker; its reader sees EOF, fails the run and replaces it."""
+        w.retiring = True
+        with self._lock:
+            self.counts[reason] += 1
+        print(f"[crew-workers] killing worker {w.worker_id} (pid {w.pid}): {reason}")
+        w.proc.kill()
+
+    def _reader(self, w: _Worker) -> None:
+        """Per-worker thread: dispatch messages until the pipe closes, then clean up."""
+        while True:
+            try:
+                msg = w.conn.recv()
+            except (EOFError, OSError):
+                break
+            kind = msg[0]
+            if kind == "log" or kind == "token":
+                run = w.run
+                if run is None or run.run_id != msg[1]:
+                    continue
+                try:
+                    if kind == "log" and run.on_log:
+                        run.on_log(msg[2])
+                    elif kind == "token" and run.on_token:
+                        run.on_token(*msg[2:])
+                except Exception as e:
+                    print(f"[crew-workers] {kind} callback failed: {e}")
+            elif kind == "result":
+                run = w.run
+                if run is not None and run.run_id == msg[1]:
+                    run.ok, run.output = msg[2], msg[3]
+                    w.run = None
+                    run.done.set()
+            elif kind == "gov":
+                if msg[2] == "acquire":
+                    # Blocks until admitted: answer from a thread, keep reading
+                    threading.Thread(target=self._gov_acquire, args=(w, msg[1], *msg[3]), daemon=True).start()
+                else:
+                    self._gov_request(w, msg[1], msg[2], msg[3])
+            elif kind == "gov_note":
+                self._gov_note(w, msg[1], msg[2])
+            elif kind == "pong":
+                w.last_pong = time.monotonic()
+            elif kind == "ready":
+                w.pid, w.warm_seconds = msg[1], msg[2]
+                w.ready = True
+                w.last_pong = time.monotonic()
+                STARTUP_LATENCY.labels("crew_worker").observe(w.warm_seconds)
+                print(f"[crew-workers] worker {w.worker_id} (pid {w.pid}) ready in {w.warm_seconds:.2f}s")
+                self._idle.put(w)
+            elif kind == "failed":
+                with self._lock:
+                    self.counts["start_failures"] += 1
+                print(f"[crew-workers] worker {w.worker_id} failed to start: {msg[1]}")
+                w.retiring = True
+                break
+        w.proc.join(1.0)
+        w.conn.close()
+        with w.gov_lock:
+            w.gone = True
+            held, w.gov_held = w.gov_held, []
+        for key, admitted in held:
+            governor().limiter(key).release(admitted, "error")
+        run, w.run = w.run, None
+        if run is not None:
+            run.ok, run.output = False, f"Crew worker {w.worker_id} exited (code {w.proc.exitcode}) during the run"
+            run.done.set()
+        if not w.retiring:
+            print(f"[crew-workers] worker {w.worker_id} (pid {w.pid}) exited unexpectedly (code {w.proc.exitcode})")
+            with self._lock:
+                self.counts["crashed"] += 1
+        with self._lock:
+            self._workers.pop(w.worker_id, None)
+            replace = not self._closed
+        # A worker that never got ready would likely fail again; replace it after a pause
+        if replace and not w.ready:
+            time.sleep(min(self.health_interval, 10.0))
+        if replace:
+            self._spawn()
+
+    # ----- governor proxy (see core.governor.RemoteLimiter) -----
+
+    def _gov_acquire(self, w: _Worker, req_id: int, key: str, prio: int, timeout: float | None) -> None:
+        lim = governor().limiter(key)
+        try:
+            admitted = lim.acquire(prio, timeout)
+        except TimeoutError as e:
+            self._gov_reply(w, req_id, False, str(e))
+            return
+        with w.gov_lock:
+            if w.gone:
+                lim.release(admitted, "error")
+                return
+            w.gov_held.append((key, admitted))
+        self._gov_reply(w, req_id, True, admitted)
+
+    def _gov_request(self, w: _Worker, req_id: int, method: str, args: tuple) -> None:
+        lim = governor().limiter(args[0])
+        try:
+            if method == "try_acquire":
+                value = lim.try_acquire()
+                if value is not None:
+                    with w.gov_lock:
+                        w.gov_held.append((args[0], value))
+            elif method == "hedge_delay":
+                value = lim.hedge_delay(*args[1:])
+            elif method == "stats":
+                value = lim.stats()
+            else:
+                raise ValueError(f"Unknown governor request {method!r}")
+        except Exception as e:
+            self._gov_reply(w, req_id, False, str(e))
+            return
+        self._gov_reply(w, req_id, True, value)
+
+    def _gov_note(self, w: _Worker, method: str, args: tuple) -> None:
+        lim = governor().limiter(args[0])
+        if method == "release":
+            with w.gov_lock:
+                try:
+                    w.gov_held.remove((args[0], args[1]))
+                except ValueError:
+                    return  # already released when the worker was cleaned up
+            lim.release(*args[1:])
+        elif method == "count":
+            lim.count(args[1])
+
+    @staticmethod
+    def _gov_reply(w: _Worker, req_id: int, ok: bool, value: Any) -> None:
+        try:
+            w.send(("gov_reply", req_id, ok, value))
+        except (OSError, ValueError):
+            pass  # worker gone; the reader releases what it held
+
+    def _health_loop(self) -> None:
+        while True:
+            time.sleep(self.health_interval)
+            with self._lock:
+                if self._closed:
+                    return
+                workers = list(self._workers.values())
+            now = time.monotonic()
+            for w in workers:
+                if w.retiring or not w.proc.is_alive():
+                    continue
+                if not w.ready:
+                    if now - w.started > self.start_timeout:
+                        self._kill(w, "unhealthy")
+                    continue
+                if now - w.last_pong > self.health_timeout:
+                    self._kill(w, "unhealthy")
+                    continue
+                if w.run is not None and self.run_timeout and now - w.run_started > self.run_timeout:
+                    self._kill(w, "unhealthy")
+                    continue
+                try:
+                    w.send(("ping",))
+                except (OSError, ValueError):
+                    pass
+
+    # ----- runs -----
+
+    def _checkout(self) -> _Worker:
+        """
+        Wait for an idle worker: up to queue_timeout (None: as long as it takes) while
+        workers are busy, but at most start_timeout while none of them is ready.
+        """
+        now = time.monotonic()
+        start_deadline = now + self.start_timeout
+        queue_deadline = now + self.queue_timeout if self.queue_timeout else None
+        while True:
+            now = time.monotonic()
+            with self._lock:
+                any_ready = any(w.ready and not w.retiring for w in self._workers.values())
+            if any_ready:
+                start_deadline = now + self.start_timeout
+            elif now >= start_deadline:
+                raise RuntimeError(f"No crew worker started within {self.start_timeout:g}s")
+            if queue_deadline is not None and now >= queue_deadline:
+                raise RuntimeError(f"No crew worker free within {self.queue_timeout:g}s")
+            try:
+                w = self._idle.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            # Skip workers that died or were retired while idle
+            if w.ready and not w.retiring and w.proc.is_alive():
+                return w
+
+    def run(
+        self,
+        kind: str,
+        kwargs: dict[str, Any] | None = None,
+        on_log: Callable[[str], None] | None = None,
+        on_token: Callable[[str, str | None, str | None], None] | None = None,
+    ) -> str:
+        """
+        Run a crew (kind "store" or "maintenance") on an idle worker and return its
+        output as text; raises RuntimeError if the run fails. on_log gets the worker's
+        stdout (whole lines); on_token gets LLM chunks (store runs only).
+        """
+        if kind not in RUNNERS:
+            raise ValueError(f"Unknown crew kind {kind!r}; expected one of {sorted(RUNNERS)}")
+        if self._closed:
+            raise RuntimeError("Crew worker pool is shut down")
+        self.start()
+        w = self._checkout()
+        run = _Run(f"{w.worker_id}-{next(self._run_ids)}", on_log, on_token)
+        w.run, w.run_started = run, time.monotonic()
+        try:
+            w.send(("run", run.run_id, kind, dict(kwargs or {}), on_token is not None and kind == "store"))
+        except (OSError, ValueError) as e:
+            w.run = None
+            raise RuntimeError(f"Crew worker {w.worker_id} is gone: {e}") from None
+        run.done.wait()
+        with self._lock:
+            self.counts["runs"] += 1
+            if not run.ok:
+                self.counts["failed_runs"] += 1
+        if w.proc.is_alive() and not w.retiring:
+            w.runs += 1
+            if w.runs >= self.max_runs:
+                with self._lock:
+                    self.counts["recycled"] += 1
+                # Stop in the background; the reader replaces it once the pipe closes
+                threading.Thread(target=self._stop, args=(w,), daemon=True).start()
+            else:
+                self._idle.put(w)
+        if not run.ok:
+            raise RuntimeError(run.output)
+        return run.output
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            workers = [w.info() for w in self._workers.values()]
+            counts = dict(self.counts)
+        return {
+            "size": self.size,
+            "max_runs_per_worker": self.max_runs,
+            "idle": sum(1 for w in workers if w["state"] == "idle"),
+            "busy": sum(1 for w in workers if w["state"] == "busy"),
+            "starting": sum(1 for w in workers if w["state"] == "starting"),
+            **counts,
+            "workers": workers,
+        }
+
+
+_pool: WorkerPool | None = None
+_pool_lock = threading.Lock()
+
+
+def pool() -> WorkerPool:
+    """The process-wide worker pool (created on first use; start() spawns it)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = WorkerPool()
+        return _pool
+
+
+def execute(
+    kind: str,
+    kwargs: dict[str, Any] | None = None,
+    on_log: Callable[[str], None] | None = None,
+    on_token: Callable[[str, str | None, str | None], None] | None = None,
+) -> Any:
+    """
+    Run a crew with the configured backend: a warm worker (CREW_BACKEND=process) or
+    this thread ("thread"). In-thread runs print to this process's stdout, so on_log
+    only applies to worker runs.
+    """
+    if settings.crew_backend == "process":
+        return pool().run(kind, kwargs, on_log=on_log, on_token=on_token)
+    from agents import crew
+
+    kwargs = dict(kwargs or {})
+    if on_token is not None and kind == "store":
+        kwargs["on_token"] = on_token
+    return getattr(crew, RUNNERS[kind])(**kwargs)
+
+
+def _collect():
+    if _pool is None:
+        return
+    s = _pool.stats()
+    yield ("crew_workers", "gauge", "Crew worker processes by state.",
+           [({"state": state}, s[state]) for state in ("idle", "busy", "starting")])
+    yield ("crew_worker_runs_total", "counter", "Crew runs on worker processes by outcome.",
+           [({"status": "ok"}, s["runs"] - s["failed_runs"]), ({"status": "error"}, s["failed_runs"])])
+    yield ("crew_worker_restarts_total", "counter", "Crew workers replaced, by reason.",
+           [({"reason": r}, s[r]) for r in ("recycled", "crashed", "unhealthy", "start_failures")])
+
+
+REGISTRY.register_collector(_collect)
@@ -0,0 +1,106 @@
+"""
+Fleet runs: the store operations crew for many stores, a bounded number at a time.
+
+Each store's crew goes through core.crew_workers.execute (this process's threads, or
+the warm workers with CREW_BACKEND=process) with its store_id, so its tools read and
+write that store's tables (settings.store_table_template) and its Bedrock calls
+queue at "batch" priority on the shared governor. One store failing doesn't stop
+the others; the report lists every store with its status, timing and output.
+"""
+from __future__ import annotations
+
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Iterable
+
+from config import settings
+from core.crew_workers import execute
+from core.jobs import Job
+
+
+def load_store_ids(lines: Iterable[str]) -> list[str]:
+    """Store ids from text lines: one per line or comma-separated; blanks and # comments skipped."""
+    ids = []
+    for line in lines:
+        line = line.split("#", 1)[0]
+        ids.extend(s.strip() for s in line.split(",") if s.strip())
+    return ids
+
+
+def effective_concurrency(concurrency: int | None = None) -> int:
+    """Stores in flight: the request (or settings), capped by the worker pool size."""
+    n = max(1, concurrency or settings.fleet_concurrency)
+    if settings.crew_backend == "process":
+        # More in flight than workers would only queue on checkout
+        n = min(n, max(1, settings.crew_workers))
+    return n
+
+
+def _run_store(store_id: str, trigger: str, priority: str) -> dict[str, Any]:
+    t0 = time.perf_counter()
+    try:
+        output = execute("store", {"store_id": store_id, "trigger": trigger, "priority": priority})
+        entry = {"store_id": store_id, "status": "succeeded", "output": str(output)}
+    except Exception as e:
+        print(f"Fleet run: store {store_id} failed: {e}")
+        entry = {"store_id": store_id, "status": "failed", "error": str(e)}
+    entry["seconds"] = round(time.perf_counter() - t0, 3)
+    return entry
+
+
+def _pct(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+def run_fleet(
+    store_ids: Iterable[str],
+    job: Job | None = None,
+    concurrency: int | None = None,
+    trigger: str = "fleet",
+    priority: str = "batch",
+) -> dict[str, Any]:
+    """
+    Run the store crew for each store (duplicates dropped, order kept) with up to
+    `concurrency` in flight, and return the aggregated report. Progress goes to job.
+    """
+    stores = list(dict.fromkeys(s.strip() for s in store_ids if s and s.strip()))
+    if not stores:
+        raise ValueError("No store ids given")
+    if len(stores) > settings.fleet_max_stores:
+        raise ValueError(f"{len(stores)} stores exceeds fleet_max_stores ({settings.fleet_max_stores})")
+    workers = min(effective_concurrency(concurrency), len(stores))
+    if job is not None:
+        job.update(stores=len(stores), concurrency=workers, stores_done=0, stores_failed=0)
+
+    results: dict[str, dict[str, Any]] = {}
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fleet") as pool:
+        futures = [pool.submit(_run_store, s, trigger, priority) for s in stores]
+        for fut in as_completed(futures):
+            entry = fut.result()
+            results[entry["store_id"]] = entry
+            if job is not None:
+                job.incr(stores_done=1, stores_failed=int(entry["status"] == "failed"))
+    wall = time.perf_counter() - t0
+
+    seconds = [r["seconds"] for r in results.values()]
+    failed = sum(r["status"] == "failed" for r in results.values())
+    return {
+        "stores": len(stores),
+        "succeeded": len(stores) - failed,
+        "failed": failed,
+        "concurrency": workers,
+        "backend": settings.crew_backend,
+        "wall_seconds": round(wall, 3),
+        "crew_seconds_total": round(sum(seconds), 3),
+        # Sum of the store runs over wall time: how much the concurrency bought
+        "speedup": round(sum(seconds) / wall, 2) if wall else 0.0,
+        "store_seconds": {
+            "p50": round(statistics.median(seconds), 3),
+            "p95": round(_pct(seconds, 0.95), 3),
+            "max": round(max(seconds), 3),
+        },
+        "results": [results[s] for s in stores],
+    }
@@ -0,0 +1,386 @@
+"""
+Process-wide governor for calls to a rate-limited model backend (Bedrock).
+
+Every crew in the process shares one limiter per model:
+
+- Adaptive (AIMD) concurrency limit: +1/limit per successful call while the limit is
+  in use, x backoff_ratio on throttling. Only calls that started after the last cut
+  can cut again, so one burst of throttles lowers the limit once, not N times.
+- Priority admission: waiting calls get a free slot lowest priority value first,
+  FIFO within a priority ("interactive" < "normal" < "batch"). The priority comes
+  from the caller's context (see `priority()`), so a crew run sets it once.
+- Throttled calls give their slot back, sleep with full-jitter exponential backoff
+  and queue again, up to max_retries.
+- Hedging (idempotent calls only): if a call is still running after the
+  hedge_quantile latency of recent calls (at least hedge_min_seconds), one copy is
+  sent, but only if a slot is free right now. The first to finish wins; the slower
+  one still completes and holds its slot until then.
+
+stats() and the llm_governor_* series on GET /metrics expose limit, in-flight
+calls, queue depth per priority, throttles, retries and hedges per model.
+
+Crew worker processes (core/crew_workers.py) don't keep limiters of their own: their
+governor uses RemoteLimiter, which forwards admission and outcomes to the parent's
+governor, so the limit stays one per model across the server and all its workers.
+"""
+from __future__ import annotations
+
+import heapq
+import itertools
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator
+
+from config import settings
+from core.metrics import LLM_QUEUE_WAIT, REGISTRY
+
+PRIORITIES = {"interactive": 0, "normal": 1, "batch": 2}
+
+_priority: ContextVar[str] = ContextVar("governor_priority", default="normal")
+
+
+@contextmanager
+def priority(name: str) -> Iterator[None]:
+    """Run the block's governed calls at this priority (a PRIORITIES key)."""
+    if name not in PRIORITIES:
+        raise ValueError(f"Unknown priority {name!r}; expected one of {sorted(PRIORITIES)}")
+    token = _priority.set(name)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> str:
+    return _priority.get()
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency limit with a priority wait queue, for one model."""
+
+    def __init__(self, key: str, initial: int, min_limit: int, max_limit: int, backoff_ratio: float) -> None:
+        self.key = key
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(max(initial, self.min_limit), self.max_limit))
+        self.backoff_ratio = backoff_ratio
+        self.in_flight = 0
+        self._cond = threading.Condition()
+        self._waiting: list[tuple[int, int]] = []
+        self._seq = itertools.count()
+        self._last_cut = 0.0
+        self._latencies: deque[float] = deque(maxlen=256)
+        self.counts = {"admitted": 0, "ok": 0, "throttled": 0, "error": 0, "retries": 0,
+                       "hedges": 0, "hedge_wins": 0, "timeouts": 0}
+
+    def _free(self) -> bool:
+        return self.in_flight < int(self.limit)
+
+    def acquire(self, prio: int, timeout: float | None = None) -> float:
+        """Wait for a slot; returns the admission time (pass it to release)."""
+        ticket = (prio, next(self._seq))
+        deadline = None if not timeout else time.monotonic() + timeout
+        with self._cond:
+            heapq.heappush(self._waiting, ticket)
+            while not (self._waiting[0] == ticket and self._free()):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    self._waiting.remove(ticket)
+                    heapq.heapify(self._waiting)
+                    self.counts["timeouts"] += 1
+                    self._cond.notify_all()
+                    raise TimeoutError(f"No {self.key} slot within {timeout}s (limit {int(self.limit)})")
+                self._cond.wait(remaining)
+            heapq.heappop(self._waiting)
+            self.in_flight += 1
+            self.counts["admitted"] += 1
+            # The next in line may fit too
+            self._cond.notify_all()
+            return time.monotonic()
+
+    def try_acquire(self) -> float | None:
+        """A slot only if one is free and nobody is waiting (hedges never queue)."""
+        with self._cond:
+            if self._waiting or not self._free():
+                return None
+            self.in_flight += 1
+            self.counts["admitted"] += 1
+            return time.monotonic()
+
+    def release(self, admitted: float, outcome: str, latency: float | None = None) -> None:
+        """outcome: "ok", "throttled" or "error"; latency feeds the hedge delay."""
+        with self._cond:
+            self.in_flight -= 1
+            self.counts[outcome] += 1
+            if outcome == "throttled":
+                if admitted >= self._last_cut:
+                    self.limit = max(float(self.min_limit), self.limit * self.backoff_ratio)
+                    self._last_cut = time.monotonic()
+            elif outcome == "ok":
+                if latency is not None:
+                    self._latencies.append(latency)
+                # Grow only while the limit is actually the bottleneck
+                if self.in_flight + 1 >= int(self.limit):
+                    self.limit = min(float(self.max_limit), self.limit + 1.0 / self.limit)
+            self._cond.notify_all()
+
+    def count(self, field: str) -> None:
+        with self._cond:
+            self.counts[field] += 1
+
+    def hedge_delay(self, quantile: float, floor: float) -> float | None:
+        """Latency quantile of recent successful calls; None (don't hedge) before there are any."""
+        with self._cond:
+            recent = sorted(self._latencies)
+        if not recent:
+            return None
+        if len(recent) < 20:
+            return max(floor, recent[-1] * 2)
+        return max(floor, recent[min(len(recent) - 1, int(quantile * len(recent)))])
+
+    def stats(self) -> dict[str, Any]:
+        with self._cond:
+            waiting = [prio for prio, _ in self._waiting]
+            depth = {name: waiting.count(value) for name, value in PRIORITIES.items()}
+            return {"limit": round(self.limit, 2), "in_flight": self.in_flight, "queued": depth, **self.counts}
+
+
+class RemoteLimiter:
+    """
+    AdaptiveLimiter stand-in whose state lives in another process. request(method, args)
+    sends a call and waits for its answer; notify(method, args) sends one-way.
+    """
+
+    def __init__(self, key: str, request: Callable[[str, tuple], Any], notify: Callable[[str, tuple], None]) -> None:
+        self.key = key
+        self._request = request
+        self._notify = notify
+
+    def acquire(self, prio: int, timeout: float | None = None) -> float:
+        return self._request("acquire", (self.key, prio, timeout))
+
+    def try_acquire(self) -> float | None:
+        return self._request("try_acquire", (self.key,))
+
+    def release(self, admitted: float, outcome: str, latency: float | None = None) -> None:
+        self._notify("release", (self.key, admitted, outcome, latency))
+
+    def count(self, field: str) -> None:
+        self._notify("count", (self.key, field))
+
+    def hedge_delay(self, quantile: float, floor: float) -> float | None:
+        return self._request("hedge_delay", (self.key, quantile, floor))
+
+    def stats(self) -> dict[str, Any]:
+        return self._request("stats", (self.key,))
+
+
+class Governor:
+    """One AdaptiveLimiter per key plus retry/backoff and hedging around each call."""
+
+    def __init__(
+        self,
+        initial: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 32,
+        backoff_ratio: float = 0.5,
+        max_retries: int = 6,
+        backoff_base: float = 0.5,
+        backoff_cap: float = 20.0,
+        hedge_quantile: float = 0.95,
+        hedge_min_seconds: float = 2.0,
+        queue_timeout: float | None = None,
+    ) -> None:
+        self._limiter_args = (initial, min_limit, max_limit, backoff_ratio)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_seconds = hedge_min_seconds
+        self.queue_timeout = queue_timeout
+        self._limiters: dict[str, AdaptiveLimiter | RemoteLimiter] = {}
+        self._lock = threading.Lock()
+        self._remote: tuple[Callable, Callable] | None = None
+
+    def use_remote(self, request: Callable[[str, tuple], Any], notify: Callable[[str, tuple], None]) -> None:
+        """Admit calls through another process's governor (see RemoteLimiter)."""
+        with self._lock:
+            self._remote = (request, notify)
+            self._limiters.clear()
+
+    def limiter(self, key: str) -> AdaptiveLimiter | RemoteLimiter:
+        with self._lock:
+            lim = self._limiters.get(key)
+            if lim is None:
+                if self._remote is not None:
+                    lim = RemoteLimiter(key, *self._remote)
+                else:
+                    lim = AdaptiveLimiter(key, *self._limiter_args)
+                self._limiters[key] = lim
+            return lim
+
+    def call(
+        self,
+        key: str,
+        fn: Callable[[], Any],
+        *,
+        is_throttle: Callable[[BaseException], bool],
+        hedge: bool = False,
+        priority: str | None = None,
+        wrap_result: Callable[[Any, Callable[[BaseException | None], None]], Any] | None = None,
+    ) -> Any:
+        """
+        Run fn() under key's limit, retrying throttles. With wrap_result the slot is
+        held past the return: wrap_result(result, done) must call done(error or None)
+        once the result is consumed (streaming responses). Hedging needs hedge=True
+        and no wrap_result.
+        """
+        prio_name = priority or current_priority()
+        prio = PRIORITIES.get(prio_name, PRIORITIES["normal"])
+        lim = self.limiter(key)
+        wait_hist = LLM_QUEUE_WAIT.labels(key, prio_name)
+        attempt = 0
+        while True:
+            t0 = time.perf_counter()
+            admitted = lim.acquire(prio, self.queue_timeout)
+            wait_hist.observe(time.perf_counter() - t0)
+            try:
+                if wrap_result is not None:
+                    return self._held(lim, admitted, fn, is_throttle, wrap_result)
+                if hedge:
+                    return self._hedged(lim, admitted, fn, is_throttle)
+                return self._once(lim, admitted, fn, is_throttle)
+            except Exception as e:
+                if not is_throttle(e) or attempt >= self.max_retries:
+                    raise
+            attempt += 1
+            lim.count("retries")
+            time.sleep(random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt)))
+
+    @staticmethod
+    def _outcome(error: BaseException | None, is_throttle: Callable[[BaseException], bool]) -> str:
+        if error is None:
+            return "ok"
+        return "throttled" if is_throttle(error) else "error"
+
+    def _once(self, lim: AdaptiveLimiter, admitted: float, fn: Callable[[], Any], is_throttle: Callable) -> Any:
+        t0 = time.perf_counter()
+        try:
+            result = fn()
+        except BaseException as e:
+            lim.release(admitted, self._outcome(e, is_throttle))
+            raise
+        lim.release(admitted, "ok", time.perf_counter() - t0)
+        return result
+
+    def _held(self, lim: AdaptiveLimiter, admitted: float, fn: Callable[[], Any], is_throttle: Callable,
+              wrap_result: Callable) -> Any:
+        try:
+            result = fn()
+        except BaseException as e:
+            lim.release(admitted, self._outcome(e, is_throttle))
+            raise
+        released = threading.Event()
+
+        def done(error: BaseException | None = None) -> None:
+            if not released.is_set():
+                released.set()
+                lim.release(admitted, self._outcome(error, is_throttle))
+
+        return wrap_result(result, done)
+
+    def _hedged(self, lim: AdaptiveLimiter, admitted: float, fn: Callable[[], Any], is_throttle: Callable) -> Any:
+        results: "deque[tuple[bool, Any, BaseException | None]]" = deque()
+        finished = threading.Condition()
+
+        def run(slot: float, is_hedge: bool) -> None:
+            t0 = time.perf_counter()
+            try:
+                value, error = fn(), None
+            except BaseException as e:
+                value, error = None, e
+            lim.release(slot, self._outcome(error, is_throttle), time.perf_counter() - t0 if error is None else None)
+            with finished:
+                results.append((is_hedge, value, error))
+                finished.notify_all()
+
+        threading.Thread(target=run, args=(admitted, False), daemon=True).start()
+        sent = 1
+        delay = lim.hedge_delay(self.hedge_quantile, self.hedge_min_seconds)
+        with finished:
+            finished.wait_for(lambda: results, timeout=delay)
+        if not results and delay is not None:
+            slot = lim.try_acquire()
+            if slot is not None:
+                sent = 2
+                lim.count("hedges")
+                threading.Thread(target=run, args=(slot, True), daemon=True).start()
+        with finished:
+            # First success wins; an error only counts once every copy has finished
+            finished.wait_for(lambda: any(err is None for _, _, err in results) or len(results) == sent)
+            winner = next((r for r in results if r[2] is None), results[0])
+        is_hedge, value, error = winner
+        if error is not None:
+            raise error
+        if is_hedge:
+            lim.count("hedge_wins")
+        return value
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        with self._lock:
+            limiters = [lim for lim in self._limiters.values() if isinstance(lim, AdaptiveLimiter)]
+        return {lim.key: lim.stats() for lim in limiters}
+
+
+_governor: Governor | None = None
+_governor_lock = threading.Lock()
+
+
+def governor() -> Governor:
+    """The process-wide governor, configured from settings on first use."""
+    global _governor
+    with _governor_lock:
+        if _governor is None:
+            _governor = Governor(
+                initial=settings.bedrock_initial_concurrency,
+                min_limit=settings.bedrock_min_concurrency,
+                max_limit=settings.bedrock_max_concurrency,
+                backoff_ratio=settings.bedrock_backoff_ratio,
+                max_retries=settings.bedrock_max_retries,
+                backoff_base=settings.bedrock_backoff_base_seconds,
+                backoff_cap=settings.bedrock_backoff_cap_seconds,
+                hedge_quantile=settings.bedrock_hedge_quantile,
+                hedge_min_seconds=settings.bedrock_hedge_min_seconds,
+                queue_timeout=settings.bedrock_queue_timeout_seconds or None,
+            )
+        return _governor
+
+
+def stats() -> dict[str, dict[str, Any]]:
+    return _governor.stats() if _governor is not None else {}
+
+
+def _collect():
+    models = stats()
+    yield ("llm_governor_limit", "gauge", "Adaptive concurrency limit per model.",
+           [({"model": m}, s["limit"]) for m, s in models.items()])
+    yield ("llm_governor_in_flight", "gauge", "Calls holding a slot per model.",
+           [({"model": m}, s["in_flight"]) for m, s in models.items()])
+    yield ("llm_governor_queue_depth", "gauge", "Calls waiting for a slot per model and priority.",
+           [({"model": m, "priority": p}, n) for m, s in models.items() for p, n in s["queued"].items()])
+    for field, help_text in (
+        ("throttled", "Calls throttled by the backend."),
+        ("retries", "Retries after throttling."),
+        ("hedges", "Hedged copies sent."),
+        ("hedge_wins", "Hedged copies that finished first."),
+        ("timeouts", "Calls that gave up waiting for a slot."),
+    ):
+        yield (f"llm_governor_{field}_total", "counter", help_text,
+               [({"model": m}, s[field]) for m, s in models.items()])
+
+
+REGISTRY.register_collector(_collect)
@@ -0,0 +1,119 @@
+"""
+In-process registry for long-running background jobs (bulk imports, fleet runs).
+
+A job has an id, a kind, a status (running / succeeded / failed), a progress dict
+the worker updates as it goes, and a result or error when it finishes. The last
+settings.jobs_keep jobs are kept in memory for GET /jobs/{job_id}; nothing survives
+a restart.
+"""
+from __future__ import annotations
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Callable
+
+from config import settings
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class Job:
+    def __init__(self, kind: str, params: dict[str, Any]) -> None:
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.params = params
+        self.status = "running"
+        self.created_at = _now()
+        self.finished_at: str | None = None
+        self.progress: dict[str, Any] = {}
+        self.result: Any = None
+        self.error: str | None = None
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    def update(self, **progress: Any) -> None:
+        with self._lock:
+            self.progress.update(progress)
+
+    def incr(self, **counts: int | float) -> None:
+        with self._lock:
+            for k, v in counts.items():
+                self.progress[k] = self.progress.get(k, 0) + v
+
+    def finish(self, result: Any = None, error: str | None = None) -> None:
+        with self._lock:
+            self.status = "failed" if error else "succeeded"
+            self.result, self.error = result, error
+            self.finished_at = _now()
+            self.progress["elapsed_seconds"] = round(time.perf_counter() - self._started, 2)
+        self._done.set()
+
+    def wait(self, timeout: float | None = None) -> bool:
+        return self._done.wait(timeout)
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._started
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            progress = dict(self.progress)
+            if self.status == "running":
+                progress["elapsed_seconds"] = round(self.elapsed, 2)
+            return {
+                "job_id": self.id,
+                "kind": self.kind,
+                "status": self.status,
+                "params": self.params,
+                "created_at": self.created_at,
+                "finished_at": self.finished_at,
+                "progress": progress,
+                "result": self.result,
+                "error": self.error,
+            }
+
+
+_jobs: "OrderedDict[str, Job]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def create(kind: str, **params: Any) -> Job:
+    job = Job(kind, params)
+    with _lock:
+        _jobs[job.id] = job
+        while len(_jobs) > settings.jobs_keep:
+            _jobs.popitem(last=False)
+    return job
+
+
+def get(job_id: str) -> Job | None:
+    with _lock:
+        return _jobs.get(job_id)
+
+
+def list_jobs(kind: str | None = None) -> list[dict[str, Any]]:
+    """Newest first."""
+    with _lock:
+        jobs = list(_jobs.values())
+    return [j.snapshot() for j in reversed(jobs) if kind is None or j.kind == kind]
+
+
+def start(job: Job, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> threading.Thread:
+    """Run fn in a daemon thread; its return value becomes the job result."""
+
+    def run() -> None:
+        try:
+            job.finish(result=fn(*args, **kwargs))
+        except Exception as e:
+            print(f"Job {job.kind} {job.id} failed: {e}")
+            job.finish(error=str(e))
+
+    thread = threading.Thread(target=run, name=f"job-{job.kind}", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,456 @@
+"""
+In-process metrics: counters, gauges and HDR-style latency histograms with labels,
+rendered in Prometheus text format for GET /metrics.
+
+Histograms bucket values log-linearly (32 sub-buckets per power of two, ~3% relative
+error) over integer microseconds, so an observation is a bit_length, two shifts and a
+list increment. Run benchmarks/bench_metrics.py to check the per-observation cost.
+"""
+from __future__ import annotations
+
+import functools
+import threading
+import time
+from typing import Any, Callable, Iterable, Iterator
+
+# Sub-bucket precision: 2**SUB_BITS linear buckets per power of two
+SUB_BITS = 5
+_SUB_COUNT = 1 << SUB_BITS
+_HALF = _SUB_COUNT >> 1
+# Enough buckets for values up to 2**40 µs (~12 days)
+_MAX_INDEX = _SUB_COUNT + (40 - SUB_BITS) * _HALF
+
+# Coarse `le` boundaries (seconds) exported to Prometheus; the fine buckets stay in-process
+EXPORT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0,
+)
+
+
+def _bucket_index(us: int) -> int:
+    if us < _SUB_COUNT:
+        return us if us > 0 else 0
+    shift = us.bit_length() - SUB_BITS
+    idx = _SUB_COUNT + (shift - 1) * _HALF + ((us >> shift) - _HALF)
+    return idx if idx < _MAX_INDEX else _MAX_INDEX - 1
+
+
+def _bucket_upper(idx: int) -> int:
+    """Largest microsecond value that maps to bucket idx."""
+    if idx < _SUB_COUNT:
+        return idx
+    shift = (idx - _SUB_COUNT) // _HALF + 1
+    mantissa = (idx - _SUB_COUNT) % _HALF + _HALF
+    return ((mantissa + 1) << shift) - 1
+
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self) -> None:
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.inc(-amount)
+
+
+class _HistogramChild:
+    __slots__ = ("counts", "count", "sum", "_lock")
+
+    def __init__(self) -> None:
+        self.counts = [0] * _MAX_INDEX
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        idx = _bucket_index(int(seconds * 1_000_000))
+        with self._lock:
+            self.counts[idx] += 1
+            self.count += 1
+            self.sum += seconds
+
+    def time(self) -> "_Timer":
+        """Context manager observing the elapsed wall time of its block."""
+        return _Timer(self)
+
+    def quantile(self, q: float) -> float:
+        """Approximate q-quantile (0..1) in seconds; 0.0 when empty."""
+        with self._lock:
+            total = self.count
+            counts = list(self.counts)
+        if not total:
+            return 0.0
+        rank = max(1, int(q * total + 0.5))
+        seen = 0
+        for idx, c in enumerate(counts):
+            seen += c
+            if seen >= rank:
+                return _bucket_upper(idx) / 1_000_000
+        return _bucket_upper(_MAX_INDEX - 1) / 1_000_000
+
+    def cumulative(self, bounds: Iterable[float]) -> list[int]:
+        """Cumulative counts at each `le` bound (seconds)."""
+        with self._lock:
+            counts = list(self.counts)
+        out = []
+        idx = 0
+        running = 0
+        for bound in bounds:
+            limit = int(bound * 1_000_000)
+            while idx < _MAX_INDEX and _bucket_upper(idx) <= limit:
+                running += counts[idx]
+                idx += 1
+            out.append(running)
+        return out
+
+
+class _Timer:
+    __slots__ = ("_child", "_start")
+
+    def __init__(self, child: _HistogramChild) -> None:
+        self._child = child
+
+    def __enter__(self) -> "_Timer":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._child.observe(time.perf_counter() - self._start)
+
+
+class _Family:
+    kind = ""
+    child_cls: type = _CounterChild
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple[str, ...]) -> None:
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self._children: dict[tuple[Any, ...], Any] = {}
+        # Non-string label tuples resolved to their str() child, kept out of series()
+        self._aliases: dict[tuple[Any, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: Any, **kw: Any) -> Any:
+        """Child series for these label values (positional in labelnames order, or by name)."""
+        raw = values or tuple(kw.get(n, "") for n in self.labelnames)
+        child = self._children.get(raw) or self._aliases.get(raw)
+        if child is None:
+            key = tuple(str(v) for v in raw)
+            with self._lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = self._children[key] = self.child_cls()
+                if raw != key:
+                    self._aliases[raw] = child
+        return child
+
+    def series(self) -> list[tuple[tuple[str, ...], Any]]:
+        with self._lock:
+            return list(self._children.items())
+
+
+class Counter(_Family):
+    kind = "counter"
+    child_cls = _CounterChild
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        self.labels(**labels).inc(amount)
+
+
+class Gauge(_Family):
+    kind = "gauge"
+    child_cls = _GaugeChild
+
+    def set(self, value: float, **labels: Any) -> None:
+        self.labels(**labels).set(value)
+
+
+class Histogram(_Family):
+    kind = "histogram"
+    child_cls = _HistogramChild
+
+    def observe(self, seconds: float, **labels: Any) -> None:
+        self.labels(**labels).observe(seconds)
+
+    def time(self, **labels: Any) -> _Timer:
+        return self.labels(**labels).time()
+
+
+class Registry:
+    """Named metric families plus collector callbacks evaluated at render time."""
+
+    def __init__(self) -> None:
+        self._families: dict[str, _Family] = {}
+        self._collectors: list[Callable[[], Iterable[tuple[str, str, str, list]]]] = []
+        self._lock = threading.Lock()
+
+    def _get(self, cls: type, name: str, help_text: str, labelnames: Iterable[str]) -> Any:
+        with self._lock:
+            fam = self._families.get(name)
+            if fam is None:
+                fam = self._families[name] = cls(name, help_text, tuple(labelnames))
+            elif not isinstance(fam, cls):
+                raise ValueError(f"Metric {name} already registered as {fam.kind}")
+            return fam
+
+    def counter(self, name: str, help_text: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._get(Counter, name, help_text, labelnames)
+
+    def gauge(self, name: str, help_text: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self._get(Gauge, name, help_text, labelnames)
+
+    def histogram(self, name: str, help_text: str, labelnames: Iterable[str] = ()) -> Histogram:
+        return self._get(Histogram, name, help_text, labelnames)
+
+    def register_collector(
+        self, fn: Callable[[], Iterable[tuple[str, str, str, list]]]
+    ) -> None:
+        """
+        fn() yields (name, kind, help, samples) where samples is a list of
+        (labels_dict, value). Used for values owned by other modules.
+        """
+        with self._lock:
+            self._collectors.append(fn)
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            families = sorted(self._families.values(), key=lambda f: f.name)
+            collectors = list(self._collectors)
+        lines: list[str] = []
+        for fam in families:
+            lines.extend(_render_family(fam))
+        for collect in collectors:
+            for name, kind, help_text, samples in collect():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_fmt_labels(labels)} {_fmt_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(labels: dict[str, Any]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items()) + "}"
+
+
+def _fmt_value(value: float) -> str:
+    if value == int(value):
+        return str(int(value))
+    return repr(float(value))
+
+
+def _render_family(fam: _Family) -> Iterator[str]:
+    yield f"# HELP {fam.name} {fam.help}"
+    yield f"# TYPE {fam.name} {fam.kind}"
+    for key, child in sorted(fam.series()):
+        labels = dict(zip(fam.labelnames, key))
+        if isinstance(child, _HistogramChild):
+            for bound, cum in zip(EXPORT_BUCKETS, child.cumulative(EXPORT_BUCKETS)):
+                yield f"{fam.name}_bucket{_fmt_labels({**labels, 'le': repr(bound)})} {cum}"
+            yield f"{fam.name}_bucket{_fmt_labels({**labels, 'le': '+Inf'})} {child.count}"
+            yield f"{fam.name}_sum{_fmt_labels(labels)} {_fmt_value(child.sum)}"
+            yield f"{fam.name}_count{_fmt_labels(labels)} {child.count}"
+        else:
+            yield f"{fam.name}{_fmt_labels(labels)} {_fmt_value(child.value)}"
+
+
+REGISTRY = Registry()
+
+# ---------- Standard metric families ----------
+
+HTTP_REQUESTS = REGISTRY.counter(
+    "http_requests_total", "HTTP requests by route template.", ("endpoint", "method", "status")
+)
+HTTP_LATENCY = REGISTRY.histogram(
+    "http_request_duration_seconds", "HTTP request latency until the last body byte.", ("endpoint", "method")
+)
+HTTP_RESPONSE_BYTES = REGISTRY.counter(
+    "http_response_bytes_total", "HTTP response body bytes sent.", ("endpoint",)
+)
+TOOL_CALLS = REGISTRY.counter(
+    "tool_calls_total", "Agent tool invocations.", ("tool", "status")
+)
+TOOL_LATENCY = REGISTRY.histogram(
+    "tool_duration_seconds", "Agent tool latency.", ("tool",)
+)
+AWS_CALLS = REGISTRY.counter(
+    "aws_calls_total", "AWS API calls.", ("service", "table", "operation", "status")
+)
+AWS_LATENCY = REGISTRY.histogram(
+    "aws_call_duration_seconds", "AWS API call latency.", ("service", "table", "operation")
+)
+STARTUP_LATENCY = REGISTRY.histogram(
+    "startup_duration_seconds", "Import / warm-up time of the API and crew workers.", ("component",)
+)
+CREW_LATENCY = REGISTRY.histogram(
+    "crew_duration_seconds", "Crew build and run latency.", ("operation",)
+)
+LLM_CALLS = REGISTRY.counter(
+    "llm_calls_total", "Bedrock LLM calls.", ("model", "agent", "status")
+)
+LLM_LATENCY = REGISTRY.histogram(
+    "llm_call_duration_seconds", "Bedrock LLM call latency.", ("model", "agent")
+)
+LLM_QUEUE_WAIT = REGISTRY.histogram(
+    "llm_queue_wait_seconds", "Wait for a Bedrock concurrency slot (core/governor.py).", ("model", "priority")
+)
+LLM_TOKENS = REGISTRY.counter(
+    "llm_tokens_total", "Bedrock tokens by kind (prompt/completion).", ("model", "kind")
+)
+BYTES = REGISTRY.counter(
+    "payload_bytes_total", "Bytes sent to external services.", ("service", "operation")
+)
+IOT_MESSAGES = REGISTRY.counter(
+    "iot_messages_total", "IoT messages by outcome (queued/sent/failed/dropped).", ("status",)
+)
+IOT_QUEUE_DEPTH = REGISTRY.gauge(
+    "iot_publish_queue_depth", "Messages waiting in the IoT publisher queue.", ()
+)
+IOT_PUBLISH_LATENCY = REGISTRY.histogram(
+    "iot_publish_latency_seconds", "IoT message latency from enqueue to broker ack.", ()
+)
+TELEMETRY_MESSAGES = REGISTRY.counter(
+    "telemetry_messages_total", "Ingested telemetry readings by kind and outcome.", ("kind", "status")
+)
+ANOMALY_EVENTS = REGISTRY.counter(
+    "equipment_anomaly_events_total", "Equipment anomaly state changes (fired/cleared).", ("state",)
+)
+MAINTENANCE_RUNS = REGISTRY.counter(
+    "maintenance_runs_total", "Targeted Maintenance Coordinator runs by outcome.", ("status",)
+)
+TELEMETRY_LAG = REGISTRY.histogram(
+    "telemetry_lag_seconds", "Telemetry lag from device timestamp to received / written.", ("stage",)
+)
+
+
+_aws_series: dict[tuple[str, str, str], tuple[Any, Any, Any]] = {}
+
+
+def _aws_children(service: str, operation: str, table: str) -> tuple[Any, Any, Any]:
+    key = (service, operation, table)
+    children = _aws_series.get(key)
+    if children is None:
+        children = _aws_series[key] = (
+            AWS_LATENCY.labels(service, table, operation),
+            AWS_CALLS.labels(service, table, operation, "ok"),
+            AWS_CALLS.labels(service, table, operation, "error"),
+        )
+    return children
+
+
+class observe_aws:
+    """Context manager timing one AWS call: `with observe_aws("dynamodb", "Scan", table): ...`."""
+
+    __slots__ = ("_children", "_start")
+
+    def __init__(self, service: str, operation: str, table: str = "") -> None:
+        self._children = _aws_children(service, operation, table)
+
+    def __enter__(self) -> "observe_aws":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type: Any, *exc: Any) -> None:
+        hist, ok, err = self._children
+        hist.observe(time.perf_counter() - self._start)
+        (err if exc_type else ok).inc()
+
+
+def instrument_tool(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """Decorator (apply under @tool) recording latency and outcome per agent tool."""
+    hist = TOOL_LATENCY.labels(fn.__name__)
+    ok = TOOL_CALLS.labels(fn.__name__, "ok")
+    err = TOOL_CALLS.labels(fn.__name__, "error")
+
+    @functools.wraps(fn)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            err.inc()
+            raise
+        finally:
+            hist.observe(time.perf_counter() - start)
+        ok.inc()
+        return result
+
+    return wrapper
+
+
+def timed(histogram: Histogram, **labels: Any) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Decorator observing a function's wall time into histogram{labels}."""
+    child = histogram.labels(**labels)
+
+    def deco(fn: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with child.time():
+                return fn(*args, **kwargs)
+        return wrapper
+
+    return deco
+
+
+# ---------- ASGI middleware ----------
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware: per-route latency (to the final body chunk, so streamed
+    responses count fully), status counts and response bytes. Labels use the route
+    template (/customers/{customer_id}) rather than the raw path to keep cardinality low.
+    """
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: dict, receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = 500
+        sent = 0
+
+        async def _send(message: dict) -> None:
+            nonlocal status, sent
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                sent += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            route = scope.get("route")
+            endpoint = getattr(route, "path", None) or "unmatched"
+            method = scope.get("method", "")
+            HTTP_LATENCY.labels(endpoint, method).observe(time.perf_counter() - start)
+            HTTP_REQUESTS.labels(endpoint, method, str(status)).inc()
+            HTTP_RESPONSE_BYTES.labels(endpoint).inc(sent)
+
+
+def render() -> str:
+    return REGISTRY.render()
@@ -0,0 +1,158 @@
+"""
+Single-flight request coalescing.
+
+Concurrent calls with the same key share one in-flight execution: the first caller
+runs the function, everyone who arrives before it finishes waits and receives a
+deep copy of its result, taken before the leader returns (or the exception). Nothing is cached once the call
+completes.
+"""
+from __future__ import annotations
+
+import copy
+import functools
+import inspect
+import threading
+from typing import Any, Callable, Hashable
+
+from core.metrics import REGISTRY
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """A group of keyed in-flight calls with counters for coalesced requests."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, _Call] = {}
+        self.calls = 0
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Run fn(*args, **kwargs) unless an identical call is already in flight."""
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.coalesced += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            with self._lock:
+                call.waiters -= 1
+                last = call.waiters == 0
+            # Followers copy the leader's snapshot (the last one takes it as is), so one
+            # caller's mutation can't leak to another
+            return call.result if last else copy.deepcopy(call.result)
+
+        result: Any = None
+        try:
+            result = fn(*args, **kwargs)
+            return result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                waiters = call.waiters
+            if waiters and call.error is None:
+                # Snapshot before waking followers: the leader's caller owns `result` and
+                # may change it as soon as we return
+                try:
+                    call.result = copy.deepcopy(result)
+                except Exception as e:
+                    call.error = e
+            call.done.set()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "executed": self.executed,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._calls),
+            }
+
+
+_groups: dict[str, SingleFlight] = {}
+_groups_lock = threading.Lock()
+
+
+def group(name: str) -> SingleFlight:
+    """Get or create the named single-flight group."""
+    with _groups_lock:
+        g = _groups.get(name)
+        if g is None:
+            g = _groups[name] = SingleFlight(name)
+        return g
+
+
+def _make_key(sig: inspect.Signature, args: tuple, kwargs: dict) -> Hashable:
+    """Same key however the arguments are passed (positional, keyword, defaulted)."""
+    bound = sig.bind(*args, **kwargs)
+    bound.apply_defaults()
+    key = tuple(bound.arguments.items())
+    try:
+        hash(key)
+    except TypeError:
+        return repr(key)
+    return key
+
+
+def singleflight(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """Decorator: coalesce concurrent calls to fn with identical arguments."""
+    g = group(f"{fn.__module__}.{fn.__qualname__}")
+    sig = inspect.signature(fn)
+
+    @functools.wraps(fn)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        return g.do(_make_key(sig, args, kwargs), fn, *args, **kwargs)
+
+    wrapper.singleflight = g  # type: ignore[attr-defined]
+    return wrapper
+
+
+def stats() -> dict[str, dict[str, int]]:
+    """Counters for every single-flight group, keyed by group name."""
+    with _groups_lock:
+        groups = list(_groups.values())
+    return {g.name: g.stats() for g in groups}
+
+
+def _collect():
+    groups = stats()
+    for field, kind, help_text in (
+        ("calls", "counter", "Calls through a single-flight group."),
+        ("executed", "counter", "Backend executions (calls minus coalesced)."),
+        ("coalesced", "counter", "Calls that shared another caller's in-flight result."),
+        ("in_flight", "gauge", "Keys currently in flight."),
+    ):
+        suffix = "_total" if kind == "counter" else ""
+        yield (
+            f"singleflight_{field}{suffix}",
+            kind,
+            help_text,
+            [({"function": name}, s[field]) for name, s in groups.items()],
+        )
+
+
+REGISTRY.register_collector(_collect)
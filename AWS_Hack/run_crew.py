@@ -1,5 +1,8 @@
 """Run the store operations crew (all agents) locally. Uses AWS Bedrock — no OpenAI key."""
 import os
+import time
+
+_STARTED = time.perf_counter()
 
 from dotenv import load_dotenv
 
@@ -7,6 +10,10 @@ load_dotenv()
 
 from agents.crew import run_store_operations
 
+# Import cost paid by every cold start (crewai, boto3, LLM providers); with
+# CREW_BACKEND=process the API pays it once per worker, at startup
+IMPORT_SECONDS = time.perf_counter() - _STARTED
+
 
 def main():
     if not any(
@@ -14,10 +21,14 @@ def main():
     ):
         print("Configure AWS first: run 'aws configure' or set AWS_REGION / AWS_PROFILE in .env")
         return
+    print(f"Startup: imports took {IMPORT_SECONDS:.2f}s")
     print("Starting Store Operations Crew (AWS Bedrock)...")
+    t0 = time.perf_counter()
     result = run_store_operations()
     print("\n--- Crew output ---")
     print(result)
+    print(f"\nStartup {IMPORT_SECONDS:.2f}s, crew run {time.perf_counter() - t0:.2f}s, "
+          f"total {time.perf_counter() - _STARTED:.2f}s")
 
 
 if __name__ == "__main__":
@@ -3,6 +3,9 @@ Create AWS resources for the Agentic Store Operations Platform:
 - DynamoDB tables: inventory, orders, equipment, customers, staff-schedules
 - Step Functions state machine (minimal workflow)
 - IoT policy and topic (optional; requires IoT thing)
+- Per-store copies of the tables for fleet runs (--stores, STORE_TABLE_TEMPLATE)
+- Sample data (--seed) or a synthetic large catalog (--skus/--orders/..., see
+  scripts/synthetic_data.py); --no-create seeds without touching resources
 """
 from __future__ import annotations
 
@@ -30,8 +33,9 @@ def get_client(service: str):
     return boto3.client(service, **kwargs)
 
 
-def create_dynamodb_tables():
-    """Create DynamoDB tables with minimal schema."""
+def create_dynamodb_tables(store_ids: list[str] | None = None):
+    """Create DynamoDB tables with minimal schema (plus each store's copies, see --stores)."""
+    from config import settings
     client = get_client("dynamodb")
     tables = [
         {
@@ -59,13 +63,46 @@ def create_dynamodb_tables():
             "key": "schedule_id",
             "key_type": "S",
         },
+        {
+            "name": "store-equipment-history",
+            "key": "equipment_id",
+            "key_type": "S",
+            "range": "day",
+            "range_type": "N",
+        },
+        {
+            "name": "store-inventory-events",
+            "key": "stream",
+            "key_type": "S",
+            "range": "seq",
+            "range_type": "N",
+        },
+        {
+            "name": "store-demand-forecast",
+            "key": "sku",
+            "key_type": "S",
+        },
     ]
+    for t in list(tables):
+        # The inventory event log covers the configured store only (aws.dynamodb.store_scope)
+        if t["name"] == "store-inventory-events" or settings.store_table_template == "{table}":
+            continue
+        for store_id in store_ids or []:
+            if store_id == settings.store_id:
+                continue
+            name = settings.store_table_template.format(store_id=store_id, table=t["name"])
+            tables.append({**t, "name": name})
     for t in tables:
         try:
+            key_schema = [{"AttributeName": t["key"], "KeyType": "HASH"}]
+            attributes = [{"AttributeName": t["key"], "AttributeType": t["key_type"]}]
+            if "range" in t:
+                key_schema.append({"AttributeName": t["range"], "KeyType": "RANGE"})
+                attributes.append({"AttributeName": t["range"], "AttributeType": t["range_type"]})
             client.create_table(
                 TableName=t["name"],
-                KeySchema=[{"AttributeName": t["key"], "KeyType": "HASH"}],
-                AttributeDefinitions=[{"AttributeName": t["key"], "AttributeType": t["key_type"]}],
+                KeySchema=key_schema,
+                AttributeDefinitions=attributes,
                 BillingMode="PAY_PER_REQUEST",
             )
             print(f"Created table: {t['name']}")
@@ -196,7 +233,7 @@ def seed_sample_data():
             "last_maintenance": "2024-11-01",
         },
     ]
-    table = db._resource().Table(settings.equipment_table)
+    table = db._resource().Table(db.physical_table(settings.equipment_table))
     for e in equipment:
         table.put_item(Item=e)
     print("Seeded sample equipment (2 items).")
@@ -205,7 +242,7 @@ def seed_sample_data():
         {"customer_id": "CUST-001", "loyalty_tier": "gold", "email": "gold@example.com"},
         {"customer_id": "CUST-002", "loyalty_tier": "silver", "email": "silver@example.com"},
     ]
-    cust_table = db._resource().Table(settings.customers_table)
+    cust_table = db._resource().Table(db.physical_table(settings.customers_table))
     for c in customers:
         cust_table.put_item(Item=c)
     print("Seeded sample customers (2 items).")
@@ -216,21 +253,40 @@ def main():
     parser = argparse.ArgumentParser(description="Deploy AWS resources for Store Operations")
     parser.add_argument("--no-iot", action="store_true", help="Skip IoT policy creation")
     parser.add_argument("--seed", action="store_true", help="Seed sample inventory and equipment")
+    parser.add_argument("--no-create", action="store_true", help="Skip resource creation (seed only)")
+    parser.add_argument("--stores", default="", help="Comma-separated store ids: also create (and --seed) "
+                        "their tables, named by STORE_TABLE_TEMPLATE, for scripts/run_fleet.py")
+    # Synthetic large catalog (scripts/synthetic_data.py), e.g. --skus 1000000 --orders 2000000
+    from scripts.synthetic_data import add_arguments
+    add_arguments(parser.add_argument_group("synthetic data"))
     args = parser.parse_args()
+    stores = [s.strip() for s in args.stores.split(",") if s.strip()]
 
-    print("Creating DynamoDB tables...")
-    create_dynamodb_tables()
+    if not args.no_create:
+        print("Creating DynamoDB tables...")
+        create_dynamodb_tables(stores)
 
-    print("Creating Step Functions state machine...")
-    create_step_functions_machine()
+        print("Creating Step Functions state machine...")
+        create_step_functions_machine()
 
-    if not args.no_iot:
-        print("Creating IoT policy...")
-        create_iot_policy()
+        if not args.no_iot:
+            print("Creating IoT policy...")
+            create_iot_policy()
 
     if args.seed:
         print("Seeding sample data...")
         seed_sample_data()
+        from aws.dynamodb import store_scope
+        for store_id in stores:
+            print(f"Seeding sample data for {store_id}...")
+            with store_scope(store_id):
+                seed_sample_data()
+
+    if args.skus or args.orders or args.equipment or args.customers or args.staff:
+        from scripts.synthetic_data import seed_synthetic
+        print("Seeding synthetic data...")
+        seed_synthetic(args.skus, args.orders, args.equipment, args.customers, args.staff,
+                       args.random_seed, args.workers, args.order_days)
 
     print("Done. Set OPENAI_API_KEY and run: python run_crew.py")
 
@@ -0,0 +1,69 @@
+"""
+Bulk-import inventory from a CSV (header line) or NDJSON file, streamed in 1 MB
+pieces through the same importer as POST /inventory/import (aws/inventory_import.py).
+
+Usage:
+  python scripts/import_inventory.py erp_export.csv [--format csv|ndjson] [--workers 8]
+  gzip -dc export.ndjson.gz | python scripts/import_inventory.py - --format ndjson
+
+Over HTTP instead:
+  curl -X POST -H "Content-Type: text/csv" --data-binary @erp_export.csv \\
+      "http://localhost:8000/inventory/import?wait=true"
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aws.inventory_import import detect_format, import_inventory  # noqa: E402
+from core import jobs  # noqa: E402
+
+READ_BYTES = 1 << 20
+
+
+def _read(f):
+    while True:
+        chunk = f.read(READ_BYTES)
+        if not chunk:
+            return
+        yield chunk
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-import inventory rows")
+    parser.add_argument("path", help="CSV / NDJSON file, or - for stdin")
+    parser.add_argument("--format", choices=["csv", "ndjson"], help="Default: from the file extension")
+    parser.add_argument("--workers", type=int, default=None, help="Parallel batch writers")
+    parser.add_argument("--chunk-rows", type=int, default=None, help="Rows per batch write")
+    parser.add_argument("--progress-seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    fmt = args.format or detect_format(None, args.path)
+    job = jobs.create("inventory_import", format=fmt, path=args.path)
+    f = sys.stdin.buffer if args.path == "-" else open(args.path, "rb")
+    try:
+        jobs.start(job, import_inventory, _read(f), fmt, job, workers=args.workers, chunk_rows=args.chunk_rows)
+        while not job.wait(args.progress_seconds):
+            p = job.snapshot()["progress"]
+            print(f"  {p.get('rows_read', 0):,} read, {p.get('rows_written', 0):,} written, "
+                  f"{p.get('rows_rejected', 0):,} rejected, {p.get('rows_per_second', 0):,} rows/s")
+    finally:
+        if f is not sys.stdin.buffer:
+            f.close()
+
+    snap = job.snapshot()
+    p = snap["progress"]
+    for e in p.get("errors", []):
+        print(f"  line {e['line']}: {e['error']}")
+    if snap["status"] == "failed":
+        print(f"Import failed: {snap['error']}")
+        sys.exit(1)
+    print(f"Imported {p['rows_written']:,} of {p['rows_read']:,} rows ({p['rows_rejected']:,} rejected) "
+          f"in {p['elapsed_seconds']}s ({p['rows_per_second']:,} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
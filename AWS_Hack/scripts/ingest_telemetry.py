@@ -0,0 +1,70 @@
+"""
+Run the telemetry ingestion pipeline: read store/+/inventory and store/+/equipment
+messages, aggregate over tumbling windows and write the results to DynamoDB.
+
+Usage:
+  python scripts/ingest_telemetry.py --source mqtt [--host localhost --port 1883]
+  python scripts/ingest_telemetry.py --source file --path events.ndjson [--follow]
+  Add --anomaly for targeted maintenance runs, --demand to feed the demand forecast.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analytics.demand import DemandRecorder
+from config import settings
+from telemetry.anomaly import AnomalyMonitor
+from telemetry.ingest import TelemetryIngestor
+from telemetry.sources import FileSource, MqttSource
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest IoT telemetry into DynamoDB")
+    parser.add_argument("--source", choices=("mqtt", "file"), default="mqtt")
+    parser.add_argument("--path", help="NDJSON file for --source file")
+    parser.add_argument("--follow", action="store_true", help="Keep tailing the file")
+    parser.add_argument("--host", default=settings.telemetry_mqtt_host)
+    parser.add_argument("--port", type=int, default=settings.telemetry_mqtt_port)
+    parser.add_argument("--window", type=float, default=settings.telemetry_window_seconds, help="Window seconds")
+    parser.add_argument(
+        "--anomaly", action="store_true",
+        help="Run the Maintenance Coordinator for equipment whose health degrades",
+    )
+    parser.add_argument(
+        "--demand", action="store_true",
+        help="Record inventory level drops as demand and keep the demand forecast table fresh",
+    )
+    args = parser.parse_args()
+
+    if args.source == "file":
+        if not args.path:
+            parser.error("--source file needs --path")
+        source = FileSource(args.path, follow=args.follow)
+    else:
+        source = MqttSource(args.host, args.port)
+
+    monitor = AnomalyMonitor() if args.anomaly else None
+    recorder = DemandRecorder() if args.demand else None
+    listeners = [x for x in (monitor, recorder) if x]
+    ingestor = TelemetryIngestor(window_seconds=args.window, listeners=listeners)
+    print(f"Ingesting telemetry from {args.source} (window={args.window}s, Ctrl+C to stop)...")
+    try:
+        stats = ingestor.run(source)
+    except KeyboardInterrupt:
+        ingestor.flush()
+        stats = ingestor.stats()
+    ingestor.close()
+    print("Ingestion stopped:", stats)
+    if monitor:
+        print("Anomalies:", monitor.dispatcher.stats())
+        monitor.close()
+    if recorder:
+        print("Demand forecast:", recorder.flush())
+
+
+if __name__ == "__main__":
+    main()
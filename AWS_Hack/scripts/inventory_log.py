@@ -0,0 +1,45 @@
+"""
+Maintain the event-sourced inventory (aws/inventory_log.py).
+
+Usage:
+  python scripts/inventory_log.py bootstrap     # seed an empty log from the current table
+  python scripts/inventory_log.py rebuild       # snapshot + tail replay, rewrite the table
+  python scripts/inventory_log.py snapshot      # write a snapshot now
+  python scripts/inventory_log.py tail --after 0 [--limit 20]
+"""
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aws import inventory_log
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inventory event log maintenance")
+    parser.add_argument("command", choices=("bootstrap", "rebuild", "snapshot", "tail"))
+    parser.add_argument("--after", type=int, default=0, help="tail: events after this sequence number")
+    parser.add_argument("--limit", type=int, default=20, help="tail: max events")
+    args = parser.parse_args()
+
+    ledger = inventory_log.get_ledger()
+    print("Recovered:", ledger.stats())
+    if args.command == "bootstrap":
+        print(f"Logged {inventory_log.bootstrap_from_table(ledger)} items")
+    elif args.command == "rebuild":
+        print("Rebuilt inventory table:", ledger.rebuild_table())
+    elif args.command == "snapshot":
+        ledger.snapshot()
+        print(f"Snapshot written at seq {ledger.seq}")
+    else:
+        for event in itertools.islice(ledger.log.read(args.after), args.limit):
+            print(json.dumps(event))
+
+
+if __name__ == "__main__":
+    main()
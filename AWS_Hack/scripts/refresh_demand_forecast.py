@@ -0,0 +1,34 @@
+"""
+Refresh the precomputed demand forecast table (analytics/demand.py), e.g. from cron
+when ingestion runs without --demand.
+
+Usage:
+  python scripts/refresh_demand_forecast.py [--full] [--backfill-orders]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analytics import demand
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Refresh per-SKU demand forecasts")
+    parser.add_argument("--full", action="store_true", help="Re-forecast every SKU, not just changed ones")
+    parser.add_argument(
+        "--backfill-orders", action="store_true",
+        help="Use purchase order history as demand for SKUs without level telemetry",
+    )
+    args = parser.parse_args()
+
+    if args.backfill_orders:
+        print(f"Backfilled {demand.backfill_from_orders()} orders into the demand history")
+    print("Refreshed:", demand.refresh(full=args.full))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Run the store operations crew for many stores, a bounded number at a time, through
+the same runner as POST /fleet/run (core/fleet.py). Each store uses its own tables
+when STORE_TABLE_TEMPLATE is set (e.g. "{store_id}-{table}").
+
+Usage:
+  python scripts/run_fleet.py store-001 store-002 store-003 [--concurrency 8]
+  python scripts/run_fleet.py --stores-file stores.txt --output fleet_report.json
+
+Over HTTP instead:
+  curl -X POST -H "Content-Type: application/json" \\
+      -d '{"store_ids": ["store-001", "store-002"], "concurrency": 4}' \\
+      "http://localhost:8000/fleet/run?wait=true"
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import settings  # noqa: E402
+from core import jobs  # noqa: E402
+from core.fleet import load_store_ids, run_fleet  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the store crew for a fleet of stores")
+    parser.add_argument("store_ids", nargs="*", help="Store ids (or use --stores-file)")
+    parser.add_argument("--stores-file", help="One store id per line (# comments allowed), or - for stdin")
+    parser.add_argument("--concurrency", type=int, default=None, help="Stores in flight (default: FLEET_CONCURRENCY)")
+    parser.add_argument("--trigger", default="fleet")
+    parser.add_argument("--output", help="Write the full report (with crew outputs) as JSON")
+    parser.add_argument("--progress-seconds", type=float, default=10.0)
+    args = parser.parse_args()
+
+    store_ids = list(args.store_ids)
+    if args.stores_file:
+        f = sys.stdin if args.stores_file == "-" else open(args.stores_file)
+        with f:
+            store_ids += load_store_ids(f)
+    if not store_ids:
+        parser.error("give store ids or --stores-file")
+
+    job = jobs.create("fleet_run", stores=len(store_ids), concurrency=args.concurrency)
+    try:
+        jobs.start(job, run_fleet, store_ids, job, concurrency=args.concurrency, trigger=args.trigger)
+        while not job.wait(args.progress_seconds):
+            p = job.snapshot()["progress"]
+            print(f"  {p.get('stores_done', 0)}/{p.get('stores', len(store_ids))} stores done, "
+                  f"{p.get('stores_failed', 0)} failed, {p['elapsed_seconds']}s")
+    finally:
+        if settings.crew_backend == "process":
+            from core.crew_workers import pool
+            pool().shutdown()
+
+    snap = job.snapshot()
+    if snap["status"] == "failed":
+        print(f"Fleet run failed: {snap['error']}")
+        sys.exit(1)
+    report = snap["result"]
+    for r in report["results"]:
+        detail = "" if r["status"] == "succeeded" else f"  {r['error']}"
+        print(f"  {r['store_id']:<24} {r['status']:<10} {r['seconds']:8.2f}s{detail}")
+    s = report["store_seconds"]
+    print(f"{report['succeeded']} of {report['stores']} stores succeeded in {report['wall_seconds']}s "
+          f"(concurrency {report['concurrency']}, {report['backend']}; per store p50 {s['p50']}s, "
+          f"p95 {s['p95']}s, max {s['max']}s; speedup {report['speedup']}x)")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+    if report["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
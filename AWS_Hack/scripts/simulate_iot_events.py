@@ -1,39 +1,263 @@
 """
-Simulate IoT events (inventory level updates, equipment telemetry) by publishing
-to AWS IoT Core. Requires an IoT thing and policy that allows publish to store/<store_id>/*.
+IoT load generator: publishes inventory and equipment telemetry for a fleet of
+stores at a fixed target rate and reports achieved throughput and latency.
+
+Traffic model:
+- equipment: each device's health drifts down slowly with noise; a fraction
+  degrade fast (the curves the anomaly detector should catch) and get "repaired"
+  back to full health once they hit the floor
+- inventory: per-SKU sales with periodic store-wide bursts, restocked when a SKU
+  falls below its reorder threshold
+
+The rate controller is open-loop: message i is due at start + i/rate whatever
+happened to earlier messages, and latency is measured from that due time, so a
+stalled publisher shows up as latency instead of quietly lowering the load.
+
+Targets:
+  iot    AWS IoT Core via aws.iot.IoTPublisher (needs a publish policy on store/<id>/*)
+  queue  in-process TelemetryIngestor on the memory backend (end-to-end ingest lag)
+  null   discard after --send-latency-ms (generator + publisher overhead)
+  file   NDJSON for telemetry.sources.FileSource replay (--path)
+
+Usage:
+  python scripts/simulate_iot_events.py --stores 10 --devices 50 --skus 500 --rate 2000 --duration 30 --target null
 """
 from __future__ import annotations
 
+import argparse
+import json
+import math
 import os
 import random
 import sys
+import threading
 import time
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from aws.iot import publish_inventory_event, publish_equipment_telemetry
-from config import settings
+from aws.iot import IoTPublisher
+from core.metrics import Registry
+
+
+# ---------- Traffic model ----------
+
+
+class Fleet:
+    def __init__(self, stores: int, devices: int, skus: int, degrade_fraction: float, burst_every: float, seed: int) -> None:
+        self.rng = random.Random(seed)
+        rng = self.rng
+        self.store_ids = [f"store-{i + 1:03d}" for i in range(stores)]
+        # [store_id, equipment_id, health, decay per second, last update t]
+        self.devices = [
+            [s, f"EQ-{d + 1:03d}", rng.uniform(0.85, 1.0),
+             rng.uniform(0.01, 0.03) if rng.random() < degrade_fraction else rng.uniform(0.0001, 0.0005), 0.0]
+            for s in self.store_ids
+            for d in range(devices)
+        ]
+        # [store_id, sku, quantity, reorder_threshold, sales per second, last update t]
+        self.skus = [
+            [s, f"SKU-{k + 1:03d}", rng.randint(40, 200), 10, rng.uniform(0.05, 0.5), 0.0]
+            for s in self.store_ids
+            for k in range(skus)
+        ]
+        self.burst_every = burst_every
+        self._d = 0
+        self._k = 0
+
+    def burst_factor(self, t: float) -> float:
+        """Sales multiplier: a 10-second rush every burst_every seconds."""
+        if self.burst_every <= 0:
+            return 1.0
+        return 5.0 if t % self.burst_every < 10 else 1.0
+
+    def equipment(self, t: float) -> tuple[str, dict]:
+        dev = self.devices[self._d]
+        self._d = (self._d + 1) % len(self.devices)
+        store_id, eid, health, decay, last_t = dev
+        health = max(0.05, health - decay * (t - last_t) + self.rng.gauss(0, 0.01))
+        if health <= 0.1:
+            health = self.rng.uniform(0.9, 1.0)  # repaired
+        dev[2] = health
+        dev[4] = t
+        temp = 18 + (1 - health) * 12 + self.rng.gauss(0, 0.5)
+        return f"store/{store_id}/equipment", {
+            "equipment_id": eid,
+            "health_score": round(min(1.0, health), 3),
+            "metrics": {"temp": round(temp, 1)},
+        }
+
+    def inventory(self, t: float) -> tuple[str, dict]:
+        row = self.skus[self._k]
+        self._k = (self._k + 1) % len(self.skus)
+        store_id, sku, qty, threshold, rate, last_t = row
+        sold = _poisson(self.rng, rate * (t - last_t) * self.burst_factor(t))
+        qty = max(0, qty - sold)
+        event = "sale" if sold else "level_update"
+        if qty < threshold:
+            qty += threshold * 8
+            event = "restock"
+        row[2] = qty
+        row[5] = t
+        return f"store/{store_id}/inventory", {"sku": sku, "quantity": qty, "event": event}
+
+
+def _poisson(rng: random.Random, lam: float) -> int:
+    if lam <= 0:
+        return 0
+    if lam > 30:
+        return max(0, int(rng.gauss(lam, math.sqrt(lam)) + 0.5))
+    limit, k, p = math.exp(-lam), 0, 1.0
+    while True:
+        p *= rng.random()
+        if p <= limit:
+            return k
+        k += 1
+
+
+# ---------- Targets ----------
+
+
+def _null_sender(latency_ms: float):
+    delay = latency_ms / 1000
+
+    def send(topic: str, body: str) -> None:
+        if delay:
+            time.sleep(delay)
+
+    return send
+
+
+def _file_sender(path: str):
+    f = open(path, "w", encoding="utf-8")
+    lock = threading.Lock()
+
+    def send(topic: str, body: str) -> None:
+        line = json.dumps({"topic": topic, "payload": json.loads(body)}) + "\n"
+        with lock:
+            f.write(line)
+
+    return send, f
+
+
+# ---------- Run ----------
+
+
+def run(args) -> dict:
+    fleet = Fleet(args.stores, args.devices, args.skus, args.degrade_fraction, args.burst_every, args.seed)
+    registry = Registry()
+    latency = registry.histogram("loadgen_latency_seconds", "Due time to ack.").labels()
+    schedule_lag = registry.histogram("loadgen_schedule_lag_seconds", "How late the generator was.").labels()
+
+    ingestor = source = ingest_thread = closer = None
+    if args.target == "queue":
+        from telemetry.ingest import TelemetryIngestor
+        from telemetry.sources import QueueSource, queue_sender
+
+        source = QueueSource(idle_seconds=0.1)
+        send = queue_sender(source)
+        # Ingest-only: aggregation and lag, no DynamoDB writes
+        ingestor = TelemetryIngestor(window_seconds=args.window, writer=lambda w: None)
+        ingest_thread = threading.Thread(target=ingestor.run, args=(source,), daemon=True)
+        ingest_thread.start()
+    elif args.target == "null":
+        send = _null_sender(args.send_latency_ms)
+    elif args.target == "file":
+        if not args.path:
+            raise SystemExit("--target file needs --path")
+        send, closer = _file_sender(args.path)
+    else:
+        send = None  # IoT Core
+
+    publisher = IoTPublisher(
+        send=send,
+        workers=args.workers,
+        queue_size=args.queue_size,
+        batch_size=args.batch_size,
+        linger_ms=args.linger_ms,
+        latency=latency,
+    )
+
+    total = int(args.rate * args.duration)
+    interval = 1.0 / args.rate
+    start = time.perf_counter()
+    wall0 = time.time()
+    next_report = start + 5
+    for i in range(total):
+        due = start + i * interval
+        now = time.perf_counter()
+        if due - now > 0.001:
+            time.sleep(due - now)
+        else:
+            schedule_lag.observe(max(0.0, now - due))
+        t = due - start
+        topic, payload = (
+            fleet.equipment(t) if fleet.rng.random() < args.equipment_share else fleet.inventory(t)
+        )
+        payload["ts"] = wall0 + t
+        publisher.publish(topic, payload, enqueued_at=due)
+        if now >= next_report:
+            s = publisher.stats()
+            print(f"  t={now - start:5.1f}s sent={s['sent']} dropped={s['dropped']} queue={s['queue_depth']}")
+            next_report += 5
+    gen_elapsed = time.perf_counter() - start
+    publisher.close()
+    elapsed = time.perf_counter() - start
+    if closer:
+        closer.close()
+
+    stats = publisher.stats()
+    report = {
+        "target": args.target,
+        "offered_rate": args.rate,
+        "messages": total,
+        "generated_rate": round(total / gen_elapsed, 1),
+        "achieved_rate": round(stats["sent"] / elapsed, 1),
+        "sent": stats["sent"],
+        "dropped": stats["dropped"],
+        "failed": stats["failed"],
+        "latency_ms": {f"p{q * 100:g}": round(latency.quantile(q) * 1000, 3) for q in (0.5, 0.9, 0.99, 0.999)},
+        "schedule_lag_ms_p99": round(schedule_lag.quantile(0.99) * 1000, 3),
+    }
+    if ingestor is not None:
+        source.close()
+        ingest_thread.join()
+        report["ingest"] = ingestor.stats()
+        ingestor.close()
+    return report
 
 
 def main():
-    print("Simulating IoT events (Ctrl+C to stop)...")
-    equipment_ids = ["EQ-001", "EQ-002"]
-    skus = ["SKU-001", "SKU-002", "SKU-003"]
-    for i in range(10):
-        # Random inventory level update
-        sku = random.choice(skus)
-        qty = random.randint(1, 50)
-        ok = publish_inventory_event(sku, qty, "level_update")
-        print(f"Inventory event: {sku} -> {qty}  (published={ok})")
-
-        # Random equipment telemetry
-        eid = random.choice(equipment_ids)
-        health = round(random.uniform(0.2, 1.0), 2)
-        ok = publish_equipment_telemetry(eid, health, {"temp": random.randint(18, 28)})
-        print(f"Equipment event: {eid} health={health}  (published={ok})")
-
-        time.sleep(2)
-    print("Simulation done.")
+    parser = argparse.ArgumentParser(description="IoT telemetry load generator")
+    parser.add_argument("--stores", type=int, default=1)
+    parser.add_argument("--devices", type=int, default=20, help="Equipment per store")
+    parser.add_argument("--skus", type=int, default=100, help="SKUs per store")
+    parser.add_argument("--rate", type=float, default=100, help="Target messages per second (all stores)")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds")
+    parser.add_argument("--equipment-share", type=float, default=0.5, help="Fraction of messages that are equipment telemetry")
+    parser.add_argument("--degrade-fraction", type=float, default=0.05, help="Fraction of devices that degrade fast")
+    parser.add_argument("--burst-every", type=float, default=60, help="Seconds between sales bursts (0 = none)")
+    parser.add_argument("--target", choices=("iot", "queue", "null", "file"), default="iot")
+    parser.add_argument("--path", help="Output file for --target file")
+    parser.add_argument("--send-latency-ms", type=float, default=0.0, help="Simulated broker round trip for --target null")
+    parser.add_argument("--workers", type=int, default=8, help="Publisher sender threads")
+    parser.add_argument("--batch-size", type=int, default=1, help="Messages per topic per publish")
+    parser.add_argument("--linger-ms", type=int, default=5)
+    parser.add_argument("--queue-size", type=int, default=100_000)
+    parser.add_argument("--window", type=float, default=1.0, help="Ingest window for --target queue")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON only")
+    args = parser.parse_args()
+
+    if not args.json:
+        print(f"Load: {args.rate:g} msg/s for {args.duration:g}s -> {args.target} "
+              f"({args.stores} stores x {args.devices} devices, {args.skus} SKUs)")
+    report = run(args)
+    if args.json:
+        print(json.dumps(report))
+        return
+    print("Report:")
+    for key, value in report.items():
+        print(f"  {key}: {value}")
 
 
 if __name__ == "__main__":
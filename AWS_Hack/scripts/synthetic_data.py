@@ -0,0 +1,335 @@
+"""
+Synthetic large-catalog generator: millions of SKUs, orders, equipment, customers
+and staff availability rows with realistic shapes, streamed to DynamoDB (or the
+in-process backend with STORAGE_BACKEND=memory).
+
+Distributions
+- Inventory: categories and SKU popularity are Zipf-like; prices log-normal; stock
+  is a few weeks of demand with ~8% of SKUs at or below their reorder threshold.
+- Orders: SKUs drawn by popularity, created_at over the last N days with weekday
+  and lunch/evening peaks, mostly delivered with a pending tail; supplier
+  coordinates around the store.
+- Equipment: health scores Beta(5, 2) (a few degraded units), last maintenance in
+  the past year. Customers: 70% bronze / 22% silver / 8% gold.
+- Staff: availability for mon..sun with ~30% days off (analytics/staffing.py).
+
+Rows are generated in fixed-size chunks, each seeded from (seed, entity, chunk
+index), so the output depends only on the seed and counts, not on worker count.
+Chunks are written by a thread pool through aws/dynamodb.py (store table routing,
+the dashboard view, and the inventory event log for SKUs when it is on).
+
+Usage:
+  python scripts/synthetic_data.py --skus 1000000 --orders 2000000 --equipment 5000 \
+      --customers 500000 --staff 300 --random-seed 42 --workers 16
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Any, Callable, Iterator
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+from config import settings  # noqa: E402
+
+CHUNK = 5000
+CATEGORIES = [f"category-{i:02d}" for i in range(50)]
+SUPPLIERS = 200
+EQUIPMENT_TYPES = ["freezer", "chiller", "hvac", "oven", "pos", "conveyor", "forklift", "scale"]
+DAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+_ENTITY_IDS = {"inventory": 1, "orders": 2, "equipment": 3, "customers": 4, "staff": 5}
+
+
+def _rng(seed: int, entity: str, chunk: int) -> np.random.Generator:
+    return np.random.default_rng([seed, _ENTITY_IDS[entity], chunk])
+
+
+def _money(x: float) -> Decimal:
+    return Decimal(f"{x:.2f}")
+
+
+def _suppliers(seed: int) -> tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng([seed, 0])
+    return (
+        settings.store_lat + rng.normal(0, 0.3, SUPPLIERS),
+        settings.store_lon + rng.normal(0, 0.4, SUPPLIERS),
+    )
+
+
+def _popularity(n: int, seed: int) -> np.ndarray:
+    """Cumulative Zipf(1.1) weights over SKU ranks, shuffled so SKU-0000001 isn't the bestseller."""
+    w = 1.0 / np.arange(1, n + 1) ** 1.1
+    np.random.default_rng([seed, 9]).shuffle(w)
+    c = np.cumsum(w)
+    return c / c[-1]
+
+
+# ---------- Generators (one chunk of rows each) ----------
+
+
+def inventory_chunk(seed: int, chunk: int, start: int, count: int) -> list[dict[str, Any]]:
+    rng = _rng(seed, "inventory", chunk)
+    idx = np.arange(start, start + count)
+    cat = np.minimum(rng.zipf(1.3, count) - 1, len(CATEGORIES) - 1)
+    price = np.round(np.exp(rng.normal(2.3, 0.9, count)), 2)
+    cost = np.round(price * rng.uniform(0.4, 0.75, count), 2)
+    daily = rng.gamma(0.8, 6.0, count)
+    lead = rng.integers(1, 10, count)
+    threshold = np.maximum(1, np.ceil(daily * lead)).astype(int)
+    low = rng.random(count) < 0.08
+    weeks = rng.uniform(1.5, 6.0, count)
+    quantity = np.where(
+        low,
+        rng.integers(0, threshold + 1),
+        threshold + np.ceil(daily * 7 * weeks).astype(int),
+    )
+    supplier = rng.integers(0, SUPPLIERS, count)
+    lat, lon = _suppliers(seed)
+    return [
+        {
+            "sku": f"SKU-{idx[i]:07d}",
+            "name": f"Item {idx[i]:07d}",
+            "category": CATEGORIES[cat[i]],
+            "quantity": int(quantity[i]),
+            "reorder_threshold": int(threshold[i]),
+            "unit_price": _money(price[i]),
+            "unit_cost": _money(cost[i]),
+            "lead_time_days": int(lead[i]),
+            "supplier_id": f"SUP-{supplier[i]:03d}",
+            "supplier_lat": Decimal(f"{lat[supplier[i]]:.5f}"),
+            "supplier_lon": Decimal(f"{lon[supplier[i]]:.5f}"),
+        }
+        for i in range(count)
+    ]
+
+
+def orders_chunk(
+    seed: int, chunk: int, start: int, count: int, skus: int, days: int = 90,
+    popularity: np.ndarray | None = None,
+) -> list[dict[str, Any]]:
+    rng = _rng(seed, "orders", chunk)
+    popularity = _popularity(skus, seed) if popularity is None else popularity
+    sku = np.searchsorted(popularity, rng.random(count))
+    # Day offsets weighted by weekday (weekends busier), hours by a two-peak day
+    base = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0) - timedelta(days=1)
+    weekday_w = np.array([1.0, 1.0, 1.0, 1.0, 1.15, 1.3, 1.2])
+    day_w = weekday_w[(base.weekday() - np.arange(days)) % 7]
+    day = rng.choice(days, count, p=day_w / day_w.sum())
+    hours = np.arange(24)
+    hour_w = np.where((hours >= 8) & (hours < 22), 1.0, 0.05) + 0.8 * np.exp(-((hours - 12.5) / 1.2) ** 2) \
+        + np.exp(-((hours - 17.5) / 1.5) ** 2)
+    hour = rng.choice(24, count, p=hour_w / hour_w.sum())
+    minute = rng.integers(0, 60, count)
+    status = rng.choice(["delivered", "pending", "cancelled"], count, p=[0.78, 0.2, 0.02])
+    quantity = np.maximum(1, rng.negative_binomial(2, 0.08, count))
+    lat, lon = _suppliers(seed)
+    supplier = sku % SUPPLIERS
+    return [
+        {
+            "order_id": f"PO-{start + i:08d}",
+            "sku": f"SKU-{sku[i]:07d}",
+            "quantity": int(quantity[i]),
+            "status": str(status[i]),
+            "created_at": (base - timedelta(days=int(day[i]))).replace(hour=int(hour[i]), minute=int(minute[i])).isoformat(),
+            "supplier_lat": Decimal(f"{lat[supplier[i]]:.5f}"),
+            "supplier_lon": Decimal(f"{lon[supplier[i]]:.5f}"),
+        }
+        for i in range(count)
+    ]
+
+
+def equipment_chunk(seed: int, chunk: int, start: int, count: int) -> list[dict[str, Any]]:
+    rng = _rng(seed, "equipment", chunk)
+    health = rng.beta(5, 2, count)
+    kind = rng.integers(0, len(EQUIPMENT_TYPES), count)
+    since = rng.integers(0, 365, count)
+    today = datetime.now(timezone.utc).date()
+    return [
+        {
+            "equipment_id": f"EQ-{start + i:06d}",
+            "type": EQUIPMENT_TYPES[kind[i]],
+            "health_score": Decimal(f"{health[i]:.3f}"),
+            "last_maintenance": (today - timedelta(days=int(since[i]))).isoformat(),
+        }
+        for i in range(count)
+    ]
+
+
+def customers_chunk(seed: int, chunk: int, start: int, count: int) -> list[dict[str, Any]]:
+    rng = _rng(seed, "customers", chunk)
+    tier = rng.choice(["bronze", "silver", "gold"], count, p=[0.70, 0.22, 0.08])
+    spend = np.exp(rng.normal(5.5, 1.1, count)) * np.select([tier == "gold", tier == "silver"], [4.0, 2.0], 1.0)
+    return [
+        {
+            "customer_id": f"CUST-{start + i:08d}",
+            "loyalty_tier": str(tier[i]),
+            "email": f"customer{start + i}@example.com",
+            "total_spend": _money(spend[i]),
+        }
+        for i in range(count)
+    ]
+
+
+def staff_chunk(seed: int, chunk: int, start: int, count: int) -> list[dict[str, Any]]:
+    rng = _rng(seed, "staff", chunk)
+    rows = []
+    for i in range(start, start + count):
+        max_hours = int(rng.choice([16, 24, 32, 40], p=[0.15, 0.2, 0.25, 0.4]))
+        for day in DAYS:
+            if rng.random() < 0.3:
+                continue
+            begin, end = int(rng.integers(6, 15)), int(rng.integers(16, 24))
+            rows.append({
+                "schedule_id": f"avail#S{i:05d}#{day}",
+                "kind": "availability",
+                "staff_id": f"S{i:05d}",
+                "schedule_day": day,
+                "start": f"{begin:02d}:00",
+                "end": f"{end:02d}:00",
+                "max_hours_week": max_hours,
+            })
+    return rows
+
+
+# ---------- Parallel writer ----------
+
+
+def _chunks(total: int) -> Iterator[tuple[int, int, int]]:
+    for chunk, start in enumerate(range(0, total, CHUNK)):
+        yield chunk, start, min(CHUNK, total - start)
+
+
+def _write_orders(rows: list[dict[str, Any]]) -> None:
+    from aws.dashboard_view import VIEW as dashboard_view
+    from aws import dynamodb as db
+
+    db.batch_write(settings.orders_table, rows)
+    if db.current_store() is None:
+        for row in rows:
+            dashboard_view.on_order(row["order_id"], row["status"], row["quantity"])
+
+
+def _write_equipment(rows: list[dict[str, Any]]) -> None:
+    from aws.dashboard_view import VIEW as dashboard_view
+    from aws import dynamodb as db
+
+    db.batch_write(settings.equipment_table, rows)
+    if db.current_store() is None:
+        for row in rows:
+            dashboard_view.on_equipment(row["equipment_id"], float(row["health_score"]))
+
+
+def write_table(
+    table_name: str,
+    total: int,
+    make_chunk: Callable[[int, int, int], list[dict[str, Any]]],
+    workers: int = 16,
+    progress_seconds: float = 5.0,
+    write: Callable[[list[dict[str, Any]]], None] | None = None,
+) -> dict[str, Any]:
+    """
+    Generate and write `total` entities chunk by chunk across `workers` threads.
+    Each chunk goes to `write` (default: db.batch_write to the store's table).
+    """
+    from aws import dynamodb as db
+
+    if write is None:
+        def write(rows: list[dict[str, Any]]) -> None:
+            db.batch_write(table_name, rows)
+
+    written = 0
+    lock = threading.Lock()
+    t0 = time.perf_counter()
+    last_report = [t0]
+
+    def work(chunk: int, start: int, count: int) -> None:
+        nonlocal written
+        rows = make_chunk(chunk, start, count)
+        # Resources are per thread (aws/dynamodb.py); batch_write retries unprocessed items
+        write(rows)
+        with lock:
+            written += len(rows)
+            now = time.perf_counter()
+            if now - last_report[0] >= progress_seconds:
+                last_report[0] = now
+                print(f"  {table_name}: {written:,} rows, {written / (now - t0):,.0f}/s")
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for f in [pool.submit(work, *c) for c in _chunks(total)]:
+            f.result()
+    elapsed = time.perf_counter() - t0
+    rate = written / elapsed if elapsed else 0.0
+    print(f"{table_name}: {written:,} rows in {elapsed:.1f}s ({rate:,.0f} rows/s)")
+    return {"table": table_name, "rows": written, "seconds": round(elapsed, 2), "rows_per_second": round(rate)}
+
+
+def seed_synthetic(
+    skus: int = 0,
+    orders: int = 0,
+    equipment: int = 0,
+    customers: int = 0,
+    staff: int = 0,
+    seed: int = 42,
+    workers: int = 16,
+    order_days: int = 90,
+) -> list[dict[str, Any]]:
+    """Write the requested number of rows per entity; returns per-table throughput."""
+    from aws import dynamodb as db
+
+    results = []
+    if skus:
+        # Through the event log when it is on, so the ledger knows the new SKUs
+        results.append(write_table(settings.inventory_table, skus,
+                                   lambda c, s, n: inventory_chunk(seed, c, s, n), workers,
+                                   write=db.batch_put_inventory))
+    if orders:
+        popularity = _popularity(max(skus, 1), seed)
+        results.append(write_table(settings.orders_table, orders,
+                                   lambda c, s, n: orders_chunk(seed, c, s, n, max(skus, 1), order_days, popularity),
+                                   workers, write=_write_orders))
+    if equipment:
+        results.append(write_table(settings.equipment_table, equipment,
+                                   lambda c, s, n: equipment_chunk(seed, c, s, n), workers,
+                                   write=_write_equipment))
+    if customers:
+        results.append(write_table(settings.customers_table, customers,
+                                   lambda c, s, n: customers_chunk(seed, c, s, n), workers))
+    if staff:
+        results.append(write_table(settings.staff_schedules_table, staff,
+                                   lambda c, s, n: staff_chunk(seed, c, s, n), workers))
+    rows = sum(r["rows"] for r in results)
+    seconds = sum(r["seconds"] for r in results)
+    if rows:
+        print(f"Total: {rows:,} rows in {seconds:.1f}s ({rows / max(seconds, 1e-9):,.0f} rows/s)")
+    return results
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--skus", type=int, default=0)
+    parser.add_argument("--orders", type=int, default=0)
+    parser.add_argument("--equipment", type=int, default=0)
+    parser.add_argument("--customers", type=int, default=0)
+    parser.add_argument("--staff", type=int, default=0, help="Staff members (availability rows)")
+    parser.add_argument("--random-seed", type=int, default=42, help="Random seed")
+    parser.add_argument("--workers", type=int, default=16, help="Parallel batch writers")
+    parser.add_argument("--order-days", type=int, default=90, help="Spread orders over this many days")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate and write a synthetic store catalog")
+    add_arguments(parser)
+    args = parser.parse_args()
+    seed_synthetic(args.skus, args.orders, args.equipment, args.customers, args.staff,
+                   args.random_seed, args.workers, args.order_days)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""IoT telemetry ingestion: sources, windowed aggregation and DynamoDB writes."""
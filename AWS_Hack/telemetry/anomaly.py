@@ -0,0 +1,239 @@
+"""
+Online equipment anomaly detection and targeted maintenance runs.
+
+EwmaDetector keeps an exponentially weighted mean/variance of health_score per
+equipment_id and flags a sample when it is z_enter standard deviations below the
+baseline, or below maintenance_health_threshold. Hysteresis keeps it from flapping:
+firing needs `enter_count` consecutive anomalous samples, the baseline is frozen
+while the equipment is anomalous, and it only clears once health is back within
+z_exit of the baseline and above the threshold plus a margin.
+
+MaintenanceDispatcher turns fired equipment into Maintenance Coordinator runs for
+just those IDs: anomalies are gathered for a debounce period into one run, equipment
+handled recently is skipped, and runs per hour are capped. AnomalyMonitor wires both
+into TelemetryIngestor as a window listener.
+"""
+from __future__ import annotations
+
+import math
+import threading
+import time
+from collections import deque
+from typing import Any, Callable
+
+from config import settings
+from core.metrics import ANOMALY_EVENTS, MAINTENANCE_RUNS
+
+# Floor for the standard deviation so a perfectly flat signal doesn't turn noise into z=inf
+_MIN_STD = 0.01
+
+
+class _Series:
+    __slots__ = ("mean", "var", "n", "streak", "active")
+
+    def __init__(self, value: float) -> None:
+        self.mean = value
+        self.var = 0.0
+        self.n = 1
+        self.streak = 0
+        self.active = False
+
+
+class EwmaDetector:
+    """Per-key EWMA z-score detector with hysteresis. update() returns "fired", "cleared" or None."""
+
+    def __init__(
+        self,
+        alpha: float | None = None,
+        z_enter: float | None = None,
+        z_exit: float | None = None,
+        warmup: int | None = None,
+        enter_count: int | None = None,
+        threshold: float | None = None,
+        clear_margin: float | None = None,
+    ) -> None:
+        self.alpha = alpha or settings.anomaly_ewma_alpha
+        self.z_enter = z_enter or settings.anomaly_z_enter
+        self.z_exit = z_exit or settings.anomaly_z_exit
+        self.warmup = settings.anomaly_warmup if warmup is None else warmup
+        self.enter_count = enter_count or settings.anomaly_enter_count
+        self.threshold = settings.maintenance_health_threshold if threshold is None else threshold
+        self.clear_margin = settings.anomaly_clear_margin if clear_margin is None else clear_margin
+        self._series: dict[str, _Series] = {}
+        self.last_reason: dict[str, str] = {}
+
+    def update(self, key: str, value: float) -> str | None:
+        s = self._series.get(key)
+        if s is None:
+            self._series[key] = s = _Series(value)
+            if value < self.threshold:
+                # Counts toward the streak like any other sample
+                s.streak = 1
+                if s.streak >= self.enter_count:
+                    return self._mark(key, s, value, 0.0)
+            return None
+        std = max(math.sqrt(s.var), _MIN_STD)
+        z = (value - s.mean) / std
+        if s.active:
+            # Baseline stays frozen while anomalous; clear only on a real recovery
+            if z > -self.z_exit and value >= self.threshold + self.clear_margin:
+                s.active = False
+                s.streak = 0
+                ANOMALY_EVENTS.labels("cleared").inc()
+                self._learn(s, value)
+                return "cleared"
+            return None
+        below = value < self.threshold
+        dropped = s.n >= self.warmup and z <= -self.z_enter
+        if below or dropped:
+            s.streak += 1
+            if s.streak >= self.enter_count:
+                return self._mark(key, s, value, z)
+            return None
+        s.streak = 0
+        self._learn(s, value)
+        return None
+
+    def _learn(self, s: _Series, value: float) -> None:
+        diff = value - s.mean
+        incr = self.alpha * diff
+        s.mean += incr
+        s.var = (1 - self.alpha) * (s.var + diff * incr)
+        s.n += 1
+
+    def _mark(self, key: str, s: _Series, value: float, z: float) -> str:
+        s.active = True
+        s.streak = 0
+        if value < self.threshold:
+            self.last_reason[key] = f"health {value:.3f} below threshold {self.threshold}"
+        else:
+            self.last_reason[key] = f"health {value:.3f} dropped {abs(z):.1f} std below baseline {s.mean:.3f}"
+        ANOMALY_EVENTS.labels("fired").inc()
+        return "fired"
+
+    def active(self) -> list[str]:
+        return [k for k, s in self._series.items() if s.active]
+
+
+def run_maintenance(equipment_ids: list[str], reasons: dict[str, str]) -> Any:
+    """Default runner: Maintenance Coordinator only, scoped to these equipment IDs."""
+    from core.crew_workers import execute
+
+    return execute("maintenance", {"equipment_ids": equipment_ids, "reasons": reasons})
+
+
+class MaintenanceDispatcher:
+    """
+    Debounced, rate-limited trigger for targeted maintenance runs. submit() is cheap
+    and non-blocking; one background thread performs at most one run at a time.
+    """
+
+    def __init__(
+        self,
+        runner: Callable[[list[str], dict[str, str]], Any] | None = None,
+        debounce_seconds: float | None = None,
+        cooldown_seconds: float | None = None,
+        max_runs_per_hour: int | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.runner = runner or run_maintenance
+        self.debounce = settings.maintenance_debounce_seconds if debounce_seconds is None else debounce_seconds
+        self.cooldown = settings.maintenance_cooldown_seconds if cooldown_seconds is None else cooldown_seconds
+        self.max_runs_per_hour = max_runs_per_hour or settings.maintenance_max_runs_per_hour
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._pending: dict[str, str] = {}
+        self._first_pending_at: float | None = None
+        self._handled_at: dict[str, float] = {}
+        self._run_times: deque[float] = deque()
+        self._closed = False
+        self.counts = {"submitted": 0, "suppressed": 0, "runs": 0, "run_errors": 0, "rate_limited": 0}
+        self._thread = threading.Thread(target=self._loop, name="maintenance-dispatcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, equipment_id: str, reason: str = "") -> bool:
+        """Queue equipment for the next run. False if it was handled within the cooldown."""
+        with self._cond:
+            handled = self._handled_at.get(equipment_id)
+            if handled is not None and self._clock() - handled < self.cooldown:
+                self.counts["suppressed"] += 1
+                return False
+            self.counts["submitted"] += 1
+            self._pending[equipment_id] = reason
+            if self._first_pending_at is None:
+                self._first_pending_at = self._clock()
+            self._cond.notify()
+            return True
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+
+    def stats(self) -> dict[str, Any]:
+        with self._cond:
+            return {**self.counts, "pending": sorted(self._pending)}
+
+    def _next_run_delay(self, now: float) -> float:
+        """Seconds until a run may start: debounce window first, then the hourly cap."""
+        delay = self._first_pending_at + self.debounce - now
+        while self._run_times and now - self._run_times[0] >= 3600:
+            self._run_times.popleft()
+        if len(self._run_times) >= self.max_runs_per_hour:
+            delay = max(delay, self._run_times[0] + 3600 - now)
+        return delay
+
+    def _loop(self) -> None:
+        while True:
+            with self._cond:
+                limited = False
+                while not self._closed:
+                    if self._pending:
+                        delay = self._next_run_delay(self._clock())
+                        if delay <= 0:
+                            break
+                        if len(self._run_times) >= self.max_runs_per_hour and not limited:
+                            limited = True
+                            self.counts["rate_limited"] += 1
+                            MAINTENANCE_RUNS.labels("rate_limited").inc()
+                        self._cond.wait(delay)
+                    else:
+                        self._cond.wait()
+                if self._closed:
+                    return
+                batch = self._pending
+                self._pending = {}
+                self._first_pending_at = None
+                now = self._clock()
+                self._run_times.append(now)
+                for eid in batch:
+                    self._handled_at[eid] = now
+            ids = sorted(batch)
+            print(f"Anomaly: running Maintenance Coordinator for {', '.join(ids)}")
+            try:
+                self.runner(ids, batch)
+                status = "ok"
+            except Exception as e:
+                status = "error"
+                print(f"Targeted maintenance run failed: {e}")
+            with self._cond:
+                self.counts["runs" if status == "ok" else "run_errors"] += 1
+            MAINTENANCE_RUNS.labels(status).inc()
+
+
+class AnomalyMonitor:
+    """TelemetryIngestor listener: window health means -> detector -> dispatcher."""
+
+    def __init__(self, detector: EwmaDetector | None = None, dispatcher: MaintenanceDispatcher | None = None) -> None:
+        self.detector = detector or EwmaDetector()
+        self.dispatcher = dispatcher or MaintenanceDispatcher()
+
+    def __call__(self, window: Any) -> None:
+        for row in window.equipment_rows():
+            eid = row["equipment_id"]
+            if self.detector.update(eid, row["health_score"]) == "fired":
+                self.dispatcher.submit(eid, self.detector.last_reason.get(eid, ""))
+
+    def close(self) -> None:
+        self.dispatcher.close()
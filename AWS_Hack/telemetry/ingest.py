@@ -0,0 +1,307 @@
+"""
+Telemetry ingestion: store/{store_id}/inventory and store/{store_id}/equipment
+messages -> tumbling-window aggregates -> DynamoDB.
+
+Each message body is one payload object or a JSON array of them (the batched form
+IoTPublisher sends). Readings are validated and folded into the open window per
+equipment_id / SKU. When the window closes, a writer thread stores one row per key:
+equipment through update_equipment_health (window mean plus min and reading count),
+inventory through one batched read-modify-write of the latest quantity per SKU.
+Payloads carrying a `ts` (epoch seconds, stamped by aws/iot.py) feed
+telemetry_lag_seconds{stage="ingest"|"write"}.
+"""
+from __future__ import annotations
+
+import json
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Iterable
+
+from config import settings
+from core.metrics import TELEMETRY_LAG, TELEMETRY_MESSAGES
+
+
+class Window:
+    """One closed tumbling window: per-key aggregates ready to write."""
+
+    __slots__ = ("start", "end", "equipment", "inventory")
+
+    def __init__(self, start: float, end: float) -> None:
+        self.start = start
+        self.end = end
+        # equipment_id -> [count, sum, min, max, last, last_ts]
+        self.equipment: dict[str, list] = {}
+        # sku -> [quantity, ts, count]; the reading with the newest ts wins
+        self.inventory: dict[str, list] = {}
+
+    def equipment_rows(self) -> list[dict[str, Any]]:
+        return [
+            {
+                "equipment_id": eid,
+                "health_score": round(agg[1] / agg[0], 4),
+                "health_min": agg[2],
+                "health_max": agg[3],
+                "health_last": agg[4],
+                "readings": agg[0],
+                "last_ts": agg[5],
+            }
+            for eid, agg in self.equipment.items()
+        ]
+
+
+def _iso(ts: float | None) -> str:
+    return datetime.fromtimestamp(ts or time.time(), timezone.utc).isoformat()
+
+
+def write_window(window: Window, pool: ThreadPoolExecutor | None = None) -> None:
+    """Default writer: equipment rows via update_equipment_health, inventory batched."""
+    from aws import dynamodb as db
+
+    rows = window.equipment_rows()
+
+    def put_equipment(row: dict[str, Any]) -> None:
+        db.update_equipment_health(
+            row["equipment_id"],
+            row["health_score"],
+            health_min=row["health_min"],
+            telemetry_readings=row["readings"],
+            telemetry_at=_iso(row["last_ts"]),
+        )
+
+    if pool is not None and len(rows) > 1:
+        list(pool.map(put_equipment, rows))
+    else:
+        for row in rows:
+            put_equipment(row)
+    if window.inventory:
+        missing = db.apply_inventory_levels(
+            {sku: agg[0] for sku, agg in window.inventory.items()},
+            telemetry_at=_iso(window.end),
+        )
+        if missing:
+            print(f"Telemetry: {len(missing)} unknown SKUs skipped (e.g. {missing[0]})")
+
+
+class TelemetryIngestor:
+    """
+    Single-threaded decode/validate/aggregate loop plus one writer thread, so a
+    slow DynamoDB write never stalls intake. Closed windows queue for the writer
+    (max `max_pending_windows`); when that fills, intake blocks (backpressure).
+
+    listeners: callables run with each Window after it was written (e.g. the
+    anomaly detector).
+    """
+
+    def __init__(
+        self,
+        window_seconds: float | None = None,
+        writer: Callable[[Window], None] | None = None,
+        listeners: Iterable[Callable[[Window], None]] = (),
+        max_pending_windows: int = 4,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.window_seconds = window_seconds or settings.telemetry_window_seconds
+        self.listeners = list(listeners)
+        self._clock = clock
+        self._pool: ThreadPoolExecutor | None = None
+        if writer is None:
+            self._pool = ThreadPoolExecutor(max_workers=settings.batch_get_concurrency, thread_name_prefix="telemetry-write")
+            writer = lambda w: write_window(w, self._pool)  # noqa: E731
+        self._writer = writer
+        self._window = self._new_window(clock())
+        self._pending: queue.Queue = queue.Queue(maxsize=max_pending_windows)
+        self._lock = threading.Lock()
+        self.counts = {
+            "messages": 0,
+            "readings": 0,
+            "undecodable": 0,
+            "invalid": 0,
+            "windows_written": 0,
+            "write_errors": 0,
+        }
+        self._exported = {"readings": 0, "invalid": 0, "undecodable": 0}
+        self._ingest_lag = TELEMETRY_LAG.labels("ingest")
+        self._write_lag = TELEMETRY_LAG.labels("write")
+        self._writer_thread = threading.Thread(target=self._write_loop, name="telemetry-writer", daemon=True)
+        self._writer_thread.start()
+
+    def _new_window(self, now: float) -> Window:
+        start = now - now % self.window_seconds
+        return Window(start, start + self.window_seconds)
+
+    # ----- intake -----
+
+    def process(self, topic: str, raw: Any, now: float | None = None) -> int:
+        """Decode, validate and aggregate one message; returns readings accepted."""
+        if now is None:
+            now = self._clock()
+        if now >= self._window.end:
+            self.close_window(now)
+        self.counts["messages"] += 1
+        if isinstance(raw, (bytes, bytearray, str)):
+            try:
+                raw = json.loads(raw)
+            except ValueError:
+                self.counts["undecodable"] += 1
+                return 0
+        payloads = raw if isinstance(raw, list) else (raw,)
+        if topic.endswith("/equipment"):
+            accepted = self._equipment(payloads, now)
+        elif topic.endswith("/inventory"):
+            accepted = self._inventory(payloads, now)
+        else:
+            self.counts["undecodable"] += 1
+            return 0
+        self.counts["readings"] += accepted
+        self.counts["invalid"] += len(payloads) - accepted
+        return accepted
+
+    def _equipment(self, payloads: Iterable[Any], now: float) -> int:
+        agg_map = self._window.equipment
+        accepted = 0
+        for p in payloads:
+            try:
+                eid = p["equipment_id"]
+                h = p["health_score"]
+            except (KeyError, TypeError):
+                continue
+            if not isinstance(eid, str) or not eid or type(h) not in (float, int) or not 0 <= h <= 1:
+                continue
+            ts = p.get("ts")
+            if type(ts) in (float, int):
+                self._ingest_lag.observe(max(0.0, now - ts))
+            else:
+                ts = now
+            agg = agg_map.get(eid)
+            if agg is None:
+                agg_map[eid] = [1, h, h, h, h, ts]
+            else:
+                agg[0] += 1
+                agg[1] += h
+                if h < agg[2]:
+                    agg[2] = h
+                if h > agg[3]:
+                    agg[3] = h
+                if ts >= agg[5]:
+                    agg[4] = h
+                    agg[5] = ts
+            accepted += 1
+        return accepted
+
+    def _inventory(self, payloads: Iterable[Any], now: float) -> int:
+        agg_map = self._window.inventory
+        accepted = 0
+        for p in payloads:
+            try:
+                sku = p["sku"]
+                q = p["quantity"]
+            except (KeyError, TypeError):
+                continue
+            if not isinstance(sku, str) or not sku or type(q) is not int or q < 0:
+                continue
+            ts = p.get("ts")
+            if type(ts) in (float, int):
+                self._ingest_lag.observe(max(0.0, now - ts))
+            else:
+                ts = now
+            agg = agg_map.get(sku)
+            if agg is None:
+                agg_map[sku] = [q, ts, 1]
+            else:
+                agg[2] += 1
+                if ts >= agg[1]:
+                    agg[0] = q
+                    agg[1] = ts
+            accepted += 1
+        return accepted
+
+    def close_window(self, now: float | None = None) -> None:
+        """Hand the open window to the writer (if it has data) and start a new one."""
+        if now is None:
+            now = self._clock()
+        window = self._window
+        self._window = self._new_window(now)
+        # Intake counters are plain ints on the hot path; export them once per window
+        for key, status in (("readings", "accepted"), ("invalid", "invalid"), ("undecodable", "undecodable")):
+            delta = self.counts[key] - self._exported[key]
+            if delta:
+                TELEMETRY_MESSAGES.labels("all", status).inc(delta)
+                self._exported[key] = self.counts[key]
+        if window.equipment or window.inventory:
+            self._pending.put(window)
+
+    def run(self, source: Iterable[Any], max_messages: int | None = None) -> dict[str, Any]:
+        """Consume a source until it ends (or max_messages), then flush. Returns stats()."""
+        process = self.process
+        n = 0
+        for msg in source:
+            if msg is None:
+                # Idle tick: close the window on time even with no traffic
+                if self._clock() >= self._window.end:
+                    self.close_window()
+                continue
+            process(msg[0], msg[1])
+            n += 1
+            if max_messages is not None and n >= max_messages:
+                break
+        self.flush()
+        return self.stats()
+
+    def flush(self) -> None:
+        """Close the open window and wait until every queued window is written."""
+        self.close_window()
+        self._pending.join()
+
+    def close(self) -> None:
+        self.flush()
+        self._pending.put(None)
+        self._writer_thread.join()
+        if self._pool is not None:
+            self._pool.shutdown()
+
+    # ----- writer -----
+
+    def _write_loop(self) -> None:
+        while True:
+            window = self._pending.get()
+            if window is None:
+                self._pending.task_done()
+                return
+            try:
+                self._writer(window)
+                done = time.time()
+                for agg in window.equipment.values():
+                    self._write_lag.observe(max(0.0, done - agg[5]))
+                for agg in window.inventory.values():
+                    self._write_lag.observe(max(0.0, done - agg[1]))
+                with self._lock:
+                    self.counts["windows_written"] += 1
+                self._count_written(window)
+                for listener in self.listeners:
+                    try:
+                        listener(window)
+                    except Exception as e:
+                        print(f"Telemetry listener {listener!r} failed: {e}")
+            except Exception as e:
+                with self._lock:
+                    self.counts["write_errors"] += 1
+                print(f"Telemetry window write failed: {e}")
+            finally:
+                self._pending.task_done()
+
+    @staticmethod
+    def _count_written(window: Window) -> None:
+        TELEMETRY_MESSAGES.labels("equipment", "written").inc(sum(a[0] for a in window.equipment.values()))
+        TELEMETRY_MESSAGES.labels("inventory", "written").inc(sum(a[2] for a in window.inventory.values()))
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            out: dict[str, Any] = dict(self.counts)
+        out["pending_windows"] = self._pending.qsize()
+        for stage, child in (("ingest", self._ingest_lag), ("write", self._write_lag)):
+            out[f"{stage}_lag_p50_ms"] = round(child.quantile(0.5) * 1000, 3)
+            out[f"{stage}_lag_p99_ms"] = round(child.quantile(0.99) * 1000, 3)
+        return out
@@ -0,0 +1,124 @@
+"""
+Telemetry sources for the ingestion pipeline.
+
+A source is an iterable of (topic, raw) pairs, where raw is the message body as
+bytes or str. A source may also yield None when idle so the pipeline can close
+windows on time. Three stand-ins for the IoT Core subscription:
+- QueueSource: an in-process queue (pair with IoTPublisher(send=queue_sender(q)))
+- FileSource: NDJSON lines of {"topic": ..., "payload": ...}
+- MqttSource: a local MQTT broker (needs paho-mqtt 2.x)
+"""
+from __future__ import annotations
+
+import json
+import queue
+import time
+from typing import Any, Callable, Iterator
+
+from config import settings
+
+Message = tuple[str, Any]
+_END = object()
+
+
+class QueueSource:
+    """Reads (topic, raw) tuples from a queue.Queue until close() or a None item."""
+
+    def __init__(self, q: "queue.Queue | None" = None, idle_seconds: float = 0.5) -> None:
+        self.queue: queue.Queue = q if q is not None else queue.Queue()
+        self.idle_seconds = idle_seconds
+
+    def put(self, topic: str, raw: Any) -> None:
+        self.queue.put((topic, raw))
+
+    def close(self) -> None:
+        self.queue.put(_END)
+
+    def __iter__(self) -> Iterator[Message | None]:
+        get = self.queue.get
+        while True:
+            try:
+                item = get(timeout=self.idle_seconds)
+            except queue.Empty:
+                yield None
+                continue
+            if item is _END or item is None:
+                return
+            yield item
+
+
+def queue_sender(q: "queue.Queue | QueueSource") -> Callable[[str, str], None]:
+    """IoTPublisher transport that delivers into a local queue instead of IoT Core."""
+    target = q.queue if isinstance(q, QueueSource) else q
+    return lambda topic, body: target.put((topic, body))
+
+
+class FileSource:
+    """NDJSON replay: one {"topic": ..., "payload": ...} object per line. follow=True tails the file."""
+
+    def __init__(self, path: str, follow: bool = False, idle_seconds: float = 0.5) -> None:
+        self.path = path
+        self.follow = follow
+        self.idle_seconds = idle_seconds
+
+    def __iter__(self) -> Iterator[Message | None]:
+        with open(self.path, encoding="utf-8") as f:
+            while True:
+                line = f.readline()
+                if not line:
+                    if not self.follow:
+                        return
+                    yield None
+                    time.sleep(self.idle_seconds)
+                    continue
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    rec = json.loads(line)
+                    yield rec["topic"], rec["payload"]
+                except (ValueError, KeyError, TypeError):
+                    # Let the pipeline count it as undecodable
+                    yield "", line
+
+
+class MqttSource:
+    """Subscribes to store/+/inventory and store/+/equipment on an MQTT broker."""
+
+    def __init__(
+        self,
+        host: str | None = None,
+        port: int | None = None,
+        topics: tuple[str, ...] = ("store/+/inventory", "store/+/equipment"),
+        idle_seconds: float = 0.5,
+    ) -> None:
+        try:
+            import paho.mqtt.client as mqtt
+        except ImportError as e:
+            raise ImportError("MqttSource needs paho-mqtt 2.x: pip install 'paho-mqtt>=2.0'") from e
+        self._queue: queue.Queue = queue.Queue(maxsize=100_000)
+        self.idle_seconds = idle_seconds
+        self.topics = topics
+        self._client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
+        self._client.on_connect = self._on_connect
+        self._client.on_message = lambda c, u, msg: self._queue.put((msg.topic, msg.payload))
+        self._client.connect(host or settings.telemetry_mqtt_host, port or settings.telemetry_mqtt_port)
+
+    def _on_connect(self, client: Any, userdata: Any, flags: Any, reason_code: Any, properties: Any) -> None:
+        if reason_code.is_failure:
+            print(f"MQTT connect failed: {reason_code}")
+            return
+        for topic in self.topics:
+            client.subscribe(topic, qos=1)
+
+    def close(self) -> None:
+        self._client.loop_stop()
+        self._client.disconnect()
+        self._queue.put(_END)
+
+    def __iter__(self) -> Iterator[Message | None]:
+        self._client.loop_start()
+        try:
+            yield from QueueSource(self._queue, self.idle_seconds)
+        finally:
+            self._client.loop_stop()
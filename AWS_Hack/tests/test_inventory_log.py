@@ -0,0 +1,170 @@
+"""InventoryLedger: replay vs snapshot recovery, gap handling, which rows a writer writes, adjust/seed."""
+from __future__ import annotations
+
+import time
+
+import pytest
+
+from aws import dynamodb as db
+from aws import inventory_log as il
+from config import settings
+
+
+class ListLog:
+    """In-memory log; `hidden` seqs are reserved but not yet written (a slow writer)."""
+
+    def __init__(self) -> None:
+        self.events: list[dict] = []
+        self.hidden: set[int] = set()
+
+    def append(self, events):
+        first = len(self.events) + 1
+        stamped = [{**e, "seq": first + k, "ts": time.time()} for k, e in enumerate(events)]
+        self.events += stamped
+        return stamped
+
+    def read(self, after_seq=0):
+        for e in self.events:
+            if e["seq"] > after_seq and e["seq"] not in self.hidden:
+                yield e
+
+
+@pytest.fixture
+def writes(monkeypatch):
+    calls = []
+    monkeypatch.setattr(db, "write_inventory_rows", lambda puts, deletes: calls.append(
+        ({i["sku"]: i for i in puts}, list(deletes))))
+    monkeypatch.setattr(settings, "inventory_log_gap_grace_seconds", 0.0)
+    monkeypatch.setattr(settings, "inventory_log_gap_retry_seconds", 300.0)
+    return calls
+
+
+def item(sku, quantity, threshold=5):
+    return {"sku": sku, "quantity": quantity, "reorder_threshold": threshold}
+
+
+def test_snapshot_plus_tail_equals_full_replay(tmp_path, writes, monkeypatch):
+    monkeypatch.setattr(settings, "inventory_snapshot_every", 10**9)
+    log = il.FileEventLog(str(tmp_path / "log"), segment_events=7)
+    writer = il.InventoryLedger(log, snapshot_path=str(tmp_path / "snapshot.json"))
+    writer.append([il.upsert_event(item(f"S{k}", 20)) for k in range(5)])
+    writer.append([il.adjust_event("S1", -3), il.set_event("S2", 4)])
+    writer.snapshot()
+    writer.append([il.adjust_event("S2", 10), il.delete_event("S3"), il.set_event("S4", 1)])
+    writer.append([il.upsert_event(item("S5", 2))])
+
+    replayed = il.InventoryLedger(il.FileEventLog(str(tmp_path / "log")))
+    replayed.recover()
+    recovered = il.InventoryLedger(il.FileEventLog(str(tmp_path / "log")),
+                                   snapshot_path=str(tmp_path / "snapshot.json"))
+    stats = recovered.recover()
+
+    assert stats["replayed"] == 4
+    assert recovered.seq == replayed.seq == writer.seq
+    assert recovered.items.items == replayed.items.items == writer.items.items
+    assert recovered.low_stock.skus == replayed.low_stock.skus == {"S4", "S5"}
+    assert replayed.get("S1")["quantity"] == 17 and replayed.get("S3") is None
+    assert list(tmp_path.glob("*.tmp")) == []
+
+
+def test_gap_within_grace_stalls(writes, monkeypatch):
+    monkeypatch.setattr(settings, "inventory_log_gap_grace_seconds", 60.0)
+    log = ListLog()
+    log.append([il.upsert_event(item("A", 10)), il.adjust_event("A", -1), il.adjust_event("A", -2)])
+    log.hidden = {2}
+    ledger = il.InventoryLedger(log)
+    ledger.catch_up()
+    assert ledger.seq == 1 and ledger.get("A")["quantity"] == 10
+
+    log.hidden.clear()
+    ledger.catch_up()
+    assert ledger.seq == 3 and ledger.get("A")["quantity"] == 7
+    assert ledger.counts["gaps_skipped"] == 0
+
+
+def test_skipped_gap_applied_when_it_turns_up(writes):
+    log = ListLog()
+    log.append([il.upsert_event(item("A", 10)), il.adjust_event("A", -4), il.adjust_event("A", -1)])
+    log.hidden = {2}
+    ledger = il.InventoryLedger(log)
+    ledger.catch_up()
+    assert ledger.counts["gaps_skipped"] == 1 and ledger.get("A")["quantity"] == 9
+
+    log.hidden.clear()
+    ledger.catch_up()
+    assert ledger.get("A")["quantity"] == 5
+    assert ledger.get("A")["seq"] == 3
+    assert ledger.counts["late_applied"] == 1 and not ledger._skipped
+
+
+def test_late_event_superseded_by_newer_absolute_event(writes):
+    log = ListLog()
+    log.append([il.upsert_event(item("A", 10)), il.adjust_event("A", -4), il.set_event("A", 8)])
+    log.hidden = {2}
+    ledger = il.InventoryLedger(log)
+    ledger.catch_up()
+    log.hidden.clear()
+    ledger.catch_up()
+    assert ledger.get("A")["quantity"] == 8
+    assert ledger.counts["late_superseded"] == 1
+
+
+def test_writer_writes_only_its_own_rows(writes):
+    log = ListLog()
+    other = il.InventoryLedger(log)
+    other.append([il.upsert_event(item("A", 10)), il.upsert_event(item("B", 10))])
+    ledger = il.InventoryLedger(log)
+    ledger.catch_up()
+
+    # Another writer's event for A is still in flight (reserved, not written)
+    log.append([il.adjust_event("A", -3)])
+    log.hidden = {3}
+    writes.clear()
+    ledger.append([il.adjust_event("B", -2)])
+    assert [sorted(puts) for puts, _ in writes] == [["B"]]
+
+    # When it turns up, A is not rewritten: this process never wrote A
+    log.hidden.clear()
+    writes.clear()
+    ledger.catch_up()
+    assert ledger.get("A")["quantity"] == 7 and writes == []
+
+
+def test_late_event_rewrites_rows_this_writer_wrote(writes):
+    log = ListLog()
+    ledger = il.InventoryLedger(log)
+    ledger.append([il.upsert_event(item("A", 10))])
+    log.append([il.adjust_event("A", -3)])
+    log.hidden = {2}
+    ledger.append([il.adjust_event("A", -1)])
+    assert writes[-1][0]["A"]["quantity"] == 9
+
+    log.hidden.clear()
+    ledger.catch_up()
+    assert writes[-1][0]["A"]["quantity"] == 6
+
+
+def test_skipped_seqs_survive_snapshot(tmp_path, writes):
+    log = ListLog()
+    log.append([il.upsert_event(item("A", 10)), il.adjust_event("A", -4), il.adjust_event("A", -1)])
+    log.hidden = {2}
+    ledger = il.InventoryLedger(log, snapshot_path=str(tmp_path / "snapshot.json"))
+    ledger.catch_up()
+    ledger.snapshot()
+
+    log.hidden.clear()
+    restarted = il.InventoryLedger(log, snapshot_path=str(tmp_path / "snapshot.json"))
+    restarted.recover()
+    assert restarted.get("A")["quantity"] == 5
+
+
+def test_adjust_returns_a_copy_and_skips_unknown_skus(writes):
+    ledger = il.InventoryLedger(ListLog())
+    ledger.seed([item("A", 10)])
+    assert ledger.adjust("Z", 1) is None and ledger.seq == 1
+    updated = ledger.adjust("A", -4, "sale")
+    assert updated["quantity"] == 6 and updated["seq"] == 2
+    updated["quantity"] = 0
+    assert ledger.get("A")["quantity"] == 6
+    with pytest.raises(RuntimeError):
+        ledger.seed([item("B", 1)])
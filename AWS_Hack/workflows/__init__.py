@@ -0,0 +1 @@
+"""Local Step Functions execution: ASL interpreter and in-process engine."""
@@ -0,0 +1,431 @@
+"""
+Interpreter for the Amazon States Language subset used by workflows/definitions.
+
+Supported:
+- States: Task, Choice, Pass, Succeed, Fail
+- Fields: InputPath, Parameters, ResultSelector, ResultPath, OutputPath, Result (Pass),
+  Retry (MaxAttempts; no sleeping), Catch (ErrorEquals, ResultPath, Next)
+- Paths: $, $.a.b, $.a[0], and the context object ($$.Execution.Id, $$.State.EnteredTime, ...)
+- Intrinsics: States.Format, States.StringToJson, States.JsonToString, States.Array
+- Choice rules: String/Numeric/Boolean/Timestamp comparisons (plus *Path variants),
+  IsPresent, IsNull, IsString, IsNumeric, IsBoolean, And, Or, Not
+
+Definitions are compiled once into closures, so an execution is a loop over Python
+callables. Task resources are resolved through a handler map: for lambda:invoke the key
+is Parameters.FunctionName (e.g. "${CheckInventoryLambdaArn}") and the handler's return
+value becomes {"Payload": ...}; any other resource (e.g. "arn:aws:states:::sns:publish")
+is looked up by its Resource string and receives the resolved Parameters.
+"""
+from __future__ import annotations
+
+import json
+import re
+from datetime import datetime, timezone
+from typing import Any, Callable
+
+LAMBDA_INVOKE = "arn:aws:states:::lambda:invoke"
+MAX_TRANSITIONS = 10_000
+
+
+class StatesError(Exception):
+    """An ASL runtime error; `error` is the States.* / task error name used by Retry/Catch."""
+
+    def __init__(self, error: str, cause: str = "") -> None:
+        super().__init__(f"{error}: {cause}" if cause else error)
+        self.error = error
+        self.cause = cause
+
+
+# ---------- Paths ----------
+
+_PATH_TOKEN = re.compile(r"\.([^.\[\]]+)|\[(\d+)\]")
+
+
+def _compile_path(path: str) -> Callable[[Any, dict], Any]:
+    """Compile a reference path into getter(data, context)."""
+    if path.startswith("$$"):
+        root, rest = "context", path[2:]
+    elif path.startswith("$"):
+        root, rest = "data", path[1:]
+    else:
+        raise StatesError("States.Runtime", f"Invalid path {path!r}")
+    steps: list[Any] = []
+    pos = 0
+    while pos < len(rest):
+        m = _PATH_TOKEN.match(rest, pos)
+        if not m:
+            raise StatesError("States.Runtime", f"Unsupported path {path!r}")
+        steps.append(m.group(1) if m.group(1) is not None else int(m.group(2)))
+        pos = m.end()
+    steps_t = tuple(steps)
+
+    def get(data: Any, context: dict) -> Any:
+        value = context if root == "context" else data
+        for step in steps_t:
+            try:
+                value = value[step]
+            except (KeyError, IndexError, TypeError):
+                raise StatesError("States.Runtime", f"Path {path!r} not found in input") from None
+        return value
+
+    return get
+
+
+def _path_present(getter: Callable[[Any, dict], Any], data: Any, context: dict) -> bool:
+    try:
+        getter(data, context)
+        return True
+    except StatesError:
+        return False
+
+
+def _set_path(data: Any, path: str, value: Any) -> Any:
+    """Apply ResultPath: returns the new state data."""
+    if path == "$":
+        return value
+    if not path.startswith("$."):
+        raise StatesError("States.Runtime", f"Unsupported ResultPath {path!r}")
+    keys = path[2:].split(".")
+    out = dict(data) if isinstance(data, dict) else {}
+    node = out
+    for k in keys[:-1]:
+        child = node.get(k)
+        node[k] = dict(child) if isinstance(child, dict) else {}
+        node = node[k]
+    node[keys[-1]] = value
+    return out
+
+
+# ---------- Intrinsic functions ----------
+
+_INTRINSIC = re.compile(r"^(States\.\w+)\((.*)\)$", re.S)
+
+
+def _split_args(args: str) -> list[str]:
+    out, depth, quote, cur = [], 0, False, []
+    i = 0
+    while i < len(args):
+        ch = args[i]
+        if quote:
+            cur.append(ch)
+            if ch == "\\" and i + 1 < len(args):
+                cur.append(args[i + 1])
+                i += 1
+            elif ch == "'":
+                quote = False
+        elif ch == "'":
+            quote = True
+            cur.append(ch)
+        elif ch == "(":
+            depth += 1
+            cur.append(ch)
+        elif ch == ")":
+            depth -= 1
+            cur.append(ch)
+        elif ch == "," and depth == 0:
+            out.append("".join(cur).strip())
+            cur = []
+        else:
+            cur.append(ch)
+        i += 1
+    if "".join(cur).strip():
+        out.append("".join(cur).strip())
+    return out
+
+
+def _compile_value_expr(expr: str) -> Callable[[Any, dict], Any]:
+    """A `.$` field value: a path or an intrinsic function call."""
+    expr = expr.strip()
+    m = _INTRINSIC.match(expr)
+    if not m:
+        return _compile_path(expr)
+    name, raw_args = m.groups()
+    args: list[Callable[[Any, dict], Any]] = []
+    for a in _split_args(raw_args):
+        if a.startswith("'"):
+            literal = re.sub(r"\\(.)", r"\1", a[1:-1])
+            args.append(lambda d, c, v=literal: v)
+        elif a.startswith("$") or a.startswith("States."):
+            args.append(_compile_value_expr(a))
+        else:
+            literal = json.loads(a)
+            args.append(lambda d, c, v=literal: v)
+
+    if name == "States.Format":
+        template = args[0]
+
+        def fmt(data: Any, context: dict) -> str:
+            parts = template(data, context).split("{}")
+            values = [a(data, context) for a in args[1:]]
+            if len(values) != len(parts) - 1:
+                raise StatesError("States.IntrinsicFailure", "States.Format argument count mismatch")
+            out = [parts[0]]
+            for v, p in zip(values, parts[1:]):
+                out.append(v if isinstance(v, str) else json.dumps(v, default=str))
+                out.append(p)
+            return "".join(out)
+
+        return fmt
+    if name == "States.StringToJson":
+        return lambda d, c: json.loads(args[0](d, c))
+    if name == "States.JsonToString":
+        return lambda d, c: json.dumps(args[0](d, c), separators=(",", ":"), default=str)
+    if name == "States.Array":
+        return lambda d, c: [a(d, c) for a in args]
+    raise StatesError("States.Runtime", f"Unsupported intrinsic {name}")
+
+
+def _compile_template(template: Any) -> Callable[[Any, dict], Any]:
+    """Compile a Parameters / ResultSelector payload template."""
+    if isinstance(template, dict):
+        fields = []
+        for key, value in template.items():
+            if key.endswith(".$"):
+                fields.append((key[:-2], _compile_value_expr(value), True))
+            else:
+                fields.append((key, _compile_template(value), False))
+        return lambda d, c: {k: f(d, c) for k, f, _ in fields}
+    if isinstance(template, list):
+        items = [_compile_template(v) for v in template]
+        return lambda d, c: [f(d, c) for f in items]
+    return lambda d, c: template
+
+
+# ---------- Choice rules ----------
+
+_COMPARATORS: dict[str, tuple[type | tuple, Callable[[Any, Any], bool]]] = {}
+for _prefix, _types in (
+    ("String", str),
+    ("Numeric", (int, float)),
+    ("Boolean", bool),
+    ("Timestamp", str),
+):
+    for _op, _fn in (
+        ("Equals", lambda a, b: a == b),
+        ("LessThan", lambda a, b: a < b),
+        ("GreaterThan", lambda a, b: a > b),
+        ("LessThanEquals", lambda a, b: a <= b),
+        ("GreaterThanEquals", lambda a, b: a >= b),
+    ):
+        if _prefix == "Boolean" and _op != "Equals":
+            continue
+        _COMPARATORS[f"{_prefix}{_op}"] = (_types, _fn)
+
+
+def _type_ok(value: Any, types: type | tuple) -> bool:
+    if types == (int, float) and isinstance(value, bool):
+        return False
+    return isinstance(value, types)
+
+
+def _compile_rule(rule: dict) -> Callable[[Any, dict], bool]:
+    if "And" in rule:
+        subs = [_compile_rule(r) for r in rule["And"]]
+        return lambda d, c: all(s(d, c) for s in subs)
+    if "Or" in rule:
+        subs = [_compile_rule(r) for r in rule["Or"]]
+        return lambda d, c: any(s(d, c) for s in subs)
+    if "Not" in rule:
+        sub = _compile_rule(rule["Not"])
+        return lambda d, c: not sub(d, c)
+
+    var = _compile_path(rule["Variable"])
+    if "IsPresent" in rule:
+        want = rule["IsPresent"]
+        return lambda d, c: _path_present(var, d, c) == want
+    for check, types in (("IsNull", type(None)), ("IsString", str), ("IsNumeric", (int, float)), ("IsBoolean", bool)):
+        if check in rule:
+            want = rule[check]
+            return lambda d, c, t=types: (_path_present(var, d, c) and _type_ok(var(d, c), t)) == want
+
+    for key, value in rule.items():
+        if key in ("Variable", "Next"):
+            continue
+        is_path = key.endswith("Path")
+        name = key[:-4] if is_path else key
+        if name not in _COMPARATORS:
+            raise StatesError("States.Runtime", f"Unsupported Choice comparator {key}")
+        types, fn = _COMPARATORS[name]
+        other = _compile_path(value) if is_path else (lambda d, c, v=value: v)
+
+        def test(d: Any, c: dict, fn=fn, types=types, other=other) -> bool:
+            if not _path_present(var, d, c):
+                return False
+            left, right = var(d, c), other(d, c)
+            return _type_ok(left, types) and _type_ok(right, types) and fn(left, right)
+
+        return test
+    raise StatesError("States.Runtime", f"Choice rule has no comparator: {rule}")
+
+
+# ---------- States ----------
+
+Handler = Callable[[Any], Any]
+
+
+class _State:
+    __slots__ = (
+        "name", "type", "next", "end", "input_path", "output_path", "result_path",
+        "parameters", "result_selector", "result", "resource", "choices", "default",
+        "error", "cause", "retry", "catch",
+    )
+
+    def __init__(self, name: str, spec: dict) -> None:
+        self.name = name
+        self.type = spec["Type"]
+        self.next = spec.get("Next")
+        self.end = spec.get("End", False)
+        self.input_path = _compile_path(spec["InputPath"]) if spec.get("InputPath") else None
+        self.output_path = _compile_path(spec["OutputPath"]) if spec.get("OutputPath") else None
+        # ResultPath: absent -> "$", explicit null -> discard the result
+        self.result_path = spec.get("ResultPath", "$")
+        self.parameters = _compile_template(spec["Parameters"]) if "Parameters" in spec else None
+        self.result_selector = _compile_template(spec["ResultSelector"]) if "ResultSelector" in spec else None
+        self.result = spec.get("Result")
+        self.resource = spec.get("Resource")
+        self.choices = [(_compile_rule(r), r["Next"]) for r in spec.get("Choices", [])]
+        self.default = spec.get("Default")
+        self.error = spec.get("Error", "States.Fail")
+        self.cause = spec.get("Cause", "")
+        self.retry = spec.get("Retry", [])
+        self.catch = spec.get("Catch", [])
+
+
+def _matches(error: str, equals: list[str]) -> bool:
+    return "States.ALL" in equals or error in equals
+
+
+class StateMachine:
+    """A compiled ASL definition. execute() is synchronous and thread-safe."""
+
+    def __init__(self, definition: dict | str, handlers: dict[str, Handler], name: str = "StateMachine") -> None:
+        if isinstance(definition, str):
+            definition = json.loads(definition)
+        self.name = name
+        self.start_at = definition["StartAt"]
+        self.states = {n: _State(n, spec) for n, spec in definition["States"].items()}
+        self.handlers = handlers
+        for state in self.states.values():
+            if state.type not in ("Task", "Choice", "Pass", "Succeed", "Fail"):
+                raise StatesError("States.Runtime", f"Unsupported state type {state.type} ({state.name})")
+
+    def execute(
+        self,
+        input_data: Any,
+        execution_id: str = "",
+        history: list[dict[str, Any]] | None = None,
+    ) -> dict[str, Any]:
+        """
+        Run to completion. Returns {"status", "output", "error", "cause"}; when a
+        history list is passed, state-level events are appended to it.
+        """
+        context: dict[str, Any] = {
+            "Execution": {"Id": execution_id, "Input": input_data, "StartTime": _now()},
+            "StateMachine": {"Name": self.name},
+            "State": {},
+        }
+
+        def record(event_type: str, **details: Any) -> None:
+            if history is not None:
+                history.append({
+                    "id": len(history) + 1,
+                    "event_type": event_type,
+                    "timestamp": _now(),
+                    **details,
+                })
+
+        record("ExecutionStarted")
+        data = input_data
+        name = self.start_at
+        for _ in range(MAX_TRANSITIONS):
+            state = self.states[name]
+            context["State"] = {"Name": name, "EnteredTime": _now()}
+            record(f"{state.type}StateEntered", state=name)
+            try:
+                if state.type == "Fail":
+                    raise StatesError(state.error, state.cause)
+                data, next_name = self._run_state(state, data, context)
+            except StatesError as e:
+                handler = next((c for c in state.catch if _matches(e.error, c["ErrorEquals"])), None)
+                if handler is None:
+                    record("ExecutionFailed", error=e.error, cause=e.cause)
+                    return {"status": "FAILED", "output": None, "error": e.error, "cause": e.cause}
+                error_output = {"Error": e.error, "Cause": e.cause}
+                path = handler.get("ResultPath", "$")
+                data = data if path is None else _set_path(data, path, error_output)
+                next_name = handler["Next"]
+            record(f"{state.type}StateExited", state=name)
+            if next_name is None:
+                record("ExecutionSucceeded")
+                return {"status": "SUCCEEDED", "output": data, "error": None, "cause": None}
+            name = next_name
+        record("ExecutionFailed", error="States.Runtime", cause="Too many transitions")
+        return {"status": "FAILED", "output": None, "error": "States.Runtime", "cause": "Too many transitions"}
+
+    def _run_state(self, state: _State, data: Any, context: dict) -> tuple[Any, str | None]:
+        if state.type == "Choice":
+            for test, next_name in state.choices:
+                if test(data, context):
+                    return data, next_name
+            if state.default is None:
+                raise StatesError("States.NoChoiceMatched", f"No choice matched in {state.name}")
+            return data, state.default
+
+        if state.type == "Succeed":
+            effective = state.input_path(data, context) if state.input_path else data
+            out = state.output_path(effective, context) if state.output_path else effective
+            return out, None
+
+        effective = state.input_path(data, context) if state.input_path else data
+        params = state.parameters(effective, context) if state.parameters else effective
+        if state.type == "Pass":
+            result = state.result if state.result is not None else params
+        else:
+            result = self._invoke_with_retry(state, params)
+            if state.result_selector:
+                result = state.result_selector(result, context)
+        if state.result_path is None:
+            out = data
+        else:
+            out = _set_path(data, state.result_path, result)
+        if state.output_path:
+            out = state.output_path(out, context)
+        return out, (None if state.end else state.next)
+
+    def _invoke_with_retry(self, state: _State, params: Any) -> Any:
+        attempts: dict[int, int] = {}
+        while True:
+            try:
+                return self._invoke(state, params)
+            except StatesError as e:
+                idx = next((i for i, r in enumerate(state.retry) if _matches(e.error, r["ErrorEquals"])), None)
+                if idx is None:
+                    raise
+                attempts[idx] = attempts.get(idx, 0) + 1
+                if attempts[idx] > state.retry[idx].get("MaxAttempts", 3):
+                    raise
+
+    def _invoke(self, state: _State, params: Any) -> Any:
+        if state.resource == LAMBDA_INVOKE:
+            function = params.get("FunctionName") if isinstance(params, dict) else None
+            handler = self.handlers.get(function)
+            payload = params.get("Payload") if isinstance(params, dict) else params
+        else:
+            function = state.resource
+            handler = self.handlers.get(function)
+            payload = params
+        if handler is None:
+            raise StatesError("States.TaskFailed", f"No local handler for {function}")
+        try:
+            result = handler(payload)
+        except StatesError:
+            raise
+        except Exception as e:
+            raise StatesError(type(e).__name__, str(e)) from e
+        if state.resource == LAMBDA_INVOKE:
+            return {"Payload": result, "StatusCode": 200}
+        return result
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
@@ -0,0 +1,168 @@
+"""
+In-process execution engine for the store workflows (WORKFLOW_BACKEND=local).
+
+Runs workflows/definitions/*.asl.json through workflows.asl with Python handlers in
+place of the Lambda functions and SNS topic, so the reorder flow can be exercised and
+load-tested without Step Functions. Pair with STORAGE_BACKEND=memory for a fully
+offline run. Executions complete synchronously inside start(); describe() and
+history() mirror the shapes aws/step_functions.py returns.
+"""
+from __future__ import annotations
+
+import json
+import threading
+import uuid
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from botocore.exceptions import ClientError
+
+from config import settings
+from workflows.asl import Handler, StateMachine
+
+DEFINITIONS_DIR = Path(__file__).resolve().parent / "definitions"
+MAX_EXECUTIONS = 10_000
+
+
+# ---------- Default task handlers ----------
+
+
+def check_inventory(payload: dict[str, Any]) -> dict[str, Any]:
+    """Stand-in for ${CheckInventoryLambdaArn}."""
+    from aws import dynamodb as db
+
+    items = db.list_low_stock()
+    return {
+        "store_id": payload.get("store_id"),
+        "low_stock_count": len(items),
+        "low_stock_items": [
+            {"sku": i["sku"], "quantity": i.get("quantity", 0), "reorder_threshold": i.get("reorder_threshold", 10)}
+            for i in items
+        ],
+    }
+
+
+def create_orders(payload: dict[str, Any]) -> dict[str, Any]:
+    """Stand-in for ${CreateOrdersLambdaArn}: same 2x-threshold rule as create_order_tool."""
+    from aws import dynamodb as db
+
+    order_ids = []
+    for item in payload.get("items") or []:
+        order_id = f"PO-{item['sku']}-{uuid.uuid4().hex[:8]}"
+        db.put_order(order_id=order_id, sku=item["sku"], quantity=item.get("reorder_threshold", 10) * 2, status="pending")
+        order_ids.append(order_id)
+    return {"store_id": payload.get("store_id"), "orders_created": len(order_ids), "order_ids": order_ids}
+
+
+# Messages "published" by the local SNS stand-in, newest last
+NOTIFICATIONS: deque[dict[str, Any]] = deque(maxlen=1000)
+
+
+def publish_notification(payload: dict[str, Any]) -> dict[str, Any]:
+    """Stand-in for arn:aws:states:::sns:publish."""
+    message_id = uuid.uuid4().hex
+    NOTIFICATIONS.append({"MessageId": message_id, **payload})
+    return {"MessageId": message_id}
+
+
+def default_handlers() -> dict[str, Handler]:
+    return {
+        "${CheckInventoryLambdaArn}": check_inventory,
+        "${CreateOrdersLambdaArn}": create_orders,
+        "arn:aws:states:::sns:publish": publish_notification,
+    }
+
+
+# ---------- Engine ----------
+
+
+class LocalWorkflowEngine:
+    """Start / describe / history for local executions, keyed by execution ARN."""
+
+    def __init__(self, definition_file: str | None = None, handlers: dict[str, Handler] | None = None) -> None:
+        definition_file = definition_file or settings.local_workflow_definition
+        path = Path(definition_file)
+        if not path.is_absolute():
+            path = DEFINITIONS_DIR / path
+        self.name = settings.state_machine_name
+        self.machine = StateMachine(path.read_text(), handlers or default_handlers(), name=self.name)
+        self._lock = threading.Lock()
+        # Oldest executions are evicted past MAX_EXECUTIONS
+        self._executions: OrderedDict[str, dict[str, Any]] = OrderedDict()
+
+    def execution_arn(self, name: str) -> str:
+        return f"arn:aws:states:local:000000000000:execution:{self.name}:{name}"
+
+    def start(self, input_payload: dict[str, Any], name: str) -> tuple[str, bool]:
+        """
+        Run an execution to completion; returns (execution ARN, started). Like
+        StartExecution, a repeated name returns the ARN while that execution is still
+        running and raises ExecutionAlreadyExists once it has closed.
+        """
+        arn = self.execution_arn(name)
+        with self._lock:
+            existing = self._executions.get(arn)
+            if existing is not None:
+                if existing["status"] == "RUNNING":
+                    return arn, False
+                raise ClientError(
+                    {"Error": {"Code": "ExecutionAlreadyExists", "Message": f"Execution already exists: '{arn}'"}},
+                    "StartExecution",
+                )
+            record: dict[str, Any] = {"status": "RUNNING", "startDate": _now(), "stopDate": None, "output": None, "history": []}
+            self._executions[arn] = record
+            while len(self._executions) > MAX_EXECUTIONS:
+                self._executions.popitem(last=False)
+        result = self.machine.execute(input_payload, execution_id=arn, history=record["history"])
+        record.update(
+            status=result["status"],
+            stopDate=_now(),
+            output=result["output"],
+            error=result["error"],
+            cause=result["cause"],
+        )
+        return arn, True
+
+    def describe(self, execution_arn: str) -> dict[str, Any]:
+        record = self._executions.get(execution_arn)
+        if record is None:
+            return {"status": "NOT_FOUND", "error": f"ExecutionDoesNotExist: {execution_arn}"}
+        out = {k: record[k] for k in ("status", "startDate", "stopDate", "output")}
+        # Round-trip like the real API so callers see plain JSON types
+        if out["output"] is not None:
+            out["output"] = json.loads(json.dumps(out["output"], default=str))
+        return out
+
+    def history(self, execution_arn: str, after_event_id: int = 0) -> list[dict[str, Any]]:
+        record = self._executions.get(execution_arn)
+        if record is None:
+            return []
+        return [
+            {
+                "id": ev["id"],
+                "event_type": ev["event_type"],
+                "timestamp": ev["timestamp"],
+                "previous_event_id": ev["id"] - 1 if ev["id"] > 1 else 0,
+            }
+            for ev in record["history"][after_event_id:]
+        ]
+
+
+_engine: LocalWorkflowEngine | None = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> LocalWorkflowEngine:
+    """Process-wide engine, built on first use from settings.local_workflow_definition."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = LocalWorkflowEngine()
+    return _engine
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
@@ -55,8 +55,9 @@ export type AgentRole =
 
 export interface LogEntry {
   id: string
-  type: "log" | "start" | "heartbeat" | "done"
+  type: "log" | "start" | "heartbeat" | "done" | "token"
   agent: AgentRole
+  task?: string
   message: string
   timestamp: string
 }
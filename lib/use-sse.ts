@@ -37,6 +37,23 @@ export function useSSE() {
             timestamp: data.timestamp || new Date().toISOString(),
           }
           setLogs((prev) => [...prev, entry])
+        } else if (data.type === "token") {
+          // Append to the running token entry of the same agent/task, else start one
+          setLogs((prev) => {
+            const last = prev[prev.length - 1]
+            if (last && last.type === "token" && last.agent === data.agent && last.task === data.task) {
+              return [...prev.slice(0, -1), { ...last, message: last.message + data.chunk }]
+            }
+            const entry: LogEntry = {
+              id: `log-${++logCounter}`,
+              type: "token",
+              agent: (data.agent as AgentRole) || "System",
+              task: data.task,
+              message: data.chunk,
+              timestamp: data.timestamp || new Date().toISOString(),
+            }
+            return [...prev, entry]
+          })
         }
         // heartbeats are silently ignored
       } catch {